@@ -0,0 +1,223 @@
+# Copyright (c) Microsoft Corporation
+# Licensed under the MIT License.
+
+"""Defines the sampling and confidence intervals of approximate views."""
+
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
+from scipy.stats import t as student_t
+
+from erroranalysis._internal.constants import ROW_INDEX
+from erroranalysis._internal.utils import generate_stratified_random_indexes
+
+DEFAULT_MAX_RESULTS = 4
+# the number of random groups the sample is split into to estimate the
+# variance of the metrics
+NUM_REPLICATES = 10
+CONFIDENCE_LEVEL = 0.95
+
+
+def sample_cohort(analyzer, dataset, sample_size, random_state=None):
+    """Sample the rows of a cohort, stratified on the error.
+
+    The rows are looked up in the analyzer's errors on the full dataset
+    by the 'index' column, so that the error of every row of the cohort
+    is known without computing the metrics on all the rows.
+
+    :param analyzer: The error analyzer.
+    :type analyzer: BaseAnalyzer
+    :param dataset: The cohort, with the 'index' column of the rows in
+        the full dataset.
+    :type dataset: pandas.DataFrame
+    :param sample_size: The maximum number of rows of the sample, or
+        None to keep all the rows.
+    :type sample_size: int
+    :param random_state: The seed used to sample the rows.
+    :type random_state: int
+    :return: The sampled cohort and the number of rows of the cohort each
+        sampled row stands for, or the cohort and None if it is not
+        sampled.
+    :rtype: tuple[pandas.DataFrame, float]
+    """
+    num_rows = dataset.shape[0]
+    if sample_size is None or num_rows <= sample_size:
+        return dataset, None
+    row_index = dataset[ROW_INDEX].to_numpy()
+    diff = np.asarray(analyzer.get_diff())[row_index]
+    sample_indexes = generate_stratified_random_indexes(
+        analyzer._get_error_strata(diff), sample_size, random_state)
+    return dataset.iloc[sample_indexes], num_rows / sample_size
+
+
+def get_replicates(num_rows, random_state=None):
+    """Split the rows of a sample into random groups of equal size.
+
+    :param num_rows: The number of rows of the sample.
+    :type num_rows: int
+    :param random_state: The seed used to split the rows.
+    :type random_state: int
+    :return: The group of each row.
+    :rtype: numpy.ndarray
+    """
+    rng = np.random.RandomState(random_state)
+    return rng.permutation(num_rows) % NUM_REPLICATES
+
+
+def compute_confidence_bounds(value, replicate_values):
+    """Compute the confidence interval of a metric value of a sample.
+
+    The variance of the metric is estimated from its values on the
+    random groups of the sample which have rows of the node or cell.
+
+    :param value: The metric value on the whole sample.
+    :type value: float
+    :param replicate_values: The metric values on the random groups.
+    :type replicate_values: list[float]
+    :return: The lower and upper bounds of the metric value, or None if
+        there are not enough groups to estimate them.
+    :rtype: tuple[float, float]
+    """
+    replicate_values = np.asarray(replicate_values, dtype=float)
+    replicate_values = replicate_values[~np.isnan(replicate_values)]
+    num_replicates = len(replicate_values)
+    if num_replicates < 2:
+        return None, None
+    quantile = student_t.ppf((1 + CONFIDENCE_LEVEL) / 2, num_replicates - 1)
+    half_width = quantile * replicate_values.std(ddof=1) / np.sqrt(
+        num_replicates)
+    return float(value - half_width), float(value + half_width)
+
+
+def scale_count(count, weight):
+    """Scale the count of sampled rows to the estimated count of rows.
+
+    :param count: The number of sampled rows.
+    :type count: int or float
+    :param weight: The number of rows each sampled row stands for.
+    :type weight: float
+    :return: The estimated number of rows.
+    :rtype: int
+    """
+    return int(round(count * weight))
+
+
+class BackgroundRefiner(object):
+    """Computes the exact views on a background thread.
+
+    When an approximate view is returned, the exact view can be
+    submitted to a single background worker, keyed by its request, so
+    that the next request for the exact view returns the computed
+    result, or waits for it, instead of computing it again.  Only the
+    last few results are kept.  The computations running on the
+    background worker do not look up the results, so that they never
+    wait for themselves.
+
+    The worker is a daemon thread, so that pending computations never
+    keep the process from exiting, and the refiner can be used from
+    several threads.  The computations share the analyzer's caches,
+    which are safe to use from several threads.
+
+    :param dataset: The dataset the views are computed on.
+    :type dataset: pandas.DataFrame or numpy.ndarray
+    :param max_results: The maximum number of kept results.
+    :type max_results: int
+    """
+
+    def __init__(self, dataset, max_results=DEFAULT_MAX_RESULTS):
+        self.dataset = dataset
+        self._max_results = max_results
+        self._worker = None
+        self._queue = queue.Queue()
+        self._futures = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def __len__(self):
+        return len(self._futures)
+
+    def __getstate__(self):
+        # the worker, its queue and the lock cannot be pickled, so the
+        # refiner is pickled without the submitted computations
+        return {'dataset': self.dataset, 'max_results': self._max_results}
+
+    def __setstate__(self, state):
+        self.__init__(state['dataset'], max_results=state['max_results'])
+
+    def submit(self, key, func, *args, **kwargs):
+        """Submits the computation of an exact view.
+
+        :param key: The key identifying the request.
+        :type key: tuple
+        :param func: The function computing the view.
+        :type func: function
+        :return: The future of the computed view.
+        :rtype: concurrent.futures.Future
+        """
+        with self._lock:
+            if key in self._futures:
+                return self._futures[key]
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._work, args=(self._queue,), daemon=True)
+                self._worker.start()
+            future = Future()
+            self._queue.put((future, func, args, kwargs))
+            self._futures[key] = future
+            while len(self._futures) > self._max_results:
+                _, evicted = self._futures.popitem(last=False)
+                evicted.cancel()
+        return future
+
+    def pop(self, key):
+        """Removes the computation of an exact view.
+
+        :param key: The key identifying the request.
+        :type key: tuple
+        :return: The future of the computed view, or None if the view
+            was not submitted or if called from the background worker.
+        :rtype: concurrent.futures.Future
+        """
+        if getattr(self._local, 'is_refining', False):
+            return None
+        with self._lock:
+            return self._futures.pop(key, None)
+
+    def _work(self, work_queue):
+        """Computes the submitted views until the refiner is shut down.
+
+        :param work_queue: The queue of the submitted computations, with
+            None to stop the worker.
+        :type work_queue: queue.Queue
+        """
+        self._local.is_refining = True
+        while True:
+            work_item = work_queue.get()
+            if work_item is None:
+                return
+            future, func, args, kwargs = work_item
+            # cancelled computations are skipped
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(func(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+
+    def shutdown(self):
+        """Cancels the pending computations and stops the worker.
+
+        The running computation, if any, is not interrupted, but its
+        result is discarded.
+        """
+        with self._lock:
+            for future in self._futures.values():
+                future.cancel()
+            self._futures.clear()
+            if self._worker is not None:
+                self._queue.put(None)
+                self._queue = queue.Queue()
+                self._worker = None
@@ -0,0 +1,192 @@
+# Copyright (c) Microsoft Corporation
+# Licensed under the MIT License.
+
+"""Defines the BinCache used to reuse the heatmap bins of features."""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_MAX_ENTRIES = 128
+
+
+def get_rows_key(row_indexes):
+    """Get a key identifying the set of rows a heatmap is computed on.
+
+    :param row_indexes: The indexes of the rows in the full dataset.
+    :type row_indexes: numpy.ndarray
+    :return: The key identifying the rows.
+    :rtype: str
+    """
+    row_indexes = np.ascontiguousarray(row_indexes, dtype=np.int64)
+    digest = hashlib.sha1(row_indexes.tobytes()).hexdigest()
+    return '{}:{}'.format(len(row_indexes), digest)
+
+
+class FeatureBins(object):
+    """The categories of a feature in the heatmap.
+
+    The categories are either the bins of a numeric feature, stored as
+    a pandas IntervalIndex, or the unique values of the feature.  For
+    contiguous right-closed bins the bin edges are kept so that the bin
+    of each value can be found with a binary search.
+
+    :param categories: The bins or unique values of the feature.
+    :type categories: pandas.IntervalIndex or numpy.ndarray
+    """
+
+    def __init__(self, categories):
+        self.categories = categories
+        self.edges = None
+        if self.is_binned:
+            self.edges = get_bin_edges(categories)
+        else:
+            self._category_index = pd.Index(categories)
+
+    @property
+    def is_binned(self):
+        """Get whether the feature is binned.
+
+        :return: True if the categories are bins.
+        :rtype: bool
+        """
+        return isinstance(self.categories, pd.IntervalIndex)
+
+    def get_codes(self, values):
+        """Get the index of the category of each value.
+
+        :param values: The values of the feature.
+        :type values: pandas.Series
+        :return: The index of the category of each value, or -1 if the
+            value does not belong to any category.
+        :rtype: numpy.ndarray
+        """
+        if not self.is_binned:
+            codes = self._category_index.get_indexer(values.to_numpy())
+            return codes.astype(np.int64)
+        if self.edges is None:
+            codes = self.categories.get_indexer(np.array(values))
+            return codes.astype(np.int64)
+        values = values.to_numpy(dtype=float, na_value=np.nan)
+        # value x is in bin i if edges[i] < x <= edges[i + 1]
+        codes = np.searchsorted(self.edges, values, side='left') - 1
+        codes[(codes < 0) | (codes >= len(self.categories))] = -1
+        return codes.astype(np.int64)
+
+
+def get_bin_edges(bins):
+    """Get the edges of contiguous right-closed bins.
+
+    :param bins: The bins.
+    :type bins: pandas.IntervalIndex
+    :return: The edges of the bins or None if the bins are not
+        contiguous right-closed numeric intervals.
+    :rtype: numpy.ndarray
+    """
+    if len(bins) == 0 or bins.closed != 'right':
+        return None
+    try:
+        left = np.asarray(bins.left, dtype=float)
+        right = np.asarray(bins.right, dtype=float)
+    except (TypeError, ValueError):
+        return None
+    if not np.array_equal(left[1:], right[:-1]) or \
+            not (left < right).all():
+        return None
+    return np.concatenate([left[:1], right])
+
+
+class BinCache(object):
+    """Bounded LRU cache of the heatmap categories of features.
+
+    Computing the bins of a numeric feature requires pd.cut or pd.qcut
+    over the feature values, so the resulting categories are cached per
+    feature, number of bins, binning method and set of rows.  Requests
+    for the same cohort, for example with a different metric or with
+    the feature paired with another feature, reuse the bins and only
+    assign the rows to them.  The cache can be shared between threads.
+
+    :param dataset: The dataset the bins are computed on.
+    :type dataset: pandas.DataFrame or numpy.ndarray
+    :param max_entries: The maximum number of cached features.
+    :type max_entries: int
+    """
+
+    def __init__(self, dataset, max_entries=DEFAULT_MAX_ENTRIES):
+        self.dataset = dataset
+        self._max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __getstate__(self):
+        # the lock cannot be pickled and is recreated when unpickled
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def get(self, feature, num_bins, quantile_binning, rows_key):
+        """Get the cached categories of the feature.
+
+        :param feature: The feature name.
+        :type feature: str
+        :param num_bins: The number of bins.
+        :type num_bins: int
+        :param quantile_binning: Whether quantile binning is used.
+        :type quantile_binning: bool
+        :param rows_key: The key identifying the rows.
+        :type rows_key: str
+        :return: The cached categories or None if they are not cached.
+        :rtype: FeatureBins
+        """
+        key = (feature, num_bins, quantile_binning, rows_key)
+        with self._lock:
+            feature_bins = self._entries.get(key)
+            if feature_bins is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return feature_bins
+
+    def put(self, feature, num_bins, quantile_binning, rows_key,
+            categories):
+        """Caches the categories of the feature.
+
+        :param feature: The feature name.
+        :type feature: str
+        :param num_bins: The number of bins.
+        :type num_bins: int
+        :param quantile_binning: Whether quantile binning is used.
+        :type quantile_binning: bool
+        :param rows_key: The key identifying the rows.
+        :type rows_key: str
+        :param categories: The bins or unique values of the feature.
+        :type categories: pandas.IntervalIndex or numpy.ndarray
+        :return: The cached categories.
+        :rtype: FeatureBins
+        """
+        key = (feature, num_bins, quantile_binning, rows_key)
+        feature_bins = FeatureBins(categories)
+        with self._lock:
+            self._entries[key] = feature_bins
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        return feature_bins
+
+    def clear(self):
+        """Removes all the cached categories."""
+        with self._lock:
+            self._entries.clear()
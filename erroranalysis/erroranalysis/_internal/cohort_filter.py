@@ -1,6 +1,7 @@
 # Copyright (c) Microsoft Corporation
 # Licensed under the MIT License.
 
+import json
 from typing import Any, List, Optional
 
 import numpy as np
@@ -17,6 +18,9 @@ from erroranalysis._internal.utils import is_spark
 MODEL = 'model'
 CLASSIFICATION_OUTCOME = 'Classification outcome'
 REGRESSION_ERROR = 'Regression error'
+TRUE_Y_DISPLAY_NAME = 'True Y'
+PRED_Y_DISPLAY_NAME = 'Predicted Y'
+MAX_LEAF_MASKS = 128
 
 
 def filter_from_cohort(analyzer, filters, composite_filters,
@@ -35,16 +39,39 @@ def filter_from_cohort(analyzer, filters, composite_filters,
     :type include_original_columns_only: bool
     :rtype: pandas.DataFrame
     """
+    if hasattr(analyzer, 'cohort_filter'):
+        filter_data_with_cohort = analyzer.cohort_filter
+    else:
+        filter_data_with_cohort = create_cohort_filter(analyzer)
+
+    return filter_data_with_cohort.filter_data_from_cohort(
+        filters=filters,
+        composite_filters=composite_filters,
+        include_original_columns_only=include_original_columns_only)
+
+
+def create_cohort_filter(analyzer):
+    """Creates the object used to filter the analyzer's dataset.
+
+    :param analyzer: The error analyzer.
+    :type: BaseAnalyzer
+    :return: The object used to filter the dataset with cohort filters.
+    :rtype: FilterDataWithCohortFilters
+    """
     is_model_analyzer = hasattr(analyzer, MODEL)
     model = None
     pred_y = None
 
     if is_model_analyzer:
         model = analyzer.model
+        if not is_spark(analyzer.dataset):
+            # use the cached predictions for computing the
+            # classification outcome and regression error
+            pred_y = analyzer.pred_y
     else:
         pred_y = analyzer.pred_y
 
-    filter_data_with_cohort = FilterDataWithCohortFilters(
+    return FilterDataWithCohortFilters(
         model=model,
         dataset=analyzer.dataset,
         features=analyzer.feature_names,
@@ -55,11 +82,6 @@ def filter_from_cohort(analyzer, filters, composite_filters,
         model_task=analyzer.model_task,
         classes=analyzer.classes)
 
-    return filter_data_with_cohort.filter_data_from_cohort(
-        filters=filters,
-        composite_filters=composite_filters,
-        include_original_columns_only=include_original_columns_only)
-
 
 class FilterDataWithCohortFilters:
     def __init__(self, model: Any, dataset: pd.DataFrame,
@@ -67,7 +89,8 @@ class FilterDataWithCohortFilters:
                  categorical_features: List[str], categories: List[List[str]],
                  true_y: np.ndarray, pred_y: np.ndarray,
                  model_task: str,
-                 classes: Optional[List[str]] = None):
+                 classes: Optional[List[str]] = None,
+                 row_offset: int = 0):
         """Class to filter data with cohort filters.
 
         :param model: The model to compute RAI insights for.
@@ -91,6 +114,10 @@ class FilterDataWithCohortFilters:
         :param classes: The list of classes in case of
                         classification problems.
         :type classes: list[str]
+        :param row_offset: The position of the first row of the dataset
+                           in the full dataset, when filtering a chunk of
+                           it, used to filter on the row index.
+        :type row_offset: int
         """
         self.model = model
         self.dataset = dataset
@@ -101,6 +128,11 @@ class FilterDataWithCohortFilters:
         self.pred_y = pred_y
         self.model_task = model_task
         self.classes = classes
+        self.row_offset = row_offset
+        self._dataframe = None
+        self._leaf_masks = {}
+        self._column_values = {}
+        self._category_codes = {}
 
     def filter_data_from_cohort(self, filters, composite_filters,
                                 include_original_columns_only=False):
@@ -116,6 +148,66 @@ class FilterDataWithCohortFilters:
         :type include_original_columns_only: bool
         :rtype: pandas.DataFrame
         """
+        if is_spark(self.dataset) or isinstance(self.true_y, str):
+            return self._filter_data_with_query(
+                filters, composite_filters,
+                include_original_columns_only=include_original_columns_only)
+        row_indexes = self.get_filtered_row_indexes(filters,
+                                                    composite_filters)
+        return self.filter_data_from_row_indexes(
+            row_indexes,
+            include_original_columns_only=include_original_columns_only)
+
+    def get_filtered_row_indexes(self, filters, composite_filters):
+        """Get the positional indexes of the rows selected by the filters.
+
+        :param filters: The filters.
+        :type filters: list[dict]
+        :param composite_filters: The composite filters.
+        :type composite_filters: list[dict]
+        :return: The positional indexes of the selected rows.
+        :rtype: numpy.ndarray
+        """
+        return np.flatnonzero(self.get_filter_mask(filters,
+                                                   composite_filters))
+
+    def get_filter_mask(self, filters, composite_filters):
+        """Get the boolean mask of the rows selected by the filters.
+
+        The filters are compiled into vectorized boolean masks over the
+        column arrays of the dataset, combined with AND/OR for composite
+        filters.  The mask of each leaf filter is cached and reused by
+        subsequent calls on this object.
+
+        :param filters: The filters.
+        :type filters: list[dict]
+        :param composite_filters: The composite filters.
+        :type composite_filters: list[dict]
+        :return: The boolean mask of the selected rows.
+        :rtype: numpy.ndarray
+        """
+        mask = self._build_mask(filters or [])
+        if composite_filters:
+            mask &= self._build_mask(composite_filters)
+        return mask
+
+    def _filter_data_with_query(self, filters, composite_filters,
+                                include_original_columns_only=False):
+        """Filters the dataset by building and evaluating a query.
+
+        Used for pyspark DataFrames, which do not support the mask
+        based filtering.
+
+        :param filters: The filters.
+        :type filters: list[dict]
+        :param composite_filters: The composite filters.
+        :type composite_filters: list[dict]
+        :return: The filtered dataset.
+        :param include_original_columns_only: Whether to just include
+                                              the original data columns.
+        :type include_original_columns_only: bool
+        :rtype: pandas.DataFrame or pyspark.pandas.DataFrame
+        """
         df = self.dataset
         if not is_spark(df):
             if not isinstance(df, pd.DataFrame):
@@ -133,6 +225,233 @@ class FilterDataWithCohortFilters:
             df, include_original_columns_only=include_original_columns_only)
         return df
 
+    def _get_dataframe(self):
+        """Get the dataset as a pandas DataFrame.
+
+        :return: The dataset as a pandas DataFrame.
+        :rtype: pandas.DataFrame
+        """
+        if isinstance(self.dataset, pd.DataFrame):
+            return self.dataset
+        if self._dataframe is None:
+            self._dataframe = pd.DataFrame(self.dataset,
+                                           columns=self.features)
+        return self._dataframe
+
+    def _num_rows(self):
+        """Get the number of rows in the dataset.
+
+        :return: The number of rows in the dataset.
+        :rtype: int
+        """
+        return len(self._get_dataframe())
+
+    def filter_data_from_row_indexes(self, row_indexes,
+                                     include_original_columns_only=False):
+        """Creates the filtered DataFrame from the selected row indexes.
+
+        The row indexes are usually the ones returned by
+        get_filtered_row_indexes, which may have been cached by the caller.
+
+        :param row_indexes: The positional indexes of the selected rows.
+        :type row_indexes: numpy.ndarray
+        :param include_original_columns_only: Whether to just include
+                                              the original data columns.
+        :type include_original_columns_only: bool
+        :return: The filtered DataFrame.
+        :rtype: pandas.DataFrame
+        """
+        df = self._get_dataframe().take(row_indexes)
+        if include_original_columns_only:
+            return df
+        df[TRUE_Y] = _take_rows(self.true_y, row_indexes)
+        if self.model is None:
+            df[PRED_Y] = _take_rows(self.pred_y, row_indexes)
+        df[ROW_INDEX] = np.asarray(row_indexes, dtype=np.int64)
+        return df
+
+    def _build_mask(self, filters):
+        """Builds the boolean mask for the given filters.
+
+        All filters in the list are combined with AND.
+
+        :param filters: The filters or composite_filters to apply to the
+                        dataset.
+        :type filters: list[dict]
+        :return: The boolean mask of the selected rows.
+        :rtype: numpy.ndarray
+        """
+        mask = np.ones(self._num_rows(), dtype=bool)
+        for filter in filters:
+            if METHOD in filter:
+                mask &= self._get_leaf_mask(filter)
+                continue
+            child_masks = [self._build_mask([composite_filter])
+                           for composite_filter in filter[COMPOSITE_FILTERS]]
+            if not child_masks:
+                continue
+            if filter[OPERATION] == CohortFilterOps.AND:
+                mask &= np.logical_and.reduce(child_masks)
+            else:
+                mask &= np.logical_or.reduce(child_masks)
+        return mask
+
+    def _get_leaf_mask(self, filter):
+        """Get the cached boolean mask for a single filter.
+
+        :param filter: The filter with a method, column and argument.
+        :type filter: dict
+        :return: The boolean mask of the rows selected by the filter.
+        :rtype: numpy.ndarray
+        """
+        key = json.dumps(filter, sort_keys=True, default=str)
+        if key not in self._leaf_masks:
+            if len(self._leaf_masks) >= MAX_LEAF_MASKS:
+                # evict the oldest mask to bound the memory used
+                del self._leaf_masks[next(iter(self._leaf_masks))]
+            self._leaf_masks[key] = self._compute_leaf_mask(filter)
+        return self._leaf_masks[key]
+
+    def _compute_leaf_mask(self, filter):
+        """Compute the boolean mask for a single filter.
+
+        :param filter: The filter with a method, column and argument.
+        :type filter: dict
+        :return: The boolean mask of the rows selected by the filter.
+        :rtype: numpy.ndarray
+        """
+        method = filter[METHOD]
+        args = filter[ARG]
+        colname = self._get_column_name(filter[COLUMN])
+        is_categorical = bool(self.categorical_features) and \
+            colname in self.categorical_features
+        if method == CohortFilterMethods.METHOD_INCLUDES or \
+                method == CohortFilterMethods.METHOD_EXCLUDES or \
+                (method == CohortFilterMethods.METHOD_EQUAL and
+                 is_categorical):
+            if is_categorical:
+                codes = self._get_category_codes(colname)
+                mask = np.isin(codes, np.asarray(args, dtype=int))
+            else:
+                values = self._get_column_values(colname)
+                if colname in (TRUE_Y, PRED_Y) and \
+                        self.classes is not None:
+                    args = [self.classes[arg] for arg in args]
+                mask = _to_mask(_isin(values, args))
+            if method == CohortFilterMethods.METHOD_EXCLUDES:
+                mask = ~mask
+            return mask
+        values = self._get_column_values(colname)
+        arg0 = args[0]
+        if method == CohortFilterMethods.METHOD_GREATER:
+            return _to_mask(values > arg0)
+        elif method == CohortFilterMethods.METHOD_LESS:
+            return _to_mask(values < arg0)
+        elif method == CohortFilterMethods.METHOD_LESS_AND_EQUAL:
+            return _to_mask(values <= arg0)
+        elif method == CohortFilterMethods.METHOD_GREATER_AND_EQUAL:
+            return _to_mask(values >= arg0)
+        elif method == CohortFilterMethods.METHOD_RANGE:
+            return _to_mask(values >= arg0) & _to_mask(values <= args[1])
+        elif method == CohortFilterMethods.METHOD_EQUAL:
+            return _to_mask(values == arg0)
+        else:
+            raise ValueError(
+                "Unsupported method type: {}".format(method))
+
+    def _get_column_name(self, colname):
+        """Maps the display names of the label columns to column names.
+
+        :param colname: The column name specified in the filter.
+        :type colname: str
+        :return: The column name used to look up the column values.
+        :rtype: str
+        """
+        if colname == TRUE_Y_DISPLAY_NAME:
+            return TRUE_Y
+        if colname == PRED_Y_DISPLAY_NAME:
+            return PRED_Y
+        return colname
+
+    def _get_pred_y(self):
+        """Get the predicted y values, calling the model if needed.
+
+        :return: The predicted y values.
+        :rtype: numpy.ndarray or list
+        """
+        if self.pred_y is None:
+            self.pred_y = self.model.predict(self._get_dataframe())
+        return self.pred_y
+
+    def _get_column_values(self, colname):
+        """Get the values of the given column for filtering.
+
+        :param colname: The column name.
+        :type colname: str
+        :return: The values of the column.
+        :rtype: numpy.ndarray or pandas.Series
+        """
+        if colname in self._column_values:
+            return self._column_values[colname]
+        is_classification = (
+            self.model_task == ModelTask.CLASSIFICATION or
+            self.model_task == ModelTask.OBJECT_DETECTION)
+        if colname == TRUE_Y:
+            values = _to_array(self.true_y)
+        elif colname == PRED_Y:
+            values = _to_array(self._get_pred_y())
+        elif colname == ROW_INDEX:
+            values = np.arange(self.row_offset,
+                               self.row_offset + self._num_rows())
+        elif colname == CLASSIFICATION_OUTCOME and is_classification:
+            pred_y = self._get_pred_y()
+            classes = get_ordered_classes(
+                self.classes, self.true_y, pred_y)
+            if len(classes) == 2:
+                values = self._compute_binary_classification_outcome_data(
+                    self.true_y, pred_y, classes)
+            else:
+                values = \
+                    self._compute_multiclass_classification_outcome_data(
+                        self.true_y, pred_y)
+            values = np.array(values)
+        elif colname == REGRESSION_ERROR and \
+                self.model_task == ModelTask.REGRESSION:
+            values = np.array(self._compute_regression_error_data(
+                self.true_y, self._get_pred_y()))
+        else:
+            column = self._get_dataframe()[colname]
+            if pd.api.types.is_extension_array_dtype(column.dtype):
+                values = column
+            else:
+                values = column.to_numpy()
+        self._column_values[colname] = values
+        return values
+
+    def _get_category_codes(self, colname):
+        """Get the integer codes of a categorical column.
+
+        The codes are the indexes of the values in the list of categories
+        for the column, or -1 for values not found in the categories.
+
+        :param colname: The categorical column name.
+        :type colname: str
+        :return: The integer codes of the column.
+        :rtype: numpy.ndarray
+        """
+        if colname not in self._category_codes:
+            cat_idx = self.categorical_features.index(colname)
+            values = self._get_dataframe()[colname]
+            categories = pd.Index(self.categories[cat_idx])
+            if categories.is_unique:
+                codes = categories.get_indexer(values)
+            else:
+                codes = np.full(len(values), -1)
+                for code, category in enumerate(self.categories[cat_idx]):
+                    codes[_to_mask(values == category)] = code
+            self._category_codes[colname] = codes
+        return self._category_codes[colname]
+
     def _filters_has_classification_outcome(self, filters):
         """Checks if classification outcome is specified as a filter.
 
@@ -490,3 +809,65 @@ class FilterDataWithCohortFilters:
             return ' & '.join(bounds)
         else:
             return ' | '.join(bounds)
+
+
+def _to_mask(values):
+    """Converts the result of a vectorized comparison to a boolean mask.
+
+    Missing values in nullable pandas types are treated as not selected.
+
+    :param values: The result of the comparison.
+    :type values: numpy.ndarray or pandas.Series
+    :return: The boolean mask.
+    :rtype: numpy.ndarray
+    """
+    if isinstance(values, pd.Series):
+        return values.to_numpy(dtype=bool, na_value=False)
+    return np.asarray(values, dtype=bool)
+
+
+def _isin(values, args):
+    """Checks whether each value is contained in the given arguments.
+
+    :param values: The values to check.
+    :type values: numpy.ndarray or pandas.Series
+    :param args: The values to check against.
+    :type args: list
+    :return: The result of the check for each value.
+    :rtype: numpy.ndarray or pandas.Series
+    """
+    if isinstance(values, pd.Series):
+        return values.isin(args)
+    return np.isin(values, args)
+
+
+def _to_array(values):
+    """Converts the given labels to a numpy array.
+
+    :param values: The labels.
+    :type values: numpy.ndarray or list or pandas.Series
+    :return: The labels as a numpy array.
+    :rtype: numpy.ndarray
+    """
+    if isinstance(values, (pd.Series, pd.DataFrame)):
+        return values.to_numpy()
+    return np.asarray(values)
+
+
+def _take_rows(values, row_indexes):
+    """Gathers the given rows from the labels.
+
+    :param values: The labels.
+    :type values: numpy.ndarray or list or pandas.Series or pandas.DataFrame
+    :param row_indexes: The positional indexes of the rows to gather.
+    :type row_indexes: numpy.ndarray
+    :return: The gathered labels.
+    :rtype: numpy.ndarray or list
+    """
+    if isinstance(values, pd.DataFrame):
+        return values.iloc[row_indexes, 0].to_numpy()
+    if isinstance(values, pd.Series):
+        return values.iloc[row_indexes].to_numpy()
+    if isinstance(values, np.ndarray):
+        return values[row_indexes]
+    return [values[idx] for idx in row_indexes]
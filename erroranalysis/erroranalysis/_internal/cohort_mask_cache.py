@@ -0,0 +1,165 @@
+# Copyright (c) Microsoft Corporation
+# Licensed under the MIT License.
+
+"""Defines the CohortMaskCache used to reuse evaluated cohort filters."""
+
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+HITS = 'hits'
+MISSES = 'misses'
+HIT_RATE = 'hit_rate'
+ENTRIES = 'entries'
+BYTES = 'bytes'
+MAX_ENTRIES = 'max_entries'
+MAX_BYTES = 'max_bytes'
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def get_cohort_key(filters, composite_filters, scope=None):
+    """Get the canonical key of the given filters.
+
+    Equivalent filter trees, for example dictionaries with the same
+    entries in a different order, map to the same key.
+
+    :param filters: The filters.
+    :type filters: list[dict]
+    :param composite_filters: The composite filters.
+    :type composite_filters: list[dict]
+    :param scope: Optional value identifying the dataset the filters
+        are applied to.
+    :type scope: str
+    :return: The canonical key of the filters.
+    :rtype: str
+    """
+    return json.dumps([scope, filters or [], composite_filters or []],
+                      sort_keys=True, separators=(',', ':'), default=str)
+
+
+class CohortMaskCache(object):
+    """Bounded LRU cache of the rows selected by cohort filters.
+
+    The cache stores the positional row indexes selected by each filter
+    tree instead of the filtered data, keyed by the canonical JSON of the
+    filters.  The least recently used entries are evicted when either
+    the number of entries or the number of bytes held exceeds its limit.
+    The cache can be shared between threads.
+
+    :param max_entries: The maximum number of cached cohorts.
+    :type max_entries: int
+    :param max_bytes: The maximum number of bytes held by the
+        cached row indexes.
+    :type max_bytes: int
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES,
+                 max_bytes=DEFAULT_MAX_BYTES):
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __getstate__(self):
+        # the lock cannot be pickled and is recreated when unpickled
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self):
+        """Get the number of bytes held by the cached row indexes.
+
+        :return: The number of bytes held by the cache.
+        :rtype: int
+        """
+        return self._bytes
+
+    def get_stats(self):
+        """Get the usage statistics of the cache.
+
+        :return: The hits, misses, hit rate, number of entries and
+            bytes held by the cache, along with its limits.
+        :rtype: dict
+        """
+        with self._lock:
+            requests = self._hits + self._misses
+            hit_rate = self._hits / requests if requests else 0.0
+            return {HITS: self._hits,
+                    MISSES: self._misses,
+                    HIT_RATE: hit_rate,
+                    ENTRIES: len(self._entries),
+                    BYTES: self._bytes,
+                    MAX_ENTRIES: self._max_entries,
+                    MAX_BYTES: self._max_bytes}
+
+    def clear(self):
+        """Removes all the cached cohorts."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def get(self, key):
+        """Get the cached row indexes for the given key.
+
+        :param key: The canonical key of the filters.
+        :type key: str
+        :return: The cached row indexes or None if the key is not cached.
+        :rtype: numpy.ndarray
+        """
+        with self._lock:
+            row_indexes = self._entries.get(key)
+            if row_indexes is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            self._entries.move_to_end(key)
+            return row_indexes
+
+    def put(self, key, row_indexes):
+        """Caches the row indexes selected by the filters with the given key.
+
+        The row indexes are stored with the smallest integer type that
+        can hold them and are marked read-only, since they are shared
+        between callers.
+
+        :param key: The canonical key of the filters.
+        :type key: str
+        :param row_indexes: The positional indexes of the selected rows.
+        :type row_indexes: numpy.ndarray
+        :return: The cached row indexes.
+        :rtype: numpy.ndarray
+        """
+        row_indexes = np.asarray(row_indexes)
+        if len(row_indexes) == 0 or \
+                row_indexes.max() <= np.iinfo(np.int32).max:
+            row_indexes = row_indexes.astype(np.int32)
+        else:
+            row_indexes = row_indexes.astype(np.int64)
+        row_indexes.setflags(write=False)
+        if row_indexes.nbytes > self._max_bytes:
+            return row_indexes
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key).nbytes
+            self._entries[key] = row_indexes
+            self._bytes += row_indexes.nbytes
+            while len(self._entries) > self._max_entries or \
+                    self._bytes > self._max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+        return row_indexes
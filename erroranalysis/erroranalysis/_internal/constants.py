@@ -135,14 +135,25 @@ class TreeNode(str, Enum):
     """
     METRIC_NAME = MetricKeys.METRIC_NAME.value
     METRIC_VALUE = MetricKeys.METRIC_VALUE.value
+    HAS_HIDDEN_CHILDREN = 'hasHiddenChildren'
+
+
+class ApproximateKeys(str, Enum):
+    """Provide the keys of the approximate heatmap cells and tree nodes.
+    """
+    IS_APPROXIMATE = 'isApproximate'
+    METRIC_VALUE_LOWER = 'metricValueLower'
+    METRIC_VALUE_UPPER = 'metricValueUpper'
 
 
 class ErrorCorrelationMethods(str, Enum):
     """Provide the supported error correlation methods.
 
-    The supported methods are 'mutual_info', 'ebm' and 'gbm_shap'.
+    The supported methods are 'mutual_info', 'histogram_mutual_info',
+    'ebm' and 'gbm_shap'.
     """
     MUTUAL_INFO = 'mutual_info'
+    HISTOGRAM_MUTUAL_INFO = 'histogram_mutual_info'
     EBM = 'ebm'
     GBM_SHAP = 'gbm_shap'
 
@@ -0,0 +1,200 @@
+# Copyright (c) Microsoft Corporation
+# Licensed under the MIT License.
+
+"""Defines the FeatureStore holding the typed columns of the dataset."""
+
+import numpy as np
+import pandas as pd
+
+
+def _get_typed_column(values):
+    """Get the values of a column as a typed array.
+
+    Object arrays of numbers, such as the columns of a mixed type numpy
+    dataset, are converted to numeric arrays, with NaN for missing
+    values.  Other arrays are kept as they are without a copy.
+
+    :param values: The values of the column.
+    :type values: numpy.ndarray
+    :return: The typed values of the column.
+    :rtype: numpy.ndarray
+    """
+    if values.dtype != object:
+        return values
+    inferred = pd.Series(values, copy=False).infer_objects()
+    if inferred.dtype == object:
+        try:
+            # numbers with missing values such as pd.NA
+            inferred = pd.to_numeric(inferred)
+        except (TypeError, ValueError):
+            return values
+    if not pd.api.types.is_numeric_dtype(inferred.dtype):
+        return values
+    if pd.api.types.is_extension_array_dtype(inferred.dtype):
+        return inferred.to_numpy(dtype=float, na_value=np.nan)
+    return inferred.to_numpy()
+
+
+def _is_all_rows(row_indexes, num_rows):
+    """Check whether the row indexes are all the rows in order.
+
+    :param row_indexes: The positional indexes of the rows.
+    :type row_indexes: numpy.ndarray
+    :param num_rows: The number of rows of the dataset.
+    :type num_rows: int
+    :return: True if the row indexes are 0 to num_rows - 1.
+    :rtype: bool
+    """
+    return len(row_indexes) == num_rows and (
+        num_rows == 0 or
+        (row_indexes[0] == 0 and row_indexes[-1] == num_rows - 1 and
+         bool((np.diff(row_indexes) == 1).all())))
+
+
+class FeatureStore(object):
+    """The columns of the features of the dataset, stored by type.
+
+    The store is created once with the analyzer and each column is typed
+    on first use.  Numeric features are kept as typed numpy arrays,
+    viewing the dataset's memory where possible, and categorical features
+    are also kept as the int32 codes of the analyzer's categorical
+    encoder.  The columns of a subset of rows, such as a cohort, are
+    gathered by row index, so that only the requested columns are copied
+    instead of converting the whole dataset to an object array on every
+    request.
+
+    :param dataset: A matrix of feature vector examples
+        (# examples x # features).
+    :type dataset: numpy.ndarray or list[][] or pandas.DataFrame
+    :param categorical_encoder: The encoder of the categorical features
+        fitted on the dataset, or None if there are none.
+    :type categorical_encoder: CategoricalEncoder
+    """
+
+    def __init__(self, dataset, categorical_encoder):
+        self.dataset = dataset
+        self._categorical_encoder = categorical_encoder
+        # the typed columns, built on first use
+        self._columns = {}
+        self._categorical_positions = {}
+        if categorical_encoder is not None:
+            self._categorical_positions = {
+                feature_index: position for position, feature_index in
+                enumerate(categorical_encoder.categorical_indexes)}
+
+    def _get_typed_column(self, feature_index):
+        """Get the values of a feature of the dataset as a typed array.
+
+        :param feature_index: The index of the feature.
+        :type feature_index: int
+        :return: The typed values of the feature.
+        :rtype: numpy.ndarray
+        """
+        if isinstance(self.dataset, pd.DataFrame):
+            column = self.dataset.iloc[:, feature_index]
+            if pd.api.types.is_extension_array_dtype(column.dtype) and \
+                    pd.api.types.is_numeric_dtype(column.dtype):
+                # nullable numeric columns would be object arrays of pd.NA
+                return column.to_numpy(dtype=float, na_value=np.nan)
+            values = column.to_numpy()
+        else:
+            if not isinstance(self.dataset, np.ndarray):
+                self.dataset = np.asarray(self.dataset)
+            values = self.dataset[:, feature_index]
+        return _get_typed_column(values)
+
+    def get_column(self, feature_index, row_indexes=None):
+        """Get the values of a feature.
+
+        :param feature_index: The index of the feature.
+        :type feature_index: int
+        :param row_indexes: The positional indexes of the rows, or None
+            for all the rows without a copy.
+        :type row_indexes: numpy.ndarray
+        :return: The values of the feature in the given rows.
+        :rtype: numpy.ndarray
+        """
+        values = self._columns.get(feature_index)
+        if values is None:
+            values = self._get_typed_column(feature_index)
+            self._columns[feature_index] = values
+        if row_indexes is None:
+            return values
+        return values[np.asarray(row_indexes, dtype=int)]
+
+    def get_encoded_matrix(self, feature_indexes, row_indexes=None):
+        """Get the numeric matrix of the given features.
+
+        Categorical features are replaced by the codes of their
+        categories, with NaN for missing values.
+
+        :param feature_indexes: The indexes of the features.
+        :type feature_indexes: list[int]
+        :param row_indexes: The positional indexes of the rows, or None
+            for all the rows.
+        :type row_indexes: numpy.ndarray
+        :return: The float matrix of the features in the given rows.
+        :rtype: numpy.ndarray
+        """
+        num_rows = len(self.dataset)
+        if row_indexes is not None:
+            row_indexes = np.asarray(row_indexes, dtype=int)
+            if _is_all_rows(row_indexes, num_rows):
+                row_indexes = None
+            else:
+                num_rows = len(row_indexes)
+        # the features are filled and read column by column
+        matrix = np.empty((num_rows, len(feature_indexes)), dtype=float,
+                          order='F')
+        for position, feature_index in enumerate(feature_indexes):
+            if feature_index in self._categorical_positions:
+                codes = self._categorical_encoder.codes[
+                    :, self._categorical_positions[feature_index]]
+                if row_indexes is not None:
+                    codes = codes[row_indexes]
+                matrix[:, position] = codes
+                matrix[codes < 0, position] = np.nan
+            else:
+                matrix[:, position] = self.get_column(feature_index,
+                                                      row_indexes)
+        return matrix
+
+
+def encode_features(dataset, feature_indexes, categorical_encoder):
+    """Get the numeric matrix of the given features of any dataset.
+
+    Unlike the FeatureStore, which gathers the columns of rows of the
+    analyzer's dataset, the features are read from the given dataset,
+    for example a cohort whose feature values were modified.
+    Categorical features are encoded with the encoder fitted on the
+    analyzer's dataset, with NaN for missing and unknown values.
+
+    :param dataset: A matrix of feature vector examples with the same
+        features as the analyzer's dataset.
+    :type dataset: numpy.ndarray or pandas.DataFrame
+    :param feature_indexes: The indexes of the features.
+    :type feature_indexes: list[int]
+    :param categorical_encoder: The encoder of the categorical features
+        fitted on the analyzer's dataset, or None if there are none.
+    :type categorical_encoder: CategoricalEncoder
+    :return: The float matrix of the features.
+    :rtype: numpy.ndarray
+    """
+    feature_store = FeatureStore(dataset, None)
+    categorical_positions = {}
+    if categorical_encoder is not None:
+        categorical_positions = {
+            feature_index: position for position, feature_index in
+            enumerate(categorical_encoder.categorical_indexes)}
+    string_indexed_data = None
+    if any(index in categorical_positions for index in feature_indexes):
+        string_indexed_data = categorical_encoder.transform(dataset)
+    matrix = np.empty((len(dataset), len(feature_indexes)), dtype=float,
+                      order='F')
+    for position, feature_index in enumerate(feature_indexes):
+        if feature_index in categorical_positions:
+            matrix[:, position] = string_indexed_data[
+                :, categorical_positions[feature_index]]
+        else:
+            matrix[:, position] = feature_store.get_column(feature_index)
+    return matrix
@@ -10,11 +10,20 @@ import numpy as np
 import pandas as pd
 from sklearn.metrics import multilabel_confusion_matrix
 
+from erroranalysis._internal.approximation import (NUM_REPLICATES,
+                                                   compute_confidence_bounds,
+                                                   get_replicates,
+                                                   sample_cohort, scale_count)
+from erroranalysis._internal.bin_cache import FeatureBins, get_rows_key
 from erroranalysis._internal.cohort_filter import filter_from_cohort
-from erroranalysis._internal.constants import (DIFF, PRED_Y, ROW_INDEX, TRUE_Y,
-                                               MatrixParams, MetricKeys,
-                                               Metrics, ModelTask,
+from erroranalysis._internal.constants import (PRED_Y, ROW_INDEX, TRUE_Y,
+                                               ApproximateKeys, MatrixParams,
+                                               MetricKeys, Metrics, ModelTask,
                                                metric_to_display_name)
+from erroranalysis._internal.feature_store import FeatureStore
+from erroranalysis._internal.metric_statistics import (
+    BINARY_METRICS, compute_grouped_median, compute_grouped_values,
+    compute_metric_statistics)
 from erroranalysis._internal.metrics import (get_ordered_classes,
                                              is_multi_agg_metric,
                                              metric_to_func)
@@ -76,12 +85,25 @@ def compute_json_matrix(analyzer, features, filters, composite_filters):
 
 
 def compute_matrix_on_dataset(analyzer, features, dataset,
-                              quantile_binning=False, num_bins=BIN_THRESHOLD):
+                              quantile_binning=False, num_bins=BIN_THRESHOLD,
+                              use_cached_predictions=False,
+                              sample_size=None, random_state=None,
+                              refine=False, metric=None):
     """Compute a matrix of metrics for a given set of feature names.
 
     The filters and composite filters are used to filter the data
     prior to computing the matrix.
 
+    On large cohorts, the matrix can be approximated on a sample of the
+    rows stratified on the error.  The counts of the approximate cells
+    are then estimated for the whole cohort, and each cell has the key
+    'isApproximate' set to True and the keys 'metricValueLower' and
+    'metricValueUpper' with the 95% confidence interval of its metric
+    value, the error rate being a fraction of the rows, or None if the
+    cell has too few sampled rows to estimate it.  The exact matrix can
+    then be computed in the background, so that requesting it without
+    the sample size returns it without computing it again.
+
     :param analyzer: The error analyzer.
     :type analyzer: BaseAnalyzer
     :param features: A list of one or two feature names to compute metrics for.
@@ -98,6 +120,24 @@ def compute_matrix_on_dataset(analyzer, features, dataset,
     :type quantile_binning: bool
     :param num_bins: The number of bins to use for quantile binning.
     :type num_bins: int
+    :param use_cached_predictions: If True, the rows of the given
+        dataset are unmodified rows of the analyzer's dataset, so the
+        features, and for a ModelAnalyzer the predictions, are looked up
+        from the analyzer's full dataset using the 'index' column instead
+        of read from the given dataset and computed with the model.
+    :type use_cached_predictions: bool
+    :param sample_size: The maximum number of rows to compute the matrix
+        on.  Larger cohorts are sampled, stratified on the error, and the
+        matrix is approximate.  By default all the rows are used.
+    :type sample_size: int
+    :param random_state: The seed used to sample the rows.
+    :type random_state: int
+    :param refine: If True and the matrix is approximate, the exact
+        matrix is computed in the background.
+    :type refine: bool
+    :param metric: The metric to compute.  By default the analyzer's
+        metric.
+    :type metric: str
     :return: A dictionary representation of the computed matrix which can be
         saved to JSON.
     :rtype: dict
@@ -108,6 +148,30 @@ def compute_matrix_on_dataset(analyzer, features, dataset,
     if features[0] is None and features[1] is None:
         raise ValueError(
             'One or two features must be specified to compute the heat map')
+    if metric is None:
+        metric = analyzer.metric
+
+    refiner = analyzer.background_refiner
+    weight = None
+    if sample_size is not None or len(refiner) > 0:
+        request_key = (MATRIX, tuple(features),
+                       get_rows_key(dataset[ROW_INDEX].to_numpy()),
+                       quantile_binning, num_bins, use_cached_predictions,
+                       metric)
+        if sample_size is None:
+            future = refiner.pop(request_key)
+            if future is not None and not future.cancelled():
+                return future.result()
+        else:
+            cohort = dataset
+            dataset, weight = sample_cohort(analyzer, cohort, sample_size,
+                                            random_state)
+            if weight is not None and refine:
+                refiner.submit(request_key, compute_matrix_on_dataset,
+                               analyzer, features, cohort,
+                               quantile_binning, num_bins,
+                               use_cached_predictions=use_cached_predictions,
+                               metric=metric)
 
     true_y = dataset[TRUE_Y]
     dropped_cols = [TRUE_Y, ROW_INDEX]
@@ -115,15 +179,20 @@ def compute_matrix_on_dataset(analyzer, features, dataset,
     if not is_model_analyzer:
         pred_y = dataset[PRED_Y]
         dropped_cols.append(PRED_Y)
-    input_data = dataset.drop(columns=dropped_cols)
     is_pandas = isinstance(analyzer.dataset, pd.DataFrame)
-    metric = analyzer.metric
+    row_index = dataset[ROW_INDEX].to_numpy()
     if is_pandas:
         true_y = true_y.to_numpy()
-    else:
-        input_data = input_data.to_numpy()
+    input_data = None
+    if not use_cached_predictions:
+        input_data = dataset.drop(columns=dropped_cols)
+        if not is_pandas:
+            input_data = input_data.to_numpy()
     if is_model_analyzer:
-        pred_y = analyzer.model.predict(input_data)
+        if use_cached_predictions:
+            pred_y = analyzer.prediction_cache.predict(row_index)
+        else:
+            pred_y = analyzer.model.predict(input_data)
     if analyzer.model_task == ModelTask.CLASSIFICATION:
         diff = pred_y != true_y
     elif analyzer.model_task == ModelTask.OBJECT_DETECTION:
@@ -159,166 +228,120 @@ def compute_matrix_on_dataset(analyzer, features, dataset,
             raise UserConfigValidationException(
                 msg.format(feature, analyzer.feature_names))
         indexes.append(analyzer.feature_names.index(feature))
-    if is_pandas:
-        input_data = input_data.to_numpy()
-    dataset_sub_features = input_data[:, indexes]
     dataset_sub_names = np.array(analyzer.feature_names)[np.array(indexes)]
-    df = pd.DataFrame(dataset_sub_features, columns=dataset_sub_names)
+    if use_cached_predictions:
+        # the rows are rows of the analyzer's dataset, so gather only the
+        # typed columns of the features of the heatmap, and reuse the
+        # bins already computed on the same rows
+        feature_store = analyzer.feature_store
+        rows_key = get_rows_key(row_index)
+    else:
+        # the feature values may differ from the analyzer's dataset, so
+        # they are read from the given dataset and the bins not cached
+        feature_store = FeatureStore(input_data, None)
+        row_index = None
+        rows_key = None
+    df = pd.DataFrame({
+        name: feature_store.get_column(index, row_index)
+        for name, index in zip(dataset_sub_names, indexes)
+    }, columns=dataset_sub_names)
     # Fix for newer versions of pandas where qcut fails for object dtypes.
     # Note this bug appears in newer versions of pandas+numpy but
     # convert_dtypes method only exists in pandas>1.1.4.
     df = convert_dtypes(df)
-    df_err = df.copy()
-    df_err[DIFF] = diff
-    if metric == Metrics.ERROR_RATE:
-        df_err = df_err[df_err[DIFF]]
-    else:
-        df_err[TRUE_Y] = true_y
-        df_err[PRED_Y] = pred_y
-    df_err = convert_dtypes(df_err)
     # construct matrix
     matrix = []
     if len(dataset_sub_names) == 2:
         feat1 = dataset_sub_names[0]
         feat2 = dataset_sub_names[1]
-        unique_count1 = len(df[feat1].unique())
-        unique_count2 = len(df[feat2].unique())
-        f1_is_cat = False
-        f2_is_cat = False
-        if analyzer.categorical_features is not None:
-            f1_is_cat = feat1 in analyzer.categorical_features
-            f2_is_cat = feat2 in analyzer.categorical_features
-        if unique_count1 > num_bins and not f1_is_cat:
-            tabdf1 = bin_data(df,
-                              feat1,
-                              num_bins,
-                              quantile_binning=quantile_binning)
-            categories1 = tabdf1.cat.categories
-            if len(categories1) < num_bins:
-                warn_duplicate_edges(feat1)
-            tabdf1_err = bin_data(df_err,
-                                  feat1,
-                                  categories1,
-                                  quantile_binning=quantile_binning)
-        else:
-            tabdf1 = df[feat1]
-            tabdf1_err = df_err[feat1]
-            categories1 = np.unique(tabdf1.to_numpy(),
-                                    return_counts=True)[0]
-        if unique_count2 > num_bins and not f2_is_cat:
-            tabdf2 = bin_data(df,
-                              feat2,
-                              num_bins,
-                              quantile_binning=quantile_binning)
-            categories2 = tabdf2.cat.categories
-            if len(categories2) < num_bins:
-                warn_duplicate_edges(feat2)
-            tabdf2_err = bin_data(df_err,
-                                  feat2,
-                                  categories2,
-                                  quantile_binning=quantile_binning)
-        else:
-            tabdf2 = df[feat2]
-            tabdf2_err = df_err[feat2]
-            categories2 = np.unique(tabdf2.to_numpy(),
-                                    return_counts=True)[0]
-        if metric == Metrics.ERROR_RATE:
-            matrix_total = pd.crosstab(tabdf1,
-                                       tabdf2,
-                                       rownames=[feat1],
-                                       colnames=[feat2])
-            matrix_error = pd.crosstab(tabdf1_err,
-                                       tabdf2_err,
-                                       rownames=[feat1],
-                                       colnames=[feat2])
-        else:
-            if is_multi_agg_metric(metric):
-                ordered_labels = get_ordered_classes(analyzer.classes,
-                                                     true_y, pred_y)
-                aggfunc = _MultiMetricAggFunc(metric_to_func[metric],
-                                              ordered_labels, metric)
-            else:
-                aggfunc = _AggFunc(metric_to_func[metric])
-            matrix_total = pd.crosstab(tabdf1,
-                                       tabdf2,
-                                       rownames=[feat1],
-                                       colnames=[feat2])
-            matrix_error = pd.crosstab(tabdf1_err,
-                                       tabdf2_err,
-                                       rownames=[feat1],
-                                       colnames=[feat2],
-                                       values=list(zip(df_err[TRUE_Y],
-                                                       df_err[PRED_Y])),
-                                       aggfunc=aggfunc._agg_func_pair)
-            fill_matrix_nulls(matrix_total, aggfunc._fill_na_value())
-            fill_matrix_nulls(matrix_error, aggfunc._fill_na_value())
-        matrix = matrix_2d(categories1, categories2,
-                           matrix_total, matrix_error,
-                           metric)
+        feature_bins1 = get_feature_bins(analyzer, df, feat1, num_bins,
+                                         quantile_binning, rows_key)
+        feature_bins2 = get_feature_bins(analyzer, df, feat2, num_bins,
+                                         quantile_binning, rows_key)
+        categories1 = feature_bins1.categories
+        categories2 = feature_bins2.categories
+        codes1 = feature_bins1.get_codes(df[feat1])
+        codes2 = feature_bins2.get_codes(df[feat2])
+        shape = (len(categories1), len(categories2))
+        cell_ids = codes1 * shape[1] + codes2
+        cell_ids[(codes1 < 0) | (codes2 < 0)] = -1
+        counts, cell_values = compute_cell_values(
+            cell_ids, shape[0] * shape[1], true_y, pred_y, diff,
+            metric, analyzer.classes)
+        if weight is not None:
+            # the cells are listed from the last category of the first
+            # feature
+            cell_bounds = compute_cell_bounds(
+                cell_ids, shape[0] * shape[1], counts, cell_values, true_y,
+                pred_y, diff, metric, analyzer.classes, random_state)
+            cell_bounds = np.reshape(cell_bounds, shape + (2,))[::-1]
+        matrix = matrix_from_cells(categories1, categories2, counts,
+                                   cell_values, metric)
     else:
         feat1 = dataset_sub_names[0]
-        unique_count1 = len(df[feat1].unique())
-        f1_is_cat = False
-        if analyzer.categorical_features is not None:
-            f1_is_cat = feat1 in analyzer.categorical_features
-        if unique_count1 > num_bins and not f1_is_cat:
-            cutdf = bin_data(df,
-                             feat1,
-                             num_bins,
-                             quantile_binning=quantile_binning)
-            num_categories = len(cutdf.cat.categories)
-            bin_range = range(num_categories)
-            if len(cutdf.cat.categories) < num_bins:
-                warn_duplicate_edges(feat1)
-            catr = cutdf.cat.rename_categories(bin_range)
-            catn, counts = np.unique(catr.to_numpy(),
-                                     return_counts=True)
-            # fix counts to include skipped categories
-            fix_counts = []
-            counts_idx = 0
-            for idx, _ in enumerate(cutdf.cat.categories):
-                if idx not in catn:
-                    fix_counts.append(0)
-                else:
-                    fix_counts.append(counts[counts_idx])
-                    counts_idx += 1
-            counts = fix_counts
-            cut_err = bin_data(df_err,
-                               feat1,
-                               cutdf.cat.categories,
-                               quantile_binning=quantile_binning)
-            catr_err = cut_err.cat.rename_categories(bin_range)
-            val_err, counts_err = np.unique(catr_err.to_numpy(),
-                                            return_counts=True)
-            val_err = cut_err.cat.categories[val_err]
-            categories = cutdf.cat.categories
-        else:
-            categories, counts = np.unique(df[feat1].to_numpy(),
-                                           return_counts=True)
-            val_err, counts_err = np.unique(df_err[feat1].to_numpy(),
-                                            return_counts=True)
-            cut_err = df_err
-        # Compute the given metric for each group, if not using error rate
-        if metric != Metrics.ERROR_RATE:
-            if is_multi_agg_metric(metric):
-                ordered_labels = get_ordered_classes(analyzer.classes,
-                                                     true_y, pred_y)
-                aggfunc = _MultiMetricAggFunc(metric_to_func[metric],
-                                              ordered_labels, metric)
-            else:
-                aggfunc = _AggFunc(metric_to_func[metric])
-            cutdf_err = pd.DataFrame(cut_err)
-            cutdf_err['metric_values'] = list(zip(df_err[TRUE_Y],
-                                                  df_err[PRED_Y]))
-            grouped = cutdf_err.groupby([feat1])
-            agg_func = {'metric_values': aggfunc._agg_func_grouped}
-            counts_err = grouped.agg(agg_func)
-            counts_err = counts_err.values.ravel()
-        matrix = matrix_1d(categories, val_err, counts,
-                           counts_err, metric)
+        feature_bins = get_feature_bins(analyzer, df, feat1, num_bins,
+                                        quantile_binning, rows_key)
+        categories = feature_bins.categories
+        codes = feature_bins.get_codes(df[feat1])
+        counts, counts_err = compute_cell_values(
+            codes, len(categories), true_y, pred_y, diff,
+            metric, analyzer.classes)
+        if weight is not None:
+            # the cells are listed from the last category
+            cell_bounds = compute_cell_bounds(
+                codes, len(categories), counts, counts_err, true_y, pred_y,
+                diff, metric, analyzer.classes, random_state)
+            cell_bounds = [cell_bounds[::-1]]
+        matrix = matrix_from_cells(categories, None, counts, counts_err,
+                                   metric)
+    if weight is not None:
+        set_approximate_cells(matrix, cell_bounds, weight)
     return matrix
 
 
+def matrix_from_cells(categories1, categories2, counts, cell_values,
+                      metric):
+    """Constructs the matrix from the count and values of its cells.
+
+    :param categories1: The categories of the first feature.
+    :type categories1: pandas.IntervalIndex or numpy.ndarray
+    :param categories2: The categories of the second feature, or None
+        for a 1D matrix.
+    :type categories2: pandas.IntervalIndex or numpy.ndarray
+    :param counts: The number of rows in each cell, with the cells of
+        the second feature varying fastest.
+    :type counts: numpy.ndarray
+    :param cell_values: The values of each cell, as returned by
+        compute_cell_values.
+    :type cell_values: numpy.ndarray
+    :param metric: The metric computed.
+    :type metric: str
+    :returns: The matrix dictionary.
+    :rtype: dict
+    """
+    if categories2 is None:
+        if metric == Metrics.ERROR_RATE:
+            val_err = categories1
+        else:
+            val_err = categories1[counts > 0]
+        return matrix_1d(categories1, val_err, counts, cell_values, metric)
+    shape = (len(categories1), len(categories2))
+    counts = np.reshape(counts, shape)
+    matrix_total = pd.DataFrame(counts, index=categories1,
+                                columns=categories2)
+    matrix_error = pd.DataFrame(np.reshape(cell_values, shape),
+                                index=categories1,
+                                columns=categories2)
+    if metric != Metrics.ERROR_RATE:
+        # only the categories with rows are present in the metric
+        # matrix, other cells have a metric value of 0
+        observed1 = np.flatnonzero(counts.sum(axis=1))
+        observed2 = np.flatnonzero(counts.sum(axis=0))
+        matrix_error = matrix_error.iloc[observed1, observed2]
+    return matrix_2d(categories1, categories2, matrix_total, matrix_error,
+                     metric)
+
+
 def compute_matrix(analyzer, features, filters, composite_filters,
                    quantile_binning=False, num_bins=BIN_THRESHOLD):
     """Compute a matrix of metrics for a given set of feature names.
@@ -385,7 +408,8 @@ def compute_matrix(analyzer, features, filters, composite_filters,
                                      filters,
                                      composite_filters)
     return compute_matrix_on_dataset(analyzer, features, filtered_df,
-                                     quantile_binning, num_bins)
+                                     quantile_binning, num_bins,
+                                     use_cached_predictions=True)
 
 
 def convert_dtypes(df):
@@ -500,6 +524,284 @@ def adjust_bin_max_edge(cut_df, feat_col):
     return cut_df
 
 
+def get_feature_bins(analyzer, df, feat, num_bins, quantile_binning,
+                     rows_key):
+    """Get the heatmap categories of the feature for the given rows.
+
+    Numeric features with more unique values than the number of bins
+    are binned, other features are grouped by their unique values.  The
+    categories are cached on the analyzer so that further heatmaps on
+    the same rows reuse them without binning the feature again.
+
+    :param analyzer: The error analyzer.
+    :type analyzer: BaseAnalyzer
+    :param df: The DataFrame containing the feature values.
+    :type df: pd.DataFrame
+    :param feat: The feature name.
+    :type feat: str
+    :param num_bins: The number of bins.
+    :type num_bins: int
+    :param quantile_binning: Whether to use quantile binning.
+    :type quantile_binning: bool
+    :param rows_key: The key identifying the rows in the DataFrame, or
+        None to compute the categories without caching them.
+    :type rows_key: str
+    :returns: The categories of the feature.
+    :rtype: FeatureBins
+    """
+    bin_cache = analyzer.bin_cache
+    feature_bins = None
+    if rows_key is not None:
+        feature_bins = bin_cache.get(feat, num_bins, quantile_binning,
+                                     rows_key)
+    if feature_bins is None:
+        is_cat = False
+        if analyzer.categorical_features is not None:
+            is_cat = feat in analyzer.categorical_features
+        if len(df[feat].unique()) > num_bins and not is_cat:
+            categories = bin_data(df,
+                                  feat,
+                                  num_bins,
+                                  quantile_binning=quantile_binning)
+            categories = categories.cat.categories
+        else:
+            categories = np.unique(df[feat].to_numpy())
+        if rows_key is None:
+            feature_bins = FeatureBins(categories)
+        else:
+            feature_bins = bin_cache.put(feat, num_bins, quantile_binning,
+                                         rows_key, categories)
+    if feature_bins.is_binned and len(feature_bins.categories) < num_bins:
+        warn_duplicate_edges(feat)
+    return feature_bins
+
+
+def compute_cell_values(cell_ids, num_cells, true_y, pred_y, diff,
+                        metric, classes):
+    """Compute the count and metric value of each cell of the matrix.
+
+    All cells are computed in a single vectorized pass.  The rows are
+    reduced to sufficient statistics per cell when the metric allows it,
+    otherwise the metric function is called on the rows of each cell.
+
+    :param cell_ids: The cell of each row, or -1 for rows in no cell.
+    :type cell_ids: numpy.ndarray
+    :param num_cells: The number of cells.
+    :type num_cells: int
+    :param true_y: The true values.
+    :type true_y: numpy.ndarray
+    :param pred_y: The predicted values.
+    :type pred_y: numpy.ndarray
+    :param diff: The difference between the predicted and true values.
+    :type diff: numpy.ndarray
+    :param metric: The metric to compute.
+    :type metric: str
+    :param classes: The list of classes.
+    :type classes: list
+    :returns: The number of rows in each cell, along with the number of
+        errors of each cell for the error rate metric, the multiple
+        metrics tuple of each cell for multi-aggregation metrics or the
+        metric value of each cell otherwise.
+    :rtype: tuple(numpy.ndarray, numpy.ndarray)
+    """
+    in_cell = cell_ids >= 0
+    counts = np.bincount(cell_ids[in_cell], minlength=num_cells)
+    if metric == Metrics.ERROR_RATE:
+        errors = np.bincount(cell_ids[in_cell],
+                             weights=diff[in_cell].astype(bool),
+                             minlength=num_cells)
+        return counts, errors.astype(np.int64)
+    if not is_multi_agg_metric(metric):
+        statistics = compute_metric_statistics(cell_ids, num_cells, true_y,
+                                               pred_y, metric)
+        if statistics is not None:
+            return counts, get_cell_values_from_statistics(statistics,
+                                                           metric)
+        elif metric == Metrics.MEDIAN_ABSOLUTE_ERROR:
+            abs_error = np.abs(pred_y.astype(float) - true_y.astype(float))
+            values = compute_grouped_median(cell_ids, num_cells, abs_error)
+        else:
+            values = np.array(compute_grouped_values(cell_ids, num_cells,
+                                                     metric_to_func[metric],
+                                                     0, true_y, pred_y),
+                              dtype=float)
+        # undefined metric values, such as the r2 score of a single
+        # sample, are shown as 0
+        values[np.isnan(values)] = 0
+        return counts, values
+    ordered_labels = get_ordered_classes(classes, true_y, pred_y)
+    statistics = None
+    if metric not in BINARY_METRICS or len(ordered_labels) == 2:
+        statistics = compute_metric_statistics(cell_ids, num_cells, true_y,
+                                               pred_y, metric,
+                                               labels=ordered_labels)
+    if statistics is None:
+        aggfunc = _MultiMetricAggFunc(metric_to_func[metric],
+                                      ordered_labels, metric)
+        cell_values = np.empty(num_cells, dtype=object)
+        values = compute_grouped_values(cell_ids, num_cells,
+                                        aggfunc._multi_metric_result,
+                                        aggfunc._fill_na_value(),
+                                        true_y, pred_y)
+        for cell, value in enumerate(values):
+            cell_values[cell] = value
+        return counts, cell_values
+    return counts, get_cell_values_from_statistics(statistics, metric)
+
+
+def get_cell_values_from_statistics(statistics, metric):
+    """Get the metric value of each cell from its sufficient statistics.
+
+    The statistics may have been merged over several chunks of rows, in
+    which case the cell values are the ones of all the rows.
+
+    :param statistics: The statistics of each cell, with the ordered
+        class labels for classification metrics.
+    :type statistics: MetricStatistics
+    :param metric: The metric to compute.
+    :type metric: str
+    :returns: The metric value of each cell, or the multiple metrics
+        tuple of each cell for multi-aggregation metrics.
+    :rtype: numpy.ndarray
+    """
+    counts = statistics.counts
+    num_cells = len(counts)
+    if not is_multi_agg_metric(metric):
+        values = statistics.get_metric_values(metric)
+        # undefined metric values, such as the r2 score of a single
+        # sample, are shown as 0
+        values[np.isnan(values)] = 0
+        return values
+    ordered_labels = statistics.labels
+    aggfunc = _MultiMetricAggFunc(metric_to_func[metric],
+                                  ordered_labels, metric)
+    cell_values = np.empty(num_cells, dtype=object)
+    pos_label_index = -1
+    if len(ordered_labels) == 2:
+        # for binary classification case, choose positive class label
+        pos_label_index = 1
+    metric_values = statistics.get_metric_values(metric, pos_label_index)
+    errors = statistics.get_error_counts()
+    label_indexes = [statistics.get_label_index(label)
+                     for label in aggfunc.labels]
+    tp, fp, fn, tn = [confusion[:, label_indexes]
+                      for confusion in statistics.get_confusion_counts()]
+    fill_na_value = aggfunc._fill_na_value()
+    for cell in range(num_cells):
+        if counts[cell] == 0:
+            cell_values[cell] = fill_na_value
+        else:
+            cell_values[cell] = (metric_values[cell],
+                                 tp[cell].tolist(), fp[cell].tolist(),
+                                 fn[cell].tolist(), tn[cell].tolist(),
+                                 errors[cell])
+    return cell_values
+
+
+def get_cell_metric_values(counts, cell_values, metric):
+    """Get the metric value of each cell from the computed cell values.
+
+    :param counts: The number of rows in each cell.
+    :type counts: numpy.ndarray
+    :param cell_values: The values of each cell, as returned by
+        compute_cell_values.
+    :type cell_values: numpy.ndarray
+    :param metric: The metric computed.
+    :type metric: str
+    :returns: The metric value of each cell, with the error rate as a
+        fraction of the rows, or NaN for empty cells.
+    :rtype: numpy.ndarray
+    """
+    values = np.full(len(counts), np.nan)
+    has_rows = counts > 0
+    if metric == Metrics.ERROR_RATE:
+        values[has_rows] = cell_values[has_rows] / counts[has_rows]
+    elif is_multi_agg_metric(metric):
+        values[has_rows] = [float(value[0])
+                            for value in cell_values[has_rows]]
+    else:
+        values[has_rows] = cell_values[has_rows]
+    return values
+
+
+def compute_cell_bounds(cell_ids, num_cells, counts, cell_values, true_y,
+                        pred_y, diff, metric, classes, random_state=None):
+    """Compute the confidence interval of the metric value of each cell.
+
+    The sampled rows are split into random groups and the variance of
+    the metric value of each cell is estimated from its values on each
+    group, which applies to every metric supported by the matrix.
+
+    :param cell_ids: The cell of each sampled row, or -1 for rows in no
+        cell.
+    :type cell_ids: numpy.ndarray
+    :param num_cells: The number of cells.
+    :type num_cells: int
+    :param counts: The number of sampled rows in each cell.
+    :type counts: numpy.ndarray
+    :param cell_values: The values of each cell, as returned by
+        compute_cell_values.
+    :type cell_values: numpy.ndarray
+    :param true_y: The true values.
+    :type true_y: numpy.ndarray
+    :param pred_y: The predicted values.
+    :type pred_y: numpy.ndarray
+    :param diff: The difference between the predicted and true values.
+    :type diff: numpy.ndarray
+    :param metric: The metric to compute.
+    :type metric: str
+    :param classes: The list of classes.
+    :type classes: list
+    :param random_state: The seed used to split the rows into groups.
+    :type random_state: int
+    :returns: The lower and upper bounds of the metric value of each cell.
+    :rtype: list[tuple[float, float]]
+    """
+    values = get_cell_metric_values(counts, cell_values, metric)
+    replicates = get_replicates(len(cell_ids), random_state)
+    replicate_values = []
+    for replicate in range(NUM_REPLICATES):
+        rows = replicates == replicate
+        replicate_counts, replicate_cell_values = compute_cell_values(
+            cell_ids[rows], num_cells, true_y[rows], pred_y[rows],
+            diff[rows], metric, classes)
+        replicate_values.append(get_cell_metric_values(
+            replicate_counts, replicate_cell_values, metric))
+    replicate_values = np.array(replicate_values)
+    return [compute_confidence_bounds(values[cell], replicate_values[:, cell])
+            for cell in range(num_cells)]
+
+
+def set_approximate_cells(matrix, cell_bounds, weight):
+    """Mark the cells of a matrix computed on a sample as approximate.
+
+    The counts of the cells are scaled to the estimated counts of the
+    whole cohort and the confidence interval of each cell is added.
+
+    :param matrix: The matrix computed on the sample.
+    :type matrix: dict
+    :param cell_bounds: The lower and upper bounds of the metric value of
+        each cell, in the order of the cells of the matrix.
+    :type cell_bounds: list[list[tuple[float, float]]]
+    :param weight: The number of rows each sampled row stands for.
+    :type weight: float
+    """
+    for matrix_row, row_bounds in zip(matrix[MATRIX], cell_bounds):
+        for cell, (lower, upper) in zip(matrix_row, row_bounds):
+            for key in [COUNT, FALSE_COUNT]:
+                if key in cell:
+                    cell[key] = scale_count(cell[key], weight)
+            if ERROR in cell:
+                cell[ERROR] = float(scale_count(cell[ERROR], weight))
+            for key in [TP, FP, FN, TN]:
+                if key in cell:
+                    cell[key] = [scale_count(count, weight)
+                                 for count in cell[key]]
+            cell[ApproximateKeys.IS_APPROXIMATE] = True
+            cell[ApproximateKeys.METRIC_VALUE_LOWER] = lower
+            cell[ApproximateKeys.METRIC_VALUE_UPPER] = upper
+
+
 class _BaseAggFunc(ABC):
     """Base class for aggregation functions."""
     def __init__(self, aggfunc):
@@ -542,49 +844,6 @@ class _BaseAggFunc(ABC):
         pass
 
 
-class _AggFunc(_BaseAggFunc):
-    """Aggregation function for a single metric."""
-    def __init__(self, aggfunc):
-        """Initialize the aggregation function.
-
-        :param aggfunc: The aggregation function.
-        :type aggfunc: callable
-        """
-        super(_AggFunc, self).__init__(aggfunc)
-
-    def _agg_func_pair(self, pair):
-        """Aggregate a pair of values.
-
-        :param pair: The pair of values.
-        :type pair: tuple
-        :returns: The aggregated values.
-        :rtype: numpy.ndarray
-        """
-        true_y, pred_y = zip(*pair.values.tolist())
-        return self.aggfunc(true_y, pred_y)
-
-    def _agg_func_grouped(self, pair):
-        """Aggregate grouped pair of values.
-
-        :param pair: The grouped pair of values.
-        :type pair: tuple
-        :returns: The aggregated values.
-        :rtype: numpy.ndarray
-        """
-        if pair.empty:
-            return 0
-        (true_y, pred_y) = zip(*pair.values.tolist())
-        return self.aggfunc(true_y, pred_y)
-
-    def _fill_na_value(self):
-        """Specifies what value should be used to replace the missing value.
-
-        :returns: The replacement value for the missing value.
-        :rtype: int
-        """
-        return 0
-
-
 class _MultiMetricAggFunc(_BaseAggFunc):
     """Aggregation function for multiple metrics."""
     def __init__(self, aggfunc, labels, metric):
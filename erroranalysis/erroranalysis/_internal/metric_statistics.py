@@ -0,0 +1,407 @@
+# Copyright (c) Microsoft Corporation
+# Licensed under the MIT License.
+
+"""Defines metrics computed from mergeable sufficient statistics.
+
+Instead of calling the sklearn metric functions on the rows of every
+tree node or heatmap cell, the rows of all groups are reduced in a
+single vectorized pass to per-group statistics which can be added
+together, and the metric values are derived from those statistics.
+"""
+
+import numpy as np
+import pandas as pd
+
+from erroranalysis._internal.constants import (Metrics, f1_metrics,
+                                               precision_metrics,
+                                               recall_metrics)
+
+BINARY_METRICS = {Metrics.PRECISION_SCORE,
+                  Metrics.RECALL_SCORE,
+                  Metrics.F1_SCORE}
+MICRO_METRICS = {Metrics.MICRO_PRECISION_SCORE,
+                 Metrics.MICRO_RECALL_SCORE,
+                 Metrics.MICRO_F1_SCORE}
+MACRO_METRICS = {Metrics.MACRO_PRECISION_SCORE,
+                 Metrics.MACRO_RECALL_SCORE,
+                 Metrics.MACRO_F1_SCORE}
+CLASSIFICATION_METRICS = BINARY_METRICS.union(
+    MICRO_METRICS, MACRO_METRICS, {Metrics.ACCURACY_SCORE})
+REGRESSION_METRICS = {Metrics.MEAN_PREDICTION,
+                      Metrics.MEAN_ABSOLUTE_ERROR,
+                      Metrics.MEAN_SQUARED_ERROR,
+                      Metrics.R2_SCORE}
+
+
+def is_statistics_metric(metric):
+    """Returns whether the metric can be computed from the statistics.
+
+    :param metric: The metric to check.
+    :type metric: str
+    :return: True if the metric can be derived from MetricStatistics.
+    :rtype: bool
+    """
+    return metric in CLASSIFICATION_METRICS or metric in REGRESSION_METRICS
+
+
+def compute_metric_statistics(group_ids, num_groups, true_y, pred_y,
+                              metric, labels=None, center=None):
+    """Computes the sufficient statistics of each group for the metric.
+
+    :param group_ids: The group of each row, rows with a negative
+        group are ignored.
+    :type group_ids: numpy.ndarray
+    :param num_groups: The number of groups.
+    :type num_groups: int
+    :param true_y: The true values.
+    :type true_y: numpy.ndarray
+    :param pred_y: The predicted values.
+    :type pred_y: numpy.ndarray
+    :param metric: The metric to compute the statistics for.
+    :type metric: str
+    :param labels: The ordered class labels, required for
+        classification metrics.
+    :type labels: list
+    :param center: The value the true values are centered on for the
+        regression statistics, or None to use their mean.  Statistics
+        computed on chunks of rows can only be merged if they use the
+        same center.
+    :type center: float
+    :return: The statistics of each group or None if the metric is not
+        supported or the labels do not cover the values.
+    :rtype: MetricStatistics
+    """
+    if not is_statistics_metric(metric):
+        return None
+    group_ids = np.asarray(group_ids)
+    valid = group_ids >= 0
+    if not valid.all():
+        group_ids = group_ids[valid]
+        true_y = np.asarray(true_y)[valid]
+        pred_y = np.asarray(pred_y)[valid]
+    counts = np.bincount(group_ids, minlength=num_groups)
+    if metric in CLASSIFICATION_METRICS:
+        if labels is None:
+            return None
+        label_index = pd.Index(labels)
+        if not label_index.is_unique:
+            return None
+        true_codes = label_index.get_indexer(np.asarray(true_y))
+        pred_codes = label_index.get_indexer(np.asarray(pred_y))
+        if (true_codes < 0).any() or (pred_codes < 0).any():
+            return None
+        num_labels = len(labels)
+        size = num_groups * num_labels
+        true_bins = group_ids * num_labels + true_codes
+        pred_bins = group_ids * num_labels + pred_codes
+        true_counts = np.bincount(true_bins, minlength=size)
+        pred_counts = np.bincount(pred_bins, minlength=size)
+        correct_counts = np.bincount(true_bins[true_codes == pred_codes],
+                                     minlength=size)
+        class_counts = np.stack([true_counts, pred_counts, correct_counts])
+        class_counts = class_counts.reshape(3, num_groups, num_labels)
+        return MetricStatistics(counts, class_counts=class_counts,
+                                labels=labels)
+    true_y = np.asarray(true_y, dtype=float)
+    pred_y = np.asarray(pred_y, dtype=float)
+    error = pred_y - true_y
+    # center the true values to reduce the loss of precision when
+    # computing the variance from the sums
+    if center is None:
+        center = true_y.mean() if len(true_y) else 0.0
+    centered_true_y = true_y - center
+    sums = np.stack([
+        np.bincount(group_ids, weights=pred_y, minlength=num_groups),
+        np.bincount(group_ids, weights=np.abs(error), minlength=num_groups),
+        np.bincount(group_ids, weights=error * error, minlength=num_groups),
+        np.bincount(group_ids, weights=centered_true_y,
+                    minlength=num_groups),
+        np.bincount(group_ids, weights=centered_true_y * centered_true_y,
+                    minlength=num_groups)])
+    true_min = np.full(num_groups, np.inf)
+    true_max = np.full(num_groups, -np.inf)
+    np.minimum.at(true_min, group_ids, true_y)
+    np.maximum.at(true_max, group_ids, true_y)
+    return MetricStatistics(counts, regression_sums=sums,
+                            true_range=np.stack([true_min, true_max]))
+
+
+def compute_grouped_values(group_ids, num_groups, func, empty_value, *arrays):
+    """Applies a function to the values of each group.
+
+    Used as an exact fallback for metrics which cannot be derived from
+    sufficient statistics.  The rows are sorted by group once and the
+    function is called on contiguous slices of the given arrays.
+
+    :param group_ids: The group of each row, rows with a negative
+        group are ignored.
+    :type group_ids: numpy.ndarray
+    :param num_groups: The number of groups.
+    :type num_groups: int
+    :param func: The function to apply to the arrays of each group.
+    :type func: function
+    :param empty_value: The value of groups without any rows.
+    :type empty_value: any
+    :param arrays: The arrays to slice for each group.
+    :type arrays: numpy.ndarray
+    :return: The value of each group.
+    :rtype: list
+    """
+    group_ids = np.asarray(group_ids)
+    order = np.argsort(group_ids, kind='stable')
+    order = order[group_ids[order] >= 0]
+    sorted_ids = group_ids[order]
+    sorted_arrays = [np.asarray(array)[order] for array in arrays]
+    bounds = np.searchsorted(sorted_ids, np.arange(num_groups + 1))
+    values = []
+    for group in range(num_groups):
+        start, end = bounds[group], bounds[group + 1]
+        if start == end:
+            values.append(empty_value)
+        else:
+            values.append(func(*[array[start:end]
+                                 for array in sorted_arrays]))
+    return values
+
+
+def compute_grouped_median(group_ids, num_groups, values):
+    """Computes the exact median of the values of each group.
+
+    :param group_ids: The group of each row, rows with a negative
+        group are ignored.
+    :type group_ids: numpy.ndarray
+    :param num_groups: The number of groups.
+    :type num_groups: int
+    :param values: The values to compute the median of.
+    :type values: numpy.ndarray
+    :return: The median of each group, 0 for empty groups.
+    :rtype: numpy.ndarray
+    """
+    group_ids = np.asarray(group_ids)
+    values = np.asarray(values, dtype=float)
+    valid = group_ids >= 0
+    group_ids = group_ids[valid]
+    values = values[valid]
+    order = np.lexsort((values, group_ids))
+    sorted_values = values[order]
+    counts = np.bincount(group_ids, minlength=num_groups)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    medians = np.zeros(num_groups)
+    has_rows = counts > 0
+    lower = starts[has_rows] + (counts[has_rows] - 1) // 2
+    upper = starts[has_rows] + counts[has_rows] // 2
+    medians[has_rows] = (sorted_values[lower] + sorted_values[upper]) / 2
+    return medians
+
+
+def _safe_divide(numerator, denominator):
+    """Divides the arrays, using 0 where the denominator is 0.
+
+    :param numerator: The numerator.
+    :type numerator: numpy.ndarray
+    :param denominator: The denominator.
+    :type denominator: numpy.ndarray
+    :return: The quotient.
+    :rtype: numpy.ndarray
+    """
+    numerator = np.asarray(numerator, dtype=float)
+    denominator = np.asarray(denominator, dtype=float)
+    result = np.zeros(np.broadcast(numerator, denominator).shape)
+    np.divide(numerator, denominator, out=result,
+              where=denominator != 0)
+    return result
+
+
+class MetricStatistics(object):
+    """Mergeable sufficient statistics of the rows in each group.
+
+    For classification the statistics are the per-class counts of the
+    true labels, predicted labels and correct predictions, from which
+    the confusion counts of each class are derived.  For regression
+    they are the count, sums of the predictions, absolute errors and
+    squared errors, the sums of the centered true values and their
+    squares, and the range of the true values.
+
+    :param counts: The number of rows in each group.
+    :type counts: numpy.ndarray
+    :param class_counts: The per-class counts of true labels, predicted
+        labels and correct predictions with shape
+        (3, # groups, # labels).
+    :type class_counts: numpy.ndarray
+    :param labels: The ordered class labels.
+    :type labels: list
+    :param regression_sums: The regression sums with shape (5, # groups).
+    :type regression_sums: numpy.ndarray
+    :param true_range: The min and max true value of each group with
+        shape (2, # groups).
+    :type true_range: numpy.ndarray
+    """
+
+    def __init__(self, counts, class_counts=None, labels=None,
+                 regression_sums=None, true_range=None):
+        self.counts = counts
+        self.class_counts = class_counts
+        self.labels = labels
+        self.regression_sums = regression_sums
+        self.true_range = true_range
+
+    def add_group(self, target, source):
+        """Adds the statistics of a group to another group.
+
+        :param target: The group to add the statistics to.
+        :type target: int
+        :param source: The group whose statistics are added.
+        :type source: int
+        """
+        self.counts[target] += self.counts[source]
+        if self.class_counts is not None:
+            self.class_counts[:, target] += self.class_counts[:, source]
+        if self.regression_sums is not None:
+            self.regression_sums[:, target] += \
+                self.regression_sums[:, source]
+            self.true_range[0, target] = min(self.true_range[0, target],
+                                             self.true_range[0, source])
+            self.true_range[1, target] = max(self.true_range[1, target],
+                                             self.true_range[1, source])
+
+    def merge(self, other):
+        """Adds the statistics of the groups of other to these groups.
+
+        Used to compute the statistics of rows read in chunks, the
+        statistics of each chunk having the same groups, labels and
+        center of the true values.
+
+        :param other: The statistics of the same groups on other rows.
+        :type other: MetricStatistics
+        :return: These statistics, after adding other.
+        :rtype: MetricStatistics
+        """
+        self.counts = self.counts + other.counts
+        if self.class_counts is not None:
+            self.class_counts = self.class_counts + other.class_counts
+        if self.regression_sums is not None:
+            self.regression_sums = \
+                self.regression_sums + other.regression_sums
+            self.true_range = np.stack([
+                np.minimum(self.true_range[0], other.true_range[0]),
+                np.maximum(self.true_range[1], other.true_range[1])])
+        return self
+
+    def get_present_labels(self, group):
+        """Get the labels which are true or predicted in the group.
+
+        :param group: The group.
+        :type group: int
+        :return: The labels present in the group.
+        :rtype: list
+        """
+        true_counts, pred_counts, _ = self.class_counts[:, group]
+        present = (true_counts + pred_counts) > 0
+        return [label for label, is_present in zip(self.labels, present)
+                if is_present]
+
+    def get_label_index(self, label):
+        """Get the index of a label in the statistics.
+
+        :param label: The label.
+        :type label: any
+        :return: The index of the label, or -1 if it is not a known label.
+        :rtype: int
+        """
+        label_index = pd.Index(self.labels)
+        if label in label_index:
+            return label_index.get_loc(label)
+        return -1
+
+    def get_confusion_counts(self):
+        """Get the one-vs-rest confusion counts of each class.
+
+        :return: The true positive, false positive, false negative and
+            true negative counts, each with shape (# groups, # labels).
+        :rtype: tuple(numpy.ndarray)
+        """
+        true_counts, pred_counts, correct_counts = self.class_counts
+        tp = correct_counts
+        fp = pred_counts - correct_counts
+        fn = true_counts - correct_counts
+        tn = self.counts[:, np.newaxis] - tp - fp - fn
+        return tp, fp, fn, tn
+
+    def get_error_counts(self):
+        """Get the number of incorrect predictions in each group.
+
+        :return: The number of incorrect predictions.
+        :rtype: numpy.ndarray
+        """
+        return self.counts - self.class_counts[2].sum(axis=1)
+
+    def get_metric_values(self, metric, pos_label_indexes=None):
+        """Computes the metric value of each group from the statistics.
+
+        Groups without any rows have a metric value of 0.  As in sklearn,
+        the precision, recall and f1 score of a class are 0 when they
+        are not defined.
+
+        :param metric: The metric to compute.
+        :type metric: str
+        :param pos_label_indexes: For the binary precision, recall and
+            f1 score metrics, the index of the positive label of each
+            group, or -1 if the positive label is not a known label.
+        :type pos_label_indexes: numpy.ndarray or int
+        :return: The metric value of each group.
+        :rtype: numpy.ndarray
+        """
+        if metric in REGRESSION_METRICS:
+            return self._get_regression_metric_values(metric)
+        tp, fp, fn, _ = self.get_confusion_counts()
+        num_correct = tp.sum(axis=1)
+        if metric == Metrics.ACCURACY_SCORE or metric in MICRO_METRICS:
+            return _safe_divide(num_correct, self.counts)
+        if metric in precision_metrics:
+            class_values = _safe_divide(tp, tp + fp)
+        elif metric in recall_metrics:
+            class_values = _safe_divide(tp, tp + fn)
+        elif metric in f1_metrics:
+            class_values = _safe_divide(2 * tp, 2 * tp + fp + fn)
+        else:
+            raise ValueError('Unsupported metric {}'.format(metric))
+        if metric in MACRO_METRICS:
+            true_counts, pred_counts, _ = self.class_counts
+            present = (true_counts + pred_counts) > 0
+            return _safe_divide((class_values * present).sum(axis=1),
+                                present.sum(axis=1))
+        pos_label_indexes = np.broadcast_to(pos_label_indexes,
+                                            self.counts.shape)
+        groups = np.arange(len(self.counts))
+        values = class_values[groups, np.maximum(pos_label_indexes, 0)]
+        values[pos_label_indexes < 0] = 0
+        return values
+
+    def _get_regression_metric_values(self, metric):
+        """Computes the regression metric value of each group.
+
+        :param metric: The regression metric to compute.
+        :type metric: str
+        :return: The metric value of each group.
+        :rtype: numpy.ndarray
+        """
+        sum_pred, sum_abs_error, sum_squared_error, sum_true, \
+            sum_squared_true = self.regression_sums
+        counts = self.counts
+        if metric == Metrics.MEAN_PREDICTION:
+            return _safe_divide(sum_pred, counts)
+        elif metric == Metrics.MEAN_ABSOLUTE_ERROR:
+            return _safe_divide(sum_abs_error, counts)
+        elif metric == Metrics.MEAN_SQUARED_ERROR:
+            return _safe_divide(sum_squared_error, counts)
+        # r2 score, with the same edge cases as sklearn: not defined for
+        # less than two samples and 1 or 0 for constant true values
+        total_variance = sum_squared_true - \
+            _safe_divide(sum_true * sum_true, counts)
+        is_constant = self.true_range[0] == self.true_range[1]
+        values = 1 - _safe_divide(sum_squared_error, total_variance)
+        constant_values = np.where(sum_squared_error == 0, 1.0, 0.0)
+        values = np.where(is_constant, constant_values, values)
+        values[counts < 2] = np.nan
+        values[counts == 0] = 0
+        return values
@@ -0,0 +1,132 @@
+# Copyright (c) Microsoft Corporation
+# Licensed under the MIT License.
+
+"""Defines the PredictionCache used to avoid re-scoring the model."""
+
+import numpy as np
+
+HITS = 'hits'
+MISSES = 'misses'
+
+
+def take_rows(values, row_indexes):
+    """Gathers the given rows from a list or array of values.
+
+    :param values: The values to gather the rows from.
+    :type values: numpy.ndarray or list or pandas.Series
+    :param row_indexes: The positional indexes of the rows to gather.
+    :type row_indexes: numpy.ndarray or list[int]
+    :return: The gathered rows.
+    :rtype: numpy.ndarray or list
+    """
+    if isinstance(values, np.ndarray):
+        return values[np.asarray(row_indexes, dtype=int)]
+    if hasattr(values, 'iloc'):
+        return values.iloc[np.asarray(row_indexes, dtype=int)].to_numpy()
+    return [values[int(idx)] for idx in row_indexes]
+
+
+class PredictionCache(object):
+    """Cache of the model's predictions on the full dataset.
+
+    The model is scored on the full dataset at most once for predictions
+    and at most once for probabilities.  Subsets of rows are served from
+    the cached outputs by positional row index.  The cached outputs are
+    invalidated when either the model or the dataset object changes.
+
+    :param model: An object that represents a model.
+    :type model: object
+    :param dataset: A matrix of feature vector examples
+        (# examples x # features).
+    :type dataset: numpy.ndarray or list[][] or pandas.DataFrame
+    """
+
+    def __init__(self, model, dataset):
+        self._model = model
+        self._dataset = dataset
+        self._predictions = None
+        self._probabilities = None
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def hits(self):
+        """Get the number of requests served from the cache.
+
+        :return: The number of cache hits.
+        :rtype: int
+        """
+        return self._hits
+
+    @property
+    def misses(self):
+        """Get the number of requests that required scoring the model.
+
+        :return: The number of cache misses.
+        :rtype: int
+        """
+        return self._misses
+
+    def get_stats(self):
+        """Get the hit and miss counters of the cache.
+
+        :return: The hit and miss counters.
+        :rtype: dict
+        """
+        return {HITS: self._hits, MISSES: self._misses}
+
+    def invalidate(self):
+        """Clears the cached predictions and probabilities."""
+        self._predictions = None
+        self._probabilities = None
+
+    def validate(self, model, dataset):
+        """Invalidates the cache if the model or dataset has changed.
+
+        :param model: The current model.
+        :type model: object
+        :param dataset: The current dataset.
+        :type dataset: numpy.ndarray or list[][] or pandas.DataFrame
+        """
+        if model is not self._model or dataset is not self._dataset:
+            self._model = model
+            self._dataset = dataset
+            self.invalidate()
+
+    def predict(self, row_indexes=None):
+        """Get the model's predictions, scoring the model only once.
+
+        :param row_indexes: Optional positional indexes of the rows to
+            return the predictions for.  If None, the predictions for
+            the full dataset are returned.
+        :type row_indexes: numpy.ndarray or list[int]
+        :return: The predictions.
+        :rtype: numpy.ndarray or list
+        """
+        if self._predictions is None:
+            self._misses += 1
+            self._predictions = self._model.predict(self._dataset)
+        else:
+            self._hits += 1
+        if row_indexes is None:
+            return self._predictions
+        return take_rows(self._predictions, row_indexes)
+
+    def predict_proba(self, row_indexes=None):
+        """Get the model's probabilities, scoring the model only once.
+
+        :param row_indexes: Optional positional indexes of the rows to
+            return the probabilities for.  If None, the probabilities for
+            the full dataset are returned.
+        :type row_indexes: numpy.ndarray or list[int]
+        :return: The prediction probabilities.
+        :rtype: numpy.ndarray
+        """
+        if self._probabilities is None:
+            self._misses += 1
+            self._probabilities = self._model.predict_proba(self._dataset)
+        else:
+            self._hits += 1
+        if row_indexes is None:
+            return self._probabilities
+        return take_rows(self._probabilities, row_indexes)
@@ -2,13 +2,117 @@
 # Licensed under the MIT License.
 
 """Module for processing categorical features and their values."""
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import numpy
 import pandas as pd
 from sklearn.compose import ColumnTransformer
 from sklearn.preprocessing import OrdinalEncoder
 
+MISSING_CODE = -1
+
+
+class CategoricalEncoder(object):
+    """Encodes the categorical features of a dataset as integer codes.
+
+    The encoder is fitted once on the full dataset and the codes of all
+    its rows are kept as an int32 matrix, so that the codes of subsets of
+    rows, such as cohorts, are gathered by row index instead of fitting
+    the encoder again, and are consistent with the full dataset.
+
+    :param all_feature_names: The list of all feature names.
+    :type all_feature_names: list[str]
+    :param categorical_features: The list of categorical features.
+    :type categorical_features: list[str]
+    :param dataset: The dataset.
+    :type dataset: pd.DataFrame or numpy.ndarray
+    """
+
+    def __init__(self, all_feature_names: List[str],
+                 categorical_features: List[str],
+                 dataset: pd.DataFrame) -> None:
+        self.categories = []
+        self.categorical_indexes = []
+        self.category_dictionary = {}
+        self._transformer = None
+        self.codes = numpy.empty((len(dataset), 0), dtype=numpy.int32)
+
+        if categorical_features:
+            self.categorical_indexes = [all_feature_names.index(feature)
+                                        for feature in categorical_features]
+            ordinal_enc = OrdinalEncoder(handle_unknown='use_encoded_value',
+                                         unknown_value=numpy.nan)
+            self._transformer = ColumnTransformer(
+                [('ord', ordinal_enc, self.categorical_indexes)],
+                remainder='drop')
+            self.codes = self._to_codes(
+                self._transformer.fit_transform(dataset))
+            transformer_categories = \
+                self._transformer.transformers_[0][1].categories_
+            for category_arr, category_index in zip(
+                    transformer_categories, self.categorical_indexes):
+                category_values = category_arr.tolist()
+                self.categories.append(category_values)
+                self.category_dictionary[category_index] = category_values
+
+    @staticmethod
+    def _to_codes(string_ind_data: numpy.ndarray) -> numpy.ndarray:
+        """Convert the encoded values to int32 codes.
+
+        :param string_ind_data: The encoded values, with NaN for missing
+            values.
+        :type string_ind_data: numpy.ndarray
+        :return: The codes, with -1 for missing values.
+        :rtype: numpy.ndarray
+        """
+        return numpy.where(numpy.isnan(string_ind_data), MISSING_CODE,
+                           string_ind_data).astype(numpy.int32)
+
+    @staticmethod
+    def _to_string_indexed_data(codes: numpy.ndarray) -> numpy.ndarray:
+        """Convert the int32 codes to encoded values.
+
+        :param codes: The codes, with -1 for missing values.
+        :type codes: numpy.ndarray
+        :return: The encoded values, with NaN for missing values.
+        :rtype: numpy.ndarray
+        """
+        string_ind_data = codes.astype(float)
+        string_ind_data[codes == MISSING_CODE] = numpy.nan
+        return string_ind_data
+
+    def get_string_indexed_data(
+            self, row_indexes: Optional[numpy.ndarray] = None) -> \
+            numpy.ndarray:
+        """Get the encoded values of the rows of the full dataset.
+
+        :param row_indexes: The positional indexes of the rows, or None
+            for all the rows.
+        :type row_indexes: numpy.ndarray
+        :return: The encoded values of the categorical features, with NaN
+            for missing values.
+        :rtype: numpy.ndarray
+        """
+        if self._transformer is None:
+            return numpy.array([])
+        codes = self.codes
+        if row_indexes is not None:
+            codes = codes[numpy.asarray(row_indexes, dtype=int)]
+        return self._to_string_indexed_data(codes)
+
+    def transform(self, dataset: pd.DataFrame) -> numpy.ndarray:
+        """Encode the values of another dataset with the fitted encoder.
+
+        :param dataset: The dataset.
+        :type dataset: pd.DataFrame or numpy.ndarray
+        :return: The encoded values of the categorical features, with NaN
+            for missing and unknown values.
+        :rtype: numpy.ndarray
+        """
+        if self._transformer is None:
+            return numpy.array([])
+        return self._transformer.transform(dataset)
+
 
 def process_categoricals(all_feature_names: List[str],
                          categorical_features: List[str],
@@ -29,25 +133,8 @@ def process_categoricals(all_feature_names: List[str],
         and the encoded data.
     :rtype: (list[list[str]], list[int], dict[int, str], numpy.ndarray)
     """
-    categories = []
-    categorical_indexes = []
-    category_dictionary = {}
-    string_ind_data = numpy.array([])
-
-    if categorical_features:
-        categorical_indexes = [all_feature_names.index(feature)
-                               for feature in categorical_features]
-        ordinal_enc = OrdinalEncoder()
-        ct = ColumnTransformer([('ord', ordinal_enc,
-                                 categorical_indexes)],
-                               remainder='drop')
-        string_ind_data = ct.fit_transform(dataset)
-        transformer_categories = ct.transformers_[0][1].categories_
-        for category_arr, category_index in zip(transformer_categories,
-                                                categorical_indexes):
-            category_values = category_arr.tolist()
-            categories.append(category_values)
-            category_dictionary[category_index] = category_values
-
-    return categories, categorical_indexes, category_dictionary, \
-        string_ind_data
+    encoder = CategoricalEncoder(all_feature_names=all_feature_names,
+                                 categorical_features=categorical_features,
+                                 dataset=dataset)
+    return encoder.categories, encoder.categorical_indexes, \
+        encoder.category_dictionary, encoder.get_string_indexed_data()
@@ -0,0 +1,251 @@
+# Copyright (c) Microsoft Corporation
+# Licensed under the MIT License.
+
+"""Defines the SurrogateCache used to reuse the surrogate error trees."""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from inspect import signature
+
+import numpy as np
+from lightgbm import Dataset, train
+
+from erroranalysis._internal.constants import ModelTask
+
+DEFAULT_MAX_ENTRIES = 4
+DEFAULT_MAX_BOOSTERS = 32
+# min_child_samples is also used by LightGBM to filter out the features
+# that cannot be split when the dataset is binned, which would prevent
+# changing it without binning the dataset again
+DATASET_PARAMS = {'feature_pre_filter': False, 'verbosity': -1}
+# before LightGBM 4.6, lightgbm.train sets its categorical features on the
+# training data, which fails once the data is binned unless they are the
+# same as the data's own
+_TRAIN_SETS_CATEGORICAL_FEATURE = \
+    'categorical_feature' in signature(train).parameters
+
+
+def get_labels_key(labels):
+    """Get a key identifying the labels a surrogate tree is trained on.
+
+    :param labels: The labels.
+    :type labels: numpy.ndarray
+    :return: The key identifying the labels.
+    :rtype: str
+    """
+    labels = np.ascontiguousarray(labels)
+    digest = hashlib.sha1(labels.tobytes()).hexdigest()
+    return '{}:{}:{}'.format(labels.dtype.str, labels.shape, digest)
+
+
+class _SurrogateEntry(object):
+    """The binned training data of a surrogate tree and its boosters.
+
+    The lock of the entry guards its boosters and the training on the
+    shared training data, which LightGBM does not support from several
+    threads at once.
+
+    :param train_set: The constructed LightGBM training data.
+    :type train_set: lightgbm.Dataset
+    :param max_boosters: The maximum number of cached boosters.
+    :type max_boosters: int
+    """
+
+    def __init__(self, train_set, max_boosters):
+        self.train_set = train_set
+        self.boosters = OrderedDict()
+        self.lock = threading.Lock()
+        self._max_boosters = max_boosters
+
+    def put(self, key, booster):
+        """Caches the booster trained with the given parameters.
+
+        :param key: The parameters of the booster.
+        :type key: tuple
+        :param booster: The booster.
+        :type booster: lightgbm.Booster
+        """
+        self.boosters[key] = booster
+        while len(self.boosters) > self._max_boosters:
+            self.boosters.popitem(last=False)
+
+
+class SurrogateCache(object):
+    """Bounded LRU cache of the surrogate models trained on errors.
+
+    Training the surrogate tree first bins the features of the cohort
+    into histograms, which takes most of the time for a single tree.  The
+    binned training data is cached per set of rows, features and errors,
+    so that changing the maximum depth, number of leaves or minimum
+    number of samples in a leaf only trains the tree again on the cached
+    bins, and the tree trained with each of these parameters is cached
+    as well.
+
+    LightGBM cannot grow an existing tree deeper, so a deeper tree is
+    trained again from the cached bins rather than from the shallower
+    tree.  The cache can be shared between threads, the trees trained
+    on the same cached bins being trained one at a time.
+
+    :param dataset: The dataset the surrogate models are trained on.
+    :type dataset: pandas.DataFrame or numpy.ndarray
+    :param max_entries: The maximum number of cached training datasets.
+    :type max_entries: int
+    :param max_boosters: The maximum number of cached boosters for each
+        training dataset.
+    :type max_boosters: int
+    :param num_threads: The number of threads LightGBM bins the data and
+        trains the trees with, or None to use its default.  Set it to 1
+        when several trees are trained in parallel threads.
+    :type num_threads: int
+    """
+
+    def __init__(self, dataset, max_entries=DEFAULT_MAX_ENTRIES,
+                 max_boosters=DEFAULT_MAX_BOOSTERS, num_threads=None):
+        self.dataset = dataset
+        self.num_threads = num_threads
+        self._max_entries = max_entries
+        self._max_boosters = max_boosters
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __getstate__(self):
+        # the lock cannot be pickled and is recreated when unpickled, and
+        # the cached LightGBM training data holds native handles which
+        # cannot be pickled either, so the cache is pickled empty
+        state = self.__dict__.copy()
+        del state['_lock']
+        state['_entries'] = OrderedDict()
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def get_booster(self, model_task, rows_key, feature_indexes,
+                    dataset_sub_features, diff, cat_ind_reindexed,
+                    max_depth, num_leaves, min_child_samples):
+        """Get the booster of the surrogate model trained on errors.
+
+        :param model_task: The model task.
+        :type model_task: str
+        :param rows_key: The key identifying the rows.
+        :type rows_key: str
+        :param feature_indexes: The indexes of the features to train the
+            surrogate model on.
+        :type feature_indexes: list[int]
+        :param dataset_sub_features: The subset of features to train the
+            surrogate model on.
+        :type dataset_sub_features: numpy.ndarray
+        :param diff: The difference between the true and predicted labels
+            column.
+        :type diff: numpy.ndarray
+        :param cat_ind_reindexed: The list of categorical feature indexes.
+        :type cat_ind_reindexed: list[int]
+        :param max_depth: The maximum depth of the surrogate tree trained
+            on errors.
+        :type max_depth: int
+        :param num_leaves: The number of leaves of the surrogate tree
+            trained on errors.
+        :type num_leaves: int
+        :param min_child_samples: The minimal number of data required to
+            create one leaf.
+        :type min_child_samples: int
+        :return: The booster of the trained surrogate model.
+        :rtype: lightgbm.Booster
+        """
+        key = (model_task, rows_key, tuple(feature_indexes),
+               get_labels_key(diff))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None:
+            # bin the data outside of the lock, as it takes most of the time
+            train_set = self._create_train_set(
+                model_task, dataset_sub_features, diff, cat_ind_reindexed,
+                self.num_threads)
+            with self._lock:
+                # another thread may have binned the same data meanwhile
+                entry = self._entries.get(key)
+                if entry is None:
+                    entry = _SurrogateEntry(train_set, self._max_boosters)
+                    self._entries[key] = entry
+                    while len(self._entries) > self._max_entries:
+                        self._entries.popitem(last=False)
+                self._entries.move_to_end(key)
+
+        params_key = (max_depth, num_leaves, min_child_samples)
+        with entry.lock:
+            booster = entry.boosters.get(params_key)
+            is_hit = booster is not None
+            if is_hit:
+                entry.boosters.move_to_end(params_key)
+            else:
+                objective = 'binary'
+                if model_task != ModelTask.CLASSIFICATION:
+                    objective = 'regression'
+                params = {'objective': objective,
+                          'max_depth': max_depth,
+                          'num_leaves': num_leaves,
+                          'min_child_samples': min_child_samples,
+                          'verbosity': -1}
+                if self.num_threads is not None:
+                    params['num_threads'] = self.num_threads
+                kwargs = {}
+                if _TRAIN_SETS_CATEGORICAL_FEATURE:
+                    kwargs['categorical_feature'] = \
+                        entry.train_set.categorical_feature
+                booster = train(params, entry.train_set, num_boost_round=1,
+                                **kwargs)
+                entry.put(params_key, booster)
+        with self._lock:
+            if is_hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return booster
+
+    @staticmethod
+    def _create_train_set(model_task, dataset_sub_features, diff,
+                          cat_ind_reindexed, num_threads=None):
+        """Bin the features into the LightGBM training data.
+
+        :param model_task: The model task.
+        :type model_task: str
+        :param dataset_sub_features: The subset of features to train the
+            surrogate model on.
+        :type dataset_sub_features: numpy.ndarray
+        :param diff: The difference between the true and predicted labels
+            column.
+        :type diff: numpy.ndarray
+        :param cat_ind_reindexed: The list of categorical feature indexes.
+        :type cat_ind_reindexed: list[int]
+        :param num_threads: The number of threads to bin the data with, or
+            None to use the LightGBM default.
+        :type num_threads: int
+        :return: The constructed training data.
+        :rtype: lightgbm.Dataset
+        """
+        if model_task == ModelTask.CLASSIFICATION:
+            # encode the labels as the scikit-learn classifier does
+            _, label = np.unique(diff, return_inverse=True)
+        else:
+            label = np.asarray(diff, dtype=float)
+        params = dict(DATASET_PARAMS)
+        if num_threads is not None:
+            params['num_threads'] = num_threads
+        train_set = Dataset(dataset_sub_features, label=label,
+                            categorical_feature=cat_ind_reindexed or 'auto',
+                            params=params)
+        return train_set.construct()
+
+    def clear(self):
+        """Removes all the cached training data and boosters."""
+        with self._lock:
+            self._entries.clear()
@@ -1,6 +1,7 @@
 # Copyright (c) Microsoft Corporation
 # Licensed under the MIT License.
 
+import heapq
 import logging
 import numbers
 from enum import Enum
@@ -11,19 +12,27 @@ from lightgbm import Booster, LGBMClassifier, LGBMRegressor
 from sklearn.metrics import (mean_absolute_error, mean_squared_error,
                              median_absolute_error, r2_score)
 
+from erroranalysis._internal.approximation import (NUM_REPLICATES,
+                                                   compute_confidence_bounds,
+                                                   get_replicates,
+                                                   sample_cohort, scale_count)
+from erroranalysis._internal.bin_cache import get_rows_key
 from erroranalysis._internal.cohort_filter import filter_from_cohort
 from erroranalysis._internal.constants import (DIFF, LEAF_INDEX, METHOD,
                                                PRED_Y, ROW_INDEX,
                                                SPLIT_FEATURE, SPLIT_INDEX,
-                                               TRUE_Y, CohortFilterMethods,
-                                               Metrics, ModelTask, TreeNode,
+                                               TRUE_Y, ApproximateKeys,
+                                               CohortFilterMethods, Metrics,
+                                               ModelTask, TreeNode,
                                                error_metrics, f1_metrics,
                                                metric_to_display_name,
                                                precision_metrics,
                                                recall_metrics,
                                                regression_metrics)
+from erroranalysis._internal.feature_store import encode_features
+from erroranalysis._internal.metric_statistics import (
+    BINARY_METRICS, CLASSIFICATION_METRICS, compute_metric_statistics)
 from erroranalysis._internal.metrics import get_ordered_classes, metric_to_func
-from erroranalysis._internal.process_categoricals import process_categoricals
 from erroranalysis._internal.utils import is_spark
 from raiutils.exceptions import UserConfigValidationException
 
@@ -57,6 +66,11 @@ OBJECT = 'object'
 PREDICTION = 'prediction'
 RAW_PREDICTION = 'rawPrediction'
 PROBABILITY = 'probability'
+TREE = 'tree'
+TREE_STATISTICS_METRICS = CLASSIFICATION_METRICS.union(
+    {Metrics.MEAN_ABSOLUTE_ERROR,
+     Metrics.MEAN_SQUARED_ERROR,
+     Metrics.R2_SCORE})
 
 
 class TreeSide(str, Enum):
@@ -120,9 +134,36 @@ def compute_error_tree_on_dataset(
         dataset,
         max_depth=DEFAULT_MAX_DEPTH,
         num_leaves=DEFAULT_NUM_LEAVES,
-        min_child_samples=DEFAULT_MIN_CHILD_SAMPLES):
+        min_child_samples=DEFAULT_MIN_CHILD_SAMPLES,
+        use_cached_predictions=False,
+        max_levels=None,
+        max_nodes=None,
+        root_node_id=None,
+        sample_size=None,
+        random_state=None,
+        refine=False,
+        metric=None):
     """Computes the error tree for the given dataset.
 
+    By default all the nodes of the tree are returned.  To bound the size
+    of the returned tree, only the top levels of the tree or the nodes
+    with the most error can be returned, and the descendants of a
+    returned node can be expanded on demand with a later call on the same
+    dataset, which reuses the surrogate model cached by the analyzer.
+    When the tree is pruned, each returned node has the key
+    'hasHiddenChildren' set to True if some of its children are not
+    returned.
+
+    On large local cohorts, the surrogate model can be trained and the
+    metrics computed on a sample of the rows stratified on the error.
+    The counts of the approximate nodes are then estimated for the whole
+    cohort, and each node has the key 'isApproximate' set to True and
+    the keys 'metricValueLower' and 'metricValueUpper' with the 95%
+    confidence interval of its metric value, or None if the node has too
+    few sampled rows to estimate it.  The exact tree can then be computed
+    in the background, so that requesting it without the sample size
+    returns it without computing it again.
+
     :param analyzer: The error analyzer containing the categorical
         features and categories for the full dataset.
     :type analyzer: BaseAnalyzer
@@ -144,6 +185,37 @@ def compute_error_tree_on_dataset(
     :type num_leaves: int
     :param min_child_samples: The minimal number of data required to
         create one leaf.
+    :type min_child_samples: int
+    :param use_cached_predictions: If True, the rows of the given
+        dataset are unmodified rows of the analyzer's dataset, so the
+        features, and for a ModelAnalyzer the predictions, are looked up
+        from the analyzer's full dataset using the 'index' column instead
+        of read from the given dataset and computed with the model.
+    :type use_cached_predictions: bool
+    :param max_levels: The maximum number of levels of nodes to return,
+        starting from the root, or from the children of the expanded node
+        if root_node_id is given.  By default all the levels are returned.
+    :type max_levels: int
+    :param max_nodes: The maximum number of nodes to return.  The nodes
+        with the most error are returned first, along with all their
+        ancestors.  By default all the nodes are returned.
+    :type max_nodes: int
+    :param root_node_id: The id of the node to expand.  If given, only
+        the descendants of the node are returned.
+    :type root_node_id: int
+    :param sample_size: The maximum number of rows to train the surrogate
+        model and compute the metrics on.  Larger cohorts are sampled,
+        stratified on the error, and the tree is approximate.  By default
+        all the rows are used.
+    :type sample_size: int
+    :param random_state: The seed used to sample the rows.
+    :type random_state: int
+    :param refine: If True and the tree is approximate, the exact tree
+        is computed in the background.
+    :type refine: bool
+    :param metric: The metric to compute.  By default the analyzer's
+        metric.
+    :type metric: str
     :return: The tree representation as a list of nodes.
     :rtype: list[dict[str, str]]
     """
@@ -153,9 +225,48 @@ def compute_error_tree_on_dataset(
         num_leaves = DEFAULT_NUM_LEAVES
     if min_child_samples is None:
         min_child_samples = DEFAULT_MIN_CHILD_SAMPLES
+    for name, value in [('max_levels', max_levels),
+                        ('max_nodes', max_nodes)]:
+        if value is not None and value < 1:
+            raise UserConfigValidationException(
+                '{} must be at least 1, got {}'.format(name, value))
+
+    if metric is None:
+        metric = analyzer.metric
 
     if dataset.shape[0] == 0:
-        return create_empty_node(analyzer.metric)
+        if root_node_id is not None:
+            # the empty tree has no node to expand
+            return []
+        return create_empty_node(metric)
+    refiner = analyzer.background_refiner
+    weight = None
+    if not is_spark(dataset) and (sample_size is not None or
+                                  len(refiner) > 0):
+        request_key = (TREE, tuple(features),
+                       get_rows_key(dataset[ROW_INDEX].to_numpy()),
+                       max_depth, num_leaves, min_child_samples,
+                       use_cached_predictions, max_levels, max_nodes,
+                       root_node_id, metric)
+        if sample_size is None:
+            future = refiner.pop(request_key)
+            if future is not None and not future.cancelled():
+                return future.result()
+        else:
+            cohort = dataset
+            dataset, weight = sample_cohort(analyzer, cohort, sample_size,
+                                            random_state)
+            if weight is not None and refine:
+                refiner.submit(request_key, compute_error_tree_on_dataset,
+                               analyzer, features, cohort,
+                               max_depth=max_depth,
+                               num_leaves=num_leaves,
+                               min_child_samples=min_child_samples,
+                               use_cached_predictions=use_cached_predictions,
+                               max_levels=max_levels,
+                               max_nodes=max_nodes,
+                               root_node_id=root_node_id,
+                               metric=metric)
     is_model_analyzer = hasattr(analyzer, MODEL)
     indexes = []
     for feature in features:
@@ -169,7 +280,8 @@ def compute_error_tree_on_dataset(
     if not is_spark(dataset):
         booster, dataset_indexed_df, cat_info = get_surrogate_booster_local(
             dataset, analyzer, is_model_analyzer, indexes,
-            dataset_sub_names, max_depth, num_leaves, min_child_samples)
+            dataset_sub_names, max_depth, num_leaves, min_child_samples,
+            use_cached_predictions=use_cached_predictions)
         cat_ind_reindexed, categories_reindexed = cat_info
     else:
         booster, dataset_indexed_df = get_surrogate_booster_pyspark(
@@ -187,8 +299,13 @@ def compute_error_tree_on_dataset(
                      cat_ind_reindexed),
                     [],
                     dataset_sub_names,
-                    metric=analyzer.metric,
-                    classes=analyzer.classes)
+                    metric=metric,
+                    classes=analyzer.classes,
+                    max_levels=max_levels,
+                    max_nodes=max_nodes,
+                    root_node_id=root_node_id,
+                    weight=weight,
+                    random_state=random_state)
     return tree
 
 
@@ -270,13 +387,15 @@ def compute_error_tree(analyzer,
         filtered_df,
         max_depth=max_depth,
         num_leaves=num_leaves,
-        min_child_samples=min_child_samples
+        min_child_samples=min_child_samples,
+        use_cached_predictions=True
     )
 
 
 def get_surrogate_booster_local(filtered_df, analyzer, is_model_analyzer,
                                 indexes, dataset_sub_names, max_depth,
-                                num_leaves, min_child_samples):
+                                num_leaves, min_child_samples,
+                                use_cached_predictions=False):
     """Get surrogate booster for local pandas DataFrame.
 
     Creates the surrogate model trained on errors and returns the booster.
@@ -303,6 +422,12 @@ def get_surrogate_booster_local(filtered_df, analyzer, is_model_analyzer,
     :param min_child_samples: The minimal number of data required to
         create one leaf.
     :type min_child_samples: int
+    :param use_cached_predictions: If True, the rows are rows of the
+        analyzer's dataset, so the predictions are looked up from the
+        analyzer's cached predictions and the features from its feature
+        store using the 'index' column.  Otherwise the model is called on
+        the features of the filtered DataFrame.
+    :type use_cached_predictions: bool
     :return: The extracted booster from the surrogate model and the
         scored dataset.
     :rtype: (Booster, pandas.DataFrame, (list[str], list[int]))
@@ -312,14 +437,20 @@ def get_surrogate_booster_local(filtered_df, analyzer, is_model_analyzer,
     if not is_model_analyzer:
         pred_y = filtered_df[PRED_Y]
         dropped_cols.append(PRED_Y)
-    input_data = filtered_df.drop(columns=dropped_cols)
     is_pandas = isinstance(analyzer.dataset, pd.DataFrame)
     if is_pandas:
         true_y = true_y.to_numpy()
-    else:
-        input_data = input_data.to_numpy(copy=True)
+    row_index = filtered_df[ROW_INDEX].to_numpy()
+    input_data = None
+    if not use_cached_predictions:
+        input_data = filtered_df.drop(columns=dropped_cols)
+        if not is_pandas:
+            input_data = input_data.to_numpy()
     if is_model_analyzer:
-        pred_y = analyzer.model.predict(input_data)
+        if use_cached_predictions:
+            pred_y = analyzer.prediction_cache.predict(row_index)
+        else:
+            pred_y = analyzer.model.predict(input_data)
     if analyzer.model_task == ModelTask.CLASSIFICATION:
         diff = pred_y != true_y
     elif analyzer.model_task == ModelTask.OBJECT_DETECTION:
@@ -356,41 +487,40 @@ def get_surrogate_booster_local(filtered_df, analyzer, is_model_analyzer,
             true_y = np.array(true_y)
         except ValueError:
             true_y = np.array(true_y, dtype=OBJECT)
-    if is_pandas:
-        input_data = input_data.to_numpy(copy=True)
 
-    if analyzer.categorical_features:
-        # Inplace replacement of columns
-        if len(input_data) != len(analyzer.string_indexed_data):
-            _, _, _, string_indexed_data = \
-                process_categoricals(
-                    all_feature_names=analyzer._feature_names,
-                    categorical_features=analyzer._categorical_features,
-                    dataset=input_data)
-        else:
-            string_indexed_data = analyzer.string_indexed_data
-        for idx, c_i in enumerate(analyzer.categorical_indexes):
-            input_data[:, c_i] = string_indexed_data[:, idx]
-    dataset_sub_features = input_data[:, indexes]
+    diff = get_valid_diff(diff)
 
     categorical_info = get_categorical_info(analyzer,
                                             dataset_sub_names)
     cat_ind_reindexed, categories_reindexed = categorical_info
 
-    surrogate = create_surrogate_model(analyzer,
-                                       dataset_sub_features,
-                                       diff,
-                                       max_depth,
-                                       num_leaves,
-                                       min_child_samples,
-                                       cat_ind_reindexed)
+    if use_cached_predictions:
+        # the rows are rows of the analyzer's dataset, so gather their
+        # typed features, with the codes of the categorical features
+        # from the encoder fitted on the full dataset
+        dataset_sub_features = analyzer.feature_store.get_encoded_matrix(
+            indexes, row_index)
+        # reuse the binned features and the trees already trained on
+        # the same rows, features and errors
+        booster = analyzer.surrogate_cache.get_booster(
+            analyzer.model_task, get_rows_key(row_index), indexes,
+            dataset_sub_features, diff, cat_ind_reindexed, max_depth,
+            num_leaves, min_child_samples)
+    else:
+        # the feature values may differ from the analyzer's dataset,
+        # so they are read from the DataFrame and the tree is not cached
+        dataset_sub_features = encode_features(
+            input_data, indexes, analyzer.categorical_encoder)
+        booster = create_surrogate_model(
+            analyzer, dataset_sub_features, diff, max_depth, num_leaves,
+            min_child_samples, cat_ind_reindexed).booster_
 
     filtered_indexed_df = pd.DataFrame(dataset_sub_features,
                                        columns=dataset_sub_names)
     filtered_indexed_df[DIFF] = diff
     filtered_indexed_df[TRUE_Y] = true_y
     filtered_indexed_df[PRED_Y] = pred_y
-    return surrogate._Booster, filtered_indexed_df, categorical_info
+    return booster, filtered_indexed_df, categorical_info
 
 
 def get_surrogate_booster_pyspark(filtered_df, analyzer, max_depth,
@@ -529,20 +659,33 @@ def create_surrogate_model(analyzer,
     except ValueError as ve:
         # throw user exception for bad model prediction output
         if "y should be a 1d array, got an array of shape" in str(ve):
-            diff_shape = diff.shape
-            invalid_shape = len(diff_shape) > 2
-            invalid_2d_dims = len(diff_shape) == 2 and diff_shape[1] != 1
-            if invalid_shape or invalid_2d_dims:
-                raise UserConfigValidationException(
-                    "The surrogate model could not be trained. " +
-                    "The shape of the diff array is invalid: {}. ".format(
-                        diff_shape) +
-                    "Please check the prediction function of the model.")
+            get_valid_diff(diff)
         # re-raise any unknown system error
         raise ve
     return surrogate
 
 
+def get_valid_diff(diff):
+    """Validates the shape of the errors the surrogate model is trained on.
+
+    :param diff: The difference between the true and predicted labels column.
+    :type diff: numpy.ndarray
+    :return: The difference as a 1d array.
+    :rtype: numpy.ndarray
+    """
+    diff_shape = diff.shape
+    invalid_shape = len(diff_shape) > 2
+    invalid_2d_dims = len(diff_shape) == 2 and diff_shape[1] != 1
+    if invalid_shape or invalid_2d_dims:
+        # throw user exception for bad model prediction output
+        raise UserConfigValidationException(
+            "The surrogate model could not be trained. " +
+            "The shape of the diff array is invalid: {}. ".format(
+                diff_shape) +
+            "Please check the prediction function of the model.")
+    return diff.ravel()
+
+
 def get_categorical_info(analyzer, dataset_sub_names):
     """Returns the categorical information for the given feature names.
 
@@ -593,7 +736,12 @@ def traverse(df,
              parent=None,
              side=TreeSide.UNKNOWN,
              metric=None,
-             classes=None):
+             classes=None,
+             max_levels=None,
+             max_nodes=None,
+             root_node_id=None,
+             weight=None,
+             random_state=None):
     """Traverses the current node in the tree to create a list of nodes.
 
     :param df: The DataFrame containing the features and labels.
@@ -616,15 +764,36 @@ def traverse(df,
     :type metric: str
     :param classes: The list of classes for the current node.
     :type classes: list[str]
+    :param max_levels: The maximum number of levels of nodes to return.
+    :type max_levels: int
+    :param max_nodes: The maximum number of nodes to return.
+    :type max_nodes: int
+    :param root_node_id: The id of the node whose descendants are
+        returned, or None to return the tree from the root.
+    :type root_node_id: int
+    :param weight: The number of rows of the cohort each row of the
+        DataFrame stands for if it is a sample, otherwise None.
+    :type weight: float
+    :param random_state: The seed used to split the sample into random
+        groups.
+    :type random_state: int
     :return: The tree representation as a list of nodes.
     :rtype: list[dict[str, str]]
     """
-    if SPLIT_INDEX in tree:
-        nodeid = tree[SPLIT_INDEX]
-    elif LEAF_INDEX in tree:
-        nodeid = max_split_index + tree[LEAF_INDEX]
-    else:
-        nodeid = 0
+    if parent is None and not is_spark(df):
+        return traverse_local(df, tree, max_split_index, categories, dict,
+                              feature_names, metric=metric, classes=classes,
+                              max_levels=max_levels, max_nodes=max_nodes,
+                              root_node_id=root_node_id, weight=weight,
+                              random_state=random_state)
+    if parent is None and is_pruned_tree(max_levels, max_nodes,
+                                         root_node_id):
+        dict = traverse(df, tree, max_split_index, categories, dict,
+                        feature_names, parent=None, side=side,
+                        metric=metric, classes=classes)
+        return prune_json_tree(dict, max_levels, max_nodes, root_node_id)
+
+    nodeid = get_node_id(tree, max_split_index)
 
     # reduce DataFrame to just features split on at each step for perf
     if not is_spark(df):
@@ -650,6 +819,440 @@ def traverse(df,
     return dict
 
 
+def traverse_local(df,
+                   tree,
+                   max_split_index,
+                   categories,
+                   json,
+                   feature_names,
+                   metric=None,
+                   classes=None,
+                   max_levels=None,
+                   max_nodes=None,
+                   root_node_id=None,
+                   weight=None,
+                   random_state=None):
+    """Traverses the tree over numpy arrays to create a list of nodes.
+
+    Instead of filtering the DataFrame at every node, the positional
+    indexes of the rows are partitioned at each split, so no DataFrame
+    is copied.  The rows are then labeled with the leaf they fall into
+    and the size and error of every node are aggregated bottom-up from
+    the leaves with np.bincount.  When the tree is pruned, the metrics
+    and the JSON nodes are only computed for the selected nodes.  When
+    the DataFrame is a sample of the cohort, the counts of the nodes are
+    estimated for the cohort and the confidence interval of the metric
+    value of each node is added.
+
+    :param df: The DataFrame containing the features and labels.
+    :type df: pandas.DataFrame
+    :param tree: The root node of the tree to traverse.
+    :type tree: dict
+    :param max_split_index: The max split index for the tree.
+    :type max_split_index: int
+    :param categories: The list of categorical features and categories.
+    :type categories: list[tuple]
+    :param json: The list to store the nodes in.
+    :type json: list
+    :param feature_names: The list of feature names.
+    :type feature_names: list[str]
+    :param metric: The metric to use for the nodes.
+    :type metric: str
+    :param classes: The list of classes.
+    :type classes: list[str]
+    :param max_levels: The maximum number of levels of nodes to return.
+    :type max_levels: int
+    :param max_nodes: The maximum number of nodes to return.
+    :type max_nodes: int
+    :param root_node_id: The id of the node whose descendants are
+        returned, or None to return the tree from the root.
+    :type root_node_id: int
+    :param weight: The number of rows of the cohort each row of the
+        DataFrame stands for if it is a sample, otherwise None.
+    :type weight: float
+    :param random_state: The seed used to split the sample into random
+        groups.
+    :type random_state: int
+    :return: The tree representation as a list of nodes.
+    :rtype: list[dict[str, str]]
+    """
+    total = df.shape[0]
+    diff = df[DIFF].to_numpy()
+    true_y = df[TRUE_Y].to_numpy()
+    pred_y = df[PRED_Y].to_numpy()
+    labels = None
+    use_statistics = metric == Metrics.ERROR_RATE
+    if metric in TREE_STATISTICS_METRICS:
+        use_statistics = True
+        if metric not in regression_metrics:
+            labels = get_ordered_classes(classes, true_y, pred_y)
+            # the binary metrics are not defined for multiclass data
+            use_statistics = metric not in BINARY_METRICS or \
+                len(get_ordered_classes(None, true_y, pred_y)) <= 2
+    column_values = {}
+
+    # partition the row indexes depth first, recording the position of
+    # the parent of each node and the leaf each row belongs to
+    nodes = []
+    leaf_positions = np.zeros(total, dtype=np.int64)
+    stack = [(tree, None, TreeSide.UNKNOWN, None, np.arange(total))]
+    while stack:
+        node, parent, side, parent_position, rows = stack.pop()
+        position = len(nodes)
+        nodes.append((node, parent, side, parent_position,
+                      None if use_statistics else rows))
+        if LEAF_VALUE in node:
+            leaf_positions[rows] = position
+            continue
+        split_name = feature_names[node[SPLIT_FEATURE]]
+        if split_name not in column_values:
+            column_values[split_name] = df[split_name].to_numpy()
+        left_mask = get_split_mask(column_values[split_name][rows],
+                                   split_name, node)
+        stack.append((node[TreeSide.RIGHT_CHILD], node,
+                      TreeSide.RIGHT_CHILD, position, rows[~left_mask]))
+        stack.append((node[TreeSide.LEFT_CHILD], node,
+                      TreeSide.LEFT_CHILD, position, rows[left_mask]))
+
+    num_nodes = len(nodes)
+    sizes, get_node_metrics = compute_node_metrics(
+        nodes, leaf_positions, true_y, pred_y, diff, metric, classes,
+        labels, use_statistics)
+    replicate_metrics = []
+    if weight is not None:
+        # estimate the variance of the metrics of the sampled nodes from
+        # random groups of the sample
+        replicates = get_replicates(total, random_state)
+        replicate_metrics = [
+            compute_node_metrics(nodes, leaf_positions, true_y, pred_y, diff,
+                                 metric, classes, labels, use_statistics,
+                                 row_mask=replicates == replicate)
+            for replicate in range(NUM_REPLICATES)]
+
+    is_pruned = is_pruned_tree(max_levels, max_nodes, root_node_id)
+    positions = range(num_nodes)
+    if is_pruned:
+        root_position = None
+        if root_node_id is not None:
+            node_ids = [get_node_id(node[0], max_split_index)
+                        for node in nodes]
+            root_position = get_node_position(node_ids, root_node_id)
+        positions, hidden_positions = select_tree_nodes(
+            [node[3] for node in nodes],
+            lambda position: get_node_metrics(position)[2],
+            max_levels=max_levels,
+            max_nodes=max_nodes,
+            root_position=root_position)
+    for position in positions:
+        node, parent, side, _, _ = nodes[position]
+        metric_value, success, error = get_node_metrics(position)
+        node_size = sizes[position]
+        if weight is not None:
+            # estimate the counts of the node in the whole cohort
+            node_size = scale_count(node_size, weight)
+            success = scale_count(success, weight)
+            if metric in regression_metrics:
+                error = error * weight
+            else:
+                error = scale_count(error, weight)
+        nodeid = get_node_id(node, max_split_index)
+        json_node = create_json_node(node, nodeid, categories,
+                                     feature_names, metric, node_size,
+                                     success, error, metric_value,
+                                     parent=parent, side=side)
+        if is_pruned:
+            json_node[TreeNode.HAS_HIDDEN_CHILDREN] = \
+                position in hidden_positions
+        if weight is not None:
+            replicate_values = [
+                get_replicate_metrics(position)[0]
+                if replicate_sizes[position] > 0 else np.nan
+                for replicate_sizes, get_replicate_metrics in
+                replicate_metrics]
+            lower, upper = compute_confidence_bounds(metric_value,
+                                                     replicate_values)
+            json_node[ApproximateKeys.IS_APPROXIMATE] = True
+            json_node[ApproximateKeys.METRIC_VALUE_LOWER] = lower
+            json_node[ApproximateKeys.METRIC_VALUE_UPPER] = upper
+        json.append(json_node)
+    return json
+
+
+def compute_node_metrics(nodes, leaf_positions, true_y, pred_y, diff,
+                         metric, classes, labels, use_statistics,
+                         row_mask=None):
+    """Compute the size and metrics of the nodes of the tree.
+
+    The size and error of every node are aggregated bottom-up from the
+    leaves with np.bincount.  The metrics which cannot be aggregated are
+    computed on the rows of the node when requested.
+
+    :param nodes: The nodes of the tree in depth first order, with the
+        position of their parent and their rows if the metric cannot be
+        aggregated.
+    :type nodes: list[tuple]
+    :param leaf_positions: The position of the leaf of each row.
+    :type leaf_positions: numpy.ndarray
+    :param true_y: The true values.
+    :type true_y: numpy.ndarray
+    :param pred_y: The predicted values.
+    :type pred_y: numpy.ndarray
+    :param diff: The difference between the predicted and true values.
+    :type diff: numpy.ndarray
+    :param metric: The metric to compute.
+    :type metric: str
+    :param classes: The list of classes.
+    :type classes: list[str]
+    :param labels: The ordered labels of the classification metrics.
+    :type labels: list
+    :param use_statistics: Whether the metric is aggregated from the
+        statistics of the leaves.
+    :type use_statistics: bool
+    :param row_mask: The mask of the rows to compute the metrics on, or
+        None for all the rows.
+    :type row_mask: numpy.ndarray
+    :return: The size of each node and the function returning the metric
+        value, success and error of a node given its position.
+    :rtype: tuple[numpy.ndarray, function]
+    """
+    row_leaf_positions = leaf_positions
+    row_true_y = true_y
+    row_pred_y = pred_y
+    row_diff = diff
+    if row_mask is not None:
+        row_leaf_positions = leaf_positions[row_mask]
+        row_true_y = true_y[row_mask]
+        row_pred_y = pred_y[row_mask]
+        row_diff = diff[row_mask]
+
+    # aggregate the leaf statistics bottom-up, the reversed depth first
+    # order visits all descendants of a node before the node itself
+    num_nodes = len(nodes)
+    sizes = np.bincount(row_leaf_positions, minlength=num_nodes)
+    statistics = None
+    errors = None
+    if metric == Metrics.ERROR_RATE:
+        errors = np.bincount(row_leaf_positions, weights=row_diff,
+                             minlength=num_nodes)
+    elif use_statistics:
+        statistics = compute_metric_statistics(row_leaf_positions, num_nodes,
+                                               row_true_y, row_pred_y, metric,
+                                               labels=labels)
+    for position in range(num_nodes - 1, 0, -1):
+        parent_position = nodes[position][3]
+        sizes[parent_position] += sizes[position]
+        if errors is not None:
+            errors[parent_position] += errors[position]
+        if statistics is not None:
+            statistics.add_group(parent_position, position)
+    if statistics is not None:
+        metric_values, successes, errors = compute_metrics_from_statistics(
+            statistics, metric, classes)
+
+    node_metrics = {}
+
+    def get_node_metrics(position):
+        if position in node_metrics:
+            return node_metrics[position]
+        node_size = sizes[position]
+        if metric == Metrics.ERROR_RATE:
+            metric_value, success, error = compute_error_rate_from_sum(
+                node_size, errors[position])
+        elif statistics is not None:
+            metric_value = 0
+            success = 0
+            error = 0
+            if node_size != 0:
+                metric_value = metric_values[position]
+                success = successes[position]
+                error = errors[position]
+        else:
+            rows = nodes[position][4]
+            if row_mask is not None:
+                rows = rows[row_mask[rows]]
+            metric_value, success, error = compute_metrics_on_arrays(
+                true_y[rows], pred_y[rows], diff[rows], metric,
+                node_size, classes)
+        node_metrics[position] = (metric_value, success, error)
+        return node_metrics[position]
+
+    return sizes, get_node_metrics
+
+
+def is_pruned_tree(max_levels, max_nodes, root_node_id):
+    """Check whether only some of the nodes of the tree are returned.
+
+    :param max_levels: The maximum number of levels of nodes to return.
+    :type max_levels: int
+    :param max_nodes: The maximum number of nodes to return.
+    :type max_nodes: int
+    :param root_node_id: The id of the node whose descendants are
+        returned, or None to return the tree from the root.
+    :type root_node_id: int
+    :return: True if the tree is pruned.
+    :rtype: bool
+    """
+    return (max_levels is not None or max_nodes is not None or
+            root_node_id is not None)
+
+
+def get_node_position(node_ids, node_id):
+    """Get the position of the node with the given id.
+
+    :param node_ids: The id of each node of the tree.
+    :type node_ids: list[int]
+    :param node_id: The id of the node to find.
+    :type node_id: int
+    :return: The position of the node.
+    :rtype: int
+    """
+    try:
+        return node_ids.index(int(node_id))
+    except (TypeError, ValueError):
+        raise UserConfigValidationException(
+            'Node {} not found in the tree. Existing nodes: {}'.format(
+                node_id, sorted(node_ids)))
+
+
+def select_tree_nodes(parent_positions, get_error, max_levels=None,
+                      max_nodes=None, root_position=None):
+    """Select the nodes of the tree to return.
+
+    The nodes are selected best first from the root, or from the
+    children of the expanded node, taking the node with the most error
+    among the children of the nodes already selected, so that the
+    selected nodes stay connected to the root.
+
+    :param parent_positions: The position of the parent of each node,
+        with the nodes in depth first order and None for the root.
+    :type parent_positions: list[int]
+    :param get_error: The function returning the error of a node
+        given its position.
+    :type get_error: function
+    :param max_levels: The maximum number of levels of nodes to select.
+    :type max_levels: int
+    :param max_nodes: The maximum number of nodes to select.
+    :type max_nodes: int
+    :param root_position: The position of the node whose descendants
+        are selected, or None to select the nodes from the root.
+    :type root_position: int
+    :return: The sorted positions of the selected nodes and the set of
+        the positions of the selected nodes with unselected children.
+    :rtype: tuple[list[int], set[int]]
+    """
+    children = [[] for _ in parent_positions]
+    for position, parent_position in enumerate(parent_positions):
+        if parent_position is not None:
+            children[parent_position].append(position)
+
+    def get_priority(position):
+        # ties and unbounded selections follow the depth first order
+        if max_nodes is None:
+            return (0, position)
+        return (-get_error(position), position)
+
+    if root_position is None:
+        candidates = [0] if parent_positions else []
+    else:
+        candidates = children[root_position]
+    heap = [(get_priority(position), 1) for position in candidates]
+    heapq.heapify(heap)
+    selected = set()
+    while heap and (max_nodes is None or len(selected) < max_nodes):
+        (_, position), level = heapq.heappop(heap)
+        selected.add(position)
+        if max_levels is None or level < max_levels:
+            for child in children[position]:
+                heapq.heappush(heap, (get_priority(child), level + 1))
+    hidden_positions = {
+        position for position in selected
+        if any(child not in selected for child in children[position])}
+    return sorted(selected), hidden_positions
+
+
+def prune_json_tree(json, max_levels, max_nodes, root_node_id):
+    """Prune the list of nodes of the tree.
+
+    :param json: The tree representation as a list of nodes, in depth
+        first order.
+    :type json: list[dict[str, str]]
+    :param max_levels: The maximum number of levels of nodes to return.
+    :type max_levels: int
+    :param max_nodes: The maximum number of nodes to return.
+    :type max_nodes: int
+    :param root_node_id: The id of the node whose descendants are
+        returned, or None to return the tree from the root.
+    :type root_node_id: int
+    :return: The pruned tree representation as a list of nodes.
+    :rtype: list[dict[str, str]]
+    """
+    node_ids = [json_node['id'] for json_node in json]
+    parent_positions = [
+        None if json_node['parentId'] is None
+        else node_ids.index(json_node['parentId'])
+        for json_node in json]
+    root_position = None
+    if root_node_id is not None:
+        root_position = get_node_position(node_ids, root_node_id)
+    positions, hidden_positions = select_tree_nodes(
+        parent_positions,
+        lambda position: json[position]['error'],
+        max_levels=max_levels,
+        max_nodes=max_nodes,
+        root_position=root_position)
+    pruned_json = []
+    for position in positions:
+        json_node = json[position]
+        json_node[TreeNode.HAS_HIDDEN_CHILDREN] = \
+            position in hidden_positions
+        pruned_json.append(json_node)
+    return pruned_json
+
+
+def get_node_id(tree, max_split_index):
+    """Gets the id of the node in the json tree representation.
+
+    :param tree: The node in the tree.
+    :type tree: dict
+    :param max_split_index: The max split index for the tree.
+    :type max_split_index: int
+    :return: The id of the node.
+    :rtype: int
+    """
+    if SPLIT_INDEX in tree:
+        return tree[SPLIT_INDEX]
+    elif LEAF_INDEX in tree:
+        return max_split_index + tree[LEAF_INDEX]
+    return 0
+
+
+def get_split_mask(values, split_name, tree):
+    """Get the mask of the values which go to the left child of the node.
+
+    :param values: The values of the split feature.
+    :type values: numpy.ndarray
+    :param split_name: The name of the split feature.
+    :type split_name: str
+    :param tree: The node in the tree which is split.
+    :type tree: dict
+    :return: The mask of the values which go to the left child.
+    :rtype: numpy.ndarray
+    """
+    threshold = tree['threshold']
+    if tree['decision_type'] == '==':
+        return np.isin(values, create_categorical_arg(threshold))
+    try:
+        return np.asarray(values <= threshold, dtype=bool)
+    except TypeError as e:
+        if len(values) > 0 and isinstance(values[0], str):
+            err = ("Column {0} of type string is incorrectly treated "
+                   "as numeric with threshold value {1}. "
+                   "Please make sure it is marked as categorical instead.")
+            err = err.format(split_name, threshold)
+            raise TypeError(err, e)
+        raise e
+
+
 def filter_to_used_features(df, tree):
     """Filters the DataFrame to only include features used in the tree.
 
@@ -782,61 +1385,17 @@ def node_to_dict(df, tree, nodeid, categories, json,
     :return: The JSON with the node and all children added.
     :rtype: dict
     """
-    p_node_name = None
-    condition = None
-    arg = None
-    method = None
-    parentid = None
     if parent is not None:
-        parentid = int(parent[SPLIT_INDEX])
         p_node_name_val = feature_names[parent[SPLIT_FEATURE]]
-        # use number.Integral to check for any numpy or python number type
-        if isinstance(p_node_name_val, numbers.Integral):
-            # for numeric column names, we can use @df[numeric_colname] syntax
-            p_node_query = "@df[" + str(p_node_name_val) + "]"
-        else:
-            # for string column names, we can just use column name directly
-            # with backticks
-            p_node_query = "`" + str(p_node_name_val) + "`"
-        p_node_name = str(p_node_name_val)
         parent_threshold = parent['threshold']
         parent_decision_type = parent['decision_type']
-        if side == TreeSide.LEFT_CHILD:
-            if parent_decision_type == '<=':
-                method = "less and equal"
-                arg = float(parent_threshold)
-                condition = "{} <= {:.2f}".format(p_node_name,
-                                                  parent_threshold)
-                df = filter_by_threshold(df, p_node_name_val,
-                                         parent_threshold, side)
-            elif parent_decision_type == '==':
-                method = CohortFilterMethods.METHOD_INCLUDES
-                arg = create_categorical_arg(parent_threshold)
-                query, condition = create_categorical_query(method,
-                                                            arg,
-                                                            p_node_name,
-                                                            p_node_query,
-                                                            parent,
-                                                            categories)
-                df = df.query(query)
-        elif side == TreeSide.RIGHT_CHILD:
-            if parent_decision_type == '<=':
-                method = "greater"
-                arg = float(parent_threshold)
-                condition = "{} > {:.2f}".format(p_node_name,
-                                                 parent_threshold)
-                df = filter_by_threshold(df, p_node_name_val,
-                                         parent_threshold, side)
-            elif parent_decision_type == '==':
-                method = CohortFilterMethods.METHOD_EXCLUDES
-                arg = create_categorical_arg(parent_threshold)
-                query, condition = create_categorical_query(method,
-                                                            arg,
-                                                            p_node_name,
-                                                            p_node_query,
-                                                            parent,
-                                                            categories)
-                df = df.query(query)
+        if parent_decision_type == '<=':
+            df = filter_by_threshold(df, p_node_name_val,
+                                     parent_threshold, side)
+        elif parent_decision_type == '==':
+            _, _, _, query = get_split_condition(
+                parent, side, feature_names, categories)
+            df = df.query(query)
     total = df.shape[0]
     if is_spark(df):
         metric_value, success, error = compute_metrics_pyspark(
@@ -844,6 +1403,116 @@ def node_to_dict(df, tree, nodeid, categories, json,
     else:
         metric_value, success, error = compute_metrics_local(
             df, metric, total, classes)
+    json.append(create_json_node(tree, nodeid, categories, feature_names,
+                                 metric, total, success, error,
+                                 metric_value, parent=parent, side=side))
+    return json, df
+
+
+def get_split_condition(parent, side, feature_names, categories):
+    """Get the filter condition of a node from the split of its parent.
+
+    :param parent: The parent node.
+    :type parent: dict
+    :param side: The side of the node from the parent.
+    :type side: TreeSide
+    :param feature_names: The list of feature names.
+    :type feature_names: list[str]
+    :param categories: The list of categories for the current node.
+    :type categories: list[tuple]
+    :return: The filter method, argument, display condition and, for
+        categorical splits, the query selecting the rows of the node.
+    :rtype: tuple(str, float or list[float], str, str)
+    """
+    p_node_name_val = feature_names[parent[SPLIT_FEATURE]]
+    # use number.Integral to check for any numpy or python number type
+    if isinstance(p_node_name_val, numbers.Integral):
+        # for numeric column names, we can use @df[numeric_colname] syntax
+        p_node_query = "@df[" + str(p_node_name_val) + "]"
+    else:
+        # for string column names, we can just use column name directly
+        # with backticks
+        p_node_query = "`" + str(p_node_name_val) + "`"
+    p_node_name = str(p_node_name_val)
+    parent_threshold = parent['threshold']
+    parent_decision_type = parent['decision_type']
+    method = None
+    arg = None
+    condition = None
+    query = None
+    if side == TreeSide.LEFT_CHILD:
+        if parent_decision_type == '<=':
+            method = "less and equal"
+            arg = float(parent_threshold)
+            condition = "{} <= {:.2f}".format(p_node_name,
+                                              parent_threshold)
+        elif parent_decision_type == '==':
+            method = CohortFilterMethods.METHOD_INCLUDES
+            arg = create_categorical_arg(parent_threshold)
+            query, condition = create_categorical_query(method,
+                                                        arg,
+                                                        p_node_name,
+                                                        p_node_query,
+                                                        parent,
+                                                        categories)
+    elif side == TreeSide.RIGHT_CHILD:
+        if parent_decision_type == '<=':
+            method = "greater"
+            arg = float(parent_threshold)
+            condition = "{} > {:.2f}".format(p_node_name,
+                                             parent_threshold)
+        elif parent_decision_type == '==':
+            method = CohortFilterMethods.METHOD_EXCLUDES
+            arg = create_categorical_arg(parent_threshold)
+            query, condition = create_categorical_query(method,
+                                                        arg,
+                                                        p_node_name,
+                                                        p_node_query,
+                                                        parent,
+                                                        categories)
+    return method, arg, condition, query
+
+
+def create_json_node(tree, nodeid, categories, feature_names, metric,
+                     total, success, error, metric_value, parent=None,
+                     side=TreeSide.UNKNOWN):
+    """Creates the dictionary for a node that can be saved as JSON.
+
+    :param tree: The node in the tree.
+    :type tree: dict
+    :param nodeid: The id of the node.
+    :type nodeid: int
+    :param categories: The list of categories for the current node.
+    :type categories: list[tuple]
+    :param feature_names: The list of feature names.
+    :type feature_names: list[str]
+    :param metric: The metric computed on the node.
+    :type metric: str
+    :param total: The total number of instances in the node.
+    :type total: int
+    :param success: The total number of success instances for the node.
+    :type success: int
+    :param error: The error for the node.
+    :type error: int or float
+    :param metric_value: The metric value for the node.
+    :type metric_value: float
+    :param parent: The parent node.
+    :type parent: dict
+    :param side: The side of the current node from the parent, if known.
+    :type side: TreeSide
+    :return: The JSON node.
+    :rtype: dict
+    """
+    p_node_name = None
+    condition = None
+    arg = None
+    method = None
+    parentid = None
+    if parent is not None:
+        parentid = int(parent[SPLIT_INDEX])
+        p_node_name = str(feature_names[parent[SPLIT_FEATURE]])
+        method, arg, condition, _ = get_split_condition(
+            parent, side, feature_names, categories)
     metric_name = metric_to_display_name[metric]
     is_error_metric = metric in error_metrics
     if SPLIT_FEATURE in tree:
@@ -851,12 +1520,11 @@ def node_to_dict(df, tree, nodeid, categories, json,
     else:
         node_name = None
     is_regression_metric = metric in regression_metrics
-    json.append(get_json_node(arg, condition, error, nodeid, method,
-                              node_name, parentid, p_node_name,
-                              total, success, metric_name,
-                              metric_value, is_error_metric,
-                              is_regression_metric))
-    return json, df
+    return get_json_node(arg, condition, error, nodeid, method,
+                         node_name, parentid, p_node_name,
+                         total, success, metric_name,
+                         metric_value, is_error_metric,
+                         is_regression_metric)
 
 
 def filter_by_threshold(df, p_node_name_val, parent_threshold, side):
@@ -923,40 +1591,115 @@ def compute_metrics_local(df, metric, total, classes):
     :return: The metric value and success/error counts.
     :rtype: tuple(float, int, int)
     """
+    return compute_metrics_on_arrays(df[TRUE_Y], df[PRED_Y], df[DIFF].values,
+                                     metric, total, classes)
+
+
+def compute_metrics_on_arrays(true_y, pred_y, diff, metric, total, classes):
+    """Compute the metric value for the given true and predicted values.
+
+    :param true_y: The true values.
+    :type true_y: numpy.ndarray or pandas.Series
+    :param pred_y: The predicted values.
+    :type pred_y: numpy.ndarray or pandas.Series
+    :param diff: The difference between the true and predicted values.
+    :type diff: numpy.ndarray
+    :param metric: The metric to compute.
+    :type metric: str
+    :param total: The total number of rows.
+    :type total: int
+    :param classes: The list of classes.
+    :type classes: list
+    :return: The metric value and success/error counts.
+    :rtype: tuple(float, int, int)
+    """
     success = 0
-    if metric != Metrics.ERROR_RATE and df.shape[0] == 0:
+    if metric != Metrics.ERROR_RATE and len(diff) == 0:
         metric_value = 0
         error = 0
     elif metric == Metrics.MEAN_ABSOLUTE_ERROR:
-        pred_y, true_y, error = get_regression_metric_data(df)
+        error = get_regression_error(true_y, pred_y)
         metric_value = mean_absolute_error(true_y, pred_y)
     elif metric == Metrics.MEAN_SQUARED_ERROR:
-        pred_y, true_y, error = get_regression_metric_data(df)
+        error = get_regression_error(true_y, pred_y)
         metric_value = mean_squared_error(true_y, pred_y)
     elif metric == Metrics.MEDIAN_ABSOLUTE_ERROR:
-        pred_y, true_y, error = get_regression_metric_data(df)
+        error = get_regression_error(true_y, pred_y)
         metric_value = median_absolute_error(true_y, pred_y)
     elif metric == Metrics.R2_SCORE:
-        pred_y, true_y, error = get_regression_metric_data(df)
+        error = get_regression_error(true_y, pred_y)
         metric_value = r2_score(true_y, pred_y)
     elif (metric in precision_metrics or
           metric in recall_metrics or
           metric in f1_metrics or
           metric == Metrics.ACCURACY_SCORE):
-        pred_y, true_y, error = get_classification_metric_data(df)
+        error = diff.sum()
         func = metric_to_func[metric]
         metric_value = compute_metric_value(func, classes, true_y,
                                             pred_y, metric)
         success = total - error
     else:
         func = metric_to_func[metric]
-        diff = df[DIFF]
         metric_value = func(None, None, diff)
         error = metric_value * total
         success = total - error
     return metric_value, success, error
 
 
+def compute_error_rate_from_sum(total, error):
+    """Compute the error rate of a node from the sum of its errors.
+
+    :param total: The total number of rows in the node.
+    :type total: int
+    :param error: The sum of the diff column of the node.
+    :type error: float
+    :return: The metric value and success/error counts.
+    :rtype: tuple(float, int, int)
+    """
+    metric_value = 0
+    if total != 0:
+        metric_value = int(error) / total
+    error = metric_value * total
+    success = total - error
+    return metric_value, success, error
+
+
+def compute_metrics_from_statistics(statistics, metric, classes):
+    """Compute the metric value of each node from its statistics.
+
+    :param statistics: The aggregated statistics of each node.
+    :type statistics: MetricStatistics
+    :param metric: The metric to compute.
+    :type metric: str
+    :param classes: The list of classes.
+    :type classes: list
+    :return: The metric value and success/error counts of each node.
+    :rtype: tuple(numpy.ndarray, numpy.ndarray, numpy.ndarray)
+    """
+    if metric in regression_metrics:
+        metric_values = statistics.get_metric_values(metric)
+        # total abs error at the node
+        errors = statistics.regression_sums[1]
+        successes = np.zeros(len(errors))
+        return metric_values, successes, errors
+    pos_label_indexes = None
+    if metric in BINARY_METRICS:
+        # same positive label as chosen by compute_metric_value
+        pos_label_indexes = np.zeros(len(statistics.counts), dtype=int)
+        for position in range(len(statistics.counts)):
+            ordered_labels = get_ordered_classes(
+                classes, statistics.get_present_labels(position), [])
+            pos_label = 1
+            if len(ordered_labels) == 2:
+                pos_label = ordered_labels[1]
+            pos_label_indexes[position] = \
+                statistics.get_label_index(pos_label)
+    metric_values = statistics.get_metric_values(metric, pos_label_indexes)
+    errors = statistics.get_error_counts()
+    successes = statistics.counts - errors
+    return metric_values, successes, errors
+
+
 def create_empty_node(metric):
     """Create an empty node for the tree.
 
@@ -1046,11 +1789,24 @@ def get_regression_metric_data(df):
     """
     pred_y = df[PRED_Y]
     true_y = df[TRUE_Y]
-    # total abs error at the node
-    error = sum(abs(pred_y - true_y))
+    error = get_regression_error(true_y, pred_y)
     return pred_y, true_y, error
 
 
+def get_regression_error(true_y, pred_y):
+    """Compute the total absolute error of the predicted values.
+
+    :param true_y: True y values.
+    :type true_y: numpy.ndarray or pandas.Series
+    :param pred_y: Predicted y values.
+    :type pred_y: numpy.ndarray or pandas.Series
+    :return: The total absolute error.
+    :rtype: float
+    """
+    # total abs error at the node
+    return np.abs(np.asarray(pred_y) - np.asarray(true_y)).sum()
+
+
 def get_classification_metric_data(df):
     """Compute classification metric data from a DataFrame.
 
@@ -1,8 +1,6 @@
 # Copyright (c) Microsoft Corporation
 # Licensed under the MIT License.
 
-import random
-
 import numpy as np
 
 try:
@@ -13,30 +11,38 @@ except ImportError:
     pass
 
 
-def generate_random_unique_indexes(count, nnz):
-    """Utility to generate a list of random unique indexes in memory.
+def generate_stratified_random_indexes(labels, nnz, random_state=None):
+    """Utility to generate a list of random unique indexes per stratum.
 
-    Uses Knuth's n of k algorithm to generate the list in memory.
+    The number of indexes chosen from each stratum is proportional to
+    its size, so that the proportions of the labels are kept.
 
-    :param count: The range of values to choose from.
-    :type count: int
+    :param labels: The stratum of each index.
+    :type labels: numpy.ndarray
     :param nnz: The number of unique values to choose.
     :type nnz: int
-    :return: The list of unique indexes of length nnz.
+    :param random_state: The seed of the random number generator.
+    :type random_state: int
+    :return: The sorted list of unique indexes of length nnz.
     :rtype: numpy.ndarray
     """
+    count = len(labels)
     if nnz > count:
-        raise Exception("Knuth n-of-k algorithms requires 0 < n < k")
-    indexes = np.zeros(nnz, dtype=int)
-    current = 0
-    i = 0
-    while i < count and current < nnz:
-        probability = (nnz - current) / (count - i)
-        if random.random() < probability:
-            indexes[current] = i
-            current += 1
-        i += 1
-    return indexes
+        raise ValueError("Cannot choose more indexes than there are labels")
+    _, strata = np.unique(labels, return_inverse=True)
+    strata_sizes = np.bincount(strata)
+    # allocate the indexes by largest remainder
+    quotas = strata_sizes * nnz / count
+    strata_nnz = np.floor(quotas).astype(int)
+    remaining = nnz - strata_nnz.sum()
+    strata_nnz[np.argsort(strata_nnz - quotas, kind='stable')[:remaining]] += 1
+    rng = np.random.RandomState(random_state)
+    indexes = [
+        rng.choice(np.flatnonzero(strata == stratum), stratum_nnz,
+                   replace=False)
+        for stratum, stratum_nnz in enumerate(strata_nnz)
+    ]
+    return np.sort(np.concatenate(indexes))
 
 
 def is_spark(df):
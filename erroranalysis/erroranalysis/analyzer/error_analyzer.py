@@ -11,24 +11,31 @@ import pandas as pd
 from sklearn.feature_selection import (mutual_info_classif,
                                        mutual_info_regression)
 
+from erroranalysis._internal.approximation import BackgroundRefiner
+from erroranalysis._internal.bin_cache import BinCache
+from erroranalysis._internal.cohort_filter import create_cohort_filter
 from erroranalysis._internal.constants import (ErrorCorrelationMethods,
                                                MatrixParams, Metrics,
                                                ModelTask, RootKeys,
                                                metric_to_display_name)
+from erroranalysis._internal.feature_store import FeatureStore
 from erroranalysis._internal.matrix_filter import \
     compute_matrix as _compute_matrix
 from erroranalysis._internal.matrix_filter import \
     compute_matrix_on_dataset as _compute_matrix_on_dataset
 from erroranalysis._internal.metrics import metric_to_func
-from erroranalysis._internal.process_categoricals import process_categoricals
+from erroranalysis._internal.prediction_cache import PredictionCache
+from erroranalysis._internal.process_categoricals import CategoricalEncoder
+from erroranalysis._internal.surrogate_cache import SurrogateCache
 from erroranalysis._internal.surrogate_error_tree import \
     compute_error_tree as _compute_error_tree
 from erroranalysis._internal.surrogate_error_tree import \
     compute_error_tree_on_dataset as _compute_error_tree_on_dataset
-from erroranalysis._internal.utils import generate_random_unique_indexes
+from erroranalysis._internal.utils import generate_stratified_random_indexes
 from erroranalysis._internal.version_checker import check_pandas_version
 from erroranalysis.error_correlation_methods import (
-    compute_ebm_global_importance, compute_gbm_global_importance)
+    compute_ebm_global_importance, compute_gbm_global_importance,
+    compute_histogram_mutual_info)
 from erroranalysis.report import ErrorReport
 
 module_logger = logging.getLogger(__name__)
@@ -87,6 +94,11 @@ class BaseAnalyzer(ABC):
     :type metric: str
     :param classes: The class names.
     :type classes: numpy.ndarray or list[]
+    :param copy_dataset: Whether to copy the dataset if it is a pandas
+        DataFrame, so that the analyzer is not affected by changes to
+        it.  Pass False to share the dataset, for example a view which
+        is not modified, without holding another copy in memory.
+    :type copy_dataset: bool
     """
     def __init__(self,
                  dataset,
@@ -95,8 +107,11 @@ class BaseAnalyzer(ABC):
                  categorical_features,
                  model_task,
                  metric,
-                 classes):
-        self._dataset = self._make_pandas_copy(dataset)
+                 classes,
+                 copy_dataset=True):
+        if copy_dataset:
+            dataset = self._make_pandas_copy(dataset)
+        self._dataset = dataset
         self._true_y = true_y
         self._categorical_features = categorical_features
         if isinstance(feature_names, np.ndarray):
@@ -119,13 +134,25 @@ class BaseAnalyzer(ABC):
             if metric is None:
                 metric = Metrics.MEAN_SQUARED_ERROR
         self._metric = metric
+        self._cohort_filter = None
+        self._bin_cache = None
+        self._surrogate_cache = None
+        self._background_refiner = None
+        self._importances_cache = {}
+        self._importances_data_version = None
+        self._categorical_encoder = None
         if self._categorical_features:
-            self._categories, self._categorical_indexes, \
-                self._category_dictionary, self._string_ind_data = \
-                process_categoricals(
-                    all_feature_names=self._feature_names,
-                    categorical_features=self._categorical_features,
-                    dataset=self._dataset)
+            self._categorical_encoder = CategoricalEncoder(
+                all_feature_names=self._feature_names,
+                categorical_features=self._categorical_features,
+                dataset=self._dataset)
+            self._categories = self._categorical_encoder.categories
+            self._categorical_indexes = \
+                self._categorical_encoder.categorical_indexes
+            self._category_dictionary = \
+                self._categorical_encoder.category_dictionary
+        self._feature_store = FeatureStore(self._dataset,
+                                           self._categorical_encoder)
         check_pandas_version(self.feature_names)
 
     @property
@@ -164,6 +191,68 @@ class BaseAnalyzer(ABC):
         """
         return self._categorical_indexes
 
+    @property
+    def cohort_filter(self):
+        """Get the object used to filter the dataset with cohort filters.
+
+        The object is reused across calls so that the masks computed for
+        each filter are cached.  It is recreated if the model or dataset
+        changes.
+
+        :return: The object used to filter the dataset.
+        :rtype: FilterDataWithCohortFilters
+        """
+        model = getattr(self, 'model', None)
+        cohort_filter = self._cohort_filter
+        if cohort_filter is None or cohort_filter.model is not model or \
+                cohort_filter.dataset is not self.dataset:
+            self._cohort_filter = create_cohort_filter(self)
+        return self._cohort_filter
+
+    @property
+    def bin_cache(self):
+        """Get the cache of the heatmap categories of the features.
+
+        The cache is recreated if the dataset changes.
+
+        :return: The cache of the heatmap categories.
+        :rtype: BinCache
+        """
+        if self._bin_cache is None or \
+                self._bin_cache.dataset is not self.dataset:
+            self._bin_cache = BinCache(self.dataset)
+        return self._bin_cache
+
+    @property
+    def surrogate_cache(self):
+        """Get the cache of the surrogate models trained on errors.
+
+        The cache is recreated if the dataset changes.
+
+        :return: The cache of the surrogate models.
+        :rtype: SurrogateCache
+        """
+        if self._surrogate_cache is None or \
+                self._surrogate_cache.dataset is not self.dataset:
+            self._surrogate_cache = SurrogateCache(self.dataset)
+        return self._surrogate_cache
+
+    @property
+    def background_refiner(self):
+        """Get the computations of the exact heatmaps and trees.
+
+        The refiner is recreated if the dataset changes.
+
+        :return: The background computations of the exact views.
+        :rtype: BackgroundRefiner
+        """
+        if self._background_refiner is None or \
+                self._background_refiner.dataset is not self.dataset:
+            if self._background_refiner is not None:
+                self._background_refiner.shutdown()
+            self._background_refiner = BackgroundRefiner(self.dataset)
+        return self._background_refiner
+
     @property
     def classes(self):
         """Get the class names.
@@ -192,6 +281,25 @@ class BaseAnalyzer(ABC):
         """
         return self._feature_names
 
+    @property
+    def categorical_encoder(self):
+        """Get the encoder of the categorical features fitted on the dataset.
+
+        :return: The encoder of the categorical features, or None if
+            there are no categorical features.
+        :rtype: CategoricalEncoder
+        """
+        return self._categorical_encoder
+
+    @property
+    def feature_store(self):
+        """Get the typed columns of the features of the dataset.
+
+        :return: The typed columns of the features.
+        :rtype: FeatureStore
+        """
+        return self._feature_store
+
     @property
     def string_indexed_data(self):
         """Get the string indexed dataset for categorical features.
@@ -199,7 +307,9 @@ class BaseAnalyzer(ABC):
         :return: The string indexed dataset for categorical features.
         :rtype: numpy.ndarray or list[][] or pandas.DataFrame
         """
-        return self._string_ind_data
+        if self._categorical_encoder is None:
+            return None
+        return self._categorical_encoder.get_string_indexed_data()
 
     @property
     def true_y(self):
@@ -283,9 +393,18 @@ class BaseAnalyzer(ABC):
             features,
             dataset,
             quantile_binning=False,
-            num_bins=BIN_THRESHOLD):
+            num_bins=BIN_THRESHOLD,
+            use_cached_predictions=False,
+            sample_size=None,
+            random_state=None,
+            refine=False):
         """Computes the matrix filter (aka heatmap) json.
 
+        For large cohorts, the heatmap can be approximated on a sample
+        of the rows stratified on the error, with a confidence interval
+        for the metric value of each cell, while the exact heatmap is
+        computed in the background.
+
         :param features: One or two feature names to compute the heatmap.
         :type features: list
         :param dataset: The dataset on which matrix view needs to be computed.
@@ -301,6 +420,23 @@ class BaseAnalyzer(ABC):
         :type quantile_binning: bool
         :param num_bins: The number of bins per feature in the heatmap.
         :type num_bins: int
+        :param use_cached_predictions: If True, the rows of the given
+            dataset are unmodified rows of the analyzer's dataset, so the
+            features, and for the ModelAnalyzer the predictions, are
+            looked up from the full dataset using the 'index' column
+            instead of read from the given dataset and computed with
+            the model.
+        :type use_cached_predictions: bool
+        :param sample_size: The maximum number of rows to compute the
+            heatmap on.  Larger cohorts are sampled and the heatmap is
+            approximate.  By default all the rows are used.
+        :type sample_size: int
+        :param random_state: The seed used to sample the rows.
+        :type random_state: int
+        :param refine: If True and the heatmap is approximate, the exact
+            heatmap is computed in the background and returned by the
+            next call without the sample size.
+        :type refine: bool
         :return: The heatmap in json representation.
         :rtype: dict
         """
@@ -309,7 +445,11 @@ class BaseAnalyzer(ABC):
             features,
             dataset,
             quantile_binning,
-            num_bins
+            num_bins,
+            use_cached_predictions=use_cached_predictions,
+            sample_size=sample_size,
+            random_state=random_state,
+            refine=refine
         )
 
     def compute_error_tree(self,
@@ -355,9 +495,23 @@ class BaseAnalyzer(ABC):
             dataset,
             max_depth=None,
             num_leaves=None,
-            min_child_samples=None):
+            min_child_samples=None,
+            use_cached_predictions=False,
+            max_levels=None,
+            max_nodes=None,
+            root_node_id=None,
+            sample_size=None,
+            random_state=None,
+            refine=False):
         """Computes the tree view json.
 
+        The tree can be pruned to its top levels or to the nodes with the
+        most error, and the descendants of a node can be expanded later
+        by passing its id as root_node_id.  For large cohorts, the tree
+        can be approximated on a sample of the rows stratified on the
+        error, with a confidence interval for the metric value of each
+        node, while the exact tree is computed in the background.
+
         :param features: The selected feature names to train the
             surrogate model on.
         :type features: list[str]
@@ -378,6 +532,36 @@ class BaseAnalyzer(ABC):
         :param min_child_samples: The minimal number of data required to
             create one leaf.
         :type min_child_samples: int
+        :param use_cached_predictions: If True, the rows of the given
+            dataset are unmodified rows of the analyzer's dataset, so the
+            features, and for the ModelAnalyzer the predictions, are
+            looked up from the full dataset using the 'index' column
+            instead of read from the given dataset and computed with
+            the model.
+        :type use_cached_predictions: bool
+        :param max_levels: The maximum number of levels of nodes to
+            return.  By default all the levels are returned.
+        :type max_levels: int
+        :param max_nodes: The maximum number of nodes to return, the
+            nodes with the most error first.  By default all the nodes
+            are returned.
+        :type max_nodes: int
+        :param root_node_id: The id of the node to expand.  If given,
+            only the descendants of the node are returned.
+        :type root_node_id: int
+        :param sample_size: The maximum number of rows to train the
+            surrogate model and compute the metrics on.  Larger cohorts
+            are sampled and the tree is approximate.  By default all the
+            rows are used.
+        :type sample_size: int
+        :param random_state: The seed used to sample the rows.  The
+            nodes of an approximate tree can only be expanded with the
+            same seed.
+        :type random_state: int
+        :param refine: If True and the tree is approximate, the exact
+            tree is computed in the background and returned by the next
+            call without the sample size.
+        :type refine: bool
         :return: The tree view in json representation.
         :rtype: dict
         """
@@ -387,7 +571,14 @@ class BaseAnalyzer(ABC):
             dataset,
             max_depth=max_depth,
             num_leaves=num_leaves,
-            min_child_samples=min_child_samples)
+            min_child_samples=min_child_samples,
+            use_cached_predictions=use_cached_predictions,
+            max_levels=max_levels,
+            max_nodes=max_nodes,
+            root_node_id=root_node_id,
+            sample_size=sample_size,
+            random_state=random_state,
+            refine=refine)
 
     def create_error_report(self,
                             filter_features=None,
@@ -443,39 +634,82 @@ class BaseAnalyzer(ABC):
                            importances=importances,
                            root_stats=root_stats)
 
-    def compute_importances(self, error_correlation_method=MUTUAL_INFO):
+    def compute_importances(self, error_correlation_method=MUTUAL_INFO,
+                            max_rows=IMPORTANCES_THRESHOLD,
+                            random_state=None):
         """Compute the importances or correlation between features and error.
 
         Computes the feature importances or the correlation between
         each of the features in the dataset and the error from the label
         and prediction columns.  Uses mutual information, specifically
         uses the scikit-learn methods mutual_info_classif for classification
-        and mutual_info_regression for regression tasks.
+        and mutual_info_regression for regression tasks.  The faster
+        'histogram_mutual_info' method computes the mutual information of
+        the binned features instead.
+
+        The importances are cached, so that they are only computed again
+        if the dataset, labels, model or predictions change.
+
+        :param error_correlation_method: Method to compute error correlation.
+        :type error_correlation_method: str
+        :param max_rows: The maximum number of rows to compute the
+            importances on.  Larger datasets are sampled, stratified on
+            the error, down to this number of rows.
+        :type max_rows: int
+        :param random_state: The seed used to sample the rows.
+        :type random_state: int
+        :return: The computed importances or correlation between the
+            features and error.
+        :rtype: list[float]
+        """
+        data_version = self._get_data_version()
+        if self._importances_data_version is None or any(
+                current is not previous for current, previous in
+                zip(data_version, self._importances_data_version)):
+            self._importances_cache = {}
+            self._importances_data_version = data_version
+        key = (error_correlation_method, self.metric, max_rows, random_state)
+        if key not in self._importances_cache:
+            self._importances_cache[key] = self._compute_importances(
+                error_correlation_method, max_rows, random_state)
+        return list(self._importances_cache[key])
+
+    def _get_data_version(self):
+        """Get the objects that the importances are computed from.
+
+        :return: The dataset, labels, model and predictions.
+        :rtype: tuple
+        """
+        return (self._dataset, self._true_y, getattr(self, '_model', None),
+                getattr(self, '_pred_y', None))
+
+    def _compute_importances(self, error_correlation_method, max_rows,
+                             random_state):
+        """Compute the importances or correlation between features and error.
 
         :param error_correlation_method: Method to compute error correlation.
         :type error_correlation_method: str
+        :param max_rows: The maximum number of rows to compute the
+            importances on.
+        :type max_rows: int
+        :param random_state: The seed used to sample the rows.
+        :type random_state: int
         :return: The computed importances or correlation between the
             features and error.
         :rtype: list[float]
         """
-        input_data = self.dataset
         diff = self.get_diff()
-        if isinstance(self.dataset, pd.DataFrame):
-            input_data = input_data.to_numpy(copy=True)
-        if self.categorical_features:
-            # Inplace replacement of columns
-            indexes = self.categorical_indexes
-            string_ind_data = self.string_indexed_data
-            for idx, c_i in enumerate(indexes):
-                input_data[:, c_i] = string_ind_data[:, idx]
         # for very large number of rows mutual information
         # will be very expensive to compute, hence we sample
-        num_rows = input_data.shape[0]
-        if num_rows > IMPORTANCES_THRESHOLD:
-            indexes = generate_random_unique_indexes(num_rows,
-                                                     IMPORTANCES_THRESHOLD)
-            input_data = input_data[indexes]
-            diff = diff[indexes]
+        num_rows = len(diff)
+        row_indexes = None
+        if max_rows is not None and num_rows > max_rows:
+            diff = np.asarray(diff)
+            row_indexes = generate_stratified_random_indexes(
+                self._get_error_strata(diff), max_rows, random_state)
+            diff = diff[row_indexes]
+        input_data = self.feature_store.get_encoded_matrix(
+            list(range(len(self.feature_names))), row_indexes)
         try:
             importances = self._compute_error_correlation(
                 input_data, diff, error_correlation_method)
@@ -487,6 +721,21 @@ class BaseAnalyzer(ABC):
                 input_data, diff, error_correlation_method)
         return importances
 
+    def _get_error_strata(self, diff):
+        """Get the strata of the error to sample the rows by.
+
+        :param diff: The difference between the label and prediction
+            columns.
+        :type diff: numpy.ndarray
+        :return: The stratum of each row.
+        :rtype: numpy.ndarray
+        """
+        diff = np.asarray(diff)
+        if self._model_task == ModelTask.REGRESSION and diff.dtype != bool:
+            deciles = np.quantile(diff, np.linspace(0, 1, 11)[1:-1])
+            return np.searchsorted(deciles, diff)
+        return diff
+
     def _compute_error_correlation(self, input_data, diff,
                                    error_correlation_method):
         """Compute the correlation between the features and error.
@@ -516,6 +765,10 @@ class BaseAnalyzer(ABC):
             else:
                 return mutual_info_regression(
                     input_data, diff, n_neighbors=n_neighbors).tolist()
+        elif error_correlation_method == \
+                ErrorCorrelationMethods.HISTOGRAM_MUTUAL_INFO:
+            return compute_histogram_mutual_info(
+                input_data, diff, self._model_task, self._categorical_indexes)
         elif error_correlation_method == ErrorCorrelationMethods.EBM:
             return compute_ebm_global_importance(
                 input_data, diff, self._model_task)
@@ -650,6 +903,11 @@ class ModelAnalyzer(BaseAnalyzer):
     :type metric: str
     :param classes: The class names.
     :type classes: numpy.ndarray or list[]
+    :param copy_dataset: Whether to copy the dataset if it is a pandas
+        DataFrame, so that the analyzer is not affected by changes to
+        it.  Pass False to share the dataset, for example a view which
+        is not modified, without holding another copy in memory.
+    :type copy_dataset: bool
     """
     def __init__(self,
                  model,
@@ -659,7 +917,8 @@ class ModelAnalyzer(BaseAnalyzer):
                  categorical_features,
                  model_task=ModelTask.UNKNOWN,
                  metric=None,
-                 classes=None):
+                 classes=None,
+                 copy_dataset=True):
         self._model = model
         if model_task == ModelTask.UNKNOWN:
             # Try to automatically infer the model task
@@ -674,7 +933,9 @@ class ModelAnalyzer(BaseAnalyzer):
                                             categorical_features,
                                             model_task,
                                             metric,
-                                            classes)
+                                            classes,
+                                            copy_dataset)
+        self._prediction_cache = PredictionCache(self._model, self._dataset)
 
     @property
     def model(self):
@@ -690,6 +951,19 @@ class ModelAnalyzer(BaseAnalyzer):
         """
         return self._model
 
+    @property
+    def prediction_cache(self):
+        """Get the cache of the model's predictions on the dataset.
+
+        The cache reports hit and miss counters which can be used to
+        confirm the model is only scored once on the dataset.
+
+        :return: The prediction cache.
+        :rtype: PredictionCache
+        """
+        self._prediction_cache.validate(self._model, self._dataset)
+        return self._prediction_cache
+
     def get_diff(self):
         """Difference between the model's predictions and true y labels.
 
@@ -703,14 +977,14 @@ class ModelAnalyzer(BaseAnalyzer):
         :rtype: numpy.ndarray
         """
         if self._model_task == ModelTask.CLASSIFICATION:
-            return self.model.predict(self.dataset) != self.true_y
+            return self.pred_y != self.true_y
         elif self._model_task == ModelTask.OBJECT_DETECTION:
             if not pytorch_installed:
                 raise ModuleNotFoundError(
                     "User Error: torch & torchvision are not installed "
                     "and are needed for the Object Detection scenario."
                 )
-            pred_y = self.model.predict(self.dataset)
+            pred_y = self.pred_y
             diff = [
                 len(
                     ErrorLabeling(
@@ -723,18 +997,19 @@ class ModelAnalyzer(BaseAnalyzer):
             ]
             return diff
         else:
-            return self.model.predict(self.dataset) - self.true_y
+            return self.pred_y - self.true_y
 
     @property
     def pred_y(self):
         """Get the computed predicted y values.
 
-        Note for ModelAnalyzer these are computed on the fly.
+        Note for ModelAnalyzer these are computed once on first
+        access and then served from the prediction cache.
 
         :return: The computed predicted y values.
         :rtype: numpy.ndarray or list[] or pandas.Series
         """
-        return self.model.predict(self.dataset)
+        return self.prediction_cache.predict()
 
 
 class PredictionsAnalyzer(BaseAnalyzer):
@@ -777,6 +1052,11 @@ class PredictionsAnalyzer(BaseAnalyzer):
     :type metric: str
     :param classes: The class names.
     :type classes: numpy.ndarray or list[]
+    :param copy_dataset: Whether to copy the dataset if it is a pandas
+        DataFrame, so that the analyzer is not affected by changes to
+        it.  Pass False to share the dataset, for example a view which
+        is not modified, without holding another copy in memory.
+    :type copy_dataset: bool
     """
     def __init__(self,
                  pred_y,
@@ -786,7 +1066,8 @@ class PredictionsAnalyzer(BaseAnalyzer):
                  categorical_features,
                  model_task=ModelTask.CLASSIFICATION,
                  metric=None,
-                 classes=None):
+                 classes=None,
+                 copy_dataset=True):
         self._pred_y = pred_y
         if model_task == ModelTask.UNKNOWN:
             raise ValueError(
@@ -797,7 +1078,8 @@ class PredictionsAnalyzer(BaseAnalyzer):
                                                   categorical_features,
                                                   model_task,
                                                   metric,
-                                                  classes)
+                                                  classes,
+                                                  copy_dataset)
 
     @property
     def pred_y(self):
@@ -5,5 +5,7 @@
 
 from .ebm import compute_ebm_global_importance
 from .gbm import compute_gbm_global_importance
+from .histogram_mutual_info import compute_histogram_mutual_info
 
-__all__ = ["compute_ebm_global_importance", "compute_gbm_global_importance"]
+__all__ = ["compute_ebm_global_importance", "compute_gbm_global_importance",
+           "compute_histogram_mutual_info"]
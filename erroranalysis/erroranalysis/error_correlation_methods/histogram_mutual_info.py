@@ -0,0 +1,118 @@
+# Copyright (c) Microsoft Corporation
+# Licensed under the MIT License.
+
+"""Defines the error correlation computation using histogram based
+mutual information."""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from erroranalysis._internal.constants import ModelTask
+
+DEFAULT_NUM_BINS = 32
+
+
+def _bin_values(values, is_categorical, num_bins):
+    """Bin the values of a feature or of the error.
+
+    Categorical values are kept as they are, numeric values are binned
+    by quantiles and missing values are put in a bin of their own.
+
+    :param values: The values to bin.
+    :type values: numpy.ndarray
+    :param is_categorical: Whether the values are categorical codes.
+    :type is_categorical: bool
+    :param num_bins: The maximum number of bins of numeric values.
+    :type num_bins: int
+    :return: The bin of each value and the number of bins.
+    :rtype: tuple[numpy.ndarray, int]
+    """
+    values = np.asarray(values, dtype=float)
+    is_missing = np.isnan(values)
+    present_values = values[~is_missing]
+    if is_categorical or len(present_values) == 0:
+        _, present_bins = np.unique(present_values, return_inverse=True)
+        num_present_bins = present_bins.max() + 1 if len(present_bins) else 0
+    else:
+        quantiles = np.linspace(0, 1, num_bins + 1)[1:-1]
+        edges = np.unique(np.quantile(present_values, quantiles))
+        present_bins = np.searchsorted(edges, present_values, side='right')
+        num_present_bins = len(edges) + 1
+    bins = np.full(len(values), num_present_bins, dtype=np.int64)
+    bins[~is_missing] = present_bins
+    return bins, num_present_bins + int(is_missing.any())
+
+
+def compute_histogram_mutual_info(input_data, diff, model_task,
+                                  categorical_indexes,
+                                  num_bins=DEFAULT_NUM_BINS,
+                                  n_jobs=None):
+    """Compute the mutual information between the binned features and error.
+
+    The features are binned once, in parallel across features, and the
+    joint histograms of all the features and the error are counted in a
+    single vectorized pass, which is much faster than the nearest
+    neighbors estimate of mutual information on large data.
+
+    :param input_data: The input data to compute the mutual information
+        on, with the categorical features string indexed.
+    :type input_data: numpy.ndarray
+    :param diff: The difference between the label and prediction
+        columns.
+    :type diff: numpy.ndarray
+    :param model_task: The model task.
+    :type model_task: str
+    :param categorical_indexes: The indexes of the categorical features.
+    :type categorical_indexes: list[int]
+    :param num_bins: The maximum number of bins of the numeric features
+        and of the regression error.
+    :type num_bins: int
+    :param n_jobs: The number of threads used to bin the features.
+        By default, as many as there are CPUs.
+    :type n_jobs: int
+    :return: The mutual information between each feature and the error.
+    :rtype: list[float]
+    """
+    num_rows, num_features = input_data.shape
+    if num_features == 0:
+        return []
+    is_classification = model_task != ModelTask.REGRESSION
+    error_bins, num_error_bins = _bin_values(
+        np.asarray(diff, dtype=float), is_classification, num_bins)
+
+    categorical_indexes = set(categorical_indexes or [])
+
+    def bin_feature(index):
+        return _bin_values(input_data[:, index],
+                           index in categorical_indexes, num_bins)
+
+    if n_jobs is None:
+        n_jobs = os.cpu_count() or 1
+    n_jobs = max(1, min(n_jobs, num_features))
+    if n_jobs == 1:
+        binned = [bin_feature(index) for index in range(num_features)]
+    else:
+        with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+            binned = list(executor.map(bin_feature, range(num_features)))
+    num_feature_bins = np.array([num_bins for _, num_bins in binned])
+    offsets = np.concatenate(([0], np.cumsum(num_feature_bins)[:-1]))
+
+    # count the joint histograms of every feature and the error at once
+    feature_bins = np.column_stack([bins for bins, _ in binned]) + offsets
+    joint_bins = feature_bins * num_error_bins + error_bins[:, np.newaxis]
+    joint_counts = np.bincount(
+        joint_bins.ravel(),
+        minlength=num_feature_bins.sum() * num_error_bins
+    ).reshape(-1, num_error_bins)
+
+    feature_counts = joint_counts.sum(axis=1, keepdims=True)
+    error_counts = np.bincount(error_bins, minlength=num_error_bins)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        terms = joint_counts * np.log(
+            joint_counts * num_rows / (feature_counts * error_counts))
+    terms[joint_counts == 0] = 0
+    mutual_info = np.add.reduceat(terms.sum(axis=1), offsets) / num_rows
+    # clip the rounding errors of independent features
+    return np.maximum(mutual_info, 0).tolist()
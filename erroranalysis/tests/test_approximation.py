@@ -0,0 +1,173 @@
+# Copyright (c) Microsoft Corporation
+# Licensed under the MIT License.
+
+import copy
+import pickle
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from erroranalysis._internal.approximation import (BackgroundRefiner,
+                                                   compute_confidence_bounds,
+                                                   sample_cohort)
+from erroranalysis._internal.cohort_filter import filter_from_cohort
+from erroranalysis._internal.constants import (ApproximateKeys, Metrics,
+                                               ModelTask, TreeNode)
+from erroranalysis._internal.error_analyzer import PredictionsAnalyzer
+
+NUM_ROWS = 20000
+SAMPLE_SIZE = 4000
+COUNT = 'count'
+FALSE_COUNT = 'falseCount'
+MATRIX = 'matrix'
+
+
+def create_large_analyzer(model_task=ModelTask.CLASSIFICATION):
+    random_state = np.random.RandomState(0)
+    X = pd.DataFrame({
+        'color': random_state.choice(['blue', 'green', 'red'], NUM_ROWS),
+        'size': random_state.normal(size=NUM_ROWS)})
+    if model_task == ModelTask.CLASSIFICATION:
+        y = random_state.randint(0, 2, NUM_ROWS)
+        error_rate = 0.1 + 0.4 * (X['size'].to_numpy() > 1)
+        pred_y = np.where(random_state.rand(NUM_ROWS) < error_rate, 1 - y, y)
+    else:
+        y = random_state.normal(size=NUM_ROWS)
+        pred_y = y + random_state.normal(size=NUM_ROWS) * (
+            1 + (X['color'] == 'red').to_numpy())
+    return PredictionsAnalyzer(pred_y, X, y, list(X.columns), ['color'],
+                               model_task=model_task)
+
+
+class TestApproximation(object):
+
+    def test_sample_cohort(self):
+        analyzer = create_large_analyzer()
+        cohort = filter_from_cohort(analyzer, None, None)
+        sample, weight = sample_cohort(analyzer, cohort, SAMPLE_SIZE,
+                                       random_state=0)
+        assert sample.shape[0] == SAMPLE_SIZE
+        assert weight == NUM_ROWS / SAMPLE_SIZE
+        # the sample keeps the error rate of the cohort
+        diff = analyzer.get_diff()
+        sample_diff = diff[sample['Index'].to_numpy()]
+        assert sample_diff.sum() * weight == pytest.approx(diff.sum(), abs=5)
+
+        same_cohort, weight = sample_cohort(analyzer, cohort, NUM_ROWS)
+        assert same_cohort is cohort
+        assert weight is None
+
+    def test_compute_confidence_bounds(self):
+        lower, upper = compute_confidence_bounds(0.5, [0.4, 0.6, np.nan])
+        assert lower < 0.5 < upper
+        assert 0.5 - lower == pytest.approx(upper - 0.5)
+        assert compute_confidence_bounds(0.5, [0.4, np.nan]) == (None, None)
+
+    def test_approximate_matrix(self):
+        analyzer = create_large_analyzer()
+        cohort = filter_from_cohort(analyzer, None, None)
+        matrix = analyzer.compute_matrix_on_dataset(
+            ['color'], cohort, sample_size=SAMPLE_SIZE, random_state=0)
+        exact_matrix = analyzer.compute_matrix_on_dataset(['color'], cohort)
+        for cell, exact_cell in zip(matrix[MATRIX][0],
+                                    exact_matrix[MATRIX][0]):
+            assert cell[ApproximateKeys.IS_APPROXIMATE]
+            assert ApproximateKeys.IS_APPROXIMATE not in exact_cell
+            assert cell[COUNT] == pytest.approx(exact_cell[COUNT], rel=0.1)
+            error_rate = exact_cell[FALSE_COUNT] / exact_cell[COUNT]
+            assert cell[ApproximateKeys.METRIC_VALUE_LOWER] <= error_rate
+            assert cell[ApproximateKeys.METRIC_VALUE_UPPER] >= error_rate
+        assert sum(cell[COUNT] for cell in matrix[MATRIX][0]) == \
+            pytest.approx(NUM_ROWS, abs=2)
+
+    def test_approximate_error_tree(self):
+        analyzer = create_large_analyzer(ModelTask.REGRESSION)
+        analyzer.update_metric(Metrics.MEAN_SQUARED_ERROR)
+        cohort = filter_from_cohort(analyzer, None, None)
+        tree = analyzer.compute_error_tree_on_dataset(
+            ['color', 'size'], cohort, sample_size=SAMPLE_SIZE,
+            random_state=0)
+        root = tree[0]
+        assert root['size'] == NUM_ROWS
+        assert root[ApproximateKeys.IS_APPROXIMATE]
+        mean_squared_error = np.mean(
+            (analyzer.pred_y - analyzer.true_y) ** 2)
+        assert root[ApproximateKeys.METRIC_VALUE_LOWER] <= \
+            mean_squared_error <= root[ApproximateKeys.METRIC_VALUE_UPPER]
+        for node in tree:
+            lower = node[ApproximateKeys.METRIC_VALUE_LOWER]
+            upper = node[ApproximateKeys.METRIC_VALUE_UPPER]
+            assert lower <= node['metricValue'] <= upper
+
+        # the same seed gives the same tree, so its nodes can be expanded
+        subtree = analyzer.compute_error_tree_on_dataset(
+            ['color', 'size'], cohort, sample_size=SAMPLE_SIZE,
+            random_state=0, root_node_id=root['id'], max_levels=1)
+        children = [node for node in tree if node['parentId'] == root['id']]
+        assert len(subtree) == len(children) == 2
+        for node, child in zip(subtree, children):
+            node.pop(TreeNode.HAS_HIDDEN_CHILDREN)
+            assert node == child
+
+    def test_refine_in_background(self):
+        analyzer = create_large_analyzer()
+        cohort = filter_from_cohort(analyzer, None, None)
+        analyzer.compute_matrix_on_dataset(
+            ['color', 'size'], cohort, sample_size=SAMPLE_SIZE,
+            random_state=0, refine=True)
+        analyzer.compute_error_tree_on_dataset(
+            ['color', 'size'], cohort, sample_size=SAMPLE_SIZE,
+            random_state=0, refine=True)
+        refiner = analyzer.background_refiner
+        assert len(refiner) == 2
+        # the exact views are returned from the background computations
+        matrix = analyzer.compute_matrix_on_dataset(['color', 'size'],
+                                                    cohort)
+        tree = analyzer.compute_error_tree_on_dataset(['color', 'size'],
+                                                      cohort)
+        assert len(refiner) == 0
+        analyzer.update_metric(Metrics.ERROR_RATE)
+        assert matrix == analyzer.compute_matrix_on_dataset(
+            ['color', 'size'], cohort)
+        assert tree == analyzer.compute_error_tree_on_dataset(
+            ['color', 'size'], cohort)
+
+    def test_shutdown_refiner(self):
+        refiner = BackgroundRefiner(None)
+        started = threading.Event()
+        release = threading.Event()
+
+        def compute_view(value):
+            started.set()
+            release.wait(10)
+            return value
+
+        running = refiner.submit('running', compute_view, 1)
+        pending = refiner.submit('pending', compute_view, 2)
+        assert started.wait(10)
+        # the worker never keeps the process from exiting
+        assert refiner._worker.daemon
+        refiner.shutdown()
+        assert len(refiner) == 0
+        assert pending.cancelled()
+        release.set()
+        assert running.result(10) == 1
+
+        # the refiner starts a new worker after being shut down
+        assert refiner.submit('next', compute_view, 3).result(10) == 3
+
+    def test_pickle_refiner(self):
+        refiner = BackgroundRefiner(None, max_results=3)
+        release = threading.Event()
+        refiner.submit('pending', release.wait, 10)
+        # the refiner is pickled and copied without its computations
+        for refiner_copy in [pickle.loads(pickle.dumps(refiner)),
+                             copy.deepcopy(refiner)]:
+            assert len(refiner_copy) == 0
+            assert refiner_copy._max_results == 3
+            assert refiner_copy.submit('next', abs, -1).result(10) == 1
+        assert len(refiner) == 1
+        release.set()
+        refiner.shutdown()
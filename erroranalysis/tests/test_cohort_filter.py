@@ -6,8 +6,10 @@ import pandas as pd
 import pytest
 
 from erroranalysis._internal.cohort_filter import filter_from_cohort
-from erroranalysis._internal.constants import (ARG, COLUMN, METHOD, PRED_Y,
-                                               ROW_INDEX, TRUE_Y, ImageColumns,
+from erroranalysis._internal.constants import (ARG, COLUMN, COMPOSITE_FILTERS,
+                                               METHOD, OPERATION, PRED_Y,
+                                               ROW_INDEX, TRUE_Y,
+                                               CohortFilterOps, ImageColumns,
                                                ModelTask)
 from erroranalysis._internal.error_analyzer import ModelAnalyzer
 from rai_test_utils.datasets.tabular import (create_diabetes_data,
@@ -324,6 +326,74 @@ class TestCohortFilter(object):
                            model_task,
                            filters=filters)
 
+    def test_cohort_filter_composite(self):
+        X_train, X_test, y_train, y_test, feature_names, _ = \
+            create_iris_pandas()
+        petal_length = feature_names[2]
+        composite_filters = [{COMPOSITE_FILTERS:
+                             [{COMPOSITE_FILTERS:
+                              [{ARG: [2.8, 3.2],
+                                COLUMN: SEPAL_WIDTH,
+                                METHOD: CohortFilterMethods.METHOD_RANGE},
+                               {ARG: [4.5],
+                                COLUMN: petal_length,
+                                METHOD: CohortFilterMethods.METHOD_GREATER}],
+                               OPERATION: CohortFilterOps.AND},
+                              {ARG: [2.5],
+                               COLUMN: SEPAL_WIDTH,
+                               METHOD: CohortFilterMethods.METHOD_LESS}],
+                             OPERATION: CohortFilterOps.OR}]
+        validation_data = create_validation_data(X_test, y_test)
+        sepal_width = X_test[SEPAL_WIDTH]
+        in_range = sepal_width.between(2.8, 3.2)
+        validation_filter = (in_range & (X_test[petal_length] > 4.5)) | \
+            (sepal_width < 2.5)
+        validation_data = validation_data.loc[validation_filter]
+        model_task = ModelTask.CLASSIFICATION
+        model = create_sklearn_svm_classifier(X_train, y_train)
+        categorical_features = []
+        run_error_analyzer(validation_data,
+                           model,
+                           X_test,
+                           y_test,
+                           feature_names,
+                           categorical_features,
+                           model_task,
+                           composite_filters=composite_filters)
+
+    @pytest.mark.parametrize('method', [CohortFilterMethods.METHOD_INCLUDES,
+                                        CohortFilterMethods.METHOD_EXCLUDES])
+    def test_cohort_filter_categorical_column_name_with_spaces(self, method):
+        X_train, X_test, y_train, y_test, feature_names, _ = \
+            create_iris_pandas()
+        flower_size = 'flower size'
+        sizes = np.array(['small', 'medium', 'large'])
+        X_train[flower_size] = sizes[np.arange(len(X_train)) % 3]
+        X_test[flower_size] = sizes[np.arange(len(X_test)) % 3]
+        feature_names = feature_names + [flower_size]
+        categorical_features = [flower_size]
+        model = create_sklearn_svm_classifier(
+            X_train.drop(columns=flower_size), y_train)
+        model = DropColumnModel(model, flower_size)
+        # the categories are sorted, so index 0 corresponds to large
+        filters = [{ARG: [0],
+                    COLUMN: flower_size,
+                    METHOD: method}]
+        validation_data = create_validation_data(X_test, y_test)
+        is_large = X_test[flower_size] == 'large'
+        if method == CohortFilterMethods.METHOD_EXCLUDES:
+            is_large = ~is_large
+        validation_data = validation_data.loc[is_large]
+        model_task = ModelTask.CLASSIFICATION
+        run_error_analyzer(validation_data,
+                           model,
+                           X_test,
+                           y_test,
+                           feature_names,
+                           categorical_features,
+                           model_task,
+                           filters=filters)
+
     def test_cohort_filter_regression_error(self):
         X_train, X_test, y_train, y_test, feature_names = \
             create_diabetes_data()
@@ -378,6 +448,20 @@ class TestCohortFilter(object):
                            model_task=model_task)
 
 
+class DropColumnModel(object):
+    """Wraps a model and drops a column before predicting."""
+
+    def __init__(self, model, column):
+        self._model = model
+        self._column = column
+
+    def predict(self, X):
+        return self._model.predict(X.drop(columns=self._column))
+
+    def predict_proba(self, X):
+        return self._model.predict_proba(X.drop(columns=self._column))
+
+
 def create_iris_pandas(use_str_labels=False):
     X_train, X_test, y_train, y_test, feature_names, classes = \
         create_iris_data()
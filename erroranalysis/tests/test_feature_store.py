@@ -0,0 +1,73 @@
+# Copyright (c) Microsoft Corporation
+# Licensed under the MIT License.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from erroranalysis._internal.error_analyzer import PredictionsAnalyzer
+
+NUM_ROWS = 50
+
+
+def create_mixed_data():
+    random_state = np.random.RandomState(0)
+    X = pd.DataFrame({
+        'color': random_state.choice(['blue', 'green', 'red'], NUM_ROWS),
+        'count': random_state.randint(0, 10, NUM_ROWS),
+        'size': random_state.normal(size=NUM_ROWS).astype(np.float32),
+        'weight': pd.array(random_state.randint(0, 5, NUM_ROWS),
+                           dtype='Int64')})
+    X.loc[3, 'color'] = np.nan
+    X.loc[5, 'weight'] = pd.NA
+    y = random_state.randint(0, 2, NUM_ROWS)
+    return X, y
+
+
+class TestFeatureStore(object):
+
+    @pytest.mark.parametrize('is_pandas', [True, False])
+    def test_get_column(self, is_pandas):
+        X, y = create_mixed_data()
+        dataset = X if is_pandas else X.astype(object).to_numpy()
+        analyzer = PredictionsAnalyzer(y, dataset, y, list(X.columns),
+                                       ['color'])
+        feature_store = analyzer.feature_store
+
+        counts = feature_store.get_column(1)
+        assert counts.dtype.kind == 'i'
+        np.testing.assert_array_equal(counts, X['count'].to_numpy())
+        sizes = feature_store.get_column(2)
+        assert sizes.dtype.kind == 'f'
+        if is_pandas:
+            # numeric columns view the dataset without a copy
+            assert sizes.dtype == np.float32
+            assert np.shares_memory(sizes, analyzer.dataset['size'].values)
+        weights = feature_store.get_column(3)
+        assert weights.dtype.kind == 'f'
+        assert np.isnan(weights[5])
+
+        rows = np.array([8, 3, 1])
+        pd.testing.assert_series_equal(
+            pd.Series(feature_store.get_column(0, rows)),
+            pd.Series(X['color'].to_numpy()[rows]))
+
+    @pytest.mark.parametrize('is_pandas', [True, False])
+    def test_get_encoded_matrix(self, is_pandas):
+        X, y = create_mixed_data()
+        dataset = X if is_pandas else X.astype(object).to_numpy()
+        analyzer = PredictionsAnalyzer(y, dataset, y, list(X.columns),
+                                       ['color'])
+
+        rows = np.array([3, 0, 7, 7])
+        matrix = analyzer.feature_store.get_encoded_matrix([2, 0], rows)
+        assert matrix.dtype == float
+        assert matrix.shape == (4, 2)
+        np.testing.assert_allclose(matrix[:, 0],
+                                   X['size'].to_numpy()[rows])
+        expected_codes = analyzer.string_indexed_data[rows, 0]
+        np.testing.assert_array_equal(matrix[:, 1], expected_codes)
+        assert np.isnan(matrix[0, 1])
+
+        full_matrix = analyzer.feature_store.get_encoded_matrix([0, 1])
+        assert full_matrix.shape == (NUM_ROWS, 2)
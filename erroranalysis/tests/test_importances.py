@@ -11,6 +11,9 @@ from sklearn.base import BaseEstimator
 from erroranalysis._internal.constants import (ErrorCorrelationMethods,
                                                ModelTask)
 from erroranalysis._internal.error_analyzer import ModelAnalyzer
+from erroranalysis._internal.utils import generate_stratified_random_indexes
+from erroranalysis.error_correlation_methods import \
+    compute_histogram_mutual_info
 from rai_test_utils.datasets.tabular import (
     create_binary_classification_dataset, create_cancer_data,
     create_housing_data, create_iris_data, create_simple_titanic_data)
@@ -25,6 +28,7 @@ TOL = 1e-10
 NUM_SAMPLE_ROWS = 100
 DEFAULT_SAMPLE_COLS = 20
 MUTUAL_INFO = ErrorCorrelationMethods.MUTUAL_INFO
+HISTOGRAM_MUTUAL_INFO = ErrorCorrelationMethods.HISTOGRAM_MUTUAL_INFO
 EBM = ErrorCorrelationMethods.EBM
 GBM_SHAP = ErrorCorrelationMethods.GBM_SHAP
 GBM_ERROR_SAMPLES_TOL = 6
@@ -33,7 +37,8 @@ GBM_ERROR_SAMPLES_TOL = 6
 class TestImportances(object):
 
     @pytest.mark.parametrize('error_correlation_method',
-                             [MUTUAL_INFO, EBM, GBM_SHAP])
+                             [MUTUAL_INFO, HISTOGRAM_MUTUAL_INFO, EBM,
+                              GBM_SHAP])
     def test_importances_iris(self, error_correlation_method):
         X_train, X_test, y_train, y_test, feature_names, _ = create_iris_data()
 
@@ -45,7 +50,8 @@ class TestImportances(object):
                                categorical_features, error_correlation_method)
 
     @pytest.mark.parametrize('error_correlation_method',
-                             [MUTUAL_INFO, EBM, GBM_SHAP])
+                             [MUTUAL_INFO, HISTOGRAM_MUTUAL_INFO, EBM,
+                              GBM_SHAP])
     def test_importances_cancer(self, error_correlation_method):
         X_train, X_test, y_train, y_test, feature_names, _ = \
             create_cancer_data()
@@ -58,7 +64,8 @@ class TestImportances(object):
                                categorical_features, error_correlation_method)
 
     @pytest.mark.parametrize('error_correlation_method',
-                             [MUTUAL_INFO, EBM, GBM_SHAP])
+                             [MUTUAL_INFO, HISTOGRAM_MUTUAL_INFO, EBM,
+                              GBM_SHAP])
     def test_importances_binary_classification(self,
                                                error_correlation_method):
         X_train, y_train, X_test, y_test, _ = \
@@ -72,7 +79,8 @@ class TestImportances(object):
                                categorical_features, error_correlation_method)
 
     @pytest.mark.parametrize('error_correlation_method',
-                             [MUTUAL_INFO, EBM, GBM_SHAP])
+                             [MUTUAL_INFO, HISTOGRAM_MUTUAL_INFO, EBM,
+                              GBM_SHAP])
     def test_importances_titanic(self, error_correlation_method):
         X_train, X_test, y_train, y_test, numeric, categorical = \
             create_simple_titanic_data()
@@ -83,7 +91,8 @@ class TestImportances(object):
                            categorical_features, error_correlation_method)
 
     @pytest.mark.parametrize('error_correlation_method',
-                             [MUTUAL_INFO, EBM, GBM_SHAP])
+                             [MUTUAL_INFO, HISTOGRAM_MUTUAL_INFO, EBM,
+                              GBM_SHAP])
     def test_importances_housing(self, error_correlation_method):
         X_train, X_test, y_train, y_test, feature_names = \
             create_housing_data()
@@ -95,7 +104,8 @@ class TestImportances(object):
                                categorical_features, error_correlation_method)
 
     @pytest.mark.parametrize('error_correlation_method',
-                             [MUTUAL_INFO, EBM, GBM_SHAP])
+                             [MUTUAL_INFO, HISTOGRAM_MUTUAL_INFO, EBM,
+                              GBM_SHAP])
     def test_large_data_importances(self, error_correlation_method):
         # mutual information can be very costly for large number of rows
         # hence, assert we downsample to compute importances for large data
@@ -124,7 +134,8 @@ class TestImportances(object):
 
     @pytest.mark.parametrize('num_rows', [1, 2, 3, 4])
     @pytest.mark.parametrize('error_correlation_method',
-                             [MUTUAL_INFO, EBM, GBM_SHAP])
+                             [MUTUAL_INFO, HISTOGRAM_MUTUAL_INFO, EBM,
+                              GBM_SHAP])
     def test_small_data_importances(self, num_rows, error_correlation_method):
         # validate we can run on very few rows
         X_train, y_train, X_test, y_test, _ = \
@@ -142,7 +153,8 @@ class TestImportances(object):
 
     @pytest.mark.parametrize('num_rows', [3, 4])
     @pytest.mark.parametrize('nan_correlation_method',
-                             [MUTUAL_INFO, EBM, GBM_SHAP])
+                             [MUTUAL_INFO, HISTOGRAM_MUTUAL_INFO, EBM,
+                              GBM_SHAP])
     def test_nan_data_importances(self, num_rows, nan_correlation_method):
         # validate we can run on very few rows
         X_train, _, X_test, y_test, _ = \
@@ -176,8 +188,51 @@ class TestImportances(object):
                                        categorical_features)
         model_analyzer.compute_importances(nan_correlation_method)
 
+    def test_importances_cached(self):
+        X_train, X_test, y_train, y_test, feature_names, _ = \
+            create_cancer_data()
+        model = create_lightgbm_classifier(X_train, y_train)
+        model_analyzer = ModelAnalyzer(model, X_test, y_test,
+                                       feature_names, [])
+        scores = model_analyzer.compute_importances(MUTUAL_INFO)
+        # the nearest neighbors estimate is noisy, so equal scores
+        # are only returned from the cache
+        assert model_analyzer.compute_importances(MUTUAL_INFO) == scores
+        scores.clear()
+        assert len(model_analyzer.compute_importances(MUTUAL_INFO)) == \
+            len(feature_names)
+
+        # the importances are computed again for other labels
+        model_analyzer._true_y = np.array(y_test)
+        assert len(model_analyzer._importances_cache) == 1
+        model_analyzer.compute_importances(MUTUAL_INFO)
+        assert len(model_analyzer._importances_cache) == 1
+        assert model_analyzer._importances_data_version[1] is \
+            model_analyzer._true_y
+
+    @pytest.mark.parametrize('error_correlation_method',
+                             [MUTUAL_INFO, HISTOGRAM_MUTUAL_INFO])
+    def test_importances_sampled(self, error_correlation_method):
+        X_train, y_train, X_test, y_test, _ = \
+            create_binary_classification_dataset(NUM_SAMPLE_ROWS)
+        feature_names = list(X_train.columns)
+        model = create_sklearn_random_forest_classifier(X_train, y_train)
+        X_test, y_test = replicate_dataset(X_test, y_test)
+        model_analyzer = ModelAnalyzer(model, X_test, y_test,
+                                       feature_names, [])
+        scores = model_analyzer.compute_importances(
+            error_correlation_method, max_rows=1000, random_state=7)
+        assert len(scores) == DEFAULT_SAMPLE_COLS
+        if error_correlation_method == HISTOGRAM_MUTUAL_INFO:
+            other_analyzer = ModelAnalyzer(model, X_test, y_test,
+                                           feature_names, [])
+            assert other_analyzer.compute_importances(
+                error_correlation_method, max_rows=1000,
+                random_state=7) == scores
+
     @pytest.mark.parametrize('error_correlation_method',
-                             [MUTUAL_INFO, EBM, GBM_SHAP])
+                             [MUTUAL_INFO, HISTOGRAM_MUTUAL_INFO, EBM,
+                              GBM_SHAP])
     def test_importances_missings(self, error_correlation_method):
         X_train, X_test, y_train, y_test, feature_names, _ = create_iris_data()
 
@@ -193,6 +248,62 @@ class TestImportances(object):
                            categorical_features, error_correlation_method)
 
 
+class TestHistogramMutualInfo(object):
+
+    @pytest.mark.parametrize('model_task',
+                             [ModelTask.CLASSIFICATION, ModelTask.REGRESSION])
+    def test_histogram_mutual_info(self, model_task):
+        random_state = np.random.RandomState(0)
+        num_rows = 10000
+        diff = random_state.randint(0, 2, num_rows)
+        if model_task == ModelTask.REGRESSION:
+            diff = diff * 10.0
+        input_data = np.column_stack([
+            diff + 5,
+            random_state.randint(0, 4, num_rows),
+            random_state.normal(size=num_rows)
+        ]).astype(float)
+        input_data[:100, 2] = np.nan
+        scores = compute_histogram_mutual_info(
+            input_data, diff, model_task, categorical_indexes=[1], n_jobs=2)
+        # a feature equal to the error has the entropy of the error
+        assert scores[0] == pytest.approx(np.log(2), abs=1e-3)
+        assert scores[1] < 1e-3
+        assert scores[2] < 1e-2
+        assert compute_histogram_mutual_info(
+            input_data, diff, model_task, [1], n_jobs=1) == scores
+
+    def test_histogram_mutual_info_no_errors(self):
+        input_data = np.arange(20, dtype=float).reshape(10, 2)
+        scores = compute_histogram_mutual_info(
+            input_data, np.zeros(10, dtype=bool), ModelTask.CLASSIFICATION,
+            [])
+        assert scores == [0, 0]
+
+
+class TestStratifiedRandomIndexes(object):
+
+    def test_generate_stratified_random_indexes(self):
+        labels = np.array([0] * 900 + [1] * 90 + [2] * 10)
+        indexes = generate_stratified_random_indexes(labels, 100,
+                                                     random_state=3)
+        assert len(indexes) == 100
+        assert len(np.unique(indexes)) == 100
+        assert np.all(np.diff(indexes) > 0)
+        assert np.bincount(labels[indexes]).tolist() == [90, 9, 1]
+        assert np.array_equal(
+            generate_stratified_random_indexes(labels, 100, random_state=3),
+            indexes)
+
+    def test_generate_stratified_random_indexes_remainders(self):
+        labels = np.array([0] * 5 + [1] * 3 + [2] * 2)
+        indexes = generate_stratified_random_indexes(labels, 5)
+        assert len(indexes) == 5
+        assert sorted(np.bincount(labels[indexes], minlength=3)) == [1, 1, 3]
+        with pytest.raises(ValueError):
+            generate_stratified_random_indexes(labels, 11)
+
+
 def run_error_analyzer(model, X_test, y_test, feature_names,
                        categorical_features,
                        error_correlation_method):
@@ -5,6 +5,7 @@ import numpy as np
 import pandas as pd
 import pytest
 
+from erroranalysis._internal.bin_cache import FeatureBins
 from erroranalysis._internal.cohort_filter import filter_from_cohort
 from erroranalysis._internal.constants import (ARG, COLUMN, METHOD, ROW_INDEX,
                                                TRUE_Y, MatrixParams, Metrics,
@@ -356,6 +357,62 @@ class TestMatrixFilter(object):
         binned_data = bin_data(df, feat1, 2)
         assert binned_data.cat.categories[1].right == max_val
 
+    @pytest.mark.parametrize('quantile_binning', [True, False])
+    def test_feature_bins_codes(self, quantile_binning):
+        X_train, X_test, y_train, y_test, feature_names = \
+            create_diabetes_data()
+        for idx, feature in enumerate(feature_names):
+            df = pd.DataFrame({feature: X_test[:, idx]})
+            binned_data = bin_data(df, feature, 8, quantile_binning)
+            feature_bins = FeatureBins(binned_data.cat.categories)
+            assert feature_bins.edges is not None
+            # codes are consistent with the displayed intervals
+            expected = binned_data.cat.categories.get_indexer(
+                df[feature].to_numpy())
+            assert np.array_equal(feature_bins.get_codes(df[feature]),
+                                  expected)
+
+    def test_matrix_filter_bin_cache(self):
+        X_train, X_test, y_train, y_test, feature_names = \
+            create_diabetes_data()
+        model = create_models_regression(X_train, y_train)[0]
+        analyzer = ModelAnalyzer(model, X_test, y_test, feature_names,
+                                 [], model_task=ModelTask.REGRESSION)
+        filters = [{ARG: [0.0],
+                    COLUMN: feature_names[2],
+                    METHOD: 'less and equal'}]
+        features = feature_names[:2]
+        matrix = analyzer.compute_matrix(features, filters, None)
+        assert analyzer.bin_cache.misses == 2
+        assert analyzer.bin_cache.hits == 0
+        assert matrix == analyzer.compute_matrix(features, filters, None)
+        assert analyzer.bin_cache.hits == 2
+        # bins are computed on the rows of the cohort
+        analyzer.compute_matrix(features, None, None)
+        assert analyzer.bin_cache.misses == 4
+        analyzer.compute_matrix([features[1], None], filters, None)
+        assert analyzer.bin_cache.hits == 3
+
+    def test_matrix_filter_on_modified_dataset(self):
+        X_train, X_test, y_train, y_test, feature_names, _ = \
+            create_cancer_data()
+        model = create_kneighbors_classifier(X_train, y_train)
+        analyzer = ModelAnalyzer(model, X_test, y_test, feature_names, [])
+        dataset = pd.DataFrame(X_test, columns=feature_names)
+        dataset[TRUE_Y] = y_test
+        dataset[ROW_INDEX] = np.arange(len(y_test))
+        features = [feature_names[0], None]
+        matrix = analyzer.compute_matrix_on_dataset(
+            features, dataset, use_cached_predictions=True)
+        assert len(matrix[CATEGORY1][VALUES]) == BIN_THRESHOLD
+
+        # the matrix is computed on the modified feature values instead
+        # of the analyzer's values of the rows
+        dataset[feature_names[0]] = 1.0
+        matrix = analyzer.compute_matrix_on_dataset(features, dataset)
+        assert matrix[CATEGORY1][VALUES] == [1]
+        assert analyzer.bin_cache.misses == 1
+
     def test_matrix_filter_with_invalid_feature_names(self):
         X_train, X_test, y_train, y_test, feature_names = create_housing_data()
 
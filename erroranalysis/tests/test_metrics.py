@@ -10,6 +10,9 @@ from erroranalysis._internal.constants import (
     Metrics, ModelTask, binary_classification_metrics,
     multiclass_classification_metrics, object_detection_metrics,
     regression_metrics)
+from erroranalysis._internal.metric_statistics import (
+    CLASSIFICATION_METRICS, REGRESSION_METRICS, compute_grouped_median,
+    compute_metric_statistics)
 from erroranalysis._internal.metrics import metric_to_func
 
 module_logger = logging.getLogger(__name__)
@@ -88,3 +91,87 @@ class TestMetrics:
         else:
             metric_value = metric_to_func[metric](y_true, y_pred)
         assert isinstance(metric_value, float)
+
+    @pytest.mark.parametrize('metric', sorted(CLASSIFICATION_METRICS))
+    def test_metric_statistics_classification(self, metric):
+        rng = np.random.default_rng(777)
+        y_true = rng.choice(['a', 'b', 'c'], 300)
+        y_pred = np.where(rng.random(300) < 0.7, y_true,
+                          rng.choice(['a', 'b', 'c'], 300))
+        if metric in [Metrics.PRECISION_SCORE, Metrics.RECALL_SCORE,
+                      Metrics.F1_SCORE]:
+            y_true[y_true == 'c'] = 'b'
+            y_pred[y_pred == 'c'] = 'b'
+        labels = sorted(set(y_true) | set(y_pred))
+        group_ids = rng.integers(-1, 4, 300)
+        # one group without any rows
+        group_ids[group_ids == 2] = 1
+        statistics = compute_metric_statistics(group_ids, 5, y_true, y_pred,
+                                               metric, labels=labels)
+        pos_label_index = len(labels) - 1
+        metric_values = statistics.get_metric_values(metric, pos_label_index)
+        for group in range(5):
+            rows = group_ids == group
+            if not rows.any():
+                assert metric_values[group] == 0
+                continue
+            kwargs = {}
+            if len(labels) == 2:
+                kwargs['pos_label'] = labels[pos_label_index]
+            expected = metric_to_func[metric](y_true[rows], y_pred[rows],
+                                              **kwargs)
+            assert np.isclose(metric_values[group], expected)
+        errors = statistics.get_error_counts()
+        assert errors.sum() == (y_true != y_pred)[group_ids >= 0].sum()
+
+    @pytest.mark.parametrize('metric', sorted(REGRESSION_METRICS))
+    def test_metric_statistics_regression(self, metric):
+        rng = np.random.default_rng(777)
+        y_true = rng.normal(size=200) + 100
+        y_pred = y_true + rng.normal(size=200)
+        group_ids = rng.integers(0, 3, 200)
+        # a group with a single row and a group with constant true values
+        group_ids[0] = 3
+        group_ids[1:3] = 4
+        y_true[1:3] = 5
+        statistics = compute_metric_statistics(group_ids, 5, y_true, y_pred,
+                                               metric)
+        # statistics are mergeable across groups
+        statistics.add_group(0, 1)
+        group_ids[group_ids == 1] = 0
+        metric_values = statistics.get_metric_values(metric)
+        for group in [0, 2, 3, 4]:
+            rows = group_ids == group
+            expected = metric_to_func[metric](y_true[rows], y_pred[rows])
+            assert np.isclose(metric_values[group], expected, equal_nan=True)
+
+    @pytest.mark.parametrize('metric', sorted(REGRESSION_METRICS))
+    def test_metric_statistics_merge_chunks(self, metric):
+        rng = np.random.default_rng(777)
+        y_true = rng.normal(size=300) + 100
+        y_pred = y_true + rng.normal(size=300)
+        group_ids = rng.integers(-1, 3, 300)
+        center = y_true.mean()
+        statistics = None
+        for start in range(0, 300, 70):
+            rows = slice(start, start + 70)
+            chunk_statistics = compute_metric_statistics(
+                group_ids[rows], 3, y_true[rows], y_pred[rows], metric,
+                center=center)
+            if statistics is None:
+                statistics = chunk_statistics
+            else:
+                statistics.merge(chunk_statistics)
+        expected = compute_metric_statistics(group_ids, 3, y_true, y_pred,
+                                             metric)
+        assert np.allclose(statistics.get_metric_values(metric),
+                           expected.get_metric_values(metric))
+
+    def test_grouped_median(self):
+        rng = np.random.default_rng(777)
+        values = rng.normal(size=101)
+        group_ids = rng.integers(-1, 3, 101)
+        medians = compute_grouped_median(group_ids, 4, values)
+        for group in range(3):
+            assert medians[group] == np.median(values[group_ids == group])
+        assert medians[3] == 0
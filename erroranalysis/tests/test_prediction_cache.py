@@ -0,0 +1,117 @@
+# Copyright (c) Microsoft Corporation
+# Licensed under the MIT License.
+
+import numpy as np
+
+from erroranalysis._internal.cohort_filter import filter_from_cohort
+from erroranalysis._internal.constants import ModelTask
+from erroranalysis._internal.error_analyzer import ModelAnalyzer
+from rai_test_utils.datasets.tabular import (create_diabetes_data,
+                                             create_iris_data)
+from rai_test_utils.models.sklearn import (
+    create_sklearn_random_forest_classifier,
+    create_sklearn_random_forest_regressor)
+
+
+class CountingModel(object):
+    """Wraps a model and counts the number of predict calls."""
+
+    def __init__(self, model):
+        self._model = model
+        self.predict_calls = 0
+        self.predict_proba_calls = 0
+
+    def predict(self, X):
+        self.predict_calls += 1
+        return self._model.predict(X)
+
+    def predict_proba(self, X):
+        self.predict_proba_calls += 1
+        return self._model.predict_proba(X)
+
+
+class TestPredictionCache(object):
+
+    def test_prediction_cache_classification(self):
+        X_train, X_test, y_train, y_test, feature_names, _ = \
+            create_iris_data()
+        model = CountingModel(
+            create_sklearn_random_forest_classifier(X_train, y_train))
+        analyzer = ModelAnalyzer(model, X_test, y_test, feature_names, [],
+                                 model_task=ModelTask.CLASSIFICATION)
+        expected_pred_y = model._model.predict(X_test)
+        assert np.array_equal(analyzer.pred_y, expected_pred_y)
+        assert np.array_equal(analyzer.get_diff(), expected_pred_y != y_test)
+        analyzer.compute_root_stats()
+        analyzer.compute_importances()
+        assert model.predict_calls == 1
+        cache = analyzer.prediction_cache
+        assert cache.misses == 1
+        assert cache.hits >= 3
+
+        row_indexes = [3, 0, 5]
+        assert np.array_equal(cache.predict(row_indexes),
+                              expected_pred_y[row_indexes])
+        probabilities = cache.predict_proba(row_indexes)
+        assert probabilities.shape == (3, len(np.unique(y_train)))
+        cache.predict_proba()
+        assert model.predict_proba_calls == 1
+        assert model.predict_calls == 1
+
+    def test_prediction_cache_regression(self):
+        X_train, X_test, y_train, y_test, feature_names = \
+            create_diabetes_data()
+        model = CountingModel(
+            create_sklearn_random_forest_regressor(X_train, y_train))
+        analyzer = ModelAnalyzer(model, X_test, y_test, feature_names, [],
+                                 model_task=ModelTask.REGRESSION)
+        report = analyzer.create_error_report(compute_importances=True,
+                                              compute_root_stats=True)
+        assert report is not None
+        analyzer.get_diff()
+        stats = analyzer.prediction_cache.get_stats()
+        assert stats['misses'] == 1
+        assert stats['hits'] >= 2
+
+    def test_prediction_cache_invalidated_on_model_change(self):
+        X_train, X_test, y_train, y_test, feature_names, _ = \
+            create_iris_data()
+        model = CountingModel(
+            create_sklearn_random_forest_classifier(X_train, y_train))
+        analyzer = ModelAnalyzer(model, X_test, y_test, feature_names, [],
+                                 model_task=ModelTask.CLASSIFICATION)
+        analyzer.pred_y
+        new_model = CountingModel(model._model)
+        analyzer._model = new_model
+        analyzer.pred_y
+        analyzer.pred_y
+        assert model.predict_calls == 1
+        assert new_model.predict_calls == 1
+
+    def test_cached_predictions_on_filtered_cohort(self):
+        X_train, X_test, y_train, y_test, feature_names, _ = \
+            create_iris_data()
+        model = CountingModel(
+            create_sklearn_random_forest_classifier(X_train, y_train))
+        analyzer = ModelAnalyzer(model, X_test, y_test, feature_names, [],
+                                 model_task=ModelTask.CLASSIFICATION)
+        filters = [{'arg': [2.8],
+                    'column': feature_names[1],
+                    'method': 'less and equal'}]
+        features = feature_names[:2]
+        analyzer.compute_error_tree(feature_names, filters, None)
+        analyzer.compute_matrix(features, filters, None)
+        assert model.predict_calls == 1
+
+        filtered_df = filter_from_cohort(analyzer, filters, None)
+        cached_tree = analyzer.compute_error_tree_on_dataset(
+            feature_names, filtered_df, use_cached_predictions=True)
+        cached_matrix = analyzer.compute_matrix_on_dataset(
+            features, filtered_df, use_cached_predictions=True)
+        assert model.predict_calls == 1
+        tree = analyzer.compute_error_tree_on_dataset(
+            feature_names, filtered_df)
+        matrix = analyzer.compute_matrix_on_dataset(features, filtered_df)
+        assert model.predict_calls == 3
+        assert cached_tree == tree
+        assert cached_matrix == matrix
@@ -1,6 +1,8 @@
 # Copyright (c) Microsoft Corporation
 # Licensed under the MIT License.
 
+import copy
+import pickle
 import re
 import time
 from enum import Enum
@@ -18,14 +20,15 @@ from erroranalysis._internal.constants import (ARG, COLUMN, COMPOSITE_FILTERS,
                                                SPLIT_FEATURE, SPLIT_INDEX,
                                                TRUE_Y, CohortFilterMethods,
                                                CohortFilterOps, ImageColumns,
-                                               Metrics, ModelTask,
+                                               Metrics, ModelTask, TreeNode,
                                                regression_metrics)
 from erroranalysis._internal.error_analyzer import (ModelAnalyzer,
                                                     PredictionsAnalyzer)
+from erroranalysis._internal.metrics import metric_to_func
 from erroranalysis._internal.surrogate_error_tree import (
     TreeSide, cache_subtree_features, compute_error_tree,
     create_surrogate_model, get_categorical_info, get_max_split_index,
-    traverse)
+    get_surrogate_booster_local, traverse)
 from rai_test_utils.datasets.tabular import (
     create_adult_census_data, create_binary_classification_dataset,
     create_cancer_data, create_diabetes_data, create_iris_data,
@@ -289,6 +292,62 @@ class TestSurrogateErrorTree(object):
                                 max_split_index, feature_names,
                                 filtered_indexed_df)
 
+    @pytest.mark.parametrize('metric', [Metrics.MEAN_SQUARED_ERROR,
+                                        Metrics.MEAN_ABSOLUTE_ERROR,
+                                        Metrics.MEDIAN_ABSOLUTE_ERROR,
+                                        Metrics.R2_SCORE])
+    def test_traverse_tree_regression(self, metric):
+        X_train, X_test, y_train, y_test, feature_names = \
+            create_diabetes_data()
+        X_test = pd.DataFrame(X_test, columns=feature_names)
+        model = create_sklearn_random_forest_regressor(X_train, y_train)
+        error_analyzer = ModelAnalyzer(model, X_test, y_test,
+                                       feature_names, [],
+                                       model_task=ModelTask.REGRESSION,
+                                       metric=metric)
+        pred_y = model.predict(X_test)
+        diff = pred_y - y_test
+        surrogate = create_surrogate_model(error_analyzer,
+                                           X_test,
+                                           diff,
+                                           max_depth=3,
+                                           num_leaves=31,
+                                           min_child_samples=5,
+                                           cat_ind_reindexed=[])
+        model_json = surrogate._Booster.dump_model()
+        tree_structure = model_json["tree_info"][0]['tree_structure']
+        max_split_index = get_max_split_index(tree_structure) + 1
+        filtered_indexed_df = X_test.copy()
+        filtered_indexed_df[DIFF] = diff
+        filtered_indexed_df[TRUE_Y] = y_test
+        filtered_indexed_df[PRED_Y] = pred_y
+        cache_subtree_features(tree_structure, feature_names)
+        tree = traverse(filtered_indexed_df,
+                        tree_structure,
+                        max_split_index,
+                        ([], []),
+                        [],
+                        feature_names,
+                        metric=error_analyzer.metric)
+        tree_dict = {}
+        for entry in tree:
+            tree_dict[entry['id']] = entry
+        validate_traversed_tree(tree_structure, tree_dict,
+                                max_split_index, feature_names,
+                                filtered_indexed_df)
+        root = tree_dict[0]
+        assert root[ERROR] == pytest.approx(np.abs(diff).sum())
+        expected_value = metric_to_func[metric](y_test, pred_y)
+        assert root[TreeNode.METRIC_VALUE] == pytest.approx(expected_value)
+        # the errors of the children add up to the error of the parent
+        for node in tree:
+            children = [child for child in tree
+                        if child[PARENTID] == node[ID]]
+            if children:
+                assert sum(child[SIZE] for child in children) == node[SIZE]
+                assert sum(child[ERROR] for child in children) == \
+                    pytest.approx(node[ERROR])
+
     @pytest.mark.parametrize('analyzer_type', [AnalyzerType.MODEL,
                                                AnalyzerType.PREDICTIONS])
     @pytest.mark.parametrize('metric', [Metrics.ERROR_RATE,
@@ -386,6 +445,236 @@ class TestSurrogateErrorTree(object):
                                AnalyzerType.MODEL,
                                tree_features=['invalid_feature'])
 
+    def test_surrogate_error_tree_categorical_cohort_codes(self):
+        random_state = np.random.RandomState(0)
+        num_rows = 300
+        X_test = pd.DataFrame({
+            'color': random_state.choice(['blue', 'green', 'red'], num_rows),
+            'size': random_state.normal(size=num_rows)})
+        X_test.loc[[3, 7], 'color'] = np.nan
+        y_test = random_state.randint(0, 2, num_rows)
+        pred_y = random_state.randint(0, 2, num_rows)
+        feature_names = list(X_test.columns)
+        analyzer = PredictionsAnalyzer(pred_y, X_test, y_test,
+                                       feature_names, ['color'])
+        codes = analyzer.categorical_encoder.codes
+        assert codes.dtype == np.int32
+        assert codes[3, 0] == -1
+
+        # a cohort without the first category keeps the codes of the
+        # full dataset, which the tree's categories are indexed by
+        rows = np.flatnonzero(X_test['color'].to_numpy() != 'blue')
+        cohort = X_test.iloc[rows].copy()
+        cohort[TRUE_Y] = y_test[rows]
+        cohort[ROW_INDEX] = rows
+        cohort[PRED_Y] = pred_y[rows]
+        _, indexed_df, _ = get_surrogate_booster_local(
+            cohort, analyzer, False, [0, 1], feature_names, 3, 31, 20)
+        expected = analyzer.string_indexed_data[rows, 0]
+        np.testing.assert_array_equal(indexed_df['color'].to_numpy(float),
+                                      expected)
+        assert np.isnan(expected).sum() == 2
+        assert set(expected[~np.isnan(expected)]) == {1, 2}
+
+    def test_surrogate_cache(self):
+        X_train, X_test, y_train, y_test, feature_names, _ = \
+            create_cancer_data()
+        model = create_kneighbors_classifier(X_train, y_train)
+        analyzer = ModelAnalyzer(model, X_test, y_test, feature_names, [])
+        tree = analyzer.compute_error_tree(feature_names, None, None,
+                                           max_depth=3)
+        surrogate_cache = analyzer.surrogate_cache
+        assert len(surrogate_cache) == 1
+        assert surrogate_cache.misses == 1
+        assert analyzer.compute_error_tree(feature_names, None, None,
+                                           max_depth=3) == tree
+        assert surrogate_cache.hits == 1
+
+        # other parameters train again on the cached bins
+        analyzer.compute_error_tree(feature_names, None, None, max_depth=4)
+        analyzer.compute_error_tree(feature_names, None, None, max_depth=3,
+                                    min_child_samples=5)
+        assert len(surrogate_cache) == 1
+        assert surrogate_cache.misses == 3
+
+        # the cached booster is the same as the one trained from scratch
+        filters = [{ARG: [10], COLUMN: feature_names[0],
+                    METHOD: CohortFilterMethods.METHOD_GREATER}]
+        filtered_df = filter_from_cohort(analyzer, filters, None)
+        booster, indexed_df, _ = get_surrogate_booster_local(
+            filtered_df, analyzer, True, [0, 1, 2], feature_names[:3],
+            4, 8, 10, use_cached_predictions=True)
+        assert len(surrogate_cache) == 2
+        surrogate = create_surrogate_model(
+            analyzer, indexed_df[feature_names[:3]].to_numpy(),
+            indexed_df[DIFF].to_numpy(), 4, 8, 10, [])
+        assert booster.dump_model()['tree_info'] == \
+            surrogate.booster_.dump_model()['tree_info']
+
+    def test_surrogate_cache_categorical(self):
+        random_state = np.random.RandomState(0)
+        num_rows = 500
+        X_test = pd.DataFrame({
+            'color': random_state.choice(['blue', 'green', 'red'], num_rows),
+            'size': random_state.normal(size=num_rows)})
+        y_test = random_state.randint(0, 2, num_rows)
+        pred_y = np.where(X_test['color'] == 'red', 1 - y_test, y_test)
+        feature_names = list(X_test.columns)
+        analyzer = PredictionsAnalyzer(pred_y, X_test, y_test,
+                                       feature_names, ['color'])
+        # the trees with other parameters are trained on the cached
+        # training data with its categorical features
+        for max_depth in [3, 4]:
+            tree = analyzer.compute_error_tree(feature_names, None, None,
+                                               max_depth=max_depth)
+            assert tree[0]['nodeName'] == 'color'
+        assert len(analyzer.surrogate_cache) == 1
+        assert analyzer.surrogate_cache.misses == 2
+
+    def test_pickle_analyzer_caches(self):
+        random_state = np.random.RandomState(0)
+        num_rows = 500
+        X_test = pd.DataFrame({
+            'color': random_state.choice(['blue', 'green', 'red'], num_rows),
+            'size': random_state.normal(size=num_rows)})
+        y_test = random_state.randint(0, 2, num_rows)
+        pred_y = np.where(X_test['color'] == 'red', 1 - y_test, y_test)
+        feature_names = list(X_test.columns)
+        analyzer = PredictionsAnalyzer(pred_y, X_test, y_test,
+                                       feature_names, ['color'])
+        tree = analyzer.compute_error_tree(feature_names, None, None)
+        matrix = analyzer.compute_matrix(feature_names, None, None)
+        assert len(analyzer.surrogate_cache) == 1
+        assert len(analyzer.bin_cache) == 2
+
+        # the caches are pickled and copied without their locks, and
+        # without the cached LightGBM training data
+        for analyzer_copy in [pickle.loads(pickle.dumps(analyzer)),
+                              copy.deepcopy(analyzer)]:
+            assert len(analyzer_copy.surrogate_cache) == 0
+            assert len(analyzer_copy.bin_cache) == 2
+            assert analyzer_copy.compute_error_tree(
+                feature_names, None, None) == tree
+            assert analyzer_copy.compute_matrix(
+                feature_names, None, None) == matrix
+            assert len(analyzer_copy.surrogate_cache) == 1
+            assert analyzer_copy.bin_cache.hits == \
+                analyzer.bin_cache.hits + 2
+
+    def test_surrogate_error_tree_on_modified_dataset(self):
+        X_train, X_test, y_train, y_test, feature_names, _ = \
+            create_cancer_data()
+        model = create_kneighbors_classifier(X_train, y_train)
+        analyzer = ModelAnalyzer(model, X_test, y_test, feature_names, [])
+        dataset = pd.DataFrame(X_test, columns=feature_names)
+        dataset[TRUE_Y] = y_test
+        dataset[ROW_INDEX] = np.arange(len(y_test))
+        tree = analyzer.compute_error_tree_on_dataset(
+            feature_names, dataset, use_cached_predictions=True)
+        assert len(tree) > 1
+
+        # the tree is trained on the modified features, which cannot
+        # be split, instead of the analyzer's features of the rows
+        dataset[feature_names] = 1.0
+        tree = analyzer.compute_error_tree_on_dataset(feature_names,
+                                                      dataset)
+        assert len(tree) == 1
+        assert len(analyzer.surrogate_cache) == 1
+
+    def test_pruned_error_tree(self):
+        X_train, X_test, y_train, y_test, feature_names, _ = \
+            create_cancer_data()
+        model = create_kneighbors_classifier(X_train, y_train)
+        analyzer = ModelAnalyzer(model, X_test, y_test, feature_names, [])
+        dataset = filter_from_cohort(analyzer, None, None)
+        tree = analyzer.compute_error_tree_on_dataset(
+            feature_names, dataset, max_depth=4, num_leaves=12,
+            min_child_samples=5)
+        nodes = {node[ID]: node for node in tree}
+        children = {}
+        for node in tree:
+            children.setdefault(node[PARENTID], []).append(node[ID])
+
+        def get_level(node):
+            level = 1
+            while node[PARENTID] is not None:
+                node = nodes[node[PARENTID]]
+                level += 1
+            return level
+
+        top_tree = analyzer.compute_error_tree_on_dataset(
+            feature_names, dataset, max_depth=4, num_leaves=12,
+            min_child_samples=5, max_levels=2)
+        assert [node[ID] for node in top_tree] == \
+            [node[ID] for node in tree if get_level(node) <= 2]
+        for node in top_tree:
+            expected = dict(nodes[node[ID]])
+            expected[TreeNode.HAS_HIDDEN_CHILDREN] = \
+                get_level(node) == 2 and node[ID] in children
+            assert node == expected
+
+        max_nodes = 5
+        error_tree = analyzer.compute_error_tree_on_dataset(
+            feature_names, dataset, max_depth=4, num_leaves=12,
+            min_child_samples=5, max_nodes=max_nodes)
+        assert len(error_tree) == max_nodes
+        error_ids = {node[ID] for node in error_tree}
+        for node in error_tree:
+            # the returned nodes stay connected to the root
+            assert node[PARENTID] is None or node[PARENTID] in error_ids
+            hidden = set(children.get(node[ID], [])) - error_ids
+            assert node[TreeNode.HAS_HIDDEN_CHILDREN] == bool(hidden)
+            # the returned children carry more error than the hidden ones
+            for hidden_id in hidden:
+                assert nodes[hidden_id][ERROR] <= min(
+                    nodes[child_id][ERROR] for child_id in
+                    set(children[node[ID]]) & error_ids or [np.inf])
+
+        with pytest.raises(UserConfigValidationException,
+                           match='max_nodes must be at least 1'):
+            analyzer.compute_error_tree_on_dataset(
+                feature_names, dataset, max_nodes=0)
+
+    def test_expand_error_tree_node(self):
+        X_train, X_test, y_train, y_test, feature_names, _ = \
+            create_cancer_data()
+        model = create_kneighbors_classifier(X_train, y_train)
+        analyzer = ModelAnalyzer(model, X_test, y_test, feature_names, [])
+        dataset = filter_from_cohort(analyzer, None, None)
+        tree = analyzer.compute_error_tree_on_dataset(
+            feature_names, dataset, max_depth=4, num_leaves=12,
+            min_child_samples=5, use_cached_predictions=True)
+        root = tree[0]
+        left_id = tree[1][ID]
+        descendants = set()
+        for node in tree:
+            if node[PARENTID] == left_id or node[PARENTID] in descendants:
+                descendants.add(node[ID])
+
+        # the expansion reuses the cached surrogate model
+        misses = analyzer.surrogate_cache.misses
+        subtree = analyzer.compute_error_tree_on_dataset(
+            feature_names, dataset, max_depth=4, num_leaves=12,
+            min_child_samples=5, use_cached_predictions=True,
+            root_node_id=left_id)
+        assert analyzer.surrogate_cache.misses == misses
+        assert [node[ID] for node in subtree] == \
+            [node[ID] for node in tree if node[ID] in descendants]
+        for node in subtree:
+            assert not node.pop(TreeNode.HAS_HIDDEN_CHILDREN)
+        assert subtree == [node for node in tree if node[ID] in descendants]
+
+        children = analyzer.compute_error_tree_on_dataset(
+            feature_names, dataset, max_depth=4, num_leaves=12,
+            min_child_samples=5, use_cached_predictions=True,
+            root_node_id=root[ID], max_levels=1)
+        assert [node[PARENTID] for node in children] == [root[ID]] * 2
+
+        with pytest.raises(UserConfigValidationException,
+                           match='Node -1 not found in the tree'):
+            analyzer.compute_error_tree_on_dataset(
+                feature_names, dataset, root_node_id=-1)
+
     def test_invalid_multidim_label(self):
         X_train, X_test, y_train, y_test, feature_names, _ = create_iris_data()
         model = DummyInvalidShapeModel()
@@ -4,8 +4,11 @@
 """Module for defining common utilities related to data processing."""
 from .data_processing_utils import (convert_to_list,
                                     convert_to_string_list_dict,
+                                    encode_json_safe, iterencode_json_safe,
                                     serialize_json_safe)
 
 __all__ = ['convert_to_list',
            'convert_to_string_list_dict',
+           'encode_json_safe',
+           'iterencode_json_safe',
            'serialize_json_safe']
@@ -3,6 +3,7 @@
 
 import datetime
 import json
+import math
 from typing import Any, Dict, List
 
 import numpy as np
@@ -159,3 +160,276 @@ def serialize_json_safe(o: Any):
         return serialize_json_safe(o.__dict__)  # objects
     else:
         return o
+
+
+_DEFAULT_CHUNK_SIZE = 1000
+_DEFAULT_BUFFER_SIZE = 1 << 16
+_FAST_SCALAR_TYPES = frozenset([int, float, bool, type(None)])
+_FAST_TYPES = _FAST_SCALAR_TYPES | frozenset([str])
+# encodes lists of JSON native values at C speed, raising a ValueError
+# for non-finite floats which serialize_json_safe replaces by 0
+_strict_encoder = json.JSONEncoder(allow_nan=False)
+_encoder = json.JSONEncoder()
+
+
+def _escape_json_string(value):
+    """Escape a string the way serialize_json_safe does.
+
+    :param value: The string to escape.
+    :type value: str
+    :return: The escaped string without the enclosing quotes.
+    :rtype: str
+    """
+    return json.encoder.encode_basestring_ascii(value)[1:-1]
+
+
+def _encode_key(key):
+    """Encode a dictionary key the way json.dumps does.
+
+    :param key: The dictionary key.
+    :type key: str or int or float or bool or None
+    :return: The encoded key.
+    :rtype: str
+    """
+    if isinstance(key, str):
+        return json.encoder.encode_basestring_ascii(key)
+    if isinstance(key, (int, float)) or key is None:
+        # json.dumps converts the other keys to their JSON representation
+        return json.encoder.encode_basestring_ascii(_encoder.encode(key))
+    raise TypeError(f'keys must be str, int, float, bool or None, '
+                    f'not {key.__class__.__name__}')
+
+
+def _get_safe_value(value):
+    """Get the value serialize_json_safe returns for a scalar or string.
+
+    :param value: The scalar or string.
+    :type value: int or float or bool or str or None
+    :return: The JSON safe value.
+    :rtype: int or float or bool or str or None
+    """
+    value_type = type(value)
+    if value_type is str:
+        return _escape_json_string(value)
+    if value_type is float and not math.isfinite(value):
+        return 0
+    return value
+
+
+def _encode_safe_values(values):
+    """Encode a list of values, or of rows of values, at C speed.
+
+    The values are encoded as json.dumps would encode the result of
+    serialize_json_safe on them, without visiting each value in Python
+    when they are all numbers, booleans or None.
+
+    :param values: The values or rows of values to encode.
+    :type values: list
+    :return: The encoded values without the enclosing brackets, or None
+        if the values are not all scalars and strings.
+    :rtype: str
+    """
+    types = set(map(type, values))
+    is_rows = types == {list}
+    if is_rows:
+        types = set()
+        for row in values:
+            types.update(map(type, row))
+    if types <= _FAST_SCALAR_TYPES:
+        try:
+            return _strict_encoder.encode(values)[1:-1]
+        except ValueError:
+            pass
+    elif not types <= _FAST_TYPES:
+        return None
+    if is_rows:
+        safe_values = [list(map(_get_safe_value, row)) for row in values]
+    else:
+        safe_values = list(map(_get_safe_value, values))
+    return _encoder.encode(safe_values)[1:-1]
+
+
+def _iterencode_safe_array(array, chunk_size):
+    """Encode a NumPy array the way serialize_json_safe does.
+
+    :param array: The array to encode.
+    :type array: numpy.ndarray
+    :param chunk_size: The number of rows to encode at a time.
+    :type chunk_size: int
+    :return: The pieces of the encoded array.
+    :rtype: Iterator[str]
+    """
+    if array.ndim == 0 or array.dtype.kind not in 'biuf':
+        yield from _iterencode_safe(array.tolist(), chunk_size)
+        return
+    yield '['
+    for start in range(0, len(array), chunk_size):
+        chunk = array[start:start + chunk_size]
+        if chunk.dtype.kind == 'f':
+            is_finite = np.isfinite(chunk)
+            if not is_finite.all():
+                # serialize_json_safe replaces non-finite floats by 0
+                chunk = chunk.astype(object)
+                chunk[~is_finite] = 0
+        encoded = _encoder.encode(chunk.tolist())[1:-1]
+        yield encoded if start == 0 else ', ' + encoded
+    yield ']'
+
+
+def _iterencode_safe_list(values, chunk_size):
+    """Encode a list or tuple the way serialize_json_safe does.
+
+    :param values: The values to encode.
+    :type values: list or tuple
+    :param chunk_size: The number of values to encode at a time.
+    :type chunk_size: int
+    :return: The pieces of the encoded list.
+    :rtype: Iterator[str]
+    """
+    yield '['
+    separator = ''
+    for start in range(0, len(values), chunk_size):
+        chunk = values[start:start + chunk_size]
+        encoded = _encode_safe_values(chunk)
+        if encoded is not None:
+            if encoded:
+                yield separator + encoded
+                separator = ', '
+            continue
+        for value in chunk:
+            yield separator
+            separator = ', '
+            yield from _iterencode_safe(value, chunk_size)
+    yield ']'
+
+
+def _iterencode_safe(o, chunk_size):
+    """Encode a value the way json.dumps encodes serialize_json_safe(o).
+
+    :param o: The value to encode.
+    :type o: Any
+    :param chunk_size: The number of list values to encode at a time.
+    :type chunk_size: int
+    :return: The pieces of the encoded value.
+    :rtype: Iterator[str]
+    """
+    o_type = type(o)
+    if o_type is str:
+        yield json.encoder.encode_basestring_ascii(_escape_json_string(o))
+    elif o_type is float:
+        yield _encoder.encode(o if math.isfinite(o) else 0)
+    elif o_type in {bool, int, type(None)}:
+        yield _encoder.encode(o)
+    elif isinstance(o, (datetime.datetime, pd.Timestamp)):
+        yield json.encoder.encode_basestring_ascii(o.__str__())
+    elif isinstance(o, dict):
+        yield from _iterencode_dict(o, chunk_size, _iterencode_safe)
+    elif isinstance(o, (list, tuple)):
+        yield from _iterencode_safe_list(o, chunk_size)
+    elif isinstance(o, np.ndarray):
+        yield from _iterencode_safe_array(o, chunk_size)
+    elif hasattr(o, 'item'):
+        yield from _iterencode(o.item(), chunk_size)
+    elif hasattr(o, '__dict__'):
+        yield from _iterencode_safe(o.__dict__, chunk_size)
+    else:
+        yield json.dumps(o, default=serialize_json_safe)
+
+
+def _iterencode_dict(o, chunk_size, iterencode_value):
+    """Encode a dictionary.
+
+    :param o: The dictionary to encode.
+    :type o: dict
+    :param chunk_size: The number of list values to encode at a time.
+    :type chunk_size: int
+    :param iterencode_value: The function encoding the values.
+    :type iterencode_value: function
+    :return: The pieces of the encoded dictionary.
+    :rtype: Iterator[str]
+    """
+    yield '{'
+    separator = ''
+    for key, value in o.items():
+        yield separator + _encode_key(key) + ': '
+        separator = ', '
+        yield from iterencode_value(value, chunk_size)
+    yield '}'
+
+
+def _iterencode(o, chunk_size):
+    """Encode a value the way json.dumps encodes it.
+
+    Values which are not JSON native are encoded as the result of
+    serialize_json_safe, as json.dumps does when it is passed
+    default=serialize_json_safe.
+
+    :param o: The value to encode.
+    :type o: Any
+    :param chunk_size: The number of list values to encode at a time.
+    :type chunk_size: int
+    :return: The pieces of the encoded value.
+    :rtype: Iterator[str]
+    """
+    if isinstance(o, (str, int, float)) or o is None:
+        yield _encoder.encode(o)
+    elif isinstance(o, dict):
+        yield from _iterencode_dict(o, chunk_size, _iterencode)
+    elif isinstance(o, (list, tuple)):
+        yield '['
+        for index, value in enumerate(o):
+            if index > 0:
+                yield ', '
+            yield from _iterencode(value, chunk_size)
+        yield ']'
+    else:
+        yield from _iterencode_safe(o, chunk_size)
+
+
+def iterencode_json_safe(o: Any, chunk_size: int = _DEFAULT_CHUNK_SIZE,
+                         buffer_size: int = _DEFAULT_BUFFER_SIZE):
+    """Encode a value as JSON in chunks.
+
+    The result is the same as json.dumps(o, default=serialize_json_safe)
+    split into chunks, so that large payloads can be streamed without
+    building the whole string in memory.  Lists and NumPy arrays of
+    numbers and strings are encoded chunk_size values at a time by the
+    C implementation of the json module instead of converting each value
+    in Python.
+
+    :param o: Object to encode.
+    :type o: Any
+    :param chunk_size: The number of list values or array rows to encode
+        at a time.
+    :type chunk_size: int
+    :param buffer_size: The minimum number of characters in each chunk,
+        except the last one.
+    :type buffer_size: int
+    :return: The chunks of the JSON document.
+    :rtype: Iterator[str]
+    """
+    pieces = []
+    length = 0
+    for piece in _iterencode(o, chunk_size):
+        pieces.append(piece)
+        length += len(piece)
+        if length >= buffer_size:
+            yield ''.join(pieces)
+            pieces = []
+            length = 0
+    if pieces:
+        yield ''.join(pieces)
+
+
+def encode_json_safe(o: Any):
+    """Encode a value as JSON.
+
+    Equivalent to json.dumps(o, default=serialize_json_safe), but
+    faster for objects holding large lists and NumPy arrays.
+
+    :param o: Object to encode.
+    :type o: Any
+    :return: The JSON document.
+    :rtype: str
+    """
+    return ''.join(iterencode_json_safe(o))
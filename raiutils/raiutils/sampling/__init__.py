@@ -2,6 +2,11 @@
 # Licensed under the MIT License.
 
 """Module for defining various sampling techniques."""
+from .chunked_sampling import (DataSample, SamplingMethods,
+                               error_stratified_sample, get_error_strata,
+                               reservoir_sample, stratified_sample)
 from .random_sampling import generate_random_sample
 
-__all__ = ['generate_random_sample']
+__all__ = ['DataSample', 'SamplingMethods', 'error_stratified_sample',
+           'generate_random_sample', 'get_error_strata', 'reservoir_sample',
+           'stratified_sample']
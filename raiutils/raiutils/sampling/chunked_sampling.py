@@ -0,0 +1,468 @@
+# Copyright (c) Microsoft Corporation
+# Licensed under the MIT License.
+
+"""Defines samplings of datasets read in chunks.
+
+The rows are sampled in a single pass over the chunks, so that datasets
+which do not fit in memory, for example read with the chunksize argument
+of pandas.read_csv, can be sampled.  Each sampled row is given a random
+key and, within each stratum, the rows with the smallest keys are kept,
+which is a uniform sample without replacement of the stratum.
+
+The positions of the sampled rows in the full dataset are recorded with
+the number of rows of the full dataset each sampled row stands for, so
+that metrics computed on the sample can be reweighted to estimate their
+values on the full dataset.
+"""
+
+from typing import Any, Callable, Iterable, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from raiutils.exceptions import UserConfigValidationException
+
+DEFAULT_CHUNK_SIZE = 100000
+# the number of quantile bins of the regression errors
+NUM_ERROR_BINS = 10
+
+
+class SamplingMethods(object):
+    """Provide the sampling method constants."""
+
+    FIRST = 'first'
+    RANDOM = 'random'
+    STRATIFIED = 'stratified'
+    ERROR_STRATIFIED = 'error_stratified'
+
+    ALL = [FIRST, RANDOM, STRATIFIED, ERROR_STRATIFIED]
+
+
+class DataSample(object):
+    """Defines the sampled rows of a dataset.
+
+    :param indexes: The sorted positions of the sampled rows in the full
+        dataset.
+    :type indexes: numpy.ndarray
+    :param weights: The number of rows of the full dataset each sampled
+        row stands for.
+    :type weights: numpy.ndarray
+    :param num_rows: The number of rows of the full dataset.
+    :type num_rows: int
+    :param method: The sampling method.
+    :type method: str
+    """
+
+    def __init__(self, indexes, weights, num_rows, method):
+        self.indexes = np.asarray(indexes, dtype=np.int64)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.num_rows = int(num_rows)
+        self.method = method
+
+    def __len__(self):
+        return len(self.indexes)
+
+    def take(self, dataset):
+        """Get the sampled rows of the full dataset.
+
+        :param dataset: The full dataset.
+        :type dataset: pandas.DataFrame or numpy.ndarray
+        :return: The sampled rows, in the order of the full dataset.
+        :rtype: pandas.DataFrame or numpy.ndarray
+        """
+        if isinstance(dataset, (pd.DataFrame, pd.Series)):
+            return dataset.iloc[self.indexes]
+        return np.asarray(dataset)[self.indexes]
+
+    def estimate_total(self, values):
+        """Estimate the sum of values over the full dataset.
+
+        :param values: The value of each sampled row.
+        :type values: numpy.ndarray
+        :return: The estimated sum over the rows of the full dataset.
+        :rtype: float
+        """
+        return float(np.dot(self.weights, np.asarray(values, dtype=float)))
+
+    def estimate_mean(self, values):
+        """Estimate the mean of values over the full dataset.
+
+        For example, the accuracy on the full dataset is estimated by the
+        mean of whether each sampled row is predicted correctly.  Metrics
+        which are not means can be reweighted by passing the weights as
+        the sample_weight argument of the scikit-learn metrics.
+
+        :param values: The value of each sampled row.
+        :type values: numpy.ndarray
+        :return: The estimated mean over the rows of the full dataset.
+        :rtype: float
+        """
+        return self.estimate_total(values) / self.weights.sum()
+
+    def to_dict(self):
+        """Get the sample as a JSON serializable dictionary.
+
+        :return: The sample as a dictionary.
+        :rtype: dict
+        """
+        return {'indexes': self.indexes.tolist(),
+                'weights': self.weights.tolist(),
+                'num_rows': self.num_rows,
+                'method': self.method}
+
+    @staticmethod
+    def from_dict(sample_dict):
+        """Get the sample from its dictionary.
+
+        :param sample_dict: The dictionary returned by to_dict.
+        :type sample_dict: dict
+        :return: The sample.
+        :rtype: DataSample
+        """
+        return DataSample(sample_dict['indexes'], sample_dict['weights'],
+                          sample_dict['num_rows'], sample_dict['method'])
+
+
+def iterate_chunks(data, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Iterate over the chunks of a dataset.
+
+    :param data: The dataset, or an iterable of its chunks.
+    :type data: pandas.DataFrame or Iterable[pandas.DataFrame]
+    :param chunk_size: The number of rows of the chunks a DataFrame is
+        split into.
+    :type chunk_size: int
+    :return: The chunks of the dataset.
+    :rtype: Iterator[pandas.DataFrame]
+    """
+    if isinstance(data, pd.DataFrame):
+        for start in range(0, max(len(data), 1), chunk_size):
+            yield data.iloc[start:start + chunk_size]
+    else:
+        yield from data
+
+
+def _validate_number_samples(number_samples):
+    """Validate the number of rows to sample.
+
+    :param number_samples: The number of rows to sample.
+    :type number_samples: int
+    """
+    if not isinstance(number_samples, (int, np.integer)) or \
+            isinstance(number_samples, bool):
+        raise UserConfigValidationException(
+            "Expecting an integer for number_samples.")
+    if number_samples <= 0:
+        raise UserConfigValidationException(
+            "The number_samples should be greater than zero.")
+
+
+def _allocate(strata_sizes, number_samples):
+    """Allocate the sampled rows to the strata.
+
+    The rows are allocated proportionally to the size of each stratum by
+    largest remainder. If there are enough rows, the strata left without
+    any row then take one from the strata with the most rows, so that rare
+    strata are represented.
+
+    :param strata_sizes: The number of rows of each stratum.
+    :type strata_sizes: numpy.ndarray
+    :param number_samples: The number of rows to sample.
+    :type number_samples: int
+    :return: The number of rows to sample from each stratum.
+    :rtype: numpy.ndarray
+    """
+    count = strata_sizes.sum()
+    if number_samples >= count:
+        return strata_sizes.copy()
+    quotas = strata_sizes * number_samples / count
+    strata_nnz = np.floor(quotas).astype(np.int64)
+    remaining = number_samples - strata_nnz.sum()
+    order = np.argsort(strata_nnz - quotas, kind='stable')
+    strata_nnz[order[:remaining]] += 1
+    if number_samples >= len(strata_sizes):
+        for stratum in np.flatnonzero((strata_nnz == 0) &
+                                      (strata_sizes > 0)):
+            strata_nnz[np.argmax(strata_nnz)] -= 1
+            strata_nnz[stratum] = 1
+    return strata_nnz
+
+
+class _StratumReservoir(object):
+    """Keeps the rows of a stratum with the smallest random keys.
+
+    :param capacity: The maximum number of rows to keep.
+    :type capacity: int
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.size = 0
+        self.keys = np.empty(0, dtype=np.float64)
+        self.positions = np.empty(0, dtype=np.int64)
+
+    def update(self, keys, positions):
+        """Add rows of the stratum.
+
+        :param keys: The random keys of the rows.
+        :type keys: numpy.ndarray
+        :param positions: The positions of the rows in the full dataset.
+        :type positions: numpy.ndarray
+        """
+        self.size += len(keys)
+        keys = np.concatenate([self.keys, keys])
+        positions = np.concatenate([self.positions, positions])
+        if len(keys) > self.capacity:
+            kept = np.argpartition(keys, self.capacity - 1)[:self.capacity]
+            keys = keys[kept]
+            positions = positions[kept]
+        self.keys = keys
+        self.positions = positions
+
+    def smallest(self, nnz):
+        """Get the positions of the rows with the smallest keys.
+
+        :param nnz: The number of rows.
+        :type nnz: int
+        :return: The positions of the rows.
+        :rtype: numpy.ndarray
+        """
+        return self.positions[np.argsort(self.keys, kind='stable')[:nnz]]
+
+
+def _sample_strata(chunks, number_samples, get_strata, method,
+                   random_state=None):
+    """Sample the rows of a dataset in chunks, stratified by get_strata.
+
+    :param chunks: The chunks of the dataset.
+    :type chunks: Iterable[pandas.DataFrame]
+    :param number_samples: The number of rows to sample.
+    :type number_samples: int
+    :param get_strata: The function returning the stratum of each row of
+        a chunk given the chunk and the position of its first row.
+    :type get_strata: Callable
+    :param method: The sampling method.
+    :type method: str
+    :param random_state: The seed of the random number generator.
+    :type random_state: int
+    :return: The sample.
+    :rtype: DataSample
+    """
+    _validate_number_samples(number_samples)
+    rng = np.random.RandomState(random_state)
+    reservoirs = {}
+    num_rows = 0
+    for chunk in chunks:
+        chunk_rows = len(chunk)
+        if chunk_rows == 0:
+            continue
+        keys = rng.random_sample(chunk_rows)
+        positions = np.arange(num_rows, num_rows + chunk_rows)
+        # unlike np.unique, factorize does not compare the strata of
+        # different types, such as strings and None
+        strata, labels = pd.factorize(
+            np.asarray(get_strata(chunk, num_rows)).reshape(-1), sort=True)
+        labels = labels.tolist()
+        if np.any(strata < 0):
+            # the missing values share a stratum
+            strata = np.where(strata < 0, len(labels), strata)
+            labels.append(None)
+        order = np.argsort(strata, kind='stable')
+        bounds = np.searchsorted(strata[order], np.arange(len(labels) + 1))
+        for stratum, label in enumerate(labels):
+            rows = order[bounds[stratum]:bounds[stratum + 1]]
+            reservoir = reservoirs.get(label)
+            if reservoir is None:
+                reservoir = reservoirs[label] = \
+                    _StratumReservoir(number_samples)
+            reservoir.update(keys[rows], positions[rows])
+        num_rows += chunk_rows
+
+    reservoirs = list(reservoirs.values())
+    strata_sizes = np.array([reservoir.size for reservoir in reservoirs],
+                            dtype=np.int64)
+    strata_nnz = _allocate(strata_sizes, number_samples)
+    indexes = []
+    weights = []
+    for reservoir, size, nnz in zip(reservoirs, strata_sizes, strata_nnz):
+        if nnz == 0:
+            continue
+        indexes.append(reservoir.smallest(nnz))
+        weights.append(np.full(nnz, size / nnz))
+    if len(indexes) == 0:
+        return DataSample([], [], num_rows, method)
+    indexes = np.concatenate(indexes)
+    weights = np.concatenate(weights)
+    order = np.argsort(indexes)
+    return DataSample(indexes[order], weights[order], num_rows, method)
+
+
+def reservoir_sample(
+        data: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+        number_samples: int,
+        random_state: Optional[int] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE) -> DataSample:
+    """Pick a uniform random sample of the rows of a dataset.
+
+    :param data: The dataset, or an iterable of its chunks.
+    :type data: pandas.DataFrame or Iterable[pandas.DataFrame]
+    :param number_samples: The number of rows to sample.
+    :type number_samples: int
+    :param random_state: The seed of the random number generator.
+    :type random_state: int
+    :param chunk_size: The number of rows of the chunks a DataFrame is
+        split into.
+    :type chunk_size: int
+    :return: The sample.
+    :rtype: DataSample
+    """
+    def get_strata(chunk, start):
+        return np.zeros(len(chunk), dtype=np.int8)
+
+    return _sample_strata(iterate_chunks(data, chunk_size), number_samples,
+                          get_strata, SamplingMethods.RANDOM, random_state)
+
+
+def stratified_sample(
+        data: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+        number_samples: int,
+        strata: Union[str, np.ndarray, Callable[[pd.DataFrame], Any]],
+        random_state: Optional[int] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE) -> DataSample:
+    """Pick a random sample of the rows of a dataset stratified by strata.
+
+    The rows are allocated to the strata proportionally to their size,
+    with at least one row per stratum if there are enough rows.
+
+    :param data: The dataset, or an iterable of its chunks.
+    :type data: pandas.DataFrame or Iterable[pandas.DataFrame]
+    :param number_samples: The number of rows to sample.
+    :type number_samples: int
+    :param strata: The name of the column holding the stratum of each
+        row, the stratum of each row of the full dataset, or a function
+        returning the stratum of each row of a chunk.
+    :type strata: str or numpy.ndarray or Callable
+    :param random_state: The seed of the random number generator.
+    :type random_state: int
+    :param chunk_size: The number of rows of the chunks a DataFrame is
+        split into.
+    :type chunk_size: int
+    :return: The sample.
+    :rtype: DataSample
+    """
+    if isinstance(strata, str):
+        column = strata
+
+        def get_strata(chunk, start):
+            if column not in chunk.columns:
+                raise UserConfigValidationException(
+                    "The column {0} is not present in dataset".format(
+                        column))
+            return chunk[column].to_numpy()
+    elif callable(strata):
+        def get_strata(chunk, start):
+            return strata(chunk)
+    else:
+        strata_values = np.asarray(strata)
+
+        def get_strata(chunk, start):
+            return strata_values[start:start + len(chunk)]
+
+    return _sample_strata(iterate_chunks(data, chunk_size), number_samples,
+                          get_strata, SamplingMethods.STRATIFIED,
+                          random_state)
+
+
+def get_error_strata(true_y, pred_y, is_classification, bin_edges=None):
+    """Get the strata of the error of the predictions.
+
+    For classification the strata are whether each row is predicted
+    correctly.  For regression they are the quantile bins of the
+    difference between the prediction and the label.
+
+    :param true_y: The labels.
+    :type true_y: numpy.ndarray
+    :param pred_y: The predictions.
+    :type pred_y: numpy.ndarray
+    :param is_classification: Whether the predictions are classes.
+    :type is_classification: bool
+    :param bin_edges: The edges of the bins of the regression errors, or
+        None to use the deciles of the errors.
+    :type bin_edges: numpy.ndarray
+    :return: The stratum of each row.
+    :rtype: numpy.ndarray
+    """
+    true_y = np.asarray(true_y).reshape(-1)
+    pred_y = np.asarray(pred_y).reshape(-1)
+    if is_classification:
+        return true_y != pred_y
+    diff = pred_y.astype(float) - true_y.astype(float)
+    if bin_edges is None:
+        bin_edges = get_error_bin_edges(diff)
+    return np.searchsorted(bin_edges, diff)
+
+
+def get_error_bin_edges(diff):
+    """Get the edges of the quantile bins of the regression errors.
+
+    :param diff: The difference between the predictions and the labels.
+    :type diff: numpy.ndarray
+    :return: The edges of the bins.
+    :rtype: numpy.ndarray
+    """
+    return np.unique(np.quantile(
+        diff, np.linspace(0, 1, NUM_ERROR_BINS + 1)[1:-1]))
+
+
+def error_stratified_sample(
+        data: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+        number_samples: int,
+        target_column: str,
+        predict: Callable[[pd.DataFrame], Any],
+        is_classification: bool,
+        random_state: Optional[int] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE) -> DataSample:
+    """Pick a random sample of the rows of a dataset stratified by error.
+
+    The predictions are made chunk by chunk.  For regression the errors
+    are binned by the deciles of the errors of the first chunk, since the
+    errors of the later chunks are not known yet.
+
+    :param data: The dataset including the label column, or an iterable
+        of its chunks.
+    :type data: pandas.DataFrame or Iterable[pandas.DataFrame]
+    :param number_samples: The number of rows to sample.
+    :type number_samples: int
+    :param target_column: The name of the label column.
+    :type target_column: str
+    :param predict: The function returning the predictions for the
+        features of a chunk, without the label column.
+    :type predict: Callable
+    :param is_classification: Whether the predictions are classes.
+    :type is_classification: bool
+    :param random_state: The seed of the random number generator.
+    :type random_state: int
+    :param chunk_size: The number of rows of the chunks a DataFrame is
+        split into.
+    :type chunk_size: int
+    :return: The sample.
+    :rtype: DataSample
+    """
+    bin_edges = []
+
+    def get_strata(chunk, start):
+        if target_column not in chunk.columns:
+            raise UserConfigValidationException(
+                "The column {0} is not present in dataset".format(
+                    target_column))
+        true_y = chunk[target_column].to_numpy()
+        pred_y = np.asarray(predict(chunk.drop(columns=[target_column])))
+        if is_classification:
+            return get_error_strata(true_y, pred_y, True)
+        if len(bin_edges) == 0:
+            bin_edges.append(get_error_bin_edges(
+                pred_y.reshape(-1).astype(float) - true_y.astype(float)))
+        return get_error_strata(true_y, pred_y, False, bin_edges[0])
+
+    return _sample_strata(iterate_chunks(data, chunk_size), number_samples,
+                          get_strata, SamplingMethods.ERROR_STRATIFIED,
+                          random_state)
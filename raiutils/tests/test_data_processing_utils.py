@@ -11,6 +11,7 @@ from scipy.sparse import csr_matrix
 
 from raiutils.data_processing import (convert_to_list,
                                       convert_to_string_list_dict,
+                                      encode_json_safe, iterencode_json_safe,
                                       serialize_json_safe)
 
 
@@ -271,3 +272,50 @@ class TestSerializationUtilities:
         result = json.dumps(serialize_json_safe(timestamp_obj_array))
         assert result is not None
         assert "2020" in result
+
+
+class TestEncodeJsonSafe:
+
+    @pytest.mark.parametrize('value', [
+        {"hello": "world\"with\"quotes",
+         "hi": ["a", "special\t\"\r\nblah", np.str_('b"')]},
+        [0, np.nan, 2, np.inf, -np.inf, None, True, 'a"b'],
+        [[1.5, 'a"', np.nan], [2, None, False]],
+        np.array([[1.5, np.nan], [np.inf, 2.0]]),
+        np.array([1, 2, 3], dtype=np.uint8),
+        np.array(['a', 'b"c'], dtype=object),
+        np.float64('nan'),
+        ('a', [1, 2, 3], {1: 'one', 2.5: None, None: True}),
+        pd.Timestamp('2020-10-10')
+    ])
+    def test_same_as_json_dumps(self, value):
+        class A:
+            def __init__(self, value):
+                self.a_data = value
+                self.b_data = [value, value]
+
+        for o in [value, [value], {'A': A(value)}, A(value)]:
+            expected = json.dumps(o, default=serialize_json_safe)
+            assert encode_json_safe(o) == expected
+
+    def test_chunks(self):
+        class A:
+            def __init__(self):
+                self.features = [[i, i * 0.5, 'c"' + str(i % 3)]
+                                 for i in range(1000)]
+                self.predictions = np.arange(1000) / 7.0
+
+        o = {'data': A()}
+        expected = json.dumps(o, default=serialize_json_safe)
+        chunks = list(iterencode_json_safe(o, chunk_size=64,
+                                           buffer_size=1024))
+        assert len(chunks) > 1
+        assert all(len(chunk) >= 1024 for chunk in chunks[:-1])
+        assert ''.join(chunks) == expected
+
+    def test_unknown(self):
+        c = complex(1, 2)
+        with pytest.raises(ValueError, match='Circular reference'):
+            json.dumps([c, 42], default=serialize_json_safe)
+        with pytest.raises(ValueError, match='Circular reference'):
+            encode_json_safe([c, 42])
@@ -3,8 +3,12 @@
 
 import numpy as np
 import pandas as pd
+import pytest
 
-from raiutils.sampling import generate_random_sample
+from raiutils.exceptions import UserConfigValidationException
+from raiutils.sampling import (DataSample, SamplingMethods,
+                               error_stratified_sample, generate_random_sample,
+                               reservoir_sample, stratified_sample)
 
 
 class TestRandomSampling:
@@ -94,3 +98,110 @@ class TestRandomSampling:
             original_data=dataset,
             sampled_data=same_dataset,
             num_requested_samples=5000)
+
+
+class TestChunkedSampling:
+    def generate_dataset(self, num_rows=1000):
+        X1 = np.arange(num_rows)
+        y = (X1 % 10 == 0).astype(int)
+        return pd.DataFrame({'col1': X1, 'target_column': y})
+
+    def get_chunks(self, dataset, chunk_size=130):
+        return (dataset.iloc[start:start + chunk_size]
+                for start in range(0, len(dataset), chunk_size))
+
+    def validate_sample(self, sample, num_rows, number_samples):
+        assert isinstance(sample, DataSample)
+        assert len(sample) == number_samples
+        assert sample.num_rows == num_rows
+        assert len(np.unique(sample.indexes)) == number_samples
+        assert np.all(np.diff(sample.indexes) > 0)
+        assert sample.weights.sum() == pytest.approx(num_rows)
+
+    def test_reservoir_sample(self):
+        dataset = self.generate_dataset()
+        sample = reservoir_sample(
+            self.get_chunks(dataset), 100, random_state=777)
+        self.validate_sample(sample, len(dataset), 100)
+        assert sample.method == SamplingMethods.RANDOM
+        assert np.all(sample.weights == len(dataset) / 100)
+        # the sample is not the first rows of the dataset
+        assert sample.indexes.max() >= 100
+
+        same_sample = reservoir_sample(dataset, 100, random_state=777,
+                                       chunk_size=130)
+        np.testing.assert_array_equal(sample.indexes, same_sample.indexes)
+
+    def test_reservoir_sample_all_rows(self):
+        dataset = self.generate_dataset(num_rows=50)
+        sample = reservoir_sample(self.get_chunks(dataset, 20), 100)
+        self.validate_sample(sample, len(dataset), 50)
+        np.testing.assert_array_equal(sample.indexes, np.arange(50))
+
+    def test_stratified_sample(self):
+        dataset = self.generate_dataset()
+        sample = stratified_sample(
+            self.get_chunks(dataset), 100, 'target_column', random_state=7)
+        self.validate_sample(sample, len(dataset), 100)
+        sampled = sample.take(dataset)
+        assert sampled['target_column'].sum() == 10
+        # the proportion of positives is estimated exactly
+        assert sample.estimate_mean(sampled['target_column']) == \
+            pytest.approx(dataset['target_column'].mean())
+
+        strata = dataset['target_column'].to_numpy()
+        same_sample = stratified_sample(
+            self.get_chunks(dataset), 100, strata, random_state=7)
+        np.testing.assert_array_equal(sample.indexes, same_sample.indexes)
+
+    def test_stratified_sample_keeps_rare_strata(self):
+        dataset = self.generate_dataset()
+        dataset.loc[3, 'target_column'] = 2
+        sample = stratified_sample(dataset, 20, 'target_column')
+        self.validate_sample(sample, len(dataset), 20)
+        assert 3 in sample.indexes
+        assert sample.weights[sample.indexes == 3][0] == 1
+
+    def test_stratified_sample_missing_strata(self):
+        dataset = self.generate_dataset()
+        strata = np.where(dataset['target_column'] == 1, 'rare', None)
+        strata[[5, 15]] = np.nan
+        sample = stratified_sample(
+            self.get_chunks(dataset), 100, strata, random_state=7)
+        self.validate_sample(sample, len(dataset), 100)
+        assert np.sum(strata[sample.indexes] == 'rare') == 10
+
+    def test_error_stratified_sample(self):
+        dataset = self.generate_dataset()
+
+        def predict(features):
+            return np.zeros(len(features), dtype=int)
+
+        sample = error_stratified_sample(
+            self.get_chunks(dataset), 100, 'target_column', predict,
+            is_classification=True)
+        self.validate_sample(sample, len(dataset), 100)
+        assert sample.method == SamplingMethods.ERROR_STRATIFIED
+        errors = sample.take(dataset)['target_column'].to_numpy() != 0
+        assert errors.sum() == 10
+
+    def test_data_sample_to_dict(self):
+        dataset = self.generate_dataset()
+        sample = reservoir_sample(dataset, 10)
+        loaded = DataSample.from_dict(sample.to_dict())
+        np.testing.assert_array_equal(loaded.indexes, sample.indexes)
+        np.testing.assert_array_equal(loaded.weights, sample.weights)
+        assert loaded.num_rows == sample.num_rows
+        assert loaded.method == sample.method
+
+    def test_invalid_number_samples(self):
+        dataset = self.generate_dataset()
+        with pytest.raises(UserConfigValidationException,
+                           match='greater than zero'):
+            reservoir_sample(dataset, 0)
+        with pytest.raises(UserConfigValidationException,
+                           match='Expecting an integer'):
+            stratified_sample(dataset, 1.5, 'target_column')
+        with pytest.raises(UserConfigValidationException,
+                           match='not present in dataset'):
+            stratified_sample(dataset, 10, 'missing')
@@ -9,7 +9,7 @@ import uuid
 from html.parser import HTMLParser
 
 from rai_core_flask import FlaskHelper  # , environment_detector
-from raiutils.data_processing import serialize_json_safe
+from raiutils.data_processing import encode_json_safe, iterencode_json_safe
 from raiwidgets.interfaces import WidgetRequestResponseConstants
 
 invalid_feature_flights_error = \
@@ -115,9 +115,13 @@ class Dashboard(object):
         self.add_url_rule(get_config, '/config', methods=["POST"])
 
         def get_model_data():
-            return json.dumps({
-                WidgetRequestResponseConstants.data: self.model_data},
-                default=serialize_json_safe)
+            # stream the model data in chunks since it holds the whole
+            # dataset, so that large dashboards start receiving it
+            # immediately without building the entire response in memory
+            return self._service.app.response_class(
+                iterencode_json_safe({
+                    WidgetRequestResponseConstants.data: self.model_data}),
+                mimetype='application/json')
         self.add_url_rule(get_model_data, '/model_data', methods=["POST"])
         return
 
@@ -140,11 +144,11 @@ class Dashboard(object):
                 "__rai_app_id__", f'rai_widget_{self.id}')
             content = content.replace(
                 '"__rai_config__"', f'`{json.dumps(self.config)}`')
-            model_data = json.dumps(self.model_data,
-                                    default=serialize_json_safe)
-            content = content.replace(
-                '"__rai_model_data__"',
-                f'`{model_data}`')
+            if '"__rai_model_data__"' in content:
+                model_data = encode_json_safe(self.model_data)
+                content = content.replace(
+                    '"__rai_model_data__"',
+                    f'`{model_data}`')
             return content
 
     def add_url_rule(self, func, route, methods):
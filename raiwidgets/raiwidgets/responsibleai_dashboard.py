@@ -66,11 +66,32 @@ class ResponsibleAIDashboard(Dashboard):
                 return jsonify(self.input.debug_ml(data))
             self.add_url_rule(tree, '/tree', methods=["POST"])
 
+            def tree_node():
+                data = request.get_json(force=True)
+                return jsonify(self.input.expand_tree_node(data))
+            self.add_url_rule(tree_node, '/tree_node', methods=["POST"])
+
             def matrix():
                 data = request.get_json(force=True)
                 return jsonify(self.input.matrix(data))
             self.add_url_rule(matrix, '/matrix', methods=["POST"])
 
+            def cohort_metric():
+                data = request.get_json(force=True)
+                return jsonify(self.input.cohort_metric(data))
+            self.add_url_rule(
+                cohort_metric,
+                '/cohort_metric',
+                methods=["POST"])
+
+            def cohort_heatmap():
+                data = request.get_json(force=True)
+                return jsonify(self.input.cohort_heatmap(data))
+            self.add_url_rule(
+                cohort_heatmap,
+                '/cohort_heatmap',
+                methods=["POST"])
+
             def causal_whatif():
                 data = request.get_json(force=True)
                 return jsonify(self.input.causal_whatif(data))
@@ -169,31 +169,45 @@ class ResponsibleAIDashboardInput:
         self._error_analyzer.update_metric(metric)
         return filtered_data_df
 
+    def _get_tree_features(self, features):
+        # TODO: Remove prompt feature
+        if not hasattr(self._analysis, '_text_column'):
+            text_cols = None
+        else:
+            text_cols = self._analysis._text_column
+        if text_cols is None:
+            text_cols = []
+        elif isinstance(text_cols, str):
+            text_cols = [text_cols]
+        return [f for f in features if f not in text_cols]
+
     def debug_ml(self, data):
         try:
-            features = data[0]  # TODO: Remove prompt feature
+            features = self._get_tree_features(data[0])
             filters = data[1]
             composite_filters = data[2]
             max_depth = data[3]
             num_leaves = data[4]
             min_child_samples = data[5]
             metric = display_name_to_metric[data[6]]
-            if not hasattr(self._analysis, '_text_column'):
-                text_cols = None
-            else:
-                text_cols = self._analysis._text_column
-            if text_cols is None:
-                text_cols = []
-            elif isinstance(text_cols, str):
-                text_cols = [text_cols]
-            features = [f for f in features if f not in text_cols]
+            # optionally bound the size of the returned tree
+            max_levels = data[7] if len(data) > 7 else None
+            max_nodes = data[8] if len(data) > 8 else None
+            # optionally approximate the tree on a sample of the cohort,
+            # the exact tree being computed in the background
+            sample_size = data[9] if len(data) > 9 else None
 
             filtered_data_df = self._prepare_filtered_error_analysis_data(
                 features, filters, composite_filters, metric)
 
             tree = self._error_analyzer.compute_error_tree_on_dataset(
                 features, filtered_data_df,
-                max_depth, num_leaves, min_child_samples)
+                max_depth, num_leaves, min_child_samples,
+                use_cached_predictions=True,
+                max_levels=max_levels,
+                max_nodes=max_nodes,
+                sample_size=sample_size,
+                refine=sample_size is not None)
             return {
                 WidgetRequestResponseConstants.data: tree
             }
@@ -208,6 +222,44 @@ class ResponsibleAIDashboardInput:
                 WidgetRequestResponseConstants.data: []
             }
 
+    def expand_tree_node(self, data):
+        try:
+            features = self._get_tree_features(data[0])
+            filters = data[1]
+            composite_filters = data[2]
+            max_depth = data[3]
+            num_leaves = data[4]
+            min_child_samples = data[5]
+            metric = display_name_to_metric[data[6]]
+            node_id = data[7]
+            max_levels = data[8] if len(data) > 8 else None
+
+            filtered_data_df = self._prepare_filtered_error_analysis_data(
+                features, filters, composite_filters, metric)
+
+            # the surrogate model trained for the tree is cached by the
+            # error analyzer, so only the descendants of the node are
+            # computed again
+            nodes = self._error_analyzer.compute_error_tree_on_dataset(
+                features, filtered_data_df,
+                max_depth, num_leaves, min_child_samples,
+                use_cached_predictions=True,
+                max_levels=max_levels,
+                root_node_id=node_id)
+            return {
+                WidgetRequestResponseConstants.data: nodes
+            }
+        except Exception as e:
+            print(e)
+            traceback.print_exc()
+            e_str = _format_exception(e)
+            return {
+                WidgetRequestResponseConstants.error:
+                    "Failed to expand tree node,"
+                    "inner error: {}".format(e_str),
+                WidgetRequestResponseConstants.data: []
+            }
+
     def matrix(self, data):
         try:
             features = data[0]
@@ -218,13 +270,19 @@ class ResponsibleAIDashboardInput:
             quantile_binning = data[3]
             num_bins = data[4]
             metric = display_name_to_metric[data[5]]
+            # optionally approximate the matrix on a sample of the cohort,
+            # the exact matrix being computed in the background
+            sample_size = data[6] if len(data) > 6 else None
 
             filtered_data_df = self._prepare_filtered_error_analysis_data(
                 features, filters, composite_filters, metric)
 
             matrix = self._error_analyzer.compute_matrix_on_dataset(
                 features, filtered_data_df,
-                quantile_binning, num_bins)
+                quantile_binning, num_bins,
+                use_cached_predictions=True,
+                sample_size=sample_size,
+                refine=sample_size is not None)
             return {
                 WidgetRequestResponseConstants.data: matrix
             }
@@ -239,6 +297,57 @@ class ResponsibleAIDashboardInput:
                 WidgetRequestResponseConstants.data: []
             }
 
+    def cohort_metric(self, data):
+        try:
+            filters = data[0]
+            composite_filters = data[1]
+            metric = display_name_to_metric[data[2]] \
+                if len(data) > 2 else None
+
+            cohort_metric = self._analysis.get_cohort_metric(
+                filters, composite_filters, metric=metric)
+            return {
+                WidgetRequestResponseConstants.data: cohort_metric
+            }
+        except Exception as e:
+            print(e)
+            traceback.print_exc()
+            e_str = _format_exception(e)
+            return {
+                WidgetRequestResponseConstants.error:
+                    "Failed to compute the cohort metric on the entire "
+                    "test data, inner error: {}".format(e_str),
+                WidgetRequestResponseConstants.data: []
+            }
+
+    def cohort_heatmap(self, data):
+        try:
+            features = data[0]
+            if features[0] is None and features[1] is None:
+                return {WidgetRequestResponseConstants.data: []}
+            filters = data[1]
+            composite_filters = data[2]
+            num_bins = data[3]
+            metric = display_name_to_metric[data[4]] \
+                if len(data) > 4 else None
+
+            heatmap = self._analysis.get_cohort_heatmap(
+                features, filters, composite_filters,
+                num_bins=num_bins, metric=metric)
+            return {
+                WidgetRequestResponseConstants.data: heatmap
+            }
+        except Exception as e:
+            print(e)
+            traceback.print_exc()
+            e_str = _format_exception(e)
+            return {
+                WidgetRequestResponseConstants.error:
+                    "Failed to compute the cohort heatmap on the entire "
+                    "test data, inner error: {}".format(e_str),
+                WidgetRequestResponseConstants.data: []
+            }
+
     def importances(self):
         try:
             scores = self._error_analyzer.compute_importances()
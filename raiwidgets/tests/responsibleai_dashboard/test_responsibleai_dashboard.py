@@ -49,6 +49,8 @@ class TestResponsibleAIDashboard:
             'predict',
             'tree',
             'matrix',
+            'cohort_metric',
+            'cohort_heatmap',
             'causal_whatif',
             'global_causal_effects',
             'global_causal_policy',
@@ -47,6 +47,74 @@ class TestResponsibleAIDashboardInputClassificationErrorAnalysis(
                 WidgetRequestResponseConstants.data]) == 0
         self.check_success_criteria(flask_server_prediction_output)
 
+    def test_rai_dashboard_input_adult_matrix_sample_size(
+            self, create_rai_insights_object_classification_with_model,
+            create_rai_insights_object_classification_with_predictions,
+            with_model):
+        if with_model:
+            ri = create_rai_insights_object_classification_with_model
+        else:
+            ri = create_rai_insights_object_classification_with_predictions
+        post_data = [['Age', 'Workclass'], [], [], False, 8, "Error rate"]
+        dashboard_input = ResponsibleAIDashboardInput(ri)
+        matrix_output = dashboard_input.matrix(post_data)
+
+        # the approximate matrix is computed on a sample of the rows
+        # and the exact matrix is then returned by the background worker
+        approximate_output = dashboard_input.matrix(post_data + [100])
+        self.check_success_criteria(approximate_output)
+        exact_output = dashboard_input.matrix(post_data)
+        assert exact_output[WidgetRequestResponseConstants.data] == \
+            matrix_output[WidgetRequestResponseConstants.data]
+
+    def test_rai_dashboard_input_adult_cohort_metric(
+            self, create_rai_insights_object_classification_with_model,
+            create_rai_insights_object_classification_with_predictions,
+            with_model):
+        if with_model:
+            ri = create_rai_insights_object_classification_with_model
+        else:
+            ri = create_rai_insights_object_classification_with_predictions
+        dashboard_input = ResponsibleAIDashboardInput(ri)
+        cohort_metric_output = dashboard_input.cohort_metric(
+            [[], [], "Error rate"])
+        self.check_success_criteria(cohort_metric_output)
+        assert cohort_metric_output[WidgetRequestResponseConstants.data] == \
+            ri.get_cohort_metric([], [])
+
+        # test invalid metric throws errors
+        cohort_metric_output = dashboard_input.cohort_metric(
+            [[], [], "Error Rate"])
+        self.check_failure_criteria(
+            cohort_metric_output,
+            "Failed to compute the cohort metric on the entire test data,")
+
+    def test_rai_dashboard_input_adult_cohort_heatmap(
+            self, create_rai_insights_object_classification_with_model,
+            create_rai_insights_object_classification_with_predictions,
+            with_model):
+        if with_model:
+            ri = create_rai_insights_object_classification_with_model
+        else:
+            ri = create_rai_insights_object_classification_with_predictions
+        dashboard_input = ResponsibleAIDashboardInput(ri)
+        heatmap_output = dashboard_input.cohort_heatmap(
+            [['Age', 'Workclass'], [], [], 8, "Error rate"])
+        self.check_success_criteria(heatmap_output)
+        assert heatmap_output[WidgetRequestResponseConstants.data] == \
+            ri.get_cohort_heatmap(['Age', 'Workclass'], [], [], num_bins=8)
+
+        heatmap_output = dashboard_input.cohort_heatmap(
+            [[None, None], [], [], 8, "Error rate"])
+        assert len(heatmap_output[WidgetRequestResponseConstants.data]) == 0
+        self.check_success_criteria(heatmap_output)
+
+        heatmap_output = dashboard_input.cohort_heatmap(
+            [['Age', 'Workclass'], [], [], 8, "Error Rate"])
+        self.check_failure_criteria(
+            heatmap_output,
+            "Failed to compute the cohort heatmap on the entire test data,")
+
     def test_rai_dashboard_input_adult_matrix_failure(
             self, create_rai_insights_object_classification_with_model,
             create_rai_insights_object_classification_with_predictions,
@@ -124,6 +192,34 @@ class TestResponsibleAIDashboardInputClassificationErrorAnalysis(
 
         self.check_success_criteria(flask_server_prediction_output)
 
+    def test_rai_dashboard_input_adult_expand_tree_node(
+            self, create_rai_insights_object_classification_with_model,
+            create_rai_insights_object_classification_with_predictions,
+            with_model):
+        if with_model:
+            ri = create_rai_insights_object_classification_with_model
+        else:
+            ri = create_rai_insights_object_classification_with_predictions
+
+        features = ri.test.drop("Income", axis=1).columns.tolist()
+        tree_data = [features, [], [], 3, 8, 8, "Error rate"]
+        dashboard_input = ResponsibleAIDashboardInput(ri)
+        tree_output = dashboard_input.debug_ml(tree_data + [1])
+        self.check_success_criteria(tree_output)
+        root = tree_output[WidgetRequestResponseConstants.data][0]
+        assert len(tree_output[WidgetRequestResponseConstants.data]) == 1
+
+        node_output = dashboard_input.expand_tree_node(
+            tree_data + [root['id'], 1])
+        self.check_success_criteria(node_output)
+        children = node_output[WidgetRequestResponseConstants.data]
+        assert [child['parentId'] for child in children] == \
+            [root['id']] * 2
+
+        node_output = dashboard_input.expand_tree_node(tree_data + [-1])
+        self.check_failure_criteria(node_output,
+                                    "Failed to expand tree node,")
+
     def test_rai_dashboard_input_adult_debug_ml_failure(
             self, create_rai_insights_object_classification_with_model,
             create_rai_insights_object_classification_with_predictions,
@@ -0,0 +1,310 @@
+# Copyright (c) Microsoft Corporation
+# Licensed under the MIT License.
+
+"""Defines the columnar format used to save datasets and model outputs.
+
+The columns of a DataFrame are saved to NumPy .npy files, along with a
+manifest.json file recording the column names, dtypes and the file
+holding each column.  Numeric, boolean and datetime columns, and columns
+of short strings, are saved in the NumPy binary format, which can be
+memory-mapped on load instead of parsed.  Any other column is saved with
+pandas' JSON serialization.
+
+Adjacent numeric, boolean and datetime columns of the same dtype are
+saved together as the rows of one 2-D array, which is loaded as a single
+pandas block.  Pandas consolidates the columns of a dtype into one block
+the first time the values of the DataFrame are read, for example to
+predict on it, which would otherwise copy memory-mapped columns into
+memory.  Columns of a dtype which are split by columns of another dtype
+are still consolidated, and so copied, on first use.
+"""
+
+import json
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from responsibleai._internal.constants import (FileFormats,
+                                               SerializationAttributes)
+
+_COLUMNS = 'columns'
+_DTYPE = 'dtype'
+_FILE = 'file'
+_FORMAT_VERSION = 'format_version'
+_INDEX = 'index'
+_NAME = 'name'
+_NUM_ROWS = 'num_rows'
+_RANGE = 'range'
+_ROW = 'row'
+_STORAGE = 'storage'
+_STRING = 'string'
+_NPY = 'npy'
+_JSON = 'json'
+_COLUMNAR_FORMAT_VERSION = 2
+# kinds of numpy dtypes which are saved natively: boolean, signed and
+# unsigned integers, floating point, complex, timedelta and datetime
+_NATIVE_KINDS = 'biufcmM'
+# strings longer than this are saved as JSON since the NumPy format
+# uses fixed width strings
+_MAX_NPY_STRING_LENGTH = 256
+
+
+def remove_data(path):
+    """Removes previously saved data at the given path, if any.
+
+    :param path: The path of a file or columnar data directory.
+    :type path: pathlib.Path
+    """
+    path = Path(path)
+    if path.is_dir():
+        shutil.rmtree(path)
+    elif path.exists():
+        path.unlink()
+
+
+def is_columnar_data(directory):
+    """Returns whether the directory holds data in the columnar format.
+
+    :param directory: The directory to check.
+    :type directory: pathlib.Path
+    :return: True if the directory holds columnar data.
+    :rtype: bool
+    """
+    return (Path(directory) / SerializationAttributes.MANIFEST_JSON).exists()
+
+
+def _get_string_array(values):
+    """Get the values as a fixed width NumPy string array if possible.
+
+    :param values: The values to convert.
+    :type values: numpy.ndarray
+    :return: The string array or None if the values are not all short
+        strings.
+    :rtype: numpy.ndarray
+    """
+    if values.dtype.kind == 'U':
+        return values
+    if values.dtype != object or len(values) == 0:
+        return None
+    is_string = pd.api.types.infer_dtype(values, skipna=False) == _STRING
+    if not is_string:
+        return None
+    max_length = max(len(value) for value in values)
+    if max_length > _MAX_NPY_STRING_LENGTH:
+        return None
+    return values.astype(str)
+
+
+def _save_values(values, directory, file_stem):
+    """Saves the values of a column or index.
+
+    :param values: The values to save.
+    :type values: pandas.Series
+    :param directory: The directory to save the values in.
+    :type directory: pathlib.Path
+    :param file_stem: The name of the file without extension.
+    :type file_stem: str
+    :return: The manifest entry describing the saved values.
+    :rtype: dict
+    """
+    dtype = values.dtype
+    entry = {_DTYPE: str(dtype)}
+    array = None
+    if isinstance(dtype, np.dtype):
+        if dtype.kind in _NATIVE_KINDS:
+            array = values.to_numpy()
+        else:
+            array = _get_string_array(values.to_numpy())
+    if array is not None:
+        entry[_STORAGE] = _NPY
+        entry[_FILE] = file_stem + FileFormats.NPY
+        np.save(directory / entry[_FILE], array, allow_pickle=False)
+    else:
+        entry[_STORAGE] = _JSON
+        entry[_FILE] = file_stem + FileFormats.JSON
+        values.reset_index(drop=True).to_json(directory / entry[_FILE],
+                                              orient='split')
+    return entry
+
+
+def _load_values(directory, entry, mmap_mode):
+    """Loads the values of a column or index.
+
+    :param directory: The directory holding the values.
+    :type directory: pathlib.Path
+    :param entry: The manifest entry describing the saved values.
+    :type entry: dict
+    :param mmap_mode: The memory-map mode for NumPy files, or None to
+        read them fully into memory.
+    :type mmap_mode: str
+    :return: The loaded values.
+    :rtype: numpy.ndarray or pandas.api.extensions.ExtensionArray
+    """
+    file_path = directory / entry[_FILE]
+    dtype = entry[_DTYPE]
+    if entry[_STORAGE] == _NPY:
+        values = np.load(file_path, mmap_mode=mmap_mode, allow_pickle=False)
+        if values.dtype.kind == 'U':
+            values = values.astype(object)
+        return values
+    values = pd.read_json(file_path, typ='series', orient='split',
+                          dtype=False)
+    return values.astype(dtype).array
+
+
+def _get_block_runs(df):
+    """Get the runs of adjacent columns saved together as a 2-D array.
+
+    :param df: The DataFrame to save.
+    :type df: pandas.DataFrame
+    :return: The positions of the columns of each run, in order.  Columns
+        which are not saved in a 2-D array are runs of their own.
+    :rtype: list[list[int]]
+    """
+    runs = []
+    previous_dtype = None
+    for position, dtype in enumerate(df.dtypes):
+        is_native = isinstance(dtype, np.dtype) and \
+            dtype.kind in _NATIVE_KINDS
+        if is_native and previous_dtype is not None and \
+                dtype == previous_dtype:
+            runs[-1].append(position)
+        else:
+            runs.append([position])
+        previous_dtype = dtype if is_native else None
+    return runs
+
+
+def save_dataframe(df, directory):
+    """Saves the DataFrame in the columnar format.
+
+    :param df: The DataFrame to save.
+    :type df: pandas.DataFrame
+    :param directory: The directory to save the DataFrame in.
+    :type directory: pathlib.Path
+    """
+    directory = Path(directory)
+    remove_data(directory)
+    directory.mkdir(parents=True)
+    columns = []
+    for run in _get_block_runs(df):
+        if len(run) == 1:
+            entry = _save_values(df.iloc[:, run[0]], directory,
+                                 'column_{}'.format(run[0]))
+            entry[_NAME] = df.columns[run[0]]
+            columns.append(entry)
+            continue
+        file_name = 'columns_{}_{}{}'.format(run[0], run[-1],
+                                             FileFormats.NPY)
+        # each column is a contiguous row, as in a pandas block
+        block = np.stack([df.iloc[:, position].to_numpy()
+                          for position in run])
+        np.save(directory / file_name, block, allow_pickle=False)
+        for row, position in enumerate(run):
+            columns.append({
+                _NAME: df.columns[position],
+                _DTYPE: str(df.dtypes.iloc[position]),
+                _STORAGE: _NPY,
+                _FILE: file_name,
+                _ROW: row
+            })
+    if isinstance(df.index, pd.RangeIndex):
+        index = {_RANGE: [df.index.start, df.index.stop, df.index.step]}
+    else:
+        index = _save_values(df.index.to_series(), directory, _INDEX)
+    index[_NAME] = df.index.name
+    manifest = {
+        _FORMAT_VERSION: _COLUMNAR_FORMAT_VERSION,
+        _NUM_ROWS: len(df),
+        _COLUMNS: columns,
+        _INDEX: index
+    }
+    with open(directory / SerializationAttributes.MANIFEST_JSON, 'w') as file:
+        json.dump(manifest, file)
+
+
+def load_dataframe(directory, mmap_mode=None):
+    """Loads a DataFrame saved in the columnar format.
+
+    :param directory: The directory the DataFrame was saved in.
+    :type directory: pathlib.Path
+    :param mmap_mode: The memory-map mode for NumPy files, for example
+        'r', or None to read them fully into memory.
+    :type mmap_mode: str
+    :return: The loaded DataFrame.
+    :rtype: pandas.DataFrame
+    """
+    directory = Path(directory)
+    with open(directory / SerializationAttributes.MANIFEST_JSON, 'r') as file:
+        manifest = json.load(file)
+    index_entry = manifest[_INDEX]
+    if _RANGE in index_entry:
+        index = pd.RangeIndex(*index_entry[_RANGE],
+                              name=index_entry[_NAME])
+    else:
+        index = pd.Index(_load_values(directory, index_entry, mmap_mode),
+                         name=index_entry[_NAME])
+    columns = manifest[_COLUMNS]
+    frames = []
+    position = 0
+    while position < len(columns):
+        entry = columns[position]
+        if _ROW not in entry:
+            frames.append(pd.DataFrame(
+                {position: _load_values(directory, entry, mmap_mode)},
+                index=index, copy=False))
+            position += 1
+            continue
+        block = np.load(directory / entry[_FILE], mmap_mode=mmap_mode,
+                        allow_pickle=False)
+        # the transpose is a view which pandas keeps as a single block
+        frames.append(pd.DataFrame(
+            block.T, index=index,
+            columns=range(position, position + len(block)), copy=False))
+        position += len(block)
+    if not frames:
+        df = pd.DataFrame(index=index)
+    elif len(frames) == 1:
+        df = frames[0]
+    else:
+        df = pd.concat(frames, axis=1, copy=False)
+    df.columns = pd.Index([entry[_NAME] for entry in columns])
+    return df
+
+
+def can_save_array(array):
+    """Returns whether the array can be saved in the NumPy format.
+
+    :param array: The array to check.
+    :type array: numpy.ndarray
+    :return: True if the array holds numbers, booleans, dates or strings.
+    :rtype: bool
+    """
+    return np.asarray(array).dtype.kind in _NATIVE_KINDS + 'U'
+
+
+def save_array(array, file_path):
+    """Saves a NumPy array of model outputs.
+
+    :param array: The array to save.
+    :type array: numpy.ndarray
+    :param file_path: The path of the .npy file to save the array to.
+    :type file_path: pathlib.Path
+    """
+    np.save(file_path, np.asarray(array), allow_pickle=False)
+
+
+def load_array(file_path, mmap_mode=None):
+    """Loads a NumPy array of model outputs.
+
+    :param file_path: The path of the .npy file the array was saved to.
+    :type file_path: pathlib.Path
+    :param mmap_mode: The memory-map mode, for example 'r', or None to
+        read the array fully into memory.
+    :type mmap_mode: str
+    :return: The loaded array.
+    :rtype: numpy.ndarray
+    """
+    return np.load(file_path, mmap_mode=mmap_mode, allow_pickle=False)
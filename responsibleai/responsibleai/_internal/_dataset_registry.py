@@ -0,0 +1,277 @@
+# Copyright (c) Microsoft Corporation
+# Licensed under the MIT License.
+
+"""Defines the DatasetRegistry sharing the datasets across the managers.
+
+The train and test datasets are held once by the registry, and the
+managers are handed views of a subset of their columns which share the
+memory of the registered datasets instead of copies, whenever pandas
+can hold the view without copying it.  The values of the views are
+read-only, so that writing to them, for example in a model predicting
+on a view, raises instead of writing to the registered datasets.
+"""
+
+import numpy as np
+import pandas as pd
+
+DATASETS = 'datasets'
+BYTES = 'bytes'
+
+
+def _get_root_array(values):
+    """Get the array owning the memory viewed by an array.
+
+    :param values: The array.
+    :type values: numpy.ndarray
+    :return: The last array in the chain of bases of the array.
+    :rtype: numpy.ndarray
+    """
+    while isinstance(values.base, np.ndarray):
+        values = values.base
+    return values
+
+
+def _get_strided_values(arrays):
+    """Get a 2-D view of columns equally spaced in the same memory.
+
+    pandas holds the columns of a dtype as the rows of a 2-D array, so
+    the columns of a dtype which remain when the excluded columns are at
+    the ends of the rows, or every other row, are equally spaced.
+
+    :param arrays: The values of the columns.
+    :type arrays: list[numpy.ndarray]
+    :return: The read-only view with a row for each column, or None if
+        the columns are not equally spaced in the memory of the same
+        array.
+    :rtype: numpy.ndarray
+    """
+    first = arrays[0]
+    for values in arrays:
+        if not isinstance(values, np.ndarray) or values.ndim != 1 or \
+                values.dtype != first.dtype or values.dtype.hasobject or \
+                values.strides != first.strides or \
+                len(values) != len(first):
+            return None
+    root = _get_root_array(first)
+    low, high = np.byte_bounds(root)
+    addresses = [values.__array_interface__['data'][0] for values in arrays]
+    step = addresses[1] - addresses[0] if len(arrays) > 1 else 0
+    for values, address, position in zip(arrays, addresses,
+                                         range(len(arrays))):
+        values_low, values_high = np.byte_bounds(values)
+        if _get_root_array(values) is not root or \
+                address != addresses[0] + position * step or \
+                values_low < low or values_high > high:
+            return None
+    return np.lib.stride_tricks.as_strided(
+        first, shape=(len(arrays), len(first)),
+        strides=(step, first.strides[0]), writeable=False)
+
+
+def _get_consolidated_view(dataset, columns):
+    """Get a view of the columns holding a single block for each dtype.
+
+    pandas copies the columns of a dtype held in separate blocks into a
+    single block when the DataFrame is consolidated, for example to get
+    its values, so the view of each dtype is built from a 2-D view of the
+    columns instead.  Columns of extension types are held in blocks of
+    their own, which are never consolidated.  The categorical columns
+    view the read-only codes of the dataset, and the columns of other
+    extension types are copied, since their values cannot be made
+    read-only.
+
+    :param dataset: The dataset.
+    :type dataset: pandas.DataFrame
+    :param columns: The names of the columns of the view.
+    :type columns: list[str]
+    :return: The view, or None if a dtype appears in several runs of
+        consecutive columns or its columns are not equally spaced.
+    :rtype: pandas.DataFrame
+    """
+    runs = []
+    for column in columns:
+        values = dataset[column].values
+        if runs and isinstance(values, np.ndarray) and \
+                isinstance(runs[-1][1][-1], np.ndarray) and \
+                values.dtype == runs[-1][1][-1].dtype:
+            runs[-1][0].append(column)
+            runs[-1][1].append(values)
+        else:
+            runs.append(([column], [values]))
+    frames = []
+    dtypes = set()
+    for run_columns, run_values in runs:
+        if not isinstance(run_values[0], np.ndarray):
+            values = run_values[0]
+            if isinstance(values, pd.Categorical):
+                values = pd.Categorical.from_codes(values.codes,
+                                                   dtype=values.dtype)
+            else:
+                values = values.copy()
+            frames.append(pd.DataFrame({run_columns[0]: values},
+                                       index=dataset.index, copy=False))
+            continue
+        values = _get_strided_values(run_values)
+        if values is None or values.dtype in dtypes:
+            return None
+        dtypes.add(values.dtype)
+        frames.append(pd.DataFrame(values.T, index=dataset.index,
+                                   columns=run_columns, copy=False))
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(frames, axis=1, copy=False)
+
+
+def get_column_view(dataset, exclude_columns=None):
+    """Get a view of the dataset without the given columns.
+
+    Unlike DataFrame.drop, the columns of the view share the memory of
+    the dataset instead of being copied, when the remaining columns of
+    each dtype are equally spaced in memory, such as when the excluded
+    columns are the first or last columns of their dtype.  The values of
+    the view are then read-only, and writing to them raises a ValueError
+    rather than modifying the dataset.  Otherwise,
+    the columns are copied by DataFrame.drop, since a view holding the
+    columns of a dtype in separate blocks would be copied, column by
+    column, each time pandas consolidates it to get its values.
+
+    :param dataset: The dataset.
+    :type dataset: pandas.DataFrame
+    :param exclude_columns: The names of the columns to exclude, or None
+        to exclude none.
+    :type exclude_columns: list[str]
+    :return: The dataset itself if no column is excluded, otherwise a new
+        DataFrame viewing or copying the remaining columns.
+    :rtype: pandas.DataFrame
+    """
+    if not exclude_columns:
+        return dataset
+    missing_columns = set(exclude_columns) - set(dataset.columns)
+    if missing_columns:
+        # raise the same error as DataFrame.drop
+        dataset.drop(columns=list(missing_columns))
+    if not dataset.columns.is_unique:
+        # duplicate columns cannot be gathered by name
+        return dataset.drop(columns=exclude_columns)
+    columns = [column for column in dataset.columns
+               if column not in exclude_columns]
+    view = None
+    if columns:
+        view = _get_consolidated_view(dataset, columns)
+    if view is None:
+        return dataset.drop(columns=exclude_columns)
+    view.columns.name = dataset.columns.name
+    return view
+
+
+def _get_buffer_key(values):
+    """Get a key identifying the memory holding the values of a column.
+
+    A view of the first rows of a column starts at the same address with
+    the same stride as the column, and so has the same key.
+
+    :param values: The values of the column.
+    :type values: numpy.ndarray or pandas.api.extensions.ExtensionArray
+    :return: The key identifying the memory.
+    :rtype: tuple
+    """
+    if isinstance(values, pd.Categorical):
+        values = values.codes
+    if isinstance(values, np.ndarray):
+        return (values.__array_interface__['data'][0], values.strides,
+                values.dtype.str)
+    return (id(values),)
+
+
+def _get_column_buffers(dataset):
+    """Get the memory held by the columns and the index of a dataset.
+
+    :param dataset: The dataset.
+    :type dataset: pandas.DataFrame
+    :return: The key identifying the memory of each column and of the
+        index, with its size in bytes.
+    :rtype: list[tuple[tuple, int]]
+    """
+    buffers = []
+    for position in range(dataset.shape[1]):
+        column = dataset.iloc[:, position]
+        buffers.append((_get_buffer_key(column.values),
+                        column.memory_usage(index=False, deep=True)))
+    index = dataset.index
+    if isinstance(index, pd.RangeIndex):
+        # the values of a range index are not held in memory
+        index_key = (index.start, index.step)
+    else:
+        index_key = _get_buffer_key(index.values)
+    buffers.append((index_key, index.memory_usage(deep=True)))
+    return buffers
+
+
+class DatasetRegistry(object):
+    """Holds the datasets of the RAIInsights shared by its managers.
+
+    Each registered dataset is held once.  Views of a subset of its
+    columns, such as the features without the dropped features or the
+    target column, are gathered from the columns of the registered
+    dataset without copying them where get_column_view can.
+    """
+
+    def __init__(self):
+        self._datasets = {}
+
+    def __contains__(self, name):
+        return name in self._datasets
+
+    def register(self, name, dataset):
+        """Registers a dataset under the given name.
+
+        :param name: The name of the dataset, for example 'train'.
+        :type name: str
+        :param dataset: The dataset, or None to unregister the name.
+        :type dataset: pandas.DataFrame
+        """
+        if dataset is None:
+            self._datasets.pop(name, None)
+        else:
+            self._datasets[name] = dataset
+
+    def get(self, name, exclude_columns=None):
+        """Get a view of a registered dataset.
+
+        :param name: The name of the dataset.
+        :type name: str
+        :param exclude_columns: The names of the columns to exclude from
+            the view, or None to get the registered dataset itself.
+        :type exclude_columns: list[str]
+        :return: The view of the dataset.
+        :rtype: pandas.DataFrame
+        """
+        return get_column_view(self._datasets[name], exclude_columns)
+
+    def get_memory_usage(self, other_datasets=None):
+        """Get the bytes held by the registered datasets.
+
+        Memory shared between the datasets, such as a dataset registered
+        with a view of the first rows of another one, is only counted
+        once in the total, except for the columns of extension types
+        other than categorical.
+
+        :param other_datasets: The datasets held outside of the registry
+            by name, such as the datasets held by the managers, which are
+            counted with the registered datasets.
+        :type other_datasets: dict
+        :return: The bytes held by each dataset and in total.
+        :rtype: dict
+        """
+        all_datasets = dict(self._datasets)
+        all_datasets.update(other_datasets or {})
+        datasets = {}
+        buffers = {}
+        for name, dataset in all_datasets.items():
+            dataset_bytes = 0
+            for key, nbytes in _get_column_buffers(dataset):
+                dataset_bytes += nbytes
+                buffers[key] = max(buffers.get(key, 0), nbytes)
+            datasets[name] = int(dataset_bytes)
+        return {DATASETS: datasets,
+                BYTES: int(sum(buffers.values()))}
@@ -0,0 +1,419 @@
+# Copyright (c) Microsoft Corporation
+# Licensed under the MIT License.
+
+"""Defines the LargeDataStore evaluating cohorts on the entire test data.
+
+The test data is read chunk by chunk, so that it can be memory-mapped
+from the columnar format, for example after RAIInsights.load with a
+mmap_mode, without holding more than a chunk of each column in memory.
+Cohort filters are compiled into boolean masks over each chunk, and the
+metrics of a cohort or of the cells of a heatmap are computed from
+sufficient statistics which are merged across the chunks, so that they
+reflect all the rows rather than a sample.
+"""
+
+import numpy as np
+import pandas as pd
+
+from erroranalysis._internal.bin_cache import FeatureBins
+from erroranalysis._internal.cohort_filter import FilterDataWithCohortFilters
+from erroranalysis._internal.cohort_mask_cache import (CohortMaskCache,
+                                                       get_cohort_key)
+from erroranalysis._internal.constants import (MatrixParams, Metrics, RootKeys,
+                                               metric_to_display_name)
+from erroranalysis._internal.matrix_filter import (
+    bin_data, get_cell_values_from_statistics, matrix_from_cells)
+from erroranalysis._internal.metric_statistics import (
+    BINARY_METRICS, compute_metric_statistics, is_statistics_metric)
+from erroranalysis._internal.metrics import (get_ordered_classes,
+                                             is_multi_agg_metric)
+from raiutils.exceptions import UserConfigValidationException
+from raiutils.models import ModelTask
+
+DEFAULT_CHUNK_SIZE = 100000
+
+
+class LargeDataStore(object):
+    """Evaluates cohort filters, metrics and heatmaps chunk by chunk.
+
+    :param dataset: The features of the test data, which may be backed
+        by memory-mapped columns.
+    :type dataset: pandas.DataFrame
+    :param true_y: The labels of the test data.
+    :type true_y: numpy.ndarray
+    :param pred_y: The cached predictions of the model on the test data.
+    :type pred_y: numpy.ndarray
+    :param categorical_features: The categorical features.
+    :type categorical_features: list[str]
+    :param categories: The categories of each categorical feature, which
+        the arguments of the categorical cohort filters index into.
+    :type categories: list[list]
+    :param model_task: Either 'classification' or 'regression'.
+    :type model_task: str
+    :param classes: The class labels for classification.
+    :type classes: list
+    :param chunk_size: The number of rows read at once.
+    :type chunk_size: int
+    """
+
+    def __init__(self, dataset, true_y, pred_y, categorical_features,
+                 categories, model_task, classes=None,
+                 chunk_size=DEFAULT_CHUNK_SIZE):
+        if model_task not in (ModelTask.CLASSIFICATION,
+                              ModelTask.REGRESSION):
+            raise UserConfigValidationException(
+                "Cohorts on the entire test data are only supported for "
+                "classification and regression")
+        self.dataset = dataset
+        self.true_y = np.asarray(true_y)
+        self.pred_y = None if pred_y is None else np.asarray(pred_y)
+        self.features = list(dataset.columns)
+        self.categorical_features = categorical_features
+        self.categories = categories
+        self.model_task = model_task
+        self.classes = classes
+        self.chunk_size = chunk_size
+        self._cohort_mask_cache = CohortMaskCache()
+        self._feature_bins = {}
+        self._labels = None
+        self._center = None
+
+    @property
+    def num_rows(self):
+        """Get the number of rows of the test data.
+
+        :return: The number of rows.
+        :rtype: int
+        """
+        return len(self.dataset)
+
+    def get_cohort_cache_stats(self):
+        """Get the usage statistics of the cache of filtered cohorts.
+
+        :return: The hits, misses, hit rate, number of entries and
+            bytes held by the cache.
+        :rtype: dict
+        """
+        return self._cohort_mask_cache.get_stats()
+
+    def get_filtered_row_indexes(self, filters, composite_filters):
+        """Get the positions of the rows selected by the cohort filters.
+
+        The rows of each cohort are cached, so that further requests on
+        the same cohort do not filter the test data again.
+
+        :param filters: The filters.
+        :type filters: list[dict]
+        :param composite_filters: The composite filters.
+        :type composite_filters: list[dict]
+        :return: The positions of the selected rows.
+        :rtype: numpy.ndarray
+        """
+        key = get_cohort_key(filters, composite_filters)
+        row_indexes = self._cohort_mask_cache.get(key)
+        if row_indexes is not None:
+            return row_indexes
+        if not filters and not composite_filters:
+            row_indexes = np.arange(self.num_rows)
+        else:
+            row_indexes = [
+                start + np.flatnonzero(cohort_filter.get_filter_mask(
+                    filters, composite_filters))
+                for start, cohort_filter in self._iterate_cohort_filters()]
+            row_indexes = np.concatenate(row_indexes) \
+                if row_indexes else np.empty(0, dtype=np.int64)
+        return self._cohort_mask_cache.put(key, row_indexes)
+
+    def compute_cohort_metric(self, filters, composite_filters,
+                              metric=None):
+        """Compute the metric of a cohort on all its rows.
+
+        :param filters: The filters.
+        :type filters: list[dict]
+        :param composite_filters: The composite filters.
+        :type composite_filters: list[dict]
+        :param metric: The metric, by default the error rate for
+            classification and the mean squared error for regression.
+        :type metric: str
+        :return: The metric name and value and the number of rows of the
+            cohort.
+        :rtype: dict
+        """
+        metric = self._validate_metric(metric)
+        row_indexes = self.get_filtered_row_indexes(filters,
+                                                    composite_filters)
+        group_ids = np.zeros(len(row_indexes), dtype=np.int64)
+        count, value = self._compute_cell_values(row_indexes, group_ids, 1,
+                                                 metric)
+        count = int(count[0])
+        if metric == Metrics.ERROR_RATE:
+            metric_value = float(value[0]) / count if count else 0.0
+        elif is_multi_agg_metric(metric):
+            metric_value = float(value[0][0])
+        else:
+            metric_value = float(value[0])
+        return {RootKeys.METRIC_NAME.value: metric_to_display_name[metric],
+                RootKeys.METRIC_VALUE.value: metric_value,
+                RootKeys.TOTAL_SIZE.value: count}
+
+    def compute_matrix(self, features, filters, composite_filters,
+                       num_bins=MatrixParams.BIN_THRESHOLD, metric=None):
+        """Compute the heatmap of a cohort on all its rows.
+
+        The numeric features are split into equal width bins over the
+        range of the feature on the entire test data, so that the bins
+        are the same for every cohort.
+
+        :param features: One or two feature names.
+        :type features: list[str]
+        :param filters: The filters.
+        :type filters: list[dict]
+        :param composite_filters: The composite filters.
+        :type composite_filters: list[dict]
+        :param num_bins: The number of bins of the numeric features.
+        :type num_bins: int
+        :param metric: The metric, by default the error rate for
+            classification and the mean squared error for regression.
+        :type metric: str
+        :return: The heatmap, in the format of the error analysis
+            heatmap.
+        :rtype: dict
+        """
+        features = [feature for feature in features if feature is not None]
+        if len(features) == 0 or len(features) > 2:
+            raise UserConfigValidationException(
+                "Expecting one or two features for the heatmap")
+        for feature in features:
+            if feature not in self.features:
+                raise UserConfigValidationException(
+                    'Feature {} not found in dataset. Existing features: '
+                    '{}'.format(feature, self.features))
+        metric = self._validate_metric(metric)
+        feature_bins = [self._get_feature_bins(feature, num_bins)
+                        for feature in features]
+        row_indexes = self.get_filtered_row_indexes(filters,
+                                                    composite_filters)
+        num_cells = 1
+        for bins in feature_bins:
+            num_cells *= len(bins.categories)
+
+        def get_cell_ids(chunk_rows):
+            cell_ids = np.zeros(len(chunk_rows), dtype=np.int64)
+            outside = np.zeros(len(chunk_rows), dtype=bool)
+            for feature, bins in zip(features, feature_bins):
+                values = self.dataset[feature].iloc[chunk_rows]
+                codes = bins.get_codes(values)
+                cell_ids = cell_ids * len(bins.categories) + codes
+                outside |= codes < 0
+            cell_ids[outside] = -1
+            return cell_ids
+
+        counts, cell_values = self._compute_cell_values(
+            row_indexes, get_cell_ids, num_cells, metric)
+        categories2 = None
+        if len(feature_bins) == 2:
+            categories2 = feature_bins[1].categories
+        return matrix_from_cells(feature_bins[0].categories, categories2,
+                                 counts, cell_values, metric)
+
+    def _validate_metric(self, metric):
+        """Validate that the metric can be computed chunk by chunk.
+
+        :param metric: The metric, or None for the default metric.
+        :type metric: str
+        :return: The metric.
+        :rtype: str
+        """
+        is_classification = self.model_task == ModelTask.CLASSIFICATION
+        if metric is None:
+            metric = Metrics.ERROR_RATE if is_classification \
+                else Metrics.MEAN_SQUARED_ERROR
+        if self.pred_y is None:
+            raise UserConfigValidationException(
+                "The predictions of the model are required to compute "
+                "metrics on the entire test data")
+        if metric == Metrics.ERROR_RATE and is_classification:
+            return metric
+        if not is_statistics_metric(metric) or \
+                (metric in BINARY_METRICS and len(self._get_labels()) != 2):
+            raise UserConfigValidationException(
+                "The metric {} is not supported on the entire test "
+                "data".format(metric))
+        return metric
+
+    def _iterate_cohort_filters(self):
+        """Iterate over the cohort filters of the chunks of the test data.
+
+        :return: The position of the first row of each chunk and the
+            object used to filter the chunk.
+        :rtype: Iterator[tuple[int, FilterDataWithCohortFilters]]
+        """
+        for start in range(0, self.num_rows, self.chunk_size):
+            end = start + self.chunk_size
+            pred_y = None if self.pred_y is None else self.pred_y[start:end]
+            yield start, FilterDataWithCohortFilters(
+                model=None,
+                dataset=self.dataset.iloc[start:end],
+                features=self.features,
+                categorical_features=self.categorical_features,
+                categories=self.categories,
+                true_y=self.true_y[start:end],
+                pred_y=pred_y,
+                model_task=self.model_task,
+                classes=self.classes,
+                row_offset=start)
+
+    def _iterate_row_chunks(self, row_indexes):
+        """Split sorted row positions into the chunks of the test data.
+
+        :param row_indexes: The sorted positions of the rows.
+        :type row_indexes: numpy.ndarray
+        :return: The positions of the rows of each chunk.
+        :rtype: Iterator[numpy.ndarray]
+        """
+        bounds = np.searchsorted(
+            row_indexes, np.arange(0, self.num_rows + self.chunk_size,
+                                   self.chunk_size))
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            if end > start:
+                yield row_indexes[start:end]
+
+    def _compute_cell_values(self, row_indexes, group_ids, num_cells,
+                             metric):
+        """Compute the count and metric value of each cell chunk by chunk.
+
+        :param row_indexes: The sorted positions of the rows.
+        :type row_indexes: numpy.ndarray
+        :param group_ids: The cell of each row, or a function returning
+            the cell of the rows at the given positions.
+        :type group_ids: numpy.ndarray or Callable
+        :param num_cells: The number of cells.
+        :type num_cells: int
+        :param metric: The metric.
+        :type metric: str
+        :return: The number of rows of each cell, along with the number
+            of errors of each cell for the error rate, or the metric value
+            of each cell as computed by compute_cell_values.
+        :rtype: tuple(numpy.ndarray, numpy.ndarray)
+        """
+        counts = np.zeros(num_cells, dtype=np.int64)
+        errors = np.zeros(num_cells, dtype=np.int64)
+        statistics = None
+        labels = None
+        if self.model_task == ModelTask.CLASSIFICATION:
+            labels = self._get_labels()
+        center = self._get_center()
+        offset = 0
+        for chunk_rows in self._iterate_row_chunks(row_indexes):
+            if callable(group_ids):
+                cell_ids = group_ids(chunk_rows)
+            else:
+                cell_ids = group_ids[offset:offset + len(chunk_rows)]
+            offset += len(chunk_rows)
+            true_y = self.true_y[chunk_rows]
+            pred_y = self.pred_y[chunk_rows]
+            in_cell = cell_ids >= 0
+            counts += np.bincount(cell_ids[in_cell], minlength=num_cells)
+            if metric == Metrics.ERROR_RATE:
+                errors += np.bincount(cell_ids[in_cell],
+                                      weights=(true_y != pred_y)[in_cell],
+                                      minlength=num_cells).astype(np.int64)
+                continue
+            chunk_statistics = compute_metric_statistics(
+                cell_ids, num_cells, true_y, pred_y, metric,
+                labels=labels, center=center)
+            if statistics is None:
+                statistics = chunk_statistics
+            else:
+                statistics.merge(chunk_statistics)
+        if metric == Metrics.ERROR_RATE:
+            return counts, errors
+        if statistics is None:
+            statistics = compute_metric_statistics(
+                np.empty(0, dtype=np.int64), num_cells,
+                self.true_y[:0], self.pred_y[:0], metric, labels=labels,
+                center=center)
+        return counts, get_cell_values_from_statistics(statistics, metric)
+
+    def _get_labels(self):
+        """Get the ordered class labels of the entire test data.
+
+        :return: The ordered class labels.
+        :rtype: list
+        """
+        if self._labels is None:
+            true_labels = set()
+            pred_labels = set()
+            for start in range(0, self.num_rows, self.chunk_size):
+                end = start + self.chunk_size
+                true_labels.update(np.unique(self.true_y[start:end]))
+                pred_labels.update(np.unique(self.pred_y[start:end]))
+            self._labels = get_ordered_classes(
+                self.classes, np.array(list(true_labels)),
+                np.array(list(pred_labels)))
+        return self._labels
+
+    def _get_center(self):
+        """Get the mean of the labels the regression statistics use.
+
+        :return: The mean of the labels, or None for classification.
+        :rtype: float
+        """
+        if self.model_task != ModelTask.REGRESSION:
+            return None
+        if self._center is None:
+            total = 0.0
+            for start in range(0, self.num_rows, self.chunk_size):
+                total += np.sum(self.true_y[start:start + self.chunk_size],
+                                dtype=float)
+            self._center = total / self.num_rows if self.num_rows else 0.0
+        return self._center
+
+    def _get_feature_bins(self, feature, num_bins):
+        """Get the heatmap categories of a feature on the entire test data.
+
+        Numeric features with more unique values than the number of bins
+        are binned by equal width over their range, other features are
+        grouped by their unique values.
+
+        :param feature: The feature name.
+        :type feature: str
+        :param num_bins: The number of bins.
+        :type num_bins: int
+        :return: The categories of the feature.
+        :rtype: FeatureBins
+        """
+        key = (feature, num_bins)
+        if key in self._feature_bins:
+            return self._feature_bins[key]
+        is_categorical = bool(self.categorical_features) and \
+            feature in self.categorical_features
+        column = self.dataset[feature]
+        unique_values = set()
+        min_value = None
+        max_value = None
+        for start in range(0, self.num_rows, self.chunk_size):
+            values = column.iloc[start:start + self.chunk_size]
+            if unique_values is not None:
+                unique_values.update(values.unique())
+                if not is_categorical and len(unique_values) > num_bins:
+                    # the feature is binned, its unique values are not
+                    # needed anymore
+                    unique_values = None
+            if not is_categorical and len(values) > 0:
+                chunk_min = values.min()
+                chunk_max = values.max()
+                min_value = chunk_min if min_value is None \
+                    else min(min_value, chunk_min)
+                max_value = chunk_max if max_value is None \
+                    else max(max_value, chunk_max)
+        if unique_values is not None:
+            categories = np.unique(np.array(list(unique_values)))
+        else:
+            # equal width bins only depend on the range of the values
+            value_range = pd.DataFrame({feature: [min_value, max_value]})
+            categories = bin_data(value_range, feature,
+                                  num_bins).cat.categories
+        feature_bins = FeatureBins(categories)
+        self._feature_bins[key] = feature_bins
+        return feature_bins
@@ -82,6 +82,8 @@ class DataBalanceManagerKeys(object):
     COLS_OF_INTEREST = 'cols_of_interest'
     TARGET_COLUMN = 'target_column'
     CLASSES = 'classes'
+    TOP_K_PAIRS = 'top_k_pairs'
+    GAP_THRESHOLD = 'gap_threshold'
 
 
 class ExplanationKeys(object):
@@ -129,15 +131,25 @@ class SerializationAttributes:
 
     # Data filenames
     LARGE_TEST_JSON = "large_test.json"
+    LARGE_TEST = "large_test"
+    TEST_SAMPLE_JSON = "test_sample.json"
+    MANIFEST_JSON = "manifest.json"
 
 
 class FileFormats:
     """Constants relating to file formats."""
     JSON = '.json'
+    NPY = '.npy'
     PKL = '.pkl'
     TXT = '.txt'
 
 
+class DataFormats:
+    """Constants for the formats the data can be saved in."""
+    JSON = 'json'
+    NPY = 'npy'
+
+
 class ModelServingConstants:
     """Constants relevant for model serving."""
     RAI_MODEL_SERVING_PORT_ENV_VAR = "RAI_MODEL_SERVING_PORT"
@@ -4,11 +4,13 @@
 """Tools to help understand imbalance and potential bias in data."""
 
 from .aggregate_balance_measures import AggregateBalanceMeasures
+from .data_balance_counts import DataBalanceCounts
 from .distribution_balance_measures import DistributionBalanceMeasures
 from .feature_balance_measures import FeatureBalanceMeasures
 
 __all__ = [
     "AggregateBalanceMeasures",
+    "DataBalanceCounts",
     "FeatureBalanceMeasures",
     "DistributionBalanceMeasures",
 ]
@@ -164,12 +164,29 @@ class AggregateBalanceMeasures(BalanceMeasures):
             columns of interest.
         :rtype: pd.DataFrame
         """
-        aggregate_measures_dict = {}
         benefits = (
             dataset.groupby(self.cols_of_interest).size() / dataset.shape[0]
         )
+        return AggregateBalanceMeasures._get_aggregate_measures(benefits)
+
+    @staticmethod
+    def _get_aggregate_measures(benefits: pd.Series) -> pd.DataFrame:
+        """
+        Returns aggregate balance measures from the probabilities of each
+        combination of values of the columns of interest.
 
-        for measure, func in self.AGGREGATE_METRICS.items():
+        :param benefits: The probabilities of each feature value combination
+            occurring in the data.
+        :type benefits: pd.Series
+        :return: A pandas DataFrame that contains the names and values of
+            aggregate balance measures.
+        :rtype: pd.DataFrame
+        """
+        aggregate_measures_dict = {}
+        for (
+            measure,
+            func,
+        ) in AggregateBalanceMeasures.AGGREGATE_METRICS.items():
             aggregate_measures_dict[measure.value] = [func(benefits)]
 
         aggregate_measures = pd.DataFrame.from_dict(aggregate_measures_dict)
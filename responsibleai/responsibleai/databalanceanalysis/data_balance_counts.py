@@ -0,0 +1,320 @@
+# Copyright (c) Microsoft Corporation
+# Licensed under the MIT License.
+
+"""Defines the mergeable row counts that data balance measures depend on."""
+
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from responsibleai.databalanceanalysis.aggregate_balance_measures import \
+    AggregateBalanceMeasures
+from responsibleai.databalanceanalysis.distribution_balance_measures import \
+    DistributionBalanceMeasures
+from responsibleai.databalanceanalysis.feature_balance_measures import (
+    ContingencyTable, FeatureBalanceMeasures)
+
+
+def _merge_counts(counts: Optional[pd.DataFrame],
+                  other_counts: pd.DataFrame) -> pd.DataFrame:
+    """
+    Adds the counts of two DataFrames indexed by the values counted,
+    keeping the values in order of first appearance.
+
+    :param counts: The counts to add to, or None if there are none yet.
+    :type counts: Optional[pd.DataFrame]
+    :param other_counts: The counts to add.
+    :type other_counts: pd.DataFrame
+    :return: The sum of the counts.
+    :rtype: pd.DataFrame
+    """
+    if counts is None:
+        return other_counts
+    index = counts.index
+    return pd.concat([counts, other_counts]).groupby(
+        level=list(range(index.nlevels)), sort=False).sum()
+
+
+def _infer_values(index: pd.Index) -> np.ndarray:
+    """
+    Returns the values of an index with the dtype that a column of these
+    values would have, since the indexes of the chunks can differ.
+
+    :param index: The index of the values.
+    :type index: pd.Index
+    :return: The values.
+    :rtype: np.ndarray
+    """
+    return pd.Series(index.to_list(), dtype=object).infer_objects().values
+
+
+class DataBalanceCounts(object):
+    """
+    Counts the rows of a dataset by value of the columns of interest and by
+    label, which are all that the data balance measures depend on.
+
+    The counts are updated with one chunk of the dataset at a time, for
+    example from pd.read_csv with a chunksize, and the counts of separate
+    shards of a dataset can be merged, so that the measures of datasets
+    larger than memory can be computed. The measures are the same as
+    those computed on the whole dataset at once.
+    """
+
+    def __init__(
+        self, cols_of_interest: List[str], label_col: str,
+        pos_labels: List[str]
+    ) -> None:
+        """
+        Construct a DataBalanceCounts class for counting the rows of a
+        dataset in chunks.
+
+        :param cols_of_interest: The list of columns to compute
+            data balance measures on.
+        :type cols_of_interest: List[str]
+        :param label_col: The name of the label column.
+        :type label_col: str
+        :param pos_labels: The label values to compute the feature balance
+            measures for, each considered in turn as the positive label.
+        :type pos_labels: List[str]
+        """
+        self.cols_of_interest = cols_of_interest
+        self.label_col = label_col
+        self.pos_labels = pos_labels
+        self._label_index = FeatureBalanceMeasures._get_label_index(
+            pos_labels)
+
+        self.num_rows = 0
+        # the number of rows with each positive label
+        self._label_counts = np.zeros(len(self._label_index), dtype=np.int64)
+        # for each column, the number of rows with each value in column 0
+        # and with each value and positive label in the next columns,
+        # indexed by the values in order of first appearance
+        self._value_counts: Dict[str, pd.DataFrame] = {}
+        # the number of rows with each combination of values of the columns
+        self._combination_counts: Optional[pd.DataFrame] = None
+        # the categories of the categorical columns, since the measures
+        # also count the categories without any rows
+        self._categorical_dtypes: Dict[str, pd.CategoricalDtype] = {}
+
+    @staticmethod
+    def from_chunks(
+        chunks: Iterable[pd.DataFrame],
+        cols_of_interest: List[str],
+        label_col: str,
+        pos_labels: List[str],
+    ) -> "DataBalanceCounts":
+        """
+        Counts the rows of a dataset given in chunks.
+
+        :param chunks: The chunks of the dataset, such as the iterator
+            returned by pd.read_csv with a chunksize.
+        :type chunks: Iterable[pd.DataFrame]
+        :param cols_of_interest: The list of columns to compute
+            data balance measures on.
+        :type cols_of_interest: List[str]
+        :param label_col: The name of the label column.
+        :type label_col: str
+        :param pos_labels: The label values to compute the feature balance
+            measures for.
+        :type pos_labels: List[str]
+        :return: The counts of the rows of all the chunks.
+        :rtype: DataBalanceCounts
+        """
+        counts = DataBalanceCounts(
+            cols_of_interest=cols_of_interest,
+            label_col=label_col,
+            pos_labels=pos_labels,
+        )
+        for chunk in chunks:
+            counts.update(chunk)
+        return counts
+
+    def update(self, chunk: pd.DataFrame) -> "DataBalanceCounts":
+        """
+        Adds the rows of a chunk of the dataset to the counts.
+
+        :param chunk: The chunk of the dataset.
+        :type chunk: pd.DataFrame
+        :return: The updated counts.
+        :rtype: DataBalanceCounts
+        """
+        num_labels = len(self._label_index)
+        label_codes = FeatureBalanceMeasures._get_label_codes(
+            labels=chunk[self.label_col], label_index=self._label_index)
+        self._label_counts += np.bincount(
+            label_codes[label_codes >= 0], minlength=num_labels)
+        self.num_rows += len(chunk)
+
+        for col in self.cols_of_interest:
+            contingency_table = FeatureBalanceMeasures._get_contingency_table(
+                df=chunk,
+                col_of_interest=col,
+                label_codes=label_codes,
+                num_labels=num_labels,
+            )
+            value_counts = pd.DataFrame(
+                np.column_stack([contingency_table.feature_counts,
+                                 contingency_table.label_counts]),
+                index=pd.Index(contingency_table.unique_vals),
+            )
+            self._value_counts[col] = _merge_counts(
+                self._value_counts.get(col), value_counts)
+            if contingency_table.is_categorical:
+                self._update_categories(col, chunk[col].dtype)
+
+        combination_counts = chunk.groupby(
+            self.cols_of_interest, sort=False, observed=True).size()
+        index = combination_counts.index
+        combination_counts = combination_counts.to_frame()
+        # categorical levels of separate chunks can have other categories
+        combination_counts.index = pd.MultiIndex.from_arrays(
+            [np.asarray(index.get_level_values(level))
+             for level in range(index.nlevels)])
+        self._combination_counts = _merge_counts(
+            self._combination_counts, combination_counts)
+        return self
+
+    def merge(self, other: "DataBalanceCounts") -> "DataBalanceCounts":
+        """
+        Adds the counts of another shard of the dataset to the counts.
+
+        :param other: The counts of the other shard.
+        :type other: DataBalanceCounts
+        :return: The updated counts.
+        :rtype: DataBalanceCounts
+        """
+        if list(self.cols_of_interest) != list(other.cols_of_interest) or \
+                self.label_col != other.label_col or \
+                not self._label_index.equals(other._label_index):
+            raise ValueError(
+                "Only the counts of the same columns of interest, label"
+                " column and positive labels can be merged.")
+
+        self.num_rows += other.num_rows
+        self._label_counts = self._label_counts + other._label_counts
+        for col, value_counts in other._value_counts.items():
+            self._value_counts[col] = _merge_counts(
+                self._value_counts.get(col), value_counts)
+        for col, dtype in other._categorical_dtypes.items():
+            self._update_categories(col, dtype)
+        if other._combination_counts is not None:
+            self._combination_counts = _merge_counts(
+                self._combination_counts, other._combination_counts)
+        return self
+
+    def _update_categories(
+        self, col: str, dtype: pd.CategoricalDtype
+    ) -> None:
+        """
+        Adds the categories of a categorical column to those seen so far.
+
+        :param col: The name of the column.
+        :type col: str
+        :param dtype: The dtype of the column in a chunk.
+        :type dtype: pd.CategoricalDtype
+        """
+        categories = dtype.categories
+        if col in self._categorical_dtypes:
+            seen_categories = self._categorical_dtypes[col].categories
+            categories = seen_categories.append(
+                categories[~categories.isin(seen_categories)])
+        self._categorical_dtypes[col] = pd.CategoricalDtype(
+            categories=categories, ordered=dtype.ordered)
+
+    def _get_values(self, col: str, index: pd.Index) -> pd.Series:
+        """
+        Returns the values counted of a column as a Series with the dtype
+        of the column, so that they are grouped as the column would be.
+
+        :param col: The name of the column.
+        :type col: str
+        :param index: The index of the values counted.
+        :type index: pd.Index
+        :return: The values.
+        :rtype: pd.Series
+        """
+        values = pd.Series(_infer_values(index))
+        if col in self._categorical_dtypes:
+            values = values.astype(self._categorical_dtypes[col])
+        return values
+
+    def feature_balance_measures(
+        self,
+        top_k_pairs: Optional[int] = None,
+        gap_threshold: Optional[float] = None,
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        Returns the feature balance measures for each positive label, as
+        returned by FeatureBalanceMeasures.measures_for_labels.
+
+        :param top_k_pairs: If provided, only the combinations of feature
+            values with the top k largest absolute gaps for each measure
+            are kept.
+        :type top_k_pairs: Optional[int]
+        :param gap_threshold: If provided, only the combinations of feature
+            values with an absolute gap of at least the threshold for any
+            measure are kept.
+        :type gap_threshold: Optional[float]
+        :return: A dictionary of positive label to feature balance
+            measures DataFrame.
+        :rtype: Dict[str, pd.DataFrame]
+        """
+        contingency_tables = {
+            col: ContingencyTable(
+                unique_vals=_infer_values(self._value_counts[col].index),
+                feature_counts=self._value_counts[col][0].to_numpy(),
+                label_counts=self._value_counts[col].iloc[:, 1:].to_numpy(),
+                num_rows=self.num_rows,
+                is_categorical=col in self._categorical_dtypes,
+            )
+            for col in self.cols_of_interest
+        }
+        return FeatureBalanceMeasures._get_measures_for_tables(
+            contingency_tables=contingency_tables,
+            label_col=self.label_col,
+            pos_labels=self.pos_labels,
+            label_counts=self._label_counts,
+            top_k_pairs=top_k_pairs,
+            gap_threshold=gap_threshold,
+        )
+
+    def distribution_balance_measures(self) -> pd.DataFrame:
+        """
+        Returns the distribution balance measures, as returned by
+        DistributionBalanceMeasures.measures.
+
+        :return: A pandas DataFrame that contains the given
+            columns of interest and for each column of interest,
+            a `dict` of <measure name, measure value> pairs.
+        :rtype: pd.DataFrame
+        """
+        all_measures = []
+        for col in self.cols_of_interest:
+            counts = self._value_counts[col]
+            values = self._get_values(col, counts.index)
+            value_counts = pd.Series(counts[0].to_numpy()).groupby(
+                values).sum()
+            all_measures.append(
+                DistributionBalanceMeasures._get_distribution_measures(
+                    col_of_interest=col, value_counts=value_counts))
+        return pd.DataFrame.from_dict(all_measures)
+
+    def aggregate_balance_measures(self) -> pd.DataFrame:
+        """
+        Returns the aggregate balance measures, as returned by
+        AggregateBalanceMeasures.measures.
+
+        :return: A pandas DataFrame that contains the names and values of
+            aggregate balance measures for the columns of interest.
+        :rtype: pd.DataFrame
+        """
+        index = self._combination_counts.index
+        values = [
+            self._get_values(col, index.get_level_values(level))
+            for level, col in enumerate(self.cols_of_interest)
+        ]
+        benefits = pd.Series(
+            self._combination_counts[0].to_numpy()
+        ).groupby(values).sum() / self.num_rows
+        return AggregateBalanceMeasures._get_aggregate_measures(benefits)
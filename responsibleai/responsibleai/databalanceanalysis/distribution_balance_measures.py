@@ -239,7 +239,29 @@ class DistributionBalanceMeasures(BalanceMeasures):
         :return: A `dict` of <measure name, measure value> pairs.
         :rtype: Dict[Measures, float]
         """
-        f_obs = df.groupby(col_of_interest).size().reset_index(name="count")
+        return DistributionBalanceMeasures._get_distribution_measures(
+            col_of_interest=col_of_interest,
+            value_counts=df.groupby(col_of_interest).size(),
+        )
+
+    @staticmethod
+    def _get_distribution_measures(
+        col_of_interest: str, value_counts: pd.Series
+    ) -> Dict[Measures, float]:
+        """
+        Returns a dictionary of distribution balance measures based on the
+        number of rows with each value of the column of interest.
+
+        :param col_of_interest: The column of interest to compute
+            distribution measures on.
+        :type col_of_interest: str
+        :param value_counts: The number of rows with each value of the
+            column of interest, sorted by value.
+        :type value_counts: pd.Series
+        :return: A `dict` of <measure name, measure value> pairs.
+        :rtype: Dict[Measures, float]
+        """
+        f_obs = value_counts.reset_index(drop=True).to_frame(name="count")
         sum_obs = f_obs["count"].sum()
         obs = f_obs["count"] / sum_obs
         ref = DistributionBalanceMeasures._create_reference_distribution(
@@ -1,9 +1,9 @@
 # Copyright (c) Microsoft Corporation
 # Licensed under the MIT License.
 
-import itertools
+import heapq
 import warnings
-from typing import Callable, Dict, List, Tuple
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
 
 import numpy as np
 import pandas as pd
@@ -59,7 +59,9 @@ def get_point_mutual(
     :rtype: float
     """
     dp = get_statistical_parity(p_pos, p_feature, p_pos_feature, total_count)
-    return -np.inf if dp == 0 else np.log(dp)
+    with np.errstate(divide="ignore"):
+        # the log of a zero statistical parity is -inf
+        return np.log(dp)
 
 
 def get_sorenson_dice(
@@ -166,7 +168,9 @@ def get_log_likelihood_ratio(
     :return: The Log likelihood ratio of the feature.
     :rtype: float
     """
-    return -np.inf if p_pos_feature == 0 else np.log(p_pos_feature / p_pos)
+    with np.errstate(divide="ignore"):
+        # the log of a zero probability is -inf
+        return np.log(p_pos_feature / p_pos)
 
 
 def get_ttest_stat(
@@ -213,6 +217,112 @@ def get_ttest_pvalue(metric: float, num_unique_vals: int) -> float:
     return scipy.stats.t.sf(abs(t_statistic), dof)
 
 
+def get_largest_gap_pairs(
+    values: np.ndarray,
+    top_k_pairs: Optional[int] = None,
+    gap_threshold: Optional[float] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the pairs of values with the largest absolute differences,
+    without computing the differences of all the pairs.
+
+    The values are sorted so that the largest differences are between
+    the two ends of the sorted values: the top k pairs are found by
+    expanding pairs from the ends with a heap, and the pairs with a gap
+    above the threshold with a binary search for each value.
+
+    :param values: The values, for example a measure of each feature value.
+    :type values: np.ndarray
+    :param top_k_pairs: The maximum number of pairs to return, or None to
+        return all the pairs with a gap above the threshold.
+    :type top_k_pairs: Optional[int]
+    :param gap_threshold: The minimum absolute difference of the pairs
+        returned, or None to only limit the number of pairs.
+    :type gap_threshold: Optional[float]
+    :return: The indexes a and b of the values in each pair, with a < b,
+        in the order of itertools.combinations. Pairs with an undefined
+        difference are never returned.
+    :rtype: Tuple[np.ndarray, np.ndarray]
+    """
+    is_defined = ~np.isnan(values)
+    order = np.flatnonzero(is_defined)
+    order = order[np.argsort(values[order], kind="stable")]
+    sorted_values = values[order]
+    num_values = len(sorted_values)
+    with np.errstate(invalid="ignore"):
+        if top_k_pairs is None:
+            # all the pairs with a gap above the threshold, starting for
+            # each value at the first larger value far enough from it
+            starts = np.searchsorted(
+                sorted_values, sorted_values + gap_threshold, side="left")
+            starts = np.maximum(starts, np.arange(1, num_values + 1))
+            lows = np.repeat(np.arange(num_values), num_values - starts)
+            offsets = np.arange(len(lows)) - np.repeat(
+                np.cumsum(num_values - starts) - (num_values - starts),
+                num_values - starts)
+            highs = np.repeat(starts, num_values - starts) + offsets
+            gaps = sorted_values[highs] - sorted_values[lows]
+            is_selected = gaps >= gap_threshold
+            lows, highs = lows[is_selected], highs[is_selected]
+        else:
+            lows, highs = [], []
+            heap = []
+            seen = set()
+
+            def push(low, high):
+                if low < high and (low, high) not in seen:
+                    seen.add((low, high))
+                    gap = sorted_values[high] - sorted_values[low]
+                    # the difference of equal infinite values is undefined,
+                    # as are those of all the values between them
+                    if not np.isnan(gap):
+                        heapq.heappush(heap, (-gap, low, high))
+
+            push(0, num_values - 1)
+            while heap and len(lows) < top_k_pairs:
+                negative_gap, low, high = heapq.heappop(heap)
+                if gap_threshold is not None and \
+                        -negative_gap < gap_threshold:
+                    break
+                lows.append(low)
+                highs.append(high)
+                push(low + 1, high)
+                push(low, high - 1)
+            lows = np.array(lows, dtype=int)
+            highs = np.array(highs, dtype=int)
+
+    class_a = np.minimum(order[lows], order[highs])
+    class_b = np.maximum(order[lows], order[highs])
+    pair_order = np.lexsort((class_b, class_a))
+    return class_a[pair_order], class_b[pair_order]
+
+
+class ContingencyTable(NamedTuple):
+    """
+    The counts of rows by value of a column of interest and by label.
+
+    :param unique_vals: The unique values of the column in order of
+        appearance.
+    :type unique_vals: np.ndarray
+    :param feature_counts: The number of rows with each value.
+    :type feature_counts: np.ndarray
+    :param label_counts: The number of rows with each value and label,
+        with shape (number of values, number of labels).
+    :type label_counts: np.ndarray
+    :param num_rows: The total number of rows.
+    :type num_rows: int
+    :param is_categorical: Whether the column is categorical, in which
+        case every category is counted even without positive labels.
+    :type is_categorical: bool
+    """
+
+    unique_vals: np.ndarray
+    feature_counts: np.ndarray
+    label_counts: np.ndarray
+    num_rows: int
+    is_categorical: bool
+
+
 class FeatureBalanceMeasures(BalanceMeasures):
     """
     This class computes a set of feature balance measures that allow us to see
@@ -294,20 +404,223 @@ class FeatureBalanceMeasures(BalanceMeasures):
             measure name -> measure value key-value pairs>
         :rtype: pd.DataFrame
         """
-        feature_balance_measures = [
-            FeatureBalanceMeasures._get_measure_gaps_for_col(
+        return FeatureBalanceMeasures.measures_for_labels(
+            dataset=dataset,
+            cols_of_interest=self.cols_of_interest,
+            label_col=self.label_col,
+            pos_labels=[self.pos_label],
+        )[self.pos_label]
+
+    @staticmethod
+    def measures_for_labels(
+        dataset: pd.DataFrame,
+        cols_of_interest: List[str],
+        label_col: str,
+        pos_labels: List[str],
+        top_k_pairs: Optional[int] = None,
+        gap_threshold: Optional[float] = None,
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        Returns feature balance measures for each of the given positive
+        labels, in the format returned by measures.
+
+        A single contingency table of feature values by label is counted
+        for each column of interest, from which the measures for all the
+        positive labels are derived.
+
+        The number of combinations of feature values grows quadratically
+        with the number of unique values, so only the most imbalanced
+        combinations can be kept with top_k_pairs or gap_threshold, which
+        are then found without computing the gaps of all the combinations.
+
+        :param dataset: The dataset to compute the measures on.
+        :type dataset: pd.DataFrame
+        :param cols_of_interest: The list of columns to compute
+            feature balance measures on.
+        :type cols_of_interest: List[str]
+        :param label_col: The name of the label column.
+        :type label_col: str
+        :param pos_labels: The label values to compute the measures for,
+            each considered in turn as the positive label.
+        :type pos_labels: List[str]
+        :param top_k_pairs: If provided, only the combinations of feature
+            values with the top k largest absolute gaps for each measure
+            are kept.
+        :type top_k_pairs: Optional[int]
+        :param gap_threshold: If provided, only the combinations of feature
+            values with an absolute gap of at least the threshold for any
+            measure are kept.
+        :type gap_threshold: Optional[float]
+        :return: A dictionary of positive label to feature balance
+            measures DataFrame.
+        :rtype: Dict[str, pd.DataFrame]
+        """
+        label_index = FeatureBalanceMeasures._get_label_index(pos_labels)
+        label_codes = FeatureBalanceMeasures._get_label_codes(
+            labels=dataset[label_col], label_index=label_index)
+        label_counts = np.bincount(
+            label_codes[label_codes >= 0], minlength=len(label_index))
+
+        contingency_tables = {
+            col: FeatureBalanceMeasures._get_contingency_table(
                 df=dataset,
                 col_of_interest=col,
-                label_col=self.label_col,
-                pos_label=self.pos_label,
+                label_codes=label_codes,
+                num_labels=len(label_index),
             )
-            for col in self.cols_of_interest
-        ]
-        return pd.concat(feature_balance_measures)
+            for col in cols_of_interest
+        }
+        return FeatureBalanceMeasures._get_measures_for_tables(
+            contingency_tables=contingency_tables,
+            label_col=label_col,
+            pos_labels=pos_labels,
+            label_counts=label_counts,
+            top_k_pairs=top_k_pairs,
+            gap_threshold=gap_threshold,
+        )
+
+    @staticmethod
+    def _get_label_index(pos_labels: List[str]) -> pd.Index:
+        """
+        Returns the index of the unique positive labels as strings.
+
+        :param pos_labels: The label values to compute the measures for.
+        :type pos_labels: List[str]
+        :return: The index of the unique positive labels.
+        :rtype: pd.Index
+        """
+        return pd.Index(
+            pd.unique(np.array([str(label) for label in pos_labels])))
+
+    @staticmethod
+    def _get_label_codes(
+        labels: pd.Series, label_index: pd.Index
+    ) -> np.ndarray:
+        """
+        Returns the index of the label of each row among the positive
+        labels, or -1 for other labels.
+
+        :param labels: The label of each row.
+        :type labels: pd.Series
+        :param label_index: The index of the unique positive labels.
+        :type label_index: pd.Index
+        :return: The code of the label of each row.
+        :rtype: np.ndarray
+        """
+        # labels are compared as strings, so that for example the
+        # positive label "1" matches the label value 1
+        return label_index.get_indexer(labels.astype("str"))
+
+    @staticmethod
+    def _get_measures_for_tables(
+        contingency_tables: Dict[str, ContingencyTable],
+        label_col: str,
+        pos_labels: List[str],
+        label_counts: np.ndarray,
+        top_k_pairs: Optional[int] = None,
+        gap_threshold: Optional[float] = None,
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        Returns feature balance measures for each of the given positive
+        labels from the contingency tables of the columns of interest.
+
+        :param contingency_tables: The contingency table of each column of
+            interest by label.
+        :type contingency_tables: Dict[str, ContingencyTable]
+        :param label_col: The name of the label column.
+        :type label_col: str
+        :param pos_labels: The label values to compute the measures for.
+        :type pos_labels: List[str]
+        :param label_counts: The number of rows with each positive label,
+            in the order of the label index.
+        :type label_counts: np.ndarray
+        :param top_k_pairs: If provided, only the combinations of feature
+            values with the top k largest absolute gaps for each measure
+            are kept.
+        :type top_k_pairs: Optional[int]
+        :param gap_threshold: If provided, only the combinations of feature
+            values with an absolute gap of at least the threshold for any
+            measure are kept.
+        :type gap_threshold: Optional[float]
+        :return: A dictionary of positive label to feature balance
+            measures DataFrame.
+        :rtype: Dict[str, pd.DataFrame]
+        """
+        label_index = FeatureBalanceMeasures._get_label_index(pos_labels)
+        feature_balance_measures = {pos_label: [] for pos_label in pos_labels}
+        for col, contingency_table in contingency_tables.items():
+            for pos_label in pos_labels:
+                label_code = label_index.get_loc(str(pos_label))
+                feature_balance_measures[pos_label].append(
+                    FeatureBalanceMeasures._get_measure_gaps_for_col(
+                        col_of_interest=col,
+                        label_col=label_col,
+                        pos_label=pos_label,
+                        contingency_table=contingency_table,
+                        label_code=label_code,
+                        num_positive=label_counts[label_code],
+                        top_k_pairs=top_k_pairs,
+                        gap_threshold=gap_threshold,
+                    )
+                )
+        return {
+            pos_label: pd.concat(measures)
+            for pos_label, measures in feature_balance_measures.items()
+        }
+
+    @staticmethod
+    def _get_contingency_table(
+        df: pd.DataFrame,
+        col_of_interest: str,
+        label_codes: np.ndarray,
+        num_labels: int,
+    ) -> ContingencyTable:
+        """
+        For the column of interest, counts the rows with each unique value
+        and the rows with each unique value and label.
+
+        :param df: The dataset to count the rows of.
+        :type df: pd.DataFrame
+        :param col_of_interest: The column of interest.
+        :type col_of_interest: str
+        :param label_codes: The index of the label of each row among the
+            positive labels, or -1 for other labels.
+        :type label_codes: np.ndarray
+        :param num_labels: The number of positive labels.
+        :type num_labels: int
+        :return: The contingency table of the column by label.
+        :rtype: ContingencyTable
+        """
+        # missing values have the code -1 and are not counted
+        value_codes, unique_vals = pd.factorize(df[col_of_interest])
+        num_values = len(unique_vals)
+        has_value = value_codes >= 0
+        feature_counts = np.bincount(
+            value_codes[has_value], minlength=num_values)
+        is_counted = has_value & (label_codes >= 0)
+        label_counts = np.bincount(
+            value_codes[is_counted] * num_labels + label_codes[is_counted],
+            minlength=num_values * num_labels,
+        ).reshape(num_values, num_labels)
+        return ContingencyTable(
+            unique_vals=np.asarray(unique_vals),
+            feature_counts=feature_counts,
+            label_counts=label_counts,
+            num_rows=len(df),
+            is_categorical=isinstance(
+                df[col_of_interest].dtype, pd.CategoricalDtype),
+        )
 
     @staticmethod
     def _get_measure_gaps_for_col(
-        df: pd.DataFrame, col_of_interest: str, label_col: str, pos_label: str
+        col_of_interest: str,
+        label_col: str,
+        pos_label: str,
+        contingency_table: ContingencyTable,
+        label_code: int,
+        num_positive: int,
+        top_k_pairs: Optional[int] = None,
+        gap_threshold: Optional[float] = None,
     ) -> pd.DataFrame:
         """
         For the column of interest, computes "gaps" between two classes
@@ -316,8 +629,6 @@ class FeatureBalanceMeasures(BalanceMeasures):
         combinations in the column of interest and for each row, the
         two feature values being compared and a dictionary of measure values.
 
-        :param df: The dataset to compute gaps between feature values on.
-        :type df: pd.DataFrame
         :param col_of_interest: The column of interest to compute gaps between
             feature values on.
         :type col_of_interest: str
@@ -325,10 +636,25 @@ class FeatureBalanceMeasures(BalanceMeasures):
         :type label_col: str
         :param pos_label: The label value that denotes a positive label.
         :type pos_label: str
+        :param contingency_table: The contingency table of the column of
+            interest by label.
+        :type contingency_table: ContingencyTable
+        :param label_code: The index of the positive label in the
+            contingency table.
+        :type label_code: int
+        :param num_positive: The number of rows with the positive label.
+        :type num_positive: int
+        :param top_k_pairs: If provided, only the combinations with the top
+            k largest absolute gaps for each measure are returned.
+        :type top_k_pairs: Optional[int]
+        :param gap_threshold: If provided, only the combinations with an
+            absolute gap of at least the threshold for any measure are
+            returned.
+        :type gap_threshold: Optional[float]
         :return: A dataframe that contains four columns.
         :rtype: pd.DataFrame
         """
-        unique_vals = df[col_of_interest].unique()
+        unique_vals = contingency_table.unique_vals
 
         if unique_vals.size < 2:
             warnings.warn((f"Column '{col_of_interest}' has less than 2"
@@ -337,97 +663,120 @@ class FeatureBalanceMeasures(BalanceMeasures):
                            " for this column."))
             return pd.DataFrame()
 
-        # create list of tuples of the pairings of classes
-        pairs = list(itertools.combinations(unique_vals, 2))
-        gap_df = pd.DataFrame(
-            pairs,
-            columns=[
-                FeatureBalanceMeasures.CLASS_A,
-                FeatureBalanceMeasures.CLASS_B,
-            ],
+        metrics = FeatureBalanceMeasures._get_individual_measures(
+            contingency_table=contingency_table,
+            label_code=label_code,
+            num_positive=num_positive,
         )
-        gap_df[Constants.FEATURE_NAME.value] = col_of_interest
 
-        metrics_df = FeatureBalanceMeasures._get_individual_measures(
-            df=df,
-            col_of_interest=col_of_interest,
-            label_col=label_col,
-            pos_label=pos_label,
+        # the pairings of classes in the order of itertools.combinations
+        if top_k_pairs is None and gap_threshold is None:
+            class_a, class_b = np.triu_indices(unique_vals.size, k=1)
+        else:
+            class_a, class_b = FeatureBalanceMeasures._get_largest_gaps(
+                metrics=metrics,
+                num_unique_vals=unique_vals.size,
+                top_k_pairs=top_k_pairs,
+                gap_threshold=gap_threshold,
+            )
+        gap_df = pd.DataFrame(
+            {
+                FeatureBalanceMeasures.CLASS_A: unique_vals[class_a],
+                FeatureBalanceMeasures.CLASS_B: unique_vals[class_b],
+            }
         )
+        gap_df[Constants.FEATURE_NAME.value] = col_of_interest
 
         for measure in FeatureBalanceMeasures.FEATURE_METRICS.keys():
-            classA_metric = gap_df[FeatureBalanceMeasures.CLASS_A].apply(
-                lambda row: metrics_df.loc[row]
-            )[measure.value]
-            classB_metric = gap_df[FeatureBalanceMeasures.CLASS_B].apply(
-                lambda row: metrics_df.loc[row]
-            )[measure.value]
-            gap_df[measure.value] = classA_metric - classB_metric
+            measure_values = metrics[measure]
+            gap_df[measure.value] = (
+                measure_values[class_a] - measure_values[class_b]
+            )
 
         # For overall stats
         for (
             measure,
             test_stat,
         ), func in FeatureBalanceMeasures.OVERALL_METRICS.items():
-            gap_df[measure.value] = gap_df[test_stat.value].apply(
-                lambda row: func(row, len(unique_vals))
+            gap_df[measure.value] = func(
+                gap_df[test_stat.value].to_numpy(), unique_vals.size
             )
 
         return gap_df
 
     @staticmethod
-    def _get_individual_measures(
-        df: pd.DataFrame, col_of_interest: str, label_col: str, pos_label: str
-    ):
+    def _get_largest_gaps(
+        metrics: Dict[Measures, np.ndarray],
+        num_unique_vals: int,
+        top_k_pairs: Optional[int],
+        gap_threshold: Optional[float],
+    ) -> Tuple[np.ndarray, np.ndarray]:
         """
-        For the column of interest, computes the individual feature balance
-        measures for every unique value in the column. These measures are
-        used to compute "gaps" between two classes (feature values).
-
-        :param df: The df to compute individual feature balance
-            measures on.
-        :type df: pd.DataFrame
-        :param col_of_interest: The column of interest to compute the
-            individual feature balance measures on.
-        :type col_of_interest: str
-        :param label_col: The name of the label column.
-        :type label_col: str
-        :param pos_label: The label value that denotes a positive label.
-        :type pos_label: str
-        :return: A dataframe that contains individual feature balance measures.
-        :rtype: pd.DataFrame
+        Selects the combinations of feature values with the largest
+        absolute gaps of any of the feature balance measures.
+
+        :param metrics: The individual feature balance measures of each
+            value.
+        :type metrics: Dict[Measures, np.ndarray]
+        :param num_unique_vals: The number of unique values.
+        :type num_unique_vals: int
+        :param top_k_pairs: The number of combinations to select for each
+            measure, or None to select all those above the threshold.
+        :type top_k_pairs: Optional[int]
+        :param gap_threshold: The minimum absolute gap of the combinations
+            selected, or None to only select the top k.
+        :type gap_threshold: Optional[float]
+        :return: The indexes of the two values of each combination
+            selected, in the order of itertools.combinations.
+        :rtype: Tuple[np.ndarray, np.ndarray]
         """
-        num_rows = df.shape[0]
-
-        p_feature_col = (
-            df[col_of_interest]
-            .value_counts()
-            .rename(FeatureBalanceMeasures.PROB_FEATURE) / num_rows
-        )
-        p_pos_feature_col = (
-            df[
-                df[label_col].astype("str") == str(pos_label)
-            ][col_of_interest]
-            .value_counts()
-            .rename(FeatureBalanceMeasures.PROB_POS_FEATURE) / num_rows
-        ).fillna(0)
-
-        new_df = pd.concat([p_feature_col, p_pos_feature_col], axis=1)
-        new_df[FeatureBalanceMeasures.PROB_POSITIVE] = (
-            df[
-                df[label_col].astype("str") == str(pos_label)
-            ].shape[0] / num_rows
-        )
-
-        for measure, func in FeatureBalanceMeasures.FEATURE_METRICS.items():
-            new_df[measure.value] = new_df.apply(
-                lambda row: func(
-                    row[FeatureBalanceMeasures.PROB_POSITIVE],
-                    row[FeatureBalanceMeasures.PROB_FEATURE],
-                    row[FeatureBalanceMeasures.PROB_POS_FEATURE],
-                    num_rows,
-                ),
-                axis=1,
+        pair_codes = []
+        for measure in FeatureBalanceMeasures.FEATURE_METRICS.keys():
+            class_a, class_b = get_largest_gap_pairs(
+                values=metrics[measure],
+                top_k_pairs=top_k_pairs,
+                gap_threshold=gap_threshold,
             )
+            pair_codes.append(class_a * num_unique_vals + class_b)
+        pair_codes = np.unique(np.concatenate(pair_codes))
+        return pair_codes // num_unique_vals, pair_codes % num_unique_vals
 
-        return new_df
+    @staticmethod
+    def _get_individual_measures(
+        contingency_table: ContingencyTable,
+        label_code: int,
+        num_positive: int,
+    ) -> Dict[Measures, np.ndarray]:
+        """
+        Computes the individual feature balance measures for every unique
+        value in a column of interest. These measures are used to compute
+        "gaps" between two classes (feature values).
+
+        :param contingency_table: The contingency table of the column of
+            interest by label.
+        :type contingency_table: ContingencyTable
+        :param label_code: The index of the positive label in the
+            contingency table.
+        :type label_code: int
+        :param num_positive: The number of rows with the positive label.
+        :type num_positive: int
+        :return: The individual feature balance measures of each value.
+        :rtype: Dict[Measures, np.ndarray]
+        """
+        num_rows = contingency_table.num_rows
+        pos_feature_counts = contingency_table.label_counts[:, label_code]
+        p_feature = contingency_table.feature_counts / num_rows
+        p_pos = num_positive / num_rows
+        p_pos_feature = pos_feature_counts / num_rows
+        if not contingency_table.is_categorical:
+            # values without any positive label have no positive
+            # probability rather than a zero one, so that their measures
+            # are undefined, except for categories which are all counted
+            p_pos_feature[pos_feature_counts == 0] = np.nan
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return {
+                measure: func(p_pos, p_feature, p_pos_feature, num_rows)
+                for measure, func in
+                FeatureBalanceMeasures.FEATURE_METRICS.items()
+            }
@@ -6,6 +6,18 @@
 from abc import ABC, abstractmethod
 
 
+def get_data_version(manager):
+    """Get the version of the computed results of a manager.
+
+    :param manager: The manager.
+    :type manager: BaseManager
+    :return: The number of times the manager computed new results.
+    :rtype: int
+    """
+    # managers created by _load do not call __init__
+    return getattr(manager, '_data_version', 0)
+
+
 class BaseManager(ABC):
     """The base class for managers."""
 
@@ -13,6 +25,14 @@ class BaseManager(ABC):
         """Initialize the BaseManager."""
         super(BaseManager, self).__init__(*args, **kwargs)
 
+    def _invalidate_data_cache(self):
+        """Mark the dashboard data memoized by the parent as stale.
+
+        The parent RAIInsights memoizes the dashboard data, which is
+        computed again once any manager computed new results.
+        """
+        self._data_version = get_data_version(self) + 1
+
     @abstractmethod
     def add(self):
         """Abstract method to add a computation to the manager."""
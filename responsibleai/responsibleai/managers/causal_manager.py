@@ -445,6 +445,7 @@ class CausalManager(BaseManager):
                     result.policies.append(policy)
 
                 result._validate_schema()
+                self._invalidate_data_cache()
         print('Current Status: Finished generating causal effects.')
 
     def get(self):
@@ -3,8 +3,14 @@
 
 """Defines the Counterfactual Manager class."""
 import json
+import multiprocessing
+import os
+import pickle
+import random
 import uuid
 import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
 from typing import Any, List, Optional, Union
 
@@ -41,6 +47,17 @@ class CounterfactualConstants:
     RANDOM = 'random'
 
 
+# The number of test rows generated together in one batch
+_BATCH_SIZE = 100
+# DiCE requires at least ten query instances for global feature importance
+_MIN_FEATURE_IMPORTANCE_BATCH_SIZE = 10
+# The seed of the first batch, the following batches add their index to it
+_BATCH_RANDOM_SEED = 777
+
+# The explainer of the worker processes, set once by _init_batch_worker
+_batch_explainer = None
+
+
 class _CommonSchemaConstants:
     LOCAL_IMPORTANCE = 'local_importance'
     METADATA = 'metadata'
@@ -115,6 +132,148 @@ def _get_schema_version(counterfactuals_dict):
     return version
 
 
+def _generate_counterfactuals_batch(explainer, X_batch, feature_importance,
+                                    random_seed, **kwargs):
+    """
+    Generate the counterfactuals of a batch of test rows with a fixed seed.
+
+    The random state is restored afterwards so that seeding the batch
+    does not leak into the caller.
+
+    :param explainer: The dice-ml explainer to generate with.
+    :type explainer: ExplainerBase
+    :param X_batch: The test rows of the batch without the target column.
+    :type X_batch: pandas.DataFrame
+    :param feature_importance: Whether to compute the feature importances.
+    :type feature_importance: bool
+    :param random_seed: The seed of the batch.
+    :type random_seed: int
+    :return: The counterfactuals of the batch.
+    :rtype: CounterfactualExplanations
+    """
+    np_state = np.random.get_state()
+    random_state = random.getstate()
+    np.random.seed(random_seed)
+    random.seed(random_seed)
+    try:
+        return _generate_counterfactuals_with_explainer(
+            explainer, X_batch, feature_importance, **kwargs)
+    finally:
+        np.random.set_state(np_state)
+        random.setstate(random_state)
+
+
+def _generate_counterfactuals_with_explainer(explainer, X_test,
+                                             feature_importance, **kwargs):
+    """
+    Generate the counterfactuals of test rows, with their importances.
+
+    :param explainer: The dice-ml explainer to generate with.
+    :type explainer: ExplainerBase
+    :param X_test: The test rows without the target column.
+    :type X_test: pandas.DataFrame
+    :param feature_importance: Whether to compute the feature importances.
+    :type feature_importance: bool
+    :return: The counterfactuals of the test rows.
+    :rtype: CounterfactualExplanations
+    """
+    if not feature_importance:
+        return explainer.generate_counterfactuals(X_test, **kwargs)
+    return explainer.global_feature_importance(X_test, **kwargs)
+
+
+def _init_batch_worker(explainer):
+    """
+    Set the explainer of a worker process once for all its batches.
+
+    :param explainer: The dice-ml explainer to generate with.
+    :type explainer: ExplainerBase
+    """
+    global _batch_explainer
+    _batch_explainer = explainer
+
+
+def _generate_counterfactuals_batch_json(X_batch, feature_importance,
+                                         random_seed, kwargs):
+    """
+    Generate the counterfactuals of a batch in a worker process.
+
+    The result is returned serialized, since the explanations otherwise
+    carry the training data back to the parent process for every batch.
+
+    :return: The serialized counterfactuals of the batch.
+    :rtype: str
+    """
+    return _generate_counterfactuals_batch(
+        _batch_explainer, X_batch, feature_importance,
+        random_seed, **kwargs).to_json()
+
+
+def _get_num_counterfactuals(cf_examples):
+    """
+    Get the number of counterfactuals found for one test row.
+
+    :param cf_examples: The counterfactuals of the test row.
+    :type cf_examples: CounterfactualExamples
+    :return: The number of counterfactuals.
+    :rtype: int
+    """
+    cfs_df = cf_examples.final_cfs_df_sparse
+    if cfs_df is None:
+        cfs_df = cf_examples.final_cfs_df
+    return 0 if cfs_df is None else len(cfs_df)
+
+
+def _merge_counterfactual_explanations(counterfactual_objs):
+    """
+    Merge the counterfactuals of consecutive batches into one object.
+
+    The local importances are per row and are concatenated. The summary
+    importance of a batch is the fraction of its counterfactuals changing
+    each feature, so the batches are weighted by their number of
+    counterfactuals, which gives the summary importance of the whole data.
+
+    :param counterfactual_objs: The counterfactuals of the batches in order.
+    :type counterfactual_objs: list[CounterfactualExplanations]
+    :return: The counterfactuals of all the batches.
+    :rtype: CounterfactualExplanations
+    """
+    if len(counterfactual_objs) == 1:
+        return counterfactual_objs[0]
+    cf_examples_list = []
+    local_importance = None
+    summary_counts = None
+    total_cfs = 0
+    for counterfactual_obj in counterfactual_objs:
+        cf_examples_list.extend(counterfactual_obj.cf_examples_list)
+        if counterfactual_obj.local_importance is not None:
+            if local_importance is None:
+                local_importance = []
+            local_importance.extend(counterfactual_obj.local_importance)
+        if counterfactual_obj.summary_importance is not None:
+            num_cfs = sum(
+                _get_num_counterfactuals(cf_examples)
+                for cf_examples in counterfactual_obj.cf_examples_list)
+            if summary_counts is None:
+                summary_counts = dict.fromkeys(
+                    counterfactual_obj.summary_importance, 0.0)
+            for feature, importance in \
+                    counterfactual_obj.summary_importance.items():
+                summary_counts[feature] = \
+                    summary_counts.get(feature, 0.0) + importance * num_cfs
+            total_cfs += num_cfs
+    summary_importance = None
+    if summary_counts is not None:
+        summary_importance = {
+            feature: count / total_cfs if total_cfs > 0 else 0
+            for feature, count in summary_counts.items()}
+    return CounterfactualExplanations(
+        cf_examples_list,
+        local_importance=local_importance,
+        summary_importance=summary_importance,
+        version=counterfactual_objs[0].metadata['version'])
+
+
 class CounterfactualConfig(BaseConfig):
     """Defines the configuration for generating counterfactuals."""
     METHOD = 'method'
@@ -551,9 +710,39 @@ class CounterfactualManager(BaseManager):
         self._add_counterfactual_config(counterfactual_config)
 
     @_measure_time
-    def compute(self):
+    def compute(self, n_jobs: int = 1,
+                batch_size: Optional[int] = None):
         """Computes the counterfactual examples by running the counterfactual
-           configuration."""
+           configuration.
+
+        By default, the counterfactuals of all the test rows are generated
+        at once. Passing n_jobs or batch_size instead splits the test rows
+        into batches that are generated in parallel worker processes and
+        merged back in order. Each batch is seeded from its index, so the
+        counterfactuals do not depend on n_jobs, but they differ from the
+        ones generated at once, and the summary importance is the average
+        of the batch importances weighted by their counterfactuals.
+        The worker processes are spawned rather than forked, since a fork
+        of a process whose OpenMP threads already ran, for example to
+        train a LightGBM model, can deadlock. The explainer is hence
+        pickled for the workers, and the batches are generated
+        sequentially if it cannot be.
+
+        :param n_jobs: The number of batches to generate in parallel,
+            or -1 to use all the CPUs.
+        :type n_jobs: int
+        :param batch_size: The number of test rows generated in a batch,
+            by default 100 when n_jobs is more than one.
+            Batches computing feature importances have at least ten rows.
+        :type batch_size: Optional[int]
+        """
+        if batch_size is not None and (
+                not isinstance(batch_size, int) or batch_size < 1):
+            raise UserConfigValidationException(
+                'batch_size should be a positive integer.')
+        if n_jobs == -1:
+            n_jobs = os.cpu_count() or 1
+
         print("Counterfactual")
         for cf_config in self._counterfactual_config_list:
             if not cf_config.is_computed:
@@ -569,23 +758,8 @@ class CounterfactualManager(BaseManager):
 
                     X_test = self._test.drop([self._target_column], axis=1)
 
-                    if not cf_config.feature_importance:
-                        counterfactual_obj = \
-                            cf_config.explainer.generate_counterfactuals(
-                                X_test, total_CFs=cf_config.total_CFs,
-                                desired_class=cf_config.desired_class,
-                                desired_range=cf_config.desired_range,
-                                features_to_vary=cf_config.features_to_vary,
-                                permitted_range=cf_config.permitted_range)
-                    else:
-                        counterfactual_obj = \
-                            cf_config.explainer.global_feature_importance(
-                                X_test,
-                                total_CFs=cf_config.total_CFs,
-                                desired_class=cf_config.desired_class,
-                                desired_range=cf_config.desired_range,
-                                features_to_vary=cf_config.features_to_vary,
-                                permitted_range=cf_config.permitted_range)
+                    counterfactual_obj = self._generate_counterfactuals(
+                        cf_config, X_test, n_jobs, batch_size)
 
                     # Validate the serialized output against schema
                     schema = CounterfactualManager._get_counterfactual_schema(
@@ -602,6 +776,119 @@ class CounterfactualManager(BaseManager):
                     cf_config.has_computation_failed = True
                     cf_config.failure_reason = str(e)
                     raise e
+                finally:
+                    self._invalidate_data_cache()
+
+    def _generate_counterfactuals(self, cf_config, X_test, n_jobs,
+                                  batch_size):
+        """Generates the counterfactuals of the test rows batch by batch.
+
+        The test rows are generated at once, without batches, when n_jobs
+        is one and no batch_size is given.
+
+        :param cf_config: The counterfactual configuration to generate.
+        :type cf_config: CounterfactualConfig
+        :param X_test: The test rows without the target column.
+        :type X_test: pandas.DataFrame
+        :param n_jobs: The number of batches to generate in parallel.
+        :type n_jobs: int
+        :param batch_size: The number of test rows generated in a batch.
+        :type batch_size: Optional[int]
+        :return: The merged counterfactuals of all the batches.
+        :rtype: CounterfactualExplanations
+        """
+        kwargs = dict(total_CFs=cf_config.total_CFs,
+                      desired_class=cf_config.desired_class,
+                      desired_range=cf_config.desired_range,
+                      features_to_vary=cf_config.features_to_vary,
+                      permitted_range=cf_config.permitted_range)
+        if n_jobs == 1 and batch_size is None:
+            return _generate_counterfactuals_with_explainer(
+                cf_config.explainer, X_test, cf_config.feature_importance,
+                **kwargs)
+        if batch_size is None:
+            batch_size = _BATCH_SIZE
+
+        num_batches = -(-len(X_test) // batch_size)
+        if cf_config.feature_importance:
+            num_batches = min(
+                num_batches,
+                len(X_test) // _MIN_FEATURE_IMPORTANCE_BATCH_SIZE)
+        num_batches = max(num_batches, 1)
+        batches = [X_test.iloc[indexes] for indexes in
+                   np.array_split(np.arange(len(X_test)), num_batches)]
+
+        n_jobs = max(1, min(n_jobs, num_batches))
+        counterfactual_objs = None
+        if n_jobs > 1:
+            try:
+                pickle.dumps(cf_config.explainer)
+            except (pickle.PicklingError, AttributeError, TypeError) as e:
+                warnings.warn(
+                    'The explainer cannot be pickled for the worker '
+                    'processes, generating the counterfactuals '
+                    'sequentially instead: {0}'.format(e))
+            else:
+                try:
+                    counterfactual_objs = \
+                        self._generate_batches_in_parallel(
+                            cf_config, batches, n_jobs, kwargs)
+                except BrokenProcessPool as e:
+                    warnings.warn(
+                        'The worker processes terminated abruptly, '
+                        'generating the counterfactuals sequentially '
+                        'instead: {0}'.format(e))
+        if counterfactual_objs is None:
+            counterfactual_objs = []
+            for batch_index, X_batch in enumerate(batches):
+                counterfactual_objs.append(_generate_counterfactuals_batch(
+                    cf_config.explainer, X_batch,
+                    cf_config.feature_importance,
+                    _BATCH_RANDOM_SEED + batch_index, **kwargs))
+                self._print_batch_status(batch_index, batches)
+        return _merge_counterfactual_explanations(counterfactual_objs)
+
+    def _generate_batches_in_parallel(self, cf_config, batches, n_jobs,
+                                      kwargs):
+        """Generates the counterfactuals of the batches on a process pool.
+
+        :param cf_config: The counterfactual configuration to generate.
+        :type cf_config: CounterfactualConfig
+        :param batches: The test rows of each batch.
+        :type batches: list[pandas.DataFrame]
+        :param n_jobs: The number of worker processes.
+        :type n_jobs: int
+        :param kwargs: The arguments of the dice-ml explainer.
+        :type kwargs: dict
+        :return: The counterfactuals of the batches in order.
+        :rtype: list[CounterfactualExplanations]
+        """
+        counterfactual_objs = [None] * len(batches)
+        with ProcessPoolExecutor(
+                max_workers=n_jobs,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_batch_worker,
+                initargs=(cf_config.explainer,)) as executor:
+            futures = {
+                executor.submit(_generate_counterfactuals_batch_json,
+                                X_batch, cf_config.feature_importance,
+                                _BATCH_RANDOM_SEED + batch_index,
+                                kwargs): batch_index
+                for batch_index, X_batch in enumerate(batches)}
+            for future in as_completed(futures):
+                batch_index = futures[future]
+                counterfactual_objs[batch_index] = \
+                    CounterfactualExplanations.from_json(future.result())
+                self._print_batch_status(batch_index, batches)
+        return counterfactual_objs
+
+    @staticmethod
+    def _print_batch_status(batch_index, batches):
+        if len(batches) > 1:
+            print('Current Status: Generated counterfactuals for batch {0}'
+                  ' of {1} ({2} samples).'.format(
+                      batch_index + 1, len(batches),
+                      len(batches[batch_index])))
 
     def request_counterfactuals(self, query_id: str, data: Any):
         """Return the counterfactuals for a given point.
@@ -6,7 +6,7 @@
 import json
 import warnings
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 import numpy as np
 import pandas as pd
@@ -17,11 +17,9 @@ from responsibleai._internal.constants import (FileFormats, ListProperties,
                                                ManagerNames)
 from responsibleai._tools.shared.state_directory_management import \
     DirectoryManager
-from responsibleai.databalanceanalysis import (AggregateBalanceMeasures,
-                                               DistributionBalanceMeasures,
-                                               FeatureBalanceMeasures)
-from responsibleai.databalanceanalysis.data_balance_utils import (
-    prepare_df, transform_measures_to_dict)
+from responsibleai.databalanceanalysis import DataBalanceCounts
+from responsibleai.databalanceanalysis.data_balance_utils import \
+    transform_measures_to_dict
 from responsibleai.managers.base_manager import BaseManager
 
 DATA_JSON = f"data{FileFormats.JSON}"
@@ -67,30 +65,74 @@ class DataBalanceManager(BaseManager):
         self._task_type = task_type
         self._is_added = False
 
-        self._df = None
-        if self._train is not None or self._test is not None:
-            self._df = pd.concat([self._train, self._test])
+        # the train and test data are counted one after the other rather
+        # than concatenated into a copy, unless loaded from a saved manager
+        self._data = None
 
         # Populated in add()
         self._cols_of_interest = None
+        self._top_k_pairs = None
+        self._gap_threshold = None
 
         # Populated in compute()
         self._data_balance_measures = None
 
-    def add(self, cols_of_interest: List[str]):
+    def add(
+        self,
+        cols_of_interest: List[str],
+        top_k_pairs: Optional[int] = None,
+        gap_threshold: Optional[float] = None,
+    ):
         """
         Add data balance measures to be computed later.
 
+        Feature balance measures are computed for every combination of two
+        values of each column of interest, so for columns with many unique
+        values only the most imbalanced combinations can be kept to bound
+        the memory used and the size of the measures.
+
         :param cols_of_interest: The names of the columns to be used
             for computing data balance measures.
         :type cols_of_interest: List[str]
+        :param top_k_pairs: If provided, only keep the combinations of
+            feature values with the top k largest absolute gaps for each
+            feature balance measure.
+        :type top_k_pairs: Optional[int]
+        :param gap_threshold: If provided, only keep the combinations of
+            feature values with an absolute gap of at least the threshold
+            for any feature balance measure.
+        :type gap_threshold: Optional[float]
         """
         self._cols_of_interest = cols_of_interest
+        self._top_k_pairs = top_k_pairs
+        self._gap_threshold = gap_threshold
 
         # Let user see exceptions early in add() before calling compute()
         self._validate()
         self._is_added = True
 
+    def _get_datasets(self):
+        """Get the datasets the data balance measures are computed on.
+
+        :return: The dataset loaded with the manager, or else the train
+            and test data which were provided.
+        :rtype: List[pd.DataFrame]
+        """
+        if self._data is not None:
+            return [self._data]
+        return [df for df in [self._train, self._test] if df is not None]
+
+    def _get_columns(self):
+        """Get the columns of the datasets.
+
+        :return: The names of the columns of any of the datasets.
+        :rtype: set
+        """
+        columns = set()
+        for df in self._get_datasets():
+            columns.update(df.columns)
+        return columns
+
     def _validate(self):
         """
         Validate that data balance measures can be computed. Raises ValueError
@@ -112,7 +154,8 @@ class DataBalanceManager(BaseManager):
                 )
             )
 
-        if self._target_column not in self._df.columns:
+        columns = self._get_columns()
+        if self._target_column not in columns:
             raise ValueError(
                 (
                     f"The target_column '{self._target_column}' must be"
@@ -144,7 +187,7 @@ class DataBalanceManager(BaseManager):
                 )
             )
 
-        if not all(col in self._df.columns for col in self._cols_of_interest):
+        if not all(col in columns for col in self._cols_of_interest):
             raise ValueError(
                 (
                     "All columns in `cols_of_interest` must be present in"
@@ -152,6 +195,29 @@ class DataBalanceManager(BaseManager):
                 )
             )
 
+        top_k_pairs = self._top_k_pairs
+        if top_k_pairs is not None and (
+                isinstance(top_k_pairs, bool) or
+                not isinstance(top_k_pairs, int) or top_k_pairs < 1):
+            raise ValueError(
+                (
+                    "The `top_k_pairs` must be a positive integer, got"
+                    f" {top_k_pairs!r}."
+                )
+            )
+
+        gap_threshold = self._gap_threshold
+        if gap_threshold is not None and (
+                isinstance(gap_threshold, bool) or
+                not isinstance(gap_threshold, (int, float)) or
+                not gap_threshold >= 0):
+            raise ValueError(
+                (
+                    "The `gap_threshold` must be a non-negative number, got"
+                    f" {gap_threshold!r}."
+                )
+            )
+
     def compute(self):
         """
         Computes data balance measures on the dataset.
@@ -162,28 +228,31 @@ class DataBalanceManager(BaseManager):
         try:
             self._validate()
 
-            self._df = prepare_df(df=self._df)
-
-            feature_balance_measures = {}
-            for pos_label in self._classes:
-                feature_balance_measures[pos_label] = FeatureBalanceMeasures(
-                    cols_of_interest=self._cols_of_interest,
-                    label_col=self._target_column,
-                    pos_label=pos_label,
-                ).measures(dataset=self._df)
+            # all the measures are computed from the counts of rows by
+            # value and label, which are counted once without copying
+            data_balance_counts = DataBalanceCounts.from_chunks(
+                chunks=self._get_datasets(),
+                cols_of_interest=self._cols_of_interest,
+                label_col=self._target_column,
+                pos_labels=self._classes,
+            )
 
-            distribution_balance_measures = DistributionBalanceMeasures(
-                cols_of_interest=self._cols_of_interest
-            ).measures(dataset=self._df)
-            aggregate_balance_measures = AggregateBalanceMeasures(
-                cols_of_interest=self._cols_of_interest
-            ).measures(dataset=self._df)
+            feature_balance_measures = \
+                data_balance_counts.feature_balance_measures(
+                    top_k_pairs=self._top_k_pairs,
+                    gap_threshold=self._gap_threshold,
+                )
+            distribution_balance_measures = \
+                data_balance_counts.distribution_balance_measures()
+            aggregate_balance_measures = \
+                data_balance_counts.aggregate_balance_measures()
 
             self._set_data_balance_measures(
                 feature_balance_measures=feature_balance_measures,
                 distribution_balance_measures=distribution_balance_measures,
                 aggregate_balance_measures=aggregate_balance_measures,
             )
+            self._invalidate_data_cache()
         except Exception as e:
             warnings.warn(
                 f"Failed to compute data balance measures due to {e!r}."
@@ -237,6 +306,8 @@ class DataBalanceManager(BaseManager):
             Keys.COLS_OF_INTEREST: self._cols_of_interest,
             Keys.TARGET_COLUMN: self._target_column,
             Keys.CLASSES: self._classes,
+            Keys.TOP_K_PAIRS: self._top_k_pairs,
+            Keys.GAP_THRESHOLD: self._gap_threshold,
         }
 
         return props
@@ -283,8 +354,9 @@ class DataBalanceManager(BaseManager):
             with open(measures_path, "w") as f:
                 json.dump(self._data_balance_measures, f)
 
+        # the train and test data are saved as a single dataset
         data_path = dir_manager.create_data_directory() / DATA_JSON
-        self._df.to_json(data_path, orient="split")
+        pd.concat(self._get_datasets()).to_json(data_path, orient="split")
 
     @staticmethod
     def _load(path, rai_insights):
@@ -307,6 +379,8 @@ class DataBalanceManager(BaseManager):
 
         is_added = False
         cols_of_interest = None
+        top_k_pairs = None
+        gap_threshold = None
         task_type = rai_insights.task_type
         target_column = rai_insights.target_column
         classes = (
@@ -314,7 +388,7 @@ class DataBalanceManager(BaseManager):
             if rai_insights._classes is not None
             else []
         )
-        df = pd.concat([rai_insights.train, rai_insights.test])
+        df = None
         data_balance_measures = None
 
         all_db_dirs = DirectoryManager.list_sub_directories(path)
@@ -332,6 +406,9 @@ class DataBalanceManager(BaseManager):
                 cols_of_interest = manager_info[Keys.COLS_OF_INTEREST]
                 target_column = manager_info[Keys.TARGET_COLUMN]
                 classes = manager_info[Keys.CLASSES]
+                # saved before the combinations could be limited
+                top_k_pairs = manager_info.get(Keys.TOP_K_PAIRS)
+                gap_threshold = manager_info.get(Keys.GAP_THRESHOLD)
 
             # Load from data json
             data_path = dir_manager.get_data_directory() / DATA_JSON
@@ -347,9 +424,11 @@ class DataBalanceManager(BaseManager):
         inst.__dict__["_is_added"] = is_added
         inst.__dict__["_task_type"] = task_type
         inst.__dict__["_cols_of_interest"] = cols_of_interest
+        inst.__dict__["_top_k_pairs"] = top_k_pairs
+        inst.__dict__["_gap_threshold"] = gap_threshold
         inst.__dict__["_target_column"] = target_column
         inst.__dict__["_classes"] = classes
-        inst.__dict__["_df"] = df
+        inst.__dict__["_data"] = df
         inst.__dict__["_data_balance_measures"] = data_balance_measures
 
         return inst
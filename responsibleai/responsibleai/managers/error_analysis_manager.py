@@ -4,22 +4,26 @@
 """Defines the Error Analysis Manager class."""
 
 import json
+import numbers
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any, List, Optional
 
 import jsonschema
+import numpy as np
 import pandas as pd
 
 from erroranalysis._internal.constants import metric_to_display_name
 from erroranalysis._internal.error_analyzer import ModelAnalyzer
-from erroranalysis._internal.error_report import as_error_report
+from erroranalysis._internal.error_report import ErrorReport, as_error_report
 from erroranalysis._internal.error_report import \
     json_converter as report_json_converter
 from raiutils.exceptions import UserConfigValidationException
 from raiutils.models import ModelTask
 from responsibleai._config.base_config import BaseConfig
 from responsibleai._interfaces import ErrorAnalysisData
+from responsibleai._internal._dataset_registry import get_column_view
 from responsibleai._internal.constants import ErrorAnalysisManagerKeys as Keys
 from responsibleai._internal.constants import (FileFormats, ListProperties,
                                                ManagerNames)
@@ -39,6 +43,20 @@ MIN_CHILD_SAMPLES = Keys.MIN_CHILD_SAMPLES
 FILTER_FEATURES = Keys.FILTER_FEATURES
 IS_COMPUTED = 'is_computed'
 
+# The error reports hold numpy values and tuples, which are validated
+# in memory as the json numbers and arrays they are serialized to
+_REPORT_TYPE_CHECKER = jsonschema.Draft7Validator.TYPE_CHECKER.redefine_many({
+    'array': lambda checker, instance: isinstance(
+        instance, (list, tuple, np.ndarray)),
+    'boolean': lambda checker, instance: isinstance(
+        instance, (bool, np.bool_)),
+    'number': lambda checker, instance: isinstance(
+        instance, numbers.Number) and not isinstance(
+        instance, (bool, np.bool_)),
+})
+_ReportValidator = jsonschema.validators.extend(
+    jsonschema.Draft7Validator, type_checker=_REPORT_TYPE_CHECKER)
+
 
 def config_json_converter(obj):
     """Helper function to convert ErrorAnalysisConfig object to json.
@@ -126,7 +144,7 @@ class MetadataRemovalClassificationModelWrapper():
     def _apply_func(self, func, dataset):
         if self.dropped_features is None or len(self.dropped_features) == 0:
             return func(dataset)
-        return func(dataset.drop(columns=self.dropped_features, axis=1))
+        return func(get_column_view(dataset, self.dropped_features))
 
 
 class MetadataRemovalRegressionModelWrapper():
@@ -149,8 +167,8 @@ class MetadataRemovalRegressionModelWrapper():
     def predict(self, dataset: pd.DataFrame):
         if self.dropped_features is None or len(self.dropped_features) == 0:
             return self.model.predict(dataset)
-        return self.model.predict(dataset.drop(
-            columns=self.dropped_features, axis=1))
+        return self.model.predict(get_column_view(
+            dataset, self.dropped_features))
 
 
 class ErrorAnalysisConfig(BaseConfig):
@@ -258,7 +276,7 @@ class ErrorAnalysisManager(BaseManager):
             self._dataset = dataset.copy()
         else:
             self._true_y = dataset[target_column]
-            self._dataset = dataset.drop(columns=[target_column])
+            self._dataset = get_column_view(dataset, [target_column])
         self._feature_names = list(self._dataset.columns)
         self._model_task = model_task
         self._classes = classes
@@ -275,7 +293,8 @@ class ErrorAnalysisManager(BaseManager):
             self._feature_names,
             self._categorical_features,
             model_task=self._model_task,
-            classes=self._classes)
+            classes=self._classes,
+            copy_dataset=False)
 
     def add(self, max_depth: int = 3, num_leaves: int = 31,
             min_child_samples: int = 20,
@@ -315,40 +334,115 @@ class ErrorAnalysisManager(BaseManager):
             self._ea_config_list.append(ea_config)
 
     @_measure_time
-    def compute(self):
+    def compute(self, n_jobs: int = 1):
         """Creates an ErrorReport by running the error analyzer on the model.
+
+        The importances and root statistics do not depend on the configs,
+        so they are computed once and shared by the reports, while the tree
+        and matrix of each config can be computed in parallel threads.
+
+        :param n_jobs: The number of configs to compute in parallel.
+            The threads share the caches of the analyzer and LightGBM
+            trains the trees with a single thread each.
+        :type n_jobs: int
         """
         print("Error Analysis")
         print('Current Status: Generating error analysis reports.')
+        configs = [config for config in self._ea_config_list
+                   if not config.is_computed]
+        if not configs:
+            print('Current Status: Finished generating error analysis '
+                  'reports.')
+            return
         compute_importances = not any(_find_features_having_missing_values(
             self._dataset))
         if not compute_importances:
             warnings.warn(
                 'Test dataset has missing values, '
                 'skipping feature importance computation in error analysis.')
-        for config in self._ea_config_list:
-            if config.is_computed:
-                continue
-            config.is_computed = True
-            max_depth = config.max_depth
-            num_leaves = config.num_leaves
-            min_child_samples = config.min_child_samples
-            filter_features = config.filter_features
-            report = self._analyzer.create_error_report(
-                filter_features, max_depth=max_depth,
-                min_child_samples=min_child_samples,
-                num_leaves=num_leaves,
-                compute_importances=compute_importances,
-                compute_root_stats=True)
-
-            # Validate the serialized output against schema
-            schema = ErrorAnalysisManager._get_error_analysis_schema()
-            jsonschema.validate(
-                json.loads(report.to_json()), schema)
 
+        # Compute the pieces shared by all the reports once, which also
+        # caches the predictions before the threads use them
+        importances = None
+        if compute_importances:
+            importances = self._analyzer.compute_importances()
+        root_stats = self._analyzer.compute_root_stats()
+        surrogate_cache = self._warm_up(configs)
+        schema = ErrorAnalysisManager._get_error_analysis_schema()
+
+        def compute_report(config):
+            return self._compute_error_report(
+                config, importances, root_stats, schema)
+
+        n_jobs = max(1, min(n_jobs, len(configs)))
+        if n_jobs == 1:
+            reports = [compute_report(config) for config in configs]
+        else:
+            num_threads = surrogate_cache.num_threads
+            surrogate_cache.num_threads = 1
+            try:
+                with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+                    reports = list(executor.map(compute_report, configs))
+            finally:
+                surrogate_cache.num_threads = num_threads
+
+        for config, report in zip(configs, reports):
+            config.is_computed = True
             self._ea_report_list.append(report)
+        self._invalidate_data_cache()
         print('Current Status: Finished generating error analysis reports.')
 
+    def _warm_up(self, configs):
+        """Creates the caches of the analyzer shared by the reports.
+
+        The analyzer creates its caches on first use, which is not safe
+        to do from several threads at once, so they are created before
+        the reports are computed.
+
+        :param configs: The configs to compute the reports of.
+        :type configs: list[ErrorAnalysisConfig]
+        :return: The cache of the surrogate models.
+        :rtype: SurrogateCache
+        """
+        self._analyzer.feature_store
+        self._analyzer.cohort_filter
+        if any(config.filter_features for config in configs):
+            self._analyzer.bin_cache
+        return self._analyzer.surrogate_cache
+
+    def _compute_error_report(self, config, importances, root_stats, schema):
+        """Computes the ErrorReport of a config from the shared pieces.
+
+        :param config: The config to compute the tree and matrix of.
+        :type config: ErrorAnalysisConfig
+        :param importances: The importances shared by the reports.
+        :type importances: Optional[list[float]]
+        :param root_stats: The root statistics shared by the reports.
+        :type root_stats: dict
+        :param schema: The schema to validate the report against.
+        :type schema: dict
+        :return: The computed and validated ErrorReport.
+        :rtype: ErrorReport
+        """
+        tree = self._analyzer.compute_error_tree(
+            self._analyzer.feature_names, None, None,
+            max_depth=config.max_depth,
+            num_leaves=config.num_leaves,
+            min_child_samples=config.min_child_samples)
+        matrix = None
+        if config.filter_features:
+            matrix = self._analyzer.compute_matrix(
+                config.filter_features, None, None)
+        report = ErrorReport(
+            tree, matrix,
+            tree_features=self._analyzer.feature_names,
+            matrix_features=config.filter_features,
+            importances=list(importances) if importances is not None
+            else None,
+            root_stats=dict(root_stats))
+        ErrorAnalysisManager._validate_error_report(report, schema)
+        return report
+
     def get(self):
         """Get the computed error reports.
 
@@ -359,6 +453,22 @@ class ErrorAnalysisManager(BaseManager):
         """
         return self._ea_report_list
 
+    @staticmethod
+    def _validate_error_report(report, schema):
+        """Validate the ErrorReport against the error analysis schema.
+
+        The report is validated in memory, and only if that fails is it
+        serialized and validated as json, which raises any actual error.
+
+        :param report: The ErrorReport to validate.
+        :type report: ErrorReport
+        :param schema: The error analysis schema.
+        :type schema: dict
+        """
+        if _ReportValidator(schema).is_valid(report.__dict__):
+            return
+        jsonschema.validate(json.loads(report.to_json()), schema)
+
     @staticmethod
     def _get_error_analysis_schema():
         """Get the schema for validating the error analysis output."""
@@ -473,6 +583,7 @@ class ErrorAnalysisManager(BaseManager):
 
         ea_config_list = []
         ea_report_list = []
+        schema = None
         all_ea_dirs = DirectoryManager.list_sub_directories(path)
         for ea_dir in all_ea_dirs:
             directory_manager = DirectoryManager(
@@ -490,9 +601,9 @@ class ErrorAnalysisManager(BaseManager):
             with open(report_path, 'r') as file:
                 ea_report = json.load(file, object_hook=as_error_report)
                 # Validate the serialized output against schema
-                schema = ErrorAnalysisManager._get_error_analysis_schema()
-                jsonschema.validate(
-                    json.loads(ea_report.to_json()), schema)
+                if schema is None:
+                    schema = ErrorAnalysisManager._get_error_analysis_schema()
+                ErrorAnalysisManager._validate_error_report(ea_report, schema)
                 ea_report_list.append(ea_report)
 
         inst.__dict__['_ea_report_list'] = ea_report_list
@@ -502,7 +613,7 @@ class ErrorAnalysisManager(BaseManager):
         inst.__dict__['_categorical_features'] = categorical_features
         target_column = rai_insights.target_column
         true_y = rai_insights.test[target_column]
-        dataset = rai_insights.test.drop(columns=[target_column])
+        dataset = get_column_view(rai_insights.test, [target_column])
         inst.__dict__['_dataset'] = dataset
         inst.__dict__['_true_y'] = true_y
         feature_names = list(dataset.columns)
@@ -519,5 +630,6 @@ class ErrorAnalysisManager(BaseManager):
             dataset,
             true_y,
             feature_names,
-            categorical_features)
+            categorical_features,
+            copy_dataset=False)
         return inst
@@ -25,6 +25,7 @@ from raiutils.models import ModelTask
 from responsibleai._interfaces import (EBMGlobalExplanation, FeatureImportance,
                                        ModelExplanationData,
                                        PrecomputedExplanations)
+from responsibleai._internal._dataset_registry import get_column_view
 from responsibleai._internal.constants import ExplainerManagerKeys as Keys
 from responsibleai._internal.constants import (ExplanationKeys, ListProperties,
                                                ManagerNames, Metadata)
@@ -80,9 +81,9 @@ class ExplainerManager(BaseManager):
         """
         self._model = model
         self._initialization_examples = \
-            initialization_examples.drop(columns=[target_column])
+            get_column_view(initialization_examples, [target_column])
         self._evaluation_examples = \
-            evaluation_examples.drop(columns=[target_column])
+            get_column_view(evaluation_examples, [target_column])
         self._is_run = False
         self._is_added = False
         self._surrogate_model = None
@@ -193,6 +194,7 @@ class ExplainerManager(BaseManager):
             data=self._evaluation_examples
         )
         self._is_run = True
+        self._invalidate_data_cache()
 
         print('Current Status: Explained {0} features.'.format(
               len(self._features)))
@@ -438,8 +440,9 @@ class ExplainerManager(BaseManager):
         inst.__dict__['_' + CATEGORICAL_FEATURES] = \
             rai_insights.get_categorical_features_after_drop()
         target_column = rai_insights.target_column
-        train = rai_insights.get_train_data().drop(columns=[target_column])
-        test = rai_insights.get_test_data().drop(columns=[target_column])
+        train = get_column_view(rai_insights.get_train_data(),
+                                [target_column])
+        test = get_column_view(rai_insights.get_test_data(), [target_column])
         inst.__dict__[U_INITIALIZATION_EXAMPLES] = train
         inst.__dict__[U_EVALUATION_EXAMPLES] = test
         inst.__dict__['_' + FEATURES] = list(train.columns)
@@ -3,6 +3,7 @@
 
 """Defines the RAIBaseInsights class."""
 
+import copy
 import json
 import os
 import pickle
@@ -15,15 +16,36 @@ import pandas as pd
 
 import responsibleai
 from raiutils.exceptions import UserConfigValidationException
+from responsibleai._internal._columnar_data import (is_columnar_data,
+                                                    load_dataframe,
+                                                    remove_data,
+                                                    save_dataframe)
 from responsibleai._internal._served_model_wrapper import ServedModelWrapper
-from responsibleai._internal.constants import (FileFormats, Metadata,
-                                               ModelServingConstants,
+from responsibleai._internal.constants import (DataFormats, FileFormats,
+                                               Metadata, ModelServingConstants,
                                                SerializationAttributes)
+from responsibleai.managers.base_manager import get_data_version
 
 _DTYPES = 'dtypes'
 _MODEL_PKL = Metadata.MODEL + FileFormats.PKL
 _SERIALIZER = 'serializer'
 _MANAGERS = 'managers'
+_MANAGER_NAMES = '_manager_names'
+_LAZY_MANAGERS = '_lazy_managers'
+_EXCLUDED_MANAGERS = '_excluded_managers'
+_LAZY_MODEL_PATH = '_lazy_model_path'
+_MODEL_ATTRIBUTES = [Metadata.MODEL, '_' + _SERIALIZER]
+
+
+def _get_manager_attribute(manager_name):
+    """Get the name of the attribute holding the manager.
+
+    :param manager_name: The name of the manager.
+    :type manager_name: str
+    :return: The name of the attribute holding the manager.
+    :rtype: str
+    """
+    return f'_{manager_name}_manager'
 
 
 class RAIBaseInsights(ABC):
@@ -68,6 +90,61 @@ class RAIBaseInsights(ABC):
         self.task_type = task_type
         self._serializer = serializer
 
+    def __getattr__(self, name):
+        """Load the model or a manager on first access after a lazy load.
+
+        This is only called when the attribute is not found in the
+        instance, which after RAIBaseInsights._load with lazy=True is the
+        case for the model, the serializer and the managers which were
+        not accessed yet.
+
+        :param name: The name of the attribute.
+        :type name: str
+        :return: The value of the attribute.
+        :rtype: object
+        """
+        instance_dict = self.__dict__
+        if name in _MODEL_ATTRIBUTES and _LAZY_MODEL_PATH in instance_dict:
+            RAIBaseInsights._load_model(self, instance_dict[_LAZY_MODEL_PATH])
+            del instance_dict[_LAZY_MODEL_PATH]
+            return instance_dict[name]
+        lazy_managers = instance_dict.get(_LAZY_MANAGERS, {})
+        if name == '_' + _MANAGERS and _MANAGER_NAMES in instance_dict:
+            for manager_name in list(lazy_managers):
+                self._load_lazy_manager(manager_name)
+            managers = [instance_dict[_get_manager_attribute(manager_name)]
+                        for manager_name in instance_dict[_MANAGER_NAMES]]
+            instance_dict['_' + _MANAGERS] = managers
+            return managers
+        for manager_name in lazy_managers:
+            if name == _get_manager_attribute(manager_name):
+                return self._load_lazy_manager(manager_name)
+        for manager_name in instance_dict.get(_EXCLUDED_MANAGERS, []):
+            # an AttributeError raised by a manager property falls back to
+            # __getattr__ with the name of the property
+            if name in [manager_name, _get_manager_attribute(manager_name)]:
+                raise AttributeError(
+                    "The {} manager was not loaded, include it in the "
+                    "components passed to load to use it".format(
+                        manager_name))
+        raise AttributeError("'{}' object has no attribute '{}'".format(
+            type(self).__name__, name))
+
+    def _load_lazy_manager(self, manager_name):
+        """Load a manager which was not loaded by a lazy load yet.
+
+        :param manager_name: The name of the manager.
+        :type manager_name: str
+        :return: The loaded manager.
+        :rtype: BaseManager
+        """
+        lazy_managers = self.__dict__[_LAZY_MANAGERS]
+        manager_class, manager_dir = lazy_managers[manager_name]
+        manager = manager_class._load(manager_dir, self)
+        self.__dict__[_get_manager_attribute(manager_name)] = manager
+        del lazy_managers[manager_name]
+        return manager
+
     @abstractmethod
     def _initialize_managers(self):
         """Initializes the managers.
@@ -116,6 +193,32 @@ class RAIBaseInsights(ABC):
     def _get_dataset(self):
         pass
 
+    def _init_data_cache(self):
+        """Initializes the memoized data of the dashboard."""
+        self._data_cache = None
+        self._data_cache_key = None
+
+    def _get_data_cache_key(self, managers):
+        """Get the key identifying the computed results of the managers.
+
+        :param managers: The loaded managers by name.
+        :type managers: dict
+        :return: The key identifying the computed results.
+        :rtype: tuple
+        """
+        return tuple((name, id(manager), get_data_version(manager))
+                     for name, manager in managers.items())
+
+    def _copy_data_cache(self):
+        """Get a copy of the memoized data that can be given to callers.
+
+        :return: A shallow copy of the memoized data and of its dataset.
+        :rtype: RAIInsightsData
+        """
+        data = copy.copy(self._data_cache)
+        data.dataset = copy.copy(self._data_cache.dataset)
+        return data
+
     def _write_to_file(self, file_path, content):
         """Save the string content to the given file path.
         :param file_path: The file path to save the content to.
@@ -135,37 +238,58 @@ class RAIBaseInsights(ABC):
         """
         pass
 
-    def _save_data(self, path):
+    def _save_data(self, path, data_format=DataFormats.JSON):
         """Save the copy of raw data (train and test sets) and
            their related metadata.
 
         :param path: The directory path to save the RAIBaseInsights to.
         :type path: str
+        :param data_format: The format to save the data in, either 'json'
+            or 'npy' for the columnar format which can be memory-mapped
+            on load.
+        :type data_format: str
         """
         data_directory = Path(path) / SerializationAttributes.DATA_DIRECTORY
         data_directory.mkdir(parents=True, exist_ok=True)
         if self.train is not None:
-            dtypes = self.train.dtypes.astype(str).to_dict()
-            self._write_to_file(data_directory /
-                                (Metadata.TRAIN + _DTYPES + FileFormats.JSON),
-                                json.dumps(dtypes))
-            self._write_to_file(data_directory /
-                                (Metadata.TRAIN + FileFormats.JSON),
-                                self.train.to_json(orient='split'))
-
-        dtypes = self.test.dtypes.astype(str).to_dict()
-        self._write_to_file(data_directory /
-                            (Metadata.TEST + _DTYPES + FileFormats.JSON),
-                            json.dumps(dtypes))
-        self._write_to_file(data_directory /
-                            (Metadata.TEST + FileFormats.JSON),
-                            self.test.to_json(orient='split'))
+            self._save_dataframe(self.train, data_directory, Metadata.TRAIN,
+                                 data_format)
+        self._save_dataframe(self.test, data_directory, Metadata.TEST,
+                             data_format)
 
         self._write_to_file(Path(path) /
                             (SerializationAttributes.RAI_VERSION_JSON),
                             json.dumps(
                                 {"responsibleai": responsibleai.__version__}))
 
+    def _save_dataframe(self, df, data_directory, name, data_format):
+        """Save the DataFrame and its dtypes in the given format.
+
+        Data previously saved under the same name in the other format is
+        removed so that it is not loaded instead.
+
+        :param df: The DataFrame to save.
+        :type df: pandas.DataFrame
+        :param data_directory: The directory to save the DataFrame in.
+        :type data_directory: pathlib.Path
+        :param name: The name of the dataset.
+        :type name: str
+        :param data_format: The format to save the data in.
+        :type data_format: str
+        """
+        dtypes = df.dtypes.astype(str).to_dict()
+        self._write_to_file(data_directory /
+                            (name + _DTYPES + FileFormats.JSON),
+                            json.dumps(dtypes))
+        json_path = data_directory / (name + FileFormats.JSON)
+        columnar_path = data_directory / name
+        if data_format == DataFormats.NPY:
+            remove_data(json_path)
+            save_dataframe(df, columnar_path)
+        else:
+            remove_data(columnar_path)
+            self._write_to_file(json_path, df.to_json(orient='split'))
+
     @abstractmethod
     def _save_metadata(self, path):
         """Save the metadata like target column, categorical features,
@@ -211,51 +335,99 @@ class RAIBaseInsights(ABC):
         :param path: The directory path to save the RAIBaseInsights to.
         :type path: str
         """
+        excluded_managers = self.__dict__.get(_EXCLUDED_MANAGERS)
+        if excluded_managers:
+            raise UserConfigValidationException(
+                "Cannot save the RAIInsights since the {} managers were "
+                "not loaded".format(', '.join(excluded_managers)))
         top_dir = Path(path)
         # save each of the individual managers
         for manager in self._managers:
             manager._save(top_dir / manager.name)
 
-    def save(self, path):
+    def save(self, path, data_format=DataFormats.JSON):
         """Save the RAIBaseInsights to the given path.
 
         :param path: The directory path to save the RAIBaseInsights to.
         :type path: str
+        :param data_format: The format to save the data in, either 'json'
+            or 'npy' for the columnar format which can be memory-mapped
+            on load.
+        :type data_format: str
         """
+        self._validate_data_format(data_format)
         self._save_managers(path)
-        self._save_data(path)
+        self._save_data(path, data_format=data_format)
         self._save_metadata(path)
         self._save_model(path)
         self._save_predictions(path)
 
     @staticmethod
-    def _load_data(inst, path):
+    def _validate_data_format(data_format):
+        """Validate the format to save the data in.
+
+        :param data_format: The format to save the data in.
+        :type data_format: str
+        """
+        if data_format not in [DataFormats.JSON, DataFormats.NPY]:
+            raise UserConfigValidationException(
+                "Unsupported data format {}, the supported formats are "
+                "{} and {}".format(data_format, DataFormats.JSON,
+                                   DataFormats.NPY))
+
+    @staticmethod
+    def _load_data(inst, path, mmap_mode=None):
         """Load the raw data (train and test sets).
 
         :param inst: RAIBaseInsights object instance.
         :type inst: RAIBaseInsights
         :param path: The directory path to data location.
         :type path: str
+        :param mmap_mode: The memory-map mode for data saved in the
+            columnar format, for example 'r', or None to read it fully
+            into memory.
+        :type mmap_mode: str
         """
         data_directory = Path(path) / SerializationAttributes.DATA_DIRECTORY
-        train_data_json = data_directory / (Metadata.TRAIN + FileFormats.JSON)
-        if train_data_json.exists():
-            train_dtypes_path = (Metadata.TRAIN + _DTYPES + FileFormats.JSON)
-            train_dtypes_json = data_directory / train_dtypes_path
-            with open(train_dtypes_json, 'r') as file:
-                types = json.load(file)
-            with open(train_data_json, 'r') as file:
-                train = pd.read_json(file, dtype=types, orient='split')
-        else:
-            train = None
-        inst.__dict__[Metadata.TRAIN] = train
+        inst.__dict__[Metadata.TRAIN] = RAIBaseInsights._load_dataframe(
+            data_directory, Metadata.TRAIN, mmap_mode)
+        test = RAIBaseInsights._load_dataframe(
+            data_directory, Metadata.TEST, mmap_mode)
+        if test is None:
+            raise FileNotFoundError(
+                "No test data found in {}".format(data_directory))
+        inst.__dict__[Metadata.TEST] = test
+
+    @staticmethod
+    def _load_dataframe(data_directory, name, mmap_mode=None,
+                        dtypes_name=None):
+        """Load the DataFrame saved in either the columnar or JSON format.
+
+        :param data_directory: The directory the DataFrame was saved in.
+        :type data_directory: pathlib.Path
+        :param name: The name of the dataset.
+        :type name: str
+        :param mmap_mode: The memory-map mode for data saved in the
+            columnar format, or None to read it fully into memory.
+        :type mmap_mode: str
+        :param dtypes_name: The name of the dataset whose dtypes are used
+            for data saved in the JSON format, defaults to the name.
+        :type dtypes_name: str
+        :return: The loaded DataFrame or None if it was not saved.
+        :rtype: pandas.DataFrame
+        """
+        columnar_path = data_directory / name
+        if is_columnar_data(columnar_path):
+            return load_dataframe(columnar_path, mmap_mode=mmap_mode)
+        json_path = data_directory / (name + FileFormats.JSON)
+        if not json_path.exists():
+            return None
+        dtypes_name = dtypes_name or name
         with open(data_directory /
-                  (Metadata.TEST + _DTYPES + FileFormats.JSON), 'r') as file:
+                  (dtypes_name + _DTYPES + FileFormats.JSON), 'r') as file:
             types = json.load(file)
-        with open(data_directory / (Metadata.TEST + FileFormats.JSON),
-                  'r') as file:
-            test = pd.read_json(file, dtype=types, orient='split')
-        inst.__dict__[Metadata.TEST] = test
+        with open(json_path, 'r') as file:
+            return pd.read_json(file, dtype=types, orient='split')
 
     @staticmethod
     def _load_model(inst, path):
@@ -300,7 +472,8 @@ class RAIBaseInsights(ABC):
                 raise e
 
     @staticmethod
-    def _load_managers(inst, path, manager_map):
+    def _load_managers(inst, path, manager_map, components=None,
+                       lazy=False):
         """Load the specified managers from the given path.
 
         :param inst: RAIBaseInsights object instance.
@@ -310,20 +483,41 @@ class RAIBaseInsights(ABC):
         :type path: str
         :param manager_map: The map of manager names to manager classes.
         :type manager_map: dict
+        :param components: The names of the managers to load, or None to
+            load all the managers in manager_map.
+        :type components: list[str]
+        :param lazy: Whether to defer loading each manager until it is
+            first accessed.
+        :type lazy: bool
         """
-        top_dir = Path(path)
-        managers = []
-        for manager_name, manager_class in manager_map.items():
-            full_name = f'_{manager_name}_manager'
-            manager_dir = top_dir / manager_name
-            manager = manager_class._load(manager_dir, inst)
-            inst.__dict__[full_name] = manager
-            managers.append(manager)
+        if components is None:
+            components = list(manager_map)
+        unknown_components = set(components) - set(manager_map)
+        if unknown_components:
+            raise UserConfigValidationException(
+                "Unknown components {}, the supported components are "
+                "{}".format(sorted(unknown_components), list(manager_map)))
 
-        inst.__dict__['_' + _MANAGERS] = managers
+        top_dir = Path(path)
+        manager_names = [manager_name for manager_name in manager_map
+                         if manager_name in components]
+        inst.__dict__[_MANAGER_NAMES] = manager_names
+        inst.__dict__[_EXCLUDED_MANAGERS] = [
+            manager_name for manager_name in manager_map
+            if manager_name not in components]
+        inst.__dict__[_LAZY_MANAGERS] = {
+            manager_name: (manager_map[manager_name], top_dir / manager_name)
+            for manager_name in manager_names}
+        if not lazy:
+            for manager_name in manager_names:
+                inst._load_lazy_manager(manager_name)
+            inst.__dict__['_' + _MANAGERS] = [
+                inst.__dict__[_get_manager_attribute(manager_name)]
+                for manager_name in manager_names]
 
     @staticmethod
-    def _load(path, inst, manager_map, load_metadata_func):
+    def _load(path, inst, manager_map, load_metadata_func, mmap_mode=None,
+              components=None, lazy=False):
         """Load the RAIBaseInsights from the given path.
 
         :param path: The directory path to load the RAIBaseInsights from.
@@ -334,13 +528,26 @@ class RAIBaseInsights(ABC):
         :type manager_map: dict
         :param load_metadata_func: The function to load the metadata.
         :type load_metadata_func: function
+        :param mmap_mode: The memory-map mode for data saved in the
+            columnar format, or None to read it fully into memory.
+        :type mmap_mode: str
+        :param components: The names of the managers to load, or None to
+            load all the managers in manager_map.
+        :type components: list[str]
+        :param lazy: Whether to defer loading the model and each manager
+            until they are first accessed.
+        :type lazy: bool
         :return: The RAIBaseInsights object after loading.
         :rtype: RAIBaseInsights
         """
         # load current state
-        RAIBaseInsights._load_data(inst, path)
+        RAIBaseInsights._load_data(inst, path, mmap_mode=mmap_mode)
         load_metadata_func(inst, path)
-        RAIBaseInsights._load_model(inst, path)
-        RAIBaseInsights._load_managers(inst, path, manager_map)
+        if lazy:
+            inst.__dict__[_LAZY_MODEL_PATH] = path
+        else:
+            RAIBaseInsights._load_model(inst, path)
+        RAIBaseInsights._load_managers(inst, path, manager_map,
+                                       components=components, lazy=lazy)
 
         return inst
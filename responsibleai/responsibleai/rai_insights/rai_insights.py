@@ -14,18 +14,31 @@ import numpy as np
 import pandas as pd
 
 from erroranalysis._internal.cohort_filter import FilterDataWithCohortFilters
-from erroranalysis._internal.process_categoricals import process_categoricals
+from erroranalysis._internal.cohort_mask_cache import (CohortMaskCache,
+                                                       get_cohort_key)
+from erroranalysis._internal.constants import MatrixParams
+from erroranalysis._internal.process_categoricals import (CategoricalEncoder,
+                                                          process_categoricals)
 from raiutils.data_processing import convert_to_list
 from raiutils.exceptions import (SystemErrorException,
                                  UserConfigValidationException)
 from raiutils.models import Forecasting, ModelTask, SKLearn
+from raiutils.sampling import (DataSample, SamplingMethods, get_error_strata,
+                               reservoir_sample, stratified_sample)
 from responsibleai._interfaces import (Dataset, RAIInsightsData,
                                        TabularDatasetMetadata)
+from responsibleai._internal._columnar_data import (can_save_array, load_array,
+                                                    remove_data, save_array,
+                                                    save_dataframe)
+from responsibleai._internal._dataset_registry import (DatasetRegistry,
+                                                       get_column_view)
 from responsibleai._internal._forecasting_wrappers import _wrap_model
-from responsibleai._internal.constants import (FileFormats, ManagerNames,
-                                               Metadata,
+from responsibleai._internal._large_data_store import LargeDataStore
+from responsibleai._internal.constants import (DataFormats, FileFormats,
+                                               ManagerNames, Metadata,
                                                SerializationAttributes)
 from responsibleai.feature_metadata import FeatureMetadata
+from responsibleai.managers.base_manager import BaseManager
 from responsibleai.managers.causal_manager import CausalManager
 from responsibleai.managers.counterfactual_manager import CounterfactualManager
 from responsibleai.managers.data_balance_manager import DataBalanceManager
@@ -50,6 +63,8 @@ _TIME_SERIES_ID_FEATURES = 'time_series_id_features'
 _CATEGORICAL_FEATURES = 'categorical_features'
 _DROPPED_FEATURES = 'dropped_features'
 _FORECASTING_RAI_INSIGHTS_ENABLED = "forecasting_enabled"
+_TEST_SAMPLE = '_test_sample'
+_SAMPLING_RANDOM_STATE = 777
 
 _STRF_TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
 
@@ -156,6 +171,7 @@ class RAIInsights(RAIBaseInsights):
                  serializer: Optional[Any] = None,
                  maximum_rows_for_test: int = 5000,
                  feature_metadata: Optional[FeatureMetadata] = None,
+                 test_sampling_method: str = SamplingMethods.FIRST,
                  **kwargs):
         """Creates an RAIInsights object.
         :param model: The model to compute RAI insights for.
@@ -191,22 +207,61 @@ class RAIInsights(RAIBaseInsights):
                                  dataset to identify different kinds
                                  of features in the dataset.
         :type feature_metadata: Optional[FeatureMetadata]
+        :param test_sampling_method: How the rows of the test data are
+            sampled when there are more than maximum_rows_for_test.
+            Either 'first' to keep the first rows, 'random' for a uniform
+            random sample, 'stratified' for a random sample stratified by
+            the target column, or 'error_stratified' for a random sample
+            stratified by the errors of the model.  The positions of the
+            sampled rows and their weights, to reweight metrics computed
+            on the sample, are returned by get_test_sample.
+        :type test_sampling_method: str
         """
         self._consolidate_categorical_features(
             categorical_features, feature_metadata)
 
         self._large_test = None
+        self._test_sample = None
+        large_model_outputs = None
         if len(test) > maximum_rows_for_test:
+            RAIInsights._validate_test_sampling_method(
+                model, task_type, test_sampling_method)
+            if test_sampling_method == SamplingMethods.FIRST:
+                sample_description = \
+                    f"the first {maximum_rows_for_test} samples"
+            else:
+                sample_description = \
+                    f"a {test_sampling_method.replace('_', ' ')} sample " \
+                    f"of {maximum_rows_for_test} samples"
             warnings.warn(f"The size of the test set {len(test)} is greater "
                           "than the supported limit of "
                           f"{maximum_rows_for_test}. Computing insights for "
-                          f"the first {maximum_rows_for_test} samples of "
-                          "the test set")
-            self._large_test = test.copy()
-            test = test.copy()[0:maximum_rows_for_test]
+                          f"{sample_description} of the test set")
+            self._large_test = test
+            if test_sampling_method == SamplingMethods.FIRST:
+                # the test data is a view of the first rows of the large
+                # test data rather than a copy
+                test = test.iloc[0:maximum_rows_for_test]
+            else:
+                if test_sampling_method == \
+                        SamplingMethods.ERROR_STRATIFIED:
+                    # the outputs on the large test data are cached below
+                    # rather than computed again
+                    large_model_outputs = RAIInsights._compute_model_outputs(
+                        model, task_type, get_column_view(
+                            test, (self._get_dropped_features() or []) +
+                            [target_column]))
+                self._test_sample = RAIInsights._sample_test(
+                    test, target_column, task_type,
+                    maximum_rows_for_test, test_sampling_method,
+                    large_model_outputs)
+                test = self._test_sample.take(test)
 
         super(RAIInsights, self).__init__(
             model, train, test, target_column, task_type, serializer)
+        self._init_dataset_registry()
+        self._dataset_registry.register(SerializationAttributes.LARGE_TEST,
+                                        self._large_test)
 
         self._predict_output = None
         self._forecast_output = None
@@ -236,7 +291,7 @@ class RAIInsights(RAIBaseInsights):
         )
 
         self._feature_columns = \
-            test.drop(columns=[target_column]).columns.tolist()
+            test.columns.drop(target_column).tolist()
         self._feature_ranges = RAIInsights._get_feature_ranges(
             test=(self._large_test if self._large_test is not None else test),
             categorical_features=self.categorical_features,
@@ -244,20 +299,17 @@ class RAIInsights(RAIBaseInsights):
             datetime_features=self._feature_metadata.datetime_features)
         self._categories, self._categorical_indexes, \
             self._category_dictionary, self._string_ind_data = \
-            process_categoricals(
+            RAIInsights._process_categoricals(
                 all_feature_names=self._feature_columns,
                 categorical_features=self.categorical_features,
-                dataset=test.drop(columns=[target_column]))
+                test=test, target_column=target_column,
+                large_test=self._large_test, test_sample=self._test_sample)
 
         if model is not None:
             # Cache predictions of the model
-            self._set_model_outputs(input_data=self.get_test_data(
-                test_data=test).drop(columns=[target_column]), large=False)
-
-            if self._large_test is not None:
-                self._set_model_outputs(
-                    input_data=self._large_test.drop(columns=[target_column]),
-                    large=True)
+            self._cache_model_outputs(large_model_outputs)
+        self._init_cohort_cache()
+        self._init_data_cache()
         # keep managers at the end since they rely on everything above
         self._initialize_managers()
         self._try_add_data_balance()
@@ -274,42 +326,170 @@ class RAIInsights(RAIBaseInsights):
         """Returns the training dataset after dropping
         features if any were configured to be dropped.
 
+        The returned dataset views the columns of the training dataset
+        without copying them and must not be modified.
+
         :return: The training dataset after dropping features.
         :rtype: pandas.DataFrame
         """
-        if self._feature_metadata is None:
-            return self.train
-        else:
-            if self._feature_metadata.dropped_features is None or \
-                    len(self._feature_metadata.dropped_features) == 0:
-                return self.train
-            else:
-                return self.train.drop(
-                    columns=self._feature_metadata.dropped_features,
-                    axis=1)
+        return self._dataset_registry.get(
+            Metadata.TRAIN, exclude_columns=self._get_dropped_features())
 
     def get_test_data(self, test_data=None):
         """Returns the test dataset after dropping
         features if any were configured to be dropped.
 
+        The returned dataset views the columns of the test dataset
+        without copying them and must not be modified.
+
         :return: The test dataset after dropping features.
         :rtype: pandas.DataFrame
         """
-        if self._feature_metadata is None:
-            return test_data if test_data is not None else self.test
-        else:
-            if self._feature_metadata.dropped_features is None or \
-                    len(self._feature_metadata.dropped_features) == 0:
-                return test_data if test_data is not None else self.test
+        if test_data is None:
+            return self._dataset_registry.get(
+                Metadata.TEST, exclude_columns=self._get_dropped_features())
+        return get_column_view(test_data, self._get_dropped_features())
+
+    def get_test_sample(self):
+        """Get the sample of the large test data the insights are on.
+
+        The weights of the sampled rows are the number of rows of the
+        large test data each of them stands for.  They can be passed as
+        the sample_weight of metrics computed on the test data to
+        estimate the metrics on the large test data.
+
+        :return: The sample, or None if the test data was not sampled at
+            random because it was small enough or its first rows were
+            kept.
+        :rtype: raiutils.sampling.DataSample
+        """
+        return self._test_sample
+
+    @staticmethod
+    def _validate_test_sampling_method(model, task_type, sampling_method):
+        """Validate the method to sample the large test data with.
+
+        :param model: The model.
+        :type model: object
+        :param task_type: The task to run.
+        :type task_type: str
+        :param sampling_method: The sampling method.
+        :type sampling_method: str
+        """
+        if sampling_method not in SamplingMethods.ALL:
+            raise UserConfigValidationException(
+                f"Unsupported test_sampling_method {sampling_method}, "
+                f"expecting one of {SamplingMethods.ALL}")
+        if sampling_method == SamplingMethods.FIRST:
+            return
+        if task_type == ModelTask.FORECASTING:
+            raise UserConfigValidationException(
+                "Only the first rows of the test data can be sampled for "
+                "forecasting, since the time series must be contiguous")
+        if sampling_method == SamplingMethods.ERROR_STRATIFIED and \
+                model is None:
+            raise UserConfigValidationException(
+                "A model is required to sample the test data stratified "
+                "by the errors of the model")
+
+    @staticmethod
+    def _sample_test(test, target_column, task_type, number_samples,
+                     sampling_method, large_model_outputs=None):
+        """Sample the rows of the large test data.
+
+        The rows are sampled with a fixed seed, so that the same test
+        data is sampled in the same way.
+
+        :param test: The large test data.
+        :type test: pandas.DataFrame
+        :param target_column: The name of the label column.
+        :type target_column: str
+        :param task_type: The task to run.
+        :type task_type: str
+        :param number_samples: The number of rows to sample.
+        :type number_samples: int
+        :param sampling_method: The sampling method.
+        :type sampling_method: str
+        :param large_model_outputs: The outputs of the model on the large
+            test data by model method, to sample stratified by the errors.
+        :type large_model_outputs: dict
+        :return: The sample.
+        :rtype: raiutils.sampling.DataSample
+        """
+        if sampling_method == SamplingMethods.RANDOM:
+            return reservoir_sample(test, number_samples,
+                                    random_state=_SAMPLING_RANDOM_STATE)
+        true_y = test[target_column].to_numpy()
+        is_classification = task_type == ModelTask.CLASSIFICATION
+        if sampling_method == SamplingMethods.STRATIFIED:
+            if is_classification:
+                strata = true_y
             else:
-                if test_data is None:
-                    return self.test.drop(
-                        columns=self._feature_metadata.dropped_features,
-                        axis=1)
-                else:
-                    return test_data.drop(
-                        columns=self._feature_metadata.dropped_features,
-                        axis=1)
+                # stratify by the deciles of the target
+                deciles = np.unique(np.quantile(
+                    true_y, np.linspace(0, 1, 11)[1:-1]))
+                strata = np.searchsorted(deciles, true_y)
+        else:
+            pred_y = large_model_outputs[SKLearn.PREDICT]
+            strata = get_error_strata(true_y, pred_y, is_classification)
+        sample = stratified_sample(test, number_samples, strata,
+                                   random_state=_SAMPLING_RANDOM_STATE)
+        sample.method = sampling_method
+        return sample
+
+    def get_dataset_memory_usage(self):
+        """Get the bytes held by the datasets and the loaded managers.
+
+        The train and test datasets are held once and the managers are
+        handed views of their columns, which share their memory unless
+        get_column_view had to copy the columns, so the datasets held by
+        the managers are counted as well.
+
+        :return: The bytes held by each dataset, with the datasets of the
+            managers named after the manager and the attribute, and in
+            total with the memory shared between the datasets counted
+            once.
+        :rtype: dict
+        """
+        manager_datasets = {}
+        # the managers not loaded yet by a lazy load do not hold memory
+        for manager in list(self.__dict__.values()):
+            if not isinstance(manager, BaseManager):
+                continue
+            for attribute, value in vars(manager).items():
+                if isinstance(value, pd.DataFrame):
+                    name = '{}.{}'.format(manager.name, attribute)
+                    manager_datasets[name] = value
+        return self._dataset_registry.get_memory_usage(manager_datasets)
+
+    def _init_dataset_registry(self):
+        """Initializes the registry of the datasets shared by managers."""
+        self._dataset_registry = DatasetRegistry()
+        self._dataset_registry.register(Metadata.TRAIN, self.train)
+        self._dataset_registry.register(Metadata.TEST, self.test)
+
+    def _get_dropped_features(self):
+        """Get the features which were configured to be dropped.
+
+        :return: The dropped features, or None if there are none.
+        :rtype: list[str]
+        """
+        if self._feature_metadata is None:
+            return None
+        return self._feature_metadata.dropped_features
+
+    def _get_test_features(self, large=False):
+        """Get a view of the features of the test data to predict on.
+
+        :param large: Whether to get the features of the large test data.
+        :type large: bool
+        :return: The features of the test data.
+        :rtype: pandas.DataFrame
+        """
+        return self._dataset_registry.get(
+            SerializationAttributes.LARGE_TEST if large else Metadata.TEST,
+            exclude_columns=(self._get_dropped_features() or []) +
+            [self.target_column])
 
     def _consolidate_categorical_features(
             self,
@@ -547,7 +727,7 @@ class RAIInsights(RAIBaseInsights):
                     'categorical feature list')
 
             difference_set = set(categorical_features) - set(
-                train.drop(columns=[target_column]).columns)
+                train.columns.drop(target_column))
             if len(difference_set) > 0:
                 message = ("Feature names in categorical_features "
                            "do not exist in train data: "
@@ -567,8 +747,9 @@ class RAIInsights(RAIBaseInsights):
                 "for classification scenario.")
         # Check if any features exist that are not numeric, datetime, or
         # categorical.
-        train_features = train.drop(columns=[target_column]).columns
-        numeric_features = train.drop(
+        # select the dtypes on the empty head rather than a copy of train
+        train_features = train.columns.drop(target_column)
+        numeric_features = train.head(0).drop(
             columns=[target_column]).select_dtypes(
                 include='number').columns.tolist()
         string_features_set = set(train_features) - set(numeric_features)
@@ -600,10 +781,8 @@ class RAIInsights(RAIBaseInsights):
             else:
                 features_to_drop = [target_column]
 
-            actual_train_data = train.drop(
-                columns=features_to_drop, axis=1)
-            actual_test_data = test.drop(
-                columns=features_to_drop, axis=1)
+            actual_train_data = get_column_view(train, features_to_drop)
+            actual_test_data = get_column_view(test, features_to_drop)
             if (len(actual_train_data.columns) == 0 or
                     len(actual_test_data.columns) == 0):
                 if has_dropped_features:
@@ -673,10 +852,8 @@ class RAIInsights(RAIBaseInsights):
                 else:
                     features_to_drop = [target_column]
 
-                train_data = train.drop(
-                    columns=features_to_drop, axis=1)
-                test_data = test.drop(
-                    columns=features_to_drop, axis=1)
+                train_data = get_column_view(train, features_to_drop)
+                test_data = get_column_view(test, features_to_drop)
 
                 train_predictions = model.predict(train_data)
                 test_predictions = model.predict(test_data)
@@ -703,7 +880,7 @@ class RAIInsights(RAIBaseInsights):
                     "Expecting type FeatureMetadata but got "
                     f"{type(feature_metadata)}")
 
-            feature_names = list(train.drop(columns=[target_column]).columns)
+            feature_names = list(train.columns.drop(target_column))
             feature_metadata.validate_feature_metadata_with_user_features(
                 feature_names)
 
@@ -732,8 +909,7 @@ class RAIInsights(RAIBaseInsights):
         if self.task_type == ModelTask.FORECASTING:
             self.model = _wrap_model(
                 model,
-                self.get_test_data(
-                    test_data=self.test).drop(columns=[self.target_column]),
+                self._get_test_features(),
                 self._feature_metadata.datetime_features[0],
                 self._feature_metadata.time_series_id_features)
         else:
@@ -866,6 +1042,158 @@ class RAIInsights(RAIBaseInsights):
         :rtype: pandas.DataFrame
         """
         large = use_entire_test_data and self._large_test is not None
+        filter_data_with_cohort = self._get_cohort_filter(large)
+        if large and self._can_use_large_data_store():
+            # filter the entire test data chunk by chunk
+            row_indexes = self.get_large_data_store().\
+                get_filtered_row_indexes(filters, composite_filters)
+            return filter_data_with_cohort.filter_data_from_row_indexes(
+                row_indexes,
+                include_original_columns_only=include_original_columns_only)
+        key = get_cohort_key(filters, composite_filters, scope=large)
+        row_indexes = self._cohort_mask_cache.get(key)
+        if row_indexes is None:
+            row_indexes = self._cohort_mask_cache.put(
+                key, filter_data_with_cohort.get_filtered_row_indexes(
+                    filters=filters, composite_filters=composite_filters))
+
+        return filter_data_with_cohort.filter_data_from_row_indexes(
+            row_indexes,
+            include_original_columns_only=include_original_columns_only)
+
+    def get_cohort_cache_stats(self):
+        """Get the usage statistics of the cache of filtered cohorts.
+
+        The rows selected by each set of cohort filters are cached and
+        reused across the dashboard requests for the same cohort.
+
+        :return: The hits, misses, hit rate, number of entries and
+            bytes held by the cache.
+        :rtype: dict
+        """
+        return self._cohort_mask_cache.get_stats()
+
+    def get_cohort_metric(self, filters, composite_filters, metric=None):
+        """Get the metric of a cohort on the entire test data.
+
+        Unlike the other insights, which are computed on at most
+        maximum_rows_for_test rows of the test data, the metric is
+        computed on all the rows of the cohort, chunk by chunk, from the
+        cached predictions of the model.
+
+        :param filters: The filters to apply.
+        :type filters: list[Filter]
+        :param composite_filters: The composite filters to apply.
+        :type composite_filters: list[CompositeFilter]
+        :param metric: The metric, by default the error rate for
+            classification and the mean squared error for regression.
+        :type metric: str
+        :return: The metric name and value and the number of rows of the
+            cohort.
+        :rtype: dict
+        """
+        return self.get_large_data_store().compute_cohort_metric(
+            filters, composite_filters, metric=metric)
+
+    def get_cohort_heatmap(self, features, filters, composite_filters,
+                           num_bins=MatrixParams.BIN_THRESHOLD, metric=None):
+        """Get the error heatmap of a cohort on the entire test data.
+
+        The heatmap is computed on all the rows of the cohort, chunk by
+        chunk.  The numeric features are split into equal width bins over
+        their range on the entire test data.
+
+        :param features: One or two feature names.
+        :type features: list[str]
+        :param filters: The filters to apply.
+        :type filters: list[Filter]
+        :param composite_filters: The composite filters to apply.
+        :type composite_filters: list[CompositeFilter]
+        :param num_bins: The number of bins of the numeric features.
+        :type num_bins: int
+        :param metric: The metric, by default the error rate for
+            classification and the mean squared error for regression.
+        :type metric: str
+        :return: The heatmap, in the format of the error analysis
+            heatmap.
+        :rtype: dict
+        """
+        return self.get_large_data_store().compute_matrix(
+            features, filters, composite_filters, num_bins=num_bins,
+            metric=metric)
+
+    def get_large_data_store(self):
+        """Get the store evaluating cohorts on the entire test data.
+
+        The store reads the test data and the cached predictions chunk by
+        chunk, so that they may be memory-mapped, for example by loading
+        the RAIInsights saved in the 'npy' format with a mmap_mode.
+
+        :return: The store of the entire test data.
+        :rtype: LargeDataStore
+        """
+        if self._large_data_store is None:
+            large = self._large_test is not None
+            test_data = self._large_test if large else self.test
+            pred_y = self._get_cached_predictions(large)
+            self._large_data_store = LargeDataStore(
+                dataset=get_column_view(
+                    test_data, (self._get_dropped_features() or []) +
+                    [self.target_column]),
+                true_y=test_data[self.target_column].to_numpy(),
+                pred_y=pred_y,
+                categorical_features=self.categorical_features,
+                categories=self._categories,
+                model_task=self.task_type,
+                classes=self._classes)
+        return self._large_data_store
+
+    def _can_use_large_data_store(self):
+        """Get whether cohorts can be filtered with the large data store.
+
+        :return: True if the task is supported by the store and the
+            predictions on the entire test data are cached.
+        :rtype: bool
+        """
+        if self.task_type not in (ModelTask.CLASSIFICATION,
+                                  ModelTask.REGRESSION):
+            return False
+        return self._get_cached_predictions(
+            self._large_test is not None) is not None
+
+    def _get_cached_predictions(self, large):
+        """Get the cached predictions without loading the model.
+
+        :param large: Whether to get the predictions on the large test
+            data.
+        :type large: bool
+        :return: The cached predictions, or None if there are none.
+        :rtype: numpy.ndarray
+        """
+        methods = [m for m in MODEL_METHODS.get(self.task_type, [])
+                   if m.purpose == MethodPurpose.PREDICTION]
+        if len(methods) == 0:
+            return None
+        return self.__dict__.get(
+            f"_{'large_' if large else ''}{methods[0].name}_output")
+
+    def _init_cohort_cache(self):
+        """Initializes the cache of the rows selected by cohort filters."""
+        self._cohort_mask_cache = CohortMaskCache()
+        self._cohort_filters = {}
+        self._large_data_store = None
+
+    def _get_cohort_filter(self, large):
+        """Get the object used to filter the test data with cohort filters.
+
+        :param large: Whether to filter the entire test data.
+        :type large: bool
+        :return: The object used to filter the test data.
+        :rtype: FilterDataWithCohortFilters
+        """
+        if large in self._cohort_filters:
+            return self._cohort_filters[large]
+
         pred_y = getattr(
             self,
             self._get_model_output_name(purpose=MethodPurpose.PREDICTION,
@@ -877,8 +1205,9 @@ class RAIInsights(RAIBaseInsights):
             test_data = self.test
             true_y = self.test[self.target_column]
 
-        X_test = test_data.drop(columns=[self.target_column])
-        X_test_after_drop = self.get_test_data(X_test)
+        X_test_after_drop = get_column_view(
+            test_data, (self._get_dropped_features() or []) +
+            [self.target_column])
         filter_data_with_cohort = FilterDataWithCohortFilters(
             model=self.model,
             dataset=X_test_after_drop,
@@ -889,29 +1218,65 @@ class RAIInsights(RAIBaseInsights):
             pred_y=pred_y,
             model_task=self.task_type,
             classes=self._classes)
+        self._cohort_filters[large] = filter_data_with_cohort
+        return filter_data_with_cohort
 
-        return filter_data_with_cohort.filter_data_from_cohort(
-            filters=filters,
-            composite_filters=composite_filters,
-            include_original_columns_only=include_original_columns_only)
+    def refresh_model_outputs(self):
+        """Call the model again on the test data to update its outputs.
+
+        The outputs of the model are cached when the RAIInsights is
+        created or loaded, and get_data reads them from the cache, so
+        this is only needed if the model changed its predictions, for
+        example if it is served remotely and was retrained.
+        """
+        if self.model is not None:
+            self._cache_model_outputs()
+        self._init_cohort_cache()
+        self._init_data_cache()
 
     def get_data(self):
         """Get all data as RAIInsightsData object
 
+        The data is memoized until any of the managers computes new
+        results or refresh_model_outputs is called, so that repeated
+        calls do not convert the dataset and the results again. Each call
+        returns a shallow copy of the memoized data and of its dataset, so
+        their fields can be reassigned, but the lists they hold and the
+        results are shared between the calls and must not be modified in
+        place.
+
         :return: Model Analysis Data
         :rtype: RAIInsightsData
         """
+        managers = {}
+        for manager_name in [ManagerNames.DATA_BALANCE,
+                             ManagerNames.EXPLAINER,
+                             ManagerNames.ERROR_ANALYSIS,
+                             ManagerNames.CAUSAL,
+                             ManagerNames.COUNTERFACTUAL]:
+            if hasattr(self, manager_name):
+                managers[manager_name] = getattr(self, manager_name)
+        data_cache_key = self._get_data_cache_key(managers)
+        if self._data_cache is not None and \
+                self._data_cache_key == data_cache_key:
+            return self._copy_data_cache()
+
         data = RAIInsightsData()
         data.dataset = self._get_dataset()
-        if hasattr(self, ManagerNames.EXPLAINER):
-            data.modelExplanationData = self.explainer.get_data()
-        if hasattr(self, ManagerNames.ERROR_ANALYSIS):
-            data.errorAnalysisData = self.error_analysis.get_data()
-        if hasattr(self, ManagerNames.CAUSAL):
-            data.causalAnalysisData = self.causal.get_data()
-        if hasattr(self, ManagerNames.COUNTERFACTUAL):
-            data.counterfactualData = self.counterfactual.get_data()
-        return data
+        if ManagerNames.EXPLAINER in managers:
+            data.modelExplanationData = \
+                managers[ManagerNames.EXPLAINER].get_data()
+        if ManagerNames.ERROR_ANALYSIS in managers:
+            data.errorAnalysisData = \
+                managers[ManagerNames.ERROR_ANALYSIS].get_data()
+        if ManagerNames.CAUSAL in managers:
+            data.causalAnalysisData = managers[ManagerNames.CAUSAL].get_data()
+        if ManagerNames.COUNTERFACTUAL in managers:
+            data.counterfactualData = \
+                managers[ManagerNames.COUNTERFACTUAL].get_data()
+        self._data_cache = data
+        self._data_cache_key = data_cache_key
+        return self._copy_data_cache()
 
     def _get_dataset(self):
         dashboard_dataset = Dataset()
@@ -946,8 +1311,8 @@ class RAIInsights(RAIBaseInsights):
         predicted_y = None
         feature_length = None
 
-        dataset: pd.DataFrame = self.test.drop(
-            [self.target_column], axis=1)
+        dataset: pd.DataFrame = get_column_view(
+            self.test, [self.target_column])
 
         if isinstance(dataset, pd.DataFrame) and hasattr(dataset, 'columns'):
             self._dataframeColumns = dataset.columns
@@ -955,32 +1320,15 @@ class RAIInsights(RAIBaseInsights):
             list_dataset = convert_to_list(dataset)
         except Exception as ex:
             raise ValueError("Unsupported dataset type") from ex
-        if dataset is not None and self.model is not None:
-            try:
-                predict_dataset = dataset
-                metadata = self._feature_metadata
-                metadata_exists = metadata is not None
-                dropped_features_exist = metadata_exists and \
-                    metadata.dropped_features is not None
-                if (dropped_features_exist and
-                        len(metadata.dropped_features) != 0):
-                    predict_dataset = predict_dataset.drop(
-                        metadata.dropped_features, axis=1)
-                predicted_y = self._get_model_output(
-                    input_data=predict_dataset,
-                    purpose=MethodPurpose.PREDICTION)
-            except Exception as ex:
-                model_method = self._get_model_method(
-                    purpose=MethodPurpose.PREDICTION)
-                raise ValueError(
-                    f"Model does not support {model_method.__name__} method "
-                    "for the given dataset type,") from ex
+        if dataset is not None:
+            predicted_y = self._get_cached_model_output(
+                input_data=dataset, purpose=MethodPurpose.PREDICTION)
+        if predicted_y is not None:
             try:
                 predicted_y = convert_to_list(predicted_y)
             except Exception as ex:
                 raise ValueError(
                     "Model prediction output of unsupported type,") from ex
-        if predicted_y is not None:
             if (self.task_type == ModelTask.CLASSIFICATION and
                     dashboard_dataset.class_names is not None):
                 predicted_y = [dashboard_dataset.class_names.index(
@@ -1037,70 +1385,83 @@ class RAIInsights(RAIBaseInsights):
             dashboard_dataset.feature_names = features
         dashboard_dataset.target_column = self.target_column
 
-        model_method = self._get_model_method(
-            purpose=MethodPurpose.PROBABILITY)
-        if model_method is not None and dataset is not None:
-            try:
-                predict_dataset = dataset
-                metadata = self._feature_metadata
-                metadata_exists = metadata is not None
-                dropped_features_exist = metadata_exists and \
-                    metadata.dropped_features is not None
-                if (dropped_features_exist and
-                        len(metadata.dropped_features) != 0):
-                    predict_dataset = predict_dataset.drop(
-                        metadata.dropped_features, axis=1)
-                probability_y = model_method(predict_dataset)
-            except Exception as ex:
-                raise ValueError(
-                    f"Model does not support {model_method.__name__} method"
-                    " for given dataset type,") from ex
-            try:
-                probability_y = convert_to_list(probability_y)
-            except Exception as ex:
-                raise ValueError(
-                    f"Model {model_method.__name__} "
-                    "output of unsupported type,") from ex
-            dashboard_dataset.probability_y = probability_y
+        if dataset is not None:
+            probability_y = self._get_cached_model_output(
+                input_data=dataset, purpose=MethodPurpose.PROBABILITY)
+            if probability_y is not None:
+                try:
+                    probability_y = convert_to_list(probability_y)
+                except Exception as ex:
+                    model_method = self._get_model_method(
+                        purpose=MethodPurpose.PROBABILITY)
+                    raise ValueError(
+                        f"Model {model_method.__name__} "
+                        "output of unsupported type,") from ex
+                dashboard_dataset.probability_y = probability_y
 
         return dashboard_dataset
 
-    def _save_predictions(self, path):
+    def _save_predictions(self, path, data_format=DataFormats.JSON):
         """Save the predictions to files.
 
         :param path: The directory path to save the RAIInsights to.
         :type path: str
+        :param data_format: The format to save the predictions in, either
+            'json' or 'npy'.
+        :type data_format: str
         """
         prediction_output_path = (
             Path(path) /
             SerializationAttributes.PREDICTIONS_DIRECTORY)
         prediction_output_path.mkdir(parents=True, exist_ok=True)
 
-        if self.model is None:
-            return
-
         for data_name, file_name in _OUTPUT_FIELDS_AND_FILENAMES:
+            json_path = prediction_output_path / file_name
+            npy_path = json_path.with_suffix(FileFormats.NPY)
+            remove_data(json_path)
+            remove_data(npy_path)
+            if self.model is None:
+                continue
             if (data_name in self.__dict__ and
                     self.__dict__[data_name] is not None):
-                self._write_to_file(
-                    prediction_output_path / file_name,
-                    json.dumps(self.__dict__[data_name].tolist()))
+                output = self.__dict__[data_name]
+                if data_format == DataFormats.NPY and \
+                        can_save_array(output):
+                    save_array(output, npy_path)
+                else:
+                    self._write_to_file(json_path,
+                                        json.dumps(output.tolist()))
 
-    def _save_large_data(self, path):
+    def _save_large_data(self, path, data_format=DataFormats.JSON):
         """Save the large data.
 
         :param path: The directory path to save the RAIInsights to.
         :type path: str
+        :param data_format: The format to save the large data in, either
+            'json' or 'npy'.
+        :type data_format: str
         """
+        data_directory = Path(path) / SerializationAttributes.DATA_DIRECTORY
+        large_test_path = (
+            data_directory / SerializationAttributes.LARGE_TEST_JSON)
+        large_test_columnar_path = (
+            data_directory / SerializationAttributes.LARGE_TEST)
+        test_sample_path = (
+            data_directory / SerializationAttributes.TEST_SAMPLE_JSON)
+        remove_data(large_test_path)
+        remove_data(large_test_columnar_path)
+        remove_data(test_sample_path)
+        if self._test_sample is not None:
+            self._write_to_file(test_sample_path,
+                                json.dumps(self._test_sample.to_dict()))
         if self._large_test is not None:
             # Save large test data
-            large_test_path = (
-                Path(path) /
-                SerializationAttributes.DATA_DIRECTORY /
-                SerializationAttributes.LARGE_TEST_JSON)
-            self._write_to_file(
-                large_test_path,
-                self._large_test.to_json(orient='split'))
+            if data_format == DataFormats.NPY:
+                save_dataframe(self._large_test, large_test_columnar_path)
+            else:
+                self._write_to_file(
+                    large_test_path,
+                    self._large_test.to_json(orient='split'))
 
     def _save_metadata(self, path):
         """Save the metadata like target column, categorical features,
@@ -1131,14 +1492,24 @@ class RAIInsights(RAIBaseInsights):
         with open(top_dir / Metadata.META_JSON, 'w') as file:
             json.dump(meta, file)
 
-    def save(self, path):
+    def save(self, path, data_format=DataFormats.JSON):
         """Save the RAIInsights to the given path.
 
         :param path: The directory path to save the RAIInsights to.
         :type path: str
+        :param data_format: The format to save the datasets and model
+            outputs in.  Either 'json', or 'npy' to save each column in
+            the NumPy binary format, which is faster to save and load
+            and can be memory-mapped by RAIInsights.load.
+        :type data_format: str
         """
-        super(RAIInsights, self).save(path)
-        self._save_large_data(path)
+        self._validate_data_format(data_format)
+        self._save_managers(path)
+        self._save_data(path, data_format=data_format)
+        self._save_metadata(path)
+        self._save_model(path)
+        self._save_predictions(path, data_format=data_format)
+        self._save_large_data(path, data_format=data_format)
 
     def _get_model_method(self, *, purpose: MethodPurpose):
         """Get the model's method for the indicated purpose.
@@ -1176,6 +1547,47 @@ class RAIInsights(RAIBaseInsights):
             return model_method(input_data)
         return None
 
+    def _get_cached_model_output(self, *, input_data, purpose):
+        """Get the output of a model method on the test data.
+
+        The output cached by _set_model_outputs, or loaded with the
+        RAIInsights, is returned without calling the model.  Otherwise
+        the model method is called and its output is cached.
+
+        :param input_data: the test data without the target column
+        :type input_data: pd.DataFrame
+        :param purpose: the purpose to identify suitable model methods
+        :type purpose: MethodPurpose
+        :return: the model output if there is a model with a suitable
+            method, otherwise None
+        :rtype: Union[None, np.array]
+        """
+        methods = [m for m in MODEL_METHODS[self.task_type]
+                   if m.purpose == purpose]
+        if len(methods) == 0:
+            return None
+        # look up the cached output without loading the model after a
+        # lazy load
+        output_name = f"_{methods[0].name}_output"
+        model_output = self.__dict__.get(output_name)
+        if model_output is not None:
+            return model_output
+
+        if self.model is None:
+            return None
+        model_method = self._get_model_method(purpose=purpose)
+        if model_method is None:
+            return None
+        try:
+            predict_dataset = self.get_test_data(test_data=input_data)
+            model_output = model_method(predict_dataset)
+        except Exception as ex:
+            raise ValueError(
+                f"Model does not support {model_method.__name__} method "
+                "for the given dataset type,") from ex
+        setattr(self, output_name, model_output)
+        return model_output
+
     def _ensure_model_outputs(self, *, input_data):
         """Ensure that the model outputs are as expected.
 
@@ -1221,31 +1633,37 @@ class RAIInsights(RAIBaseInsights):
         model_method = self._get_model_method(purpose=purpose)
         return f"_{'large_' if large else ''}{model_method.__name__}_output"
 
-    def _set_model_output(self, *, model_method, input_data, large=False):
-        """Store the model output on a suitable field.
+    @staticmethod
+    def _compute_model_outputs(model, task_type, input_data):
+        """Call the model to compute the outputs cached for the task.
 
-        :param model_method: the method to use to produce the model output
-        :type model_method: ModelMethod
+        :param model: The model.
+        :type model: object
+        :param task_type: The task to run.
+        :type task_type: str
         :param input_data: the data to pass to the model
         :type input_data: Union[pd.DataFrame, np.array]
-        :param large: whether or not the output is based on a large (full)
-            dataset
-        :type large: boolean
+        :return: The output of each model method by name, which is None
+            for the optional methods the model does not have.
+        :rtype: dict
         """
-        field_name = f"_{'large_' if large else ''}{model_method.name}_output"
-        try:
-            method = getattr(self.model, model_method.name)
-        except AttributeError as err:
-            if model_method.optional:
-                setattr(self, field_name, None)
-                return
-            else:
-                raise ValueError(
-                    f"The model is expected to have a {model_method.name} "
-                    "method,") from err
-        setattr(self, field_name, method(input_data))
-
-    def _set_model_outputs(self, *, input_data, large=False):
+        model_outputs = {}
+        for model_method in MODEL_METHODS[task_type]:
+            try:
+                method = getattr(model, model_method.name)
+            except AttributeError as err:
+                if model_method.optional:
+                    model_outputs[model_method.name] = None
+                    continue
+                else:
+                    raise ValueError(
+                        f"The model is expected to have a {model_method.name} "
+                        "method,") from err
+            model_outputs[model_method.name] = method(input_data)
+        return model_outputs
+
+    def _set_model_outputs(self, *, input_data=None, large=False,
+                           model_outputs=None):
         """Store all model outputs on suitable fields.
 
         :param input_data: the data to pass to the model
@@ -1253,12 +1671,89 @@ class RAIInsights(RAIBaseInsights):
         :param large: whether or not the output is based on a large (full)
             dataset
         :type large: boolean
+        :param model_outputs: The outputs of the model by model method,
+            if they are already computed, in which case the input data
+            is not used.
+        :type model_outputs: dict
+        """
+        if model_outputs is None:
+            model_outputs = RAIInsights._compute_model_outputs(
+                self.model, self.task_type, input_data)
+        for name, output in model_outputs.items():
+            setattr(self, f"_{'large_' if large else ''}{name}_output",
+                    output)
+
+    def _cache_model_outputs(self, large_model_outputs=None):
+        """Store the outputs of the model on the test data.
+
+        When the test data is sampled from the large test data, the
+        outputs on the sampled rows are taken from the outputs on the
+        large test data instead of calling the model on them again.
+
+        :param large_model_outputs: The outputs of the model on the large
+            test data by model method, if they are already computed.
+        :type large_model_outputs: dict
         """
-        for model_method in MODEL_METHODS[self.task_type]:
-            self._set_model_output(
-                model_method=model_method,
-                input_data=input_data,
-                large=large)
+        if self._large_test is not None:
+            if large_model_outputs is None:
+                large_model_outputs = RAIInsights._compute_model_outputs(
+                    self.model, self.task_type,
+                    self._get_test_features(large=True))
+            self._set_model_outputs(model_outputs=large_model_outputs,
+                                    large=True)
+        if self._test_sample is None:
+            self._set_model_outputs(input_data=self._get_test_features())
+        else:
+            self._set_model_outputs(model_outputs={
+                name: None if output is None else self._test_sample.take(
+                    output)
+                for name, output in large_model_outputs.items()})
+
+    @staticmethod
+    def _process_categoricals(all_feature_names, categorical_features,
+                              test, target_column, large_test=None,
+                              test_sample=None):
+        """Process the categorical features of the test data.
+
+        With a large test data, the categories are those of the entire
+        test data, like the feature ranges the categorical cohort filters
+        of the dashboard index into, so that the values found only in the
+        rows which were not sampled are filtered too.
+
+        :param all_feature_names: The list of all feature names.
+        :type all_feature_names: list[str]
+        :param categorical_features: The list of categorical features.
+        :type categorical_features: list[str]
+        :param test: The test data.
+        :type test: pandas.DataFrame
+        :param target_column: The name of the label column.
+        :type target_column: str
+        :param large_test: The large test data the test data was taken
+            from, if any.
+        :type large_test: pandas.DataFrame
+        :param test_sample: The sample of the large test data, or None if
+            the test data is its first rows.
+        :type test_sample: raiutils.sampling.DataSample
+        :return: The list of unique categories,
+            the list of indices of categorical features,
+            the dictionary of indices and categorical values
+            and the encoded test data.
+        :rtype: (list[list[str]], list[int], dict[int, str], numpy.ndarray)
+        """
+        if large_test is None:
+            return process_categoricals(
+                all_feature_names=all_feature_names,
+                categorical_features=categorical_features,
+                dataset=get_column_view(test, [target_column]))
+        encoder = CategoricalEncoder(
+            all_feature_names=all_feature_names,
+            categorical_features=categorical_features,
+            dataset=get_column_view(large_test, [target_column]))
+        row_indexes = np.arange(len(test)) if test_sample is None \
+            else test_sample.indexes
+        return encoder.categories, encoder.categorical_indexes, \
+            encoder.category_dictionary, \
+            encoder.get_string_indexed_data(row_indexes)
 
     @staticmethod
     def _get_feature_ranges(
@@ -1362,29 +1857,45 @@ class RAIInsights(RAIBaseInsights):
                 dropped_features=meta[Metadata.FEATURE_METADATA][
                     _DROPPED_FEATURES],)
 
-        all_features_names = inst.__dict__['_' + Metadata.FEATURE_COLUMNS]
-        categorical_features = inst.__dict__[Metadata.CATEGORICAL_FEATURES]
-        dataset = inst.__dict__[Metadata.TEST].drop(
-            columns=[inst.__dict__[Metadata.TARGET_COLUMN]])
+        # the managers loaded next are handed views of the datasets
+        inst._init_dataset_registry()
+
+    @staticmethod
+    def _load_categoricals(inst):
+        """Process the categorical features of the loaded test data.
+
+        :param inst: RAIInsights object instance.
+        :type inst: RAIInsights
+        """
         inst.__dict__['_' + Metadata.CATEGORIES], \
             inst.__dict__['_' + Metadata.CATEGORICAL_INDEXES], \
             inst.__dict__['_' + Metadata.CATEGORY_DICTIONARY], \
             inst.__dict__['_' + Metadata.STRING_IND_DATA] = \
-            process_categoricals(
-                all_feature_names=all_features_names,
-                categorical_features=categorical_features,
-                dataset=dataset)
+            RAIInsights._process_categoricals(
+                all_feature_names=inst.__dict__[
+                    '_' + Metadata.FEATURE_COLUMNS],
+                categorical_features=inst.__dict__[
+                    Metadata.CATEGORICAL_FEATURES],
+                test=inst.__dict__[Metadata.TEST],
+                target_column=inst.__dict__[Metadata.TARGET_COLUMN],
+                large_test=inst.__dict__['_large_test'],
+                test_sample=inst.__dict__[_TEST_SAMPLE])
 
     @staticmethod
-    def _load_predictions(inst, path):
+    def _load_predictions(inst, path, mmap_mode=None):
         """Load the predictions.
 
         :param inst: RAIInsights object instance.
         :type inst: RAIInsights
         :param path: The directory path to data location.
         :type path: str
+        :param mmap_mode: The memory-map mode for predictions saved in
+            the NumPy format, or None to read them fully into memory.
+        :type mmap_mode: str
         """
-        if inst.__dict__[_MODEL] is None:
+        # the model is not loaded yet after a lazy load, in which case
+        # only the saved files determine the predictions
+        if _MODEL in inst.__dict__ and inst.__dict__[_MODEL] is None:
             for data_name in _OUTPUT_FIELDS:
                 inst.__dict__[data_name] = None
             return
@@ -1395,46 +1906,66 @@ class RAIInsights(RAIBaseInsights):
 
         for data_name, file_name in _OUTPUT_FIELDS_AND_FILENAMES:
             file_path = prediction_output_path / file_name
-            if file_path.exists():
+            npy_path = file_path.with_suffix(FileFormats.NPY)
+            if npy_path.exists():
+                inst.__dict__[data_name] = load_array(npy_path,
+                                                      mmap_mode=mmap_mode)
+            elif file_path.exists():
                 with open(file_path, 'r') as file:
                     inst.__dict__[data_name] = np.array(json.load(file))
             else:
                 inst.__dict__[data_name] = None
 
     @staticmethod
-    def _load_large_data(inst, path):
+    def _load_large_data(inst, path, mmap_mode=None):
         """Load the large test data.
 
         :param inst: RAIInsights object instance.
         :type inst: RAIInsights
         :param path: The directory path to data location.
         :type path: str
+        :param mmap_mode: The memory-map mode for data saved in the
+            columnar format, or None to read it fully into memory.
+        :type mmap_mode: str
         """
-        large_test_path = (
+        data_directory = (
             Path(path) /
-            SerializationAttributes.DATA_DIRECTORY /
-            SerializationAttributes.LARGE_TEST_JSON)
-        if large_test_path.exists():
-            data_directory = (
-                Path(path) /
-                SerializationAttributes.DATA_DIRECTORY)
-            with open(
-                data_directory / (
-                    Metadata.TEST + 'dtypes' + FileFormats.JSON),
-                    'r') as file:
-                types = json.load(file)
-            with open(large_test_path, 'r') as file:
-                inst.__dict__["_large_test"] = \
-                    pd.read_json(file, dtype=types, orient='split')
-        else:
-            inst.__dict__["_large_test"] = None
+            SerializationAttributes.DATA_DIRECTORY)
+        inst.__dict__["_large_test"] = RAIBaseInsights._load_dataframe(
+            data_directory, SerializationAttributes.LARGE_TEST,
+            mmap_mode=mmap_mode, dtypes_name=Metadata.TEST)
+        inst._dataset_registry.register(SerializationAttributes.LARGE_TEST,
+                                        inst.__dict__["_large_test"])
+        test_sample_path = (
+            data_directory / SerializationAttributes.TEST_SAMPLE_JSON)
+        inst.__dict__[_TEST_SAMPLE] = None
+        if test_sample_path.exists():
+            with open(test_sample_path, 'r') as file:
+                inst.__dict__[_TEST_SAMPLE] = DataSample.from_dict(
+                    json.load(file))
 
     @staticmethod
-    def load(path):
+    def load(path, mmap_mode=None, components=None, lazy=False):
         """Load the RAIInsights from the given path.
 
+        Both the JSON and the columnar 'npy' data formats are supported.
+
         :param path: The directory path to load the RAIInsights from.
         :type path: str
+        :param mmap_mode: The memory-map mode for datasets and model
+            outputs saved in the 'npy' format, for example 'r' to map the
+            files read-only instead of reading them into memory.  Ignored
+            for data saved in the JSON format.
+        :type mmap_mode: str
+        :param components: The names of the managers to load, for example
+            ['error_analysis'], or None to load all the managers.  The
+            other managers are unavailable on the loaded RAIInsights,
+            which can then not be saved.
+        :type components: list[str]
+        :param lazy: Whether to defer unpickling the model and loading
+            each manager until they are first accessed, for example
+            through the causal or explainer properties.
+        :type lazy: bool
         :return: The RAIInsights object after loading.
         :rtype: RAIInsights
         """
@@ -1452,8 +1983,13 @@ class RAIInsights(RAIBaseInsights):
 
         # load current state
         RAIBaseInsights._load(path, inst, manager_map,
-                              RAIInsights._load_metadata)
-        RAIInsights._load_predictions(inst, path)
-        RAIInsights._load_large_data(inst, path)
+                              RAIInsights._load_metadata,
+                              mmap_mode=mmap_mode,
+                              components=components, lazy=lazy)
+        RAIInsights._load_predictions(inst, path, mmap_mode=mmap_mode)
+        RAIInsights._load_large_data(inst, path, mmap_mode=mmap_mode)
+        RAIInsights._load_categoricals(inst)
+        inst._init_cohort_cache()
+        inst._init_data_cache()
 
         return inst
@@ -2,7 +2,9 @@
 # Copyright (c) Microsoft Corporation
 # Licensed under the MIT License.
 
+import json
 import os
+from unittest import mock
 
 import pytest
 
@@ -17,6 +19,26 @@ from responsibleai._tools.shared.state_directory_management import \
 from ..common_utils import create_iris_data
 
 
+class FailingInWorkerModel(object):
+    """A model failing to predict in any process but its own."""
+
+    def __init__(self, model):
+        self._model = model
+        self._pid = os.getpid()
+
+    def predict(self, X):
+        self._check_process()
+        return self._model.predict(X)
+
+    def predict_proba(self, X):
+        self._check_process()
+        return self._model.predict_proba(X)
+
+    def _check_process(self):
+        if os.getpid() != self._pid:
+            raise ValueError('Failed to predict in a worker process')
+
+
 class TestCounterfactualAdvancedFeatures(object):
 
     @pytest.mark.parametrize('vary_all_features', [True, False])
@@ -180,6 +202,115 @@ class TestCounterfactualAdvancedFeatures(object):
         assert counterfactual_config_list[0].explainer is not None
         assert counterfactual_config_list[1].explainer is not None
 
+    @pytest.mark.parametrize('feature_importance', [True, False])
+    def test_counterfactual_batches(self, feature_importance):
+        X_train, X_test, y_train, y_test, feature_names, _ = \
+            create_iris_data()
+
+        model = create_lightgbm_classifier(X_train, y_train)
+        X_train['target'] = y_train
+        X_test['target'] = y_test
+
+        cf_objs = []
+        for n_jobs in [1, 2]:
+            rai_insights = RAIInsights(
+                model=model,
+                train=X_train,
+                test=X_test.iloc[0:25],
+                target_column='target',
+                task_type='classification')
+            rai_insights.counterfactual.add(
+                total_CFs=10, desired_class=2,
+                feature_importance=feature_importance)
+            rai_insights.counterfactual.compute(n_jobs=n_jobs, batch_size=10)
+            cf_objs.append(rai_insights.counterfactual.get()[0])
+
+        for cf_obj in cf_objs:
+            assert len(cf_obj.cf_examples_list) == 25
+            if feature_importance:
+                assert len(cf_obj.local_importance) == 25
+                assert set(cf_obj.summary_importance) == set(feature_names)
+            else:
+                assert cf_obj.summary_importance is None
+
+        # The batches are seeded from their index, so the
+        # counterfactuals do not depend on the number of jobs
+        sequential, parallel = [
+            json.loads(cf_obj.to_json()) for cf_obj in cf_objs]
+        assert sequential['test_data'] == parallel['test_data']
+        assert sequential['cfs_list'] == parallel['cfs_list']
+
+        with pytest.raises(UserConfigValidationException,
+                           match='batch_size should be a positive integer.'):
+            rai_insights.counterfactual.compute(batch_size=0)
+
+    def test_counterfactual_batches_unpicklable_model(self):
+        X_train, X_test, y_train, y_test, _, _ = create_iris_data()
+
+        model = create_lightgbm_classifier(X_train, y_train)
+        # the model cannot be pickled for the worker processes
+        model.callback = lambda: None
+        X_train['target'] = y_train
+        X_test['target'] = y_test
+
+        rai_insights = RAIInsights(
+            model=model,
+            train=X_train,
+            test=X_test.iloc[0:20],
+            target_column='target',
+            task_type='classification')
+        rai_insights.counterfactual.add(total_CFs=10, desired_class=2)
+        with pytest.warns(UserWarning,
+                          match='cannot be pickled for the worker processes'):
+            rai_insights.counterfactual.compute(n_jobs=2, batch_size=10)
+        cf_obj = rai_insights.counterfactual.get()[0]
+        assert len(cf_obj.cf_examples_list) == 20
+
+    def test_counterfactual_batches_worker_error(self):
+        X_train, X_test, y_train, y_test, _, _ = create_iris_data()
+
+        model = FailingInWorkerModel(
+            create_lightgbm_classifier(X_train, y_train))
+        X_train['target'] = y_train
+        X_test['target'] = y_test
+
+        rai_insights = RAIInsights(
+            model=model,
+            train=X_train,
+            test=X_test.iloc[0:20],
+            target_column='target',
+            task_type='classification')
+        rai_insights.counterfactual.add(total_CFs=10, desired_class=2)
+        # the errors of the workers are raised rather than retried
+        with pytest.raises(ValueError,
+                           match='Failed to predict in a worker process'):
+            rai_insights.counterfactual.compute(n_jobs=2, batch_size=10)
+        assert rai_insights.counterfactual._counterfactual_config_list[
+            0].has_computation_failed
+
+    def test_counterfactual_compute_without_batches(self):
+        X_train, X_test, y_train, y_test, _, _ = create_iris_data()
+
+        model = create_lightgbm_classifier(X_train, y_train)
+        X_train['target'] = y_train
+        X_test['target'] = y_test
+
+        rai_insights = RAIInsights(
+            model=model,
+            train=X_train,
+            test=X_test.iloc[0:25],
+            target_column='target',
+            task_type='classification')
+        rai_insights.counterfactual.add(total_CFs=10, desired_class=2)
+        module = 'responsibleai.managers.counterfactual_manager.'
+        with mock.patch(module + '_generate_counterfactuals_batch') as \
+                generate_batch:
+            rai_insights.counterfactual.compute()
+        # all the test rows are generated at once, unseeded, by default
+        generate_batch.assert_not_called()
+        cf_obj = rai_insights.counterfactual.get()[0]
+        assert len(cf_obj.cf_examples_list) == 25
+
     @pytest.mark.parametrize('feature_importance', [True, False])
     def test_counterfactual_manager_request_counterfactuals(
             self, feature_importance):
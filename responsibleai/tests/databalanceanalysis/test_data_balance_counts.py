@@ -0,0 +1,85 @@
+# Copyright (c) Microsoft Corporation
+# Licensed under the MIT License.
+
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from responsibleai.databalanceanalysis import (AggregateBalanceMeasures,
+                                               DataBalanceCounts,
+                                               DistributionBalanceMeasures,
+                                               FeatureBalanceMeasures)
+
+from .conftest import (SYNTHETIC_DATA_ETHNICITY, SYNTHETIC_DATA_GENDER,
+                       SYNTHETIC_DATA_LABEL)
+
+COLS_OF_INTEREST = [SYNTHETIC_DATA_GENDER, SYNTHETIC_DATA_ETHNICITY]
+POS_LABELS = ["0", "1"]
+
+
+def _assert_same_measures(counts, dataset):
+    expected = FeatureBalanceMeasures.measures_for_labels(
+        dataset=dataset,
+        cols_of_interest=COLS_OF_INTEREST,
+        label_col=SYNTHETIC_DATA_LABEL,
+        pos_labels=POS_LABELS,
+    )
+    actual = counts.feature_balance_measures()
+    for pos_label in POS_LABELS:
+        pd.testing.assert_frame_equal(actual[pos_label], expected[pos_label])
+    pd.testing.assert_frame_equal(
+        counts.distribution_balance_measures(),
+        DistributionBalanceMeasures(COLS_OF_INTEREST).measures(dataset),
+    )
+    pd.testing.assert_frame_equal(
+        counts.aggregate_balance_measures(),
+        AggregateBalanceMeasures(COLS_OF_INTEREST).measures(dataset),
+    )
+
+
+class TestDataBalanceCounts:
+    @pytest.mark.parametrize("chunksize", [1, 4, 100])
+    def test_from_csv_chunks(self, synthetic_data, chunksize):
+        csv = io.StringIO(synthetic_data.to_csv(index=False))
+        counts = DataBalanceCounts.from_chunks(
+            chunks=pd.read_csv(csv, chunksize=chunksize),
+            cols_of_interest=COLS_OF_INTEREST,
+            label_col=SYNTHETIC_DATA_LABEL,
+            pos_labels=POS_LABELS,
+        )
+        assert counts.num_rows == len(synthetic_data)
+        _assert_same_measures(counts, synthetic_data)
+
+    def test_merge_shards(self, synthetic_data):
+        dataset = synthetic_data.copy()
+        dataset[SYNTHETIC_DATA_ETHNICITY] = pd.Categorical(
+            dataset[SYNTHETIC_DATA_ETHNICITY],
+            categories=["White", "Black", "Asian", "Other", "Unseen"])
+        dataset.loc[2, SYNTHETIC_DATA_GENDER] = np.nan
+
+        shards = [
+            DataBalanceCounts(
+                cols_of_interest=COLS_OF_INTEREST,
+                label_col=SYNTHETIC_DATA_LABEL,
+                pos_labels=POS_LABELS,
+            ).update(shard)
+            for shard in np.array_split(dataset, 3)
+        ]
+        counts = shards[0].merge(shards[1]).merge(shards[2])
+        _assert_same_measures(counts, dataset)
+
+    def test_merge_errors_on_other_columns(self, synthetic_data):
+        counts = DataBalanceCounts(
+            cols_of_interest=COLS_OF_INTEREST,
+            label_col=SYNTHETIC_DATA_LABEL,
+            pos_labels=POS_LABELS,
+        ).update(synthetic_data)
+        other = DataBalanceCounts(
+            cols_of_interest=[SYNTHETIC_DATA_GENDER],
+            label_col=SYNTHETIC_DATA_LABEL,
+            pos_labels=POS_LABELS,
+        ).update(synthetic_data)
+        with pytest.raises(ValueError, match="can be merged"):
+            counts.merge(other)
@@ -1,6 +1,8 @@
 # Copyright (c) Microsoft Corporation
 # Licensed under the MIT License.
 
+import json
+
 import pandas as pd
 import pytest
 from pandas.testing import assert_frame_equal
@@ -12,6 +14,9 @@ from responsibleai.databalanceanalysis.data_balance_utils import (
 from responsibleai.managers.data_balance_manager import DataBalanceManager
 from responsibleai.rai_insights.rai_insights import RAIInsights
 
+from .conftest import (SYNTHETIC_DATA_ETHNICITY, SYNTHETIC_DATA_GENDER,
+                       SYNTHETIC_DATA_LABEL)
+
 
 class TestDataBalanceManager:
     def test_init_with_valid_input(self, adult_data):
@@ -34,7 +39,7 @@ class TestDataBalanceManager:
             assert manager._train is train
             assert manager._test is test
             assert_frame_equal(
-                manager._df.reset_index(drop=True),
+                pd.concat(manager._get_datasets()).reset_index(drop=True),
                 combined.reset_index(drop=True),
             )
 
@@ -51,7 +56,7 @@ class TestDataBalanceManager:
         assert manager._task_type is None
         assert manager._train is None
         assert manager._test is None
-        assert manager._df is None
+        assert manager._get_datasets() == []
 
     @pytest.mark.parametrize("target_col", [None, ""])
     @pytest.mark.parametrize("cols_of_interest", [None, []])
@@ -276,7 +281,8 @@ class TestDataBalanceManager:
         assert_frame_equal(loaded._test, saved._test)
         assert loaded._target_column == saved._target_column
         # Also, df gets created using rai_insights.train and rai_insights.test
-        assert_frame_equal(loaded._df, saved._df)
+        assert_frame_equal(pd.concat(loaded._get_datasets()),
+                           pd.concat(saved._get_datasets()))
 
         # All the instance variables specific to the manager, such as
         # _cols_of_interest, don't get set.
@@ -316,7 +322,8 @@ class TestDataBalanceManager:
         assert_frame_equal(saved._train, loaded._train)
         assert_frame_equal(saved._test, loaded._test)
         assert saved._is_added is loaded._is_added is True
-        assert_frame_equal(saved._df, loaded._df)
+        assert_frame_equal(pd.concat(saved._get_datasets()),
+                           pd.concat(loaded._get_datasets()))
 
         assert saved._cols_of_interest == loaded._cols_of_interest
 
@@ -360,8 +367,70 @@ class TestDataBalanceManager:
         assert_frame_equal(saved._train, loaded._train)
         assert_frame_equal(saved._test, loaded._test)
         assert saved._is_added is loaded._is_added is True
-        assert_frame_equal(saved._df, loaded._df)
+        assert_frame_equal(pd.concat(saved._get_datasets()),
+                           pd.concat(loaded._get_datasets()))
 
         assert saved._cols_of_interest == loaded._cols_of_interest
 
         assert saved._data_balance_measures == loaded._data_balance_measures
+
+    @pytest.mark.parametrize(
+        "top_k_pairs,gap_threshold",
+        [(0, None), (1.5, None), (True, None), (None, -0.1), (None, "0.1")])
+    def test_add_errors_on_invalid_pair_limits(
+        self, synthetic_data, top_k_pairs, gap_threshold
+    ):
+        manager = DataBalanceManager(
+            train=synthetic_data,
+            test=None,
+            target_column=SYNTHETIC_DATA_LABEL,
+            classes=[0, 1],
+            task_type=TaskType.CLASSIFICATION,
+        )
+        with pytest.raises(ValueError):
+            manager.add(
+                cols_of_interest=[SYNTHETIC_DATA_ETHNICITY],
+                top_k_pairs=top_k_pairs,
+                gap_threshold=gap_threshold,
+            )
+
+    def test_save_and_load_with_pair_limits(self, tmpdir, synthetic_data):
+        saved = DataBalanceManager(
+            train=synthetic_data,
+            test=None,
+            target_column=SYNTHETIC_DATA_LABEL,
+            classes=[0, 1],
+            task_type=TaskType.CLASSIFICATION,
+        )
+        saved.add(
+            cols_of_interest=[SYNTHETIC_DATA_ETHNICITY],
+            top_k_pairs=1,
+            gap_threshold=0.0,
+        )
+        saved.compute()
+
+        # there are 6 pairs of ethnicities for each of the 2 classes
+        feature_measures = saved.get()[FEATURE_BALANCE_MEASURES_KEY]
+        num_pairs = sum(
+            len(feature_measures[label][SYNTHETIC_DATA_ETHNICITY])
+            for label in feature_measures)
+        assert 2 <= num_pairs < 12
+
+        save_dir = tmpdir.mkdir("save-dir")
+        saved._save(save_dir)
+        rai_insights = RAIInsights(
+            model=None,
+            train=synthetic_data,
+            test=synthetic_data,
+            target_column=SYNTHETIC_DATA_LABEL,
+            task_type="classification",
+            categorical_features=[SYNTHETIC_DATA_GENDER,
+                                  SYNTHETIC_DATA_ETHNICITY],
+        )
+        loaded = saved._load(save_dir, rai_insights)
+
+        assert loaded._top_k_pairs == 1
+        assert loaded._gap_threshold == 0.0
+        # compare the serialized measures since some gaps are nan
+        assert json.dumps(saved._data_balance_measures) == \
+            json.dumps(loaded._data_balance_measures)
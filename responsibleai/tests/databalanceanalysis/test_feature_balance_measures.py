@@ -1,13 +1,17 @@
 # Copyright (c) Microsoft Corporation
 # Licensed under the MIT License.
 
+import numpy as np
 import pandas as pd
 import pytest
 
 from responsibleai.databalanceanalysis import FeatureBalanceMeasures
+from responsibleai.databalanceanalysis.feature_balance_measures import \
+    get_largest_gap_pairs
 
 from ..common_utils import assert_series_and_dict_equal
-from .conftest import SYNTHETIC_DATA_GENDER, SYNTHETIC_DATA_LABEL
+from .conftest import (SYNTHETIC_DATA_ETHNICITY, SYNTHETIC_DATA_GENDER,
+                       SYNTHETIC_DATA_LABEL)
 
 
 class TestFeatureBalanceMeasures:
@@ -70,3 +74,90 @@ class TestFeatureBalanceMeasures:
                 label_col=target_feature,
                 pos_label=pos_label,
             ).measures(singular_valued_col_data)
+
+    def test_measures_for_labels(self, synthetic_data):
+        cols_of_interest = [SYNTHETIC_DATA_GENDER, SYNTHETIC_DATA_ETHNICITY]
+        pos_labels = ["0", "1"]
+        all_measures = FeatureBalanceMeasures.measures_for_labels(
+            dataset=synthetic_data,
+            cols_of_interest=cols_of_interest,
+            label_col=SYNTHETIC_DATA_LABEL,
+            pos_labels=pos_labels,
+        )
+        assert list(all_measures) == pos_labels
+        for pos_label in pos_labels:
+            expected = FeatureBalanceMeasures(
+                cols_of_interest=cols_of_interest,
+                label_col=SYNTHETIC_DATA_LABEL,
+                pos_label=pos_label,
+            ).measures(dataset=synthetic_data)
+            pd.testing.assert_frame_equal(all_measures[pos_label], expected)
+
+    def test_gaps_of_all_pairs(self):
+        df = pd.DataFrame({
+            "col": ["a", "b", "c", "a", "b", "a", "d"],
+            "target": [1, 0, 1, 1, 1, 0, 0],
+        })
+        measures = FeatureBalanceMeasures(
+            cols_of_interest=["col"], label_col="target", pos_label=1
+        ).measures(dataset=df)
+
+        assert list(zip(measures.ClassA, measures.ClassB)) == [
+            ("a", "b"), ("a", "c"), ("a", "d"),
+            ("b", "c"), ("b", "d"), ("c", "d")]
+        # p(pos | feature) of a, b, c is 2/3, 1/2, 1 and d has no positive
+        # label, so its measures are undefined
+        expected_parity_gaps = [1 / 6, -1 / 3, np.nan, -1 / 2, np.nan, np.nan]
+        np.testing.assert_allclose(
+            measures.StatisticalParity, expected_parity_gaps)
+        np.testing.assert_allclose(
+            measures.PointwiseMutualInfo,
+            [np.log(2 / 3) - np.log(1 / 2), np.log(2 / 3), np.nan,
+             np.log(1 / 2), np.nan, np.nan])
+
+    @pytest.mark.parametrize(
+        "top_k_pairs,gap_threshold", [(1, None), (2, 0.1), (None, 0.3)])
+    def test_largest_gaps(self, top_k_pairs, gap_threshold):
+        rng = np.random.default_rng(7)
+        df = pd.DataFrame({
+            "col": rng.integers(0, 20, 300).astype(str),
+            "target": rng.integers(0, 2, 300),
+        })
+        all_gaps = FeatureBalanceMeasures.measures_for_labels(
+            dataset=df, cols_of_interest=["col"], label_col="target",
+            pos_labels=["1"])["1"]
+        largest_gaps = FeatureBalanceMeasures.measures_for_labels(
+            dataset=df, cols_of_interest=["col"], label_col="target",
+            pos_labels=["1"], top_k_pairs=top_k_pairs,
+            gap_threshold=gap_threshold)["1"]
+
+        # the kept pairs are a subset of all the pairs, in the same order
+        assert 0 < len(largest_gaps) < len(all_gaps)
+        kept = all_gaps.merge(
+            largest_gaps[[FeatureBalanceMeasures.CLASS_A,
+                          FeatureBalanceMeasures.CLASS_B]])
+        pd.testing.assert_frame_equal(largest_gaps, kept)
+
+        # and include the largest gaps of every measure, which can be tied
+        for measure in FeatureBalanceMeasures.FEATURE_METRICS:
+            expected = all_gaps[measure.value].abs().dropna()
+            actual = largest_gaps[measure.value].abs().dropna()
+            if gap_threshold is not None:
+                expected = expected[expected >= gap_threshold]
+                actual = actual[actual >= gap_threshold]
+            if top_k_pairs is None:
+                assert set(expected.round(12)) <= set(actual.round(12))
+            else:
+                np.testing.assert_allclose(
+                    actual.nlargest(top_k_pairs),
+                    expected.nlargest(top_k_pairs))
+
+    def test_get_largest_gap_pairs(self):
+        values = np.array([0.5, np.nan, -1.0, 2.0, np.inf, 2.0])
+        class_a, class_b = get_largest_gap_pairs(values, top_k_pairs=3)
+        # the infinite gaps are largest and the nan value is never paired
+        assert list(zip(class_a, class_b)) == [(0, 4), (2, 4), (3, 4)]
+
+        class_a, class_b = get_largest_gap_pairs(values, gap_threshold=2.5)
+        assert list(zip(class_a, class_b)) == [
+            (0, 4), (2, 3), (2, 4), (2, 5), (3, 4), (4, 5)]
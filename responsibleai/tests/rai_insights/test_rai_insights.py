@@ -9,6 +9,7 @@ from tempfile import TemporaryDirectory
 import numpy as np
 import pandas as pd
 import pytest
+from jsonschema import ValidationError
 from tests.causal_manager_validator import validate_causal
 from tests.common_utils import create_iris_data
 from tests.counterfactual_manager_validator import validate_counterfactual
@@ -32,6 +33,7 @@ from responsibleai._internal.constants import (ManagerNames,
 from responsibleai._tools.shared.state_directory_management import \
     DirectoryManager
 from responsibleai.feature_metadata import FeatureMetadata
+from responsibleai.managers.error_analysis_manager import ErrorAnalysisManager
 
 LABELS = 'labels'
 
@@ -47,6 +49,22 @@ class ManagerParams:
     MAX_CAT_EXPANSION = 'max_cat_expansion'
 
 
+class CountingModel(object):
+    """Counts the calls to the predict methods of a model."""
+
+    def __init__(self, model):
+        self.model = model
+        self.num_calls = 0
+
+    def predict(self, X):
+        self.num_calls += 1
+        return self.model.predict(X)
+
+    def predict_proba(self, X):
+        self.num_calls += 1
+        return self.model.predict_proba(X)
+
+
 class TestRAIInsights(object):
 
     @pytest.mark.parametrize('manager_type', [ManagerNames.COUNTERFACTUAL,
@@ -74,6 +92,114 @@ class TestRAIInsights(object):
                              manager_type, manager_args, classes,
                              feature_metadata=feature_metadata)
 
+    @pytest.mark.parametrize('n_jobs', [1, 3])
+    def test_rai_insights_error_analysis_multiple_configs(self, n_jobs):
+        X_train, X_test, y_train, y_test, feature_names, classes = \
+            create_iris_data()
+        model = create_models_classification(X_train, y_train)[0]
+        X_train[LABELS] = y_train
+        X_test[LABELS] = y_test
+        rai_insights = RAIInsights(
+            model, X_train, X_test, LABELS, 'classification')
+
+        configs = [(3, None), (4, feature_names[:2]),
+                   (5, feature_names[1:3])]
+        for max_depth, filter_features in configs:
+            rai_insights.error_analysis.add(
+                max_depth=max_depth, filter_features=filter_features)
+        rai_insights.error_analysis.compute(n_jobs=n_jobs)
+        validate_error_analysis(rai_insights, expected_reports=len(configs))
+
+        # the reports match those computed one by one, and share the
+        # importances and root stats computed once
+        analyzer = rai_insights.error_analysis._analyzer
+        reports = rai_insights.error_analysis.get()
+        for report, (max_depth, filter_features) in zip(reports, configs):
+            expected = analyzer.create_error_report(
+                filter_features, max_depth=max_depth, num_leaves=31,
+                min_child_samples=20, compute_root_stats=True)
+            assert report.tree == expected.tree
+            assert report.matrix == expected.matrix
+            assert report.matrix_features == filter_features
+            assert report.root_stats == expected.root_stats
+            assert report.importances == reports[0].importances
+
+        # the computed configs are skipped when computing again
+        rai_insights.error_analysis.compute(n_jobs=n_jobs)
+        assert len(rai_insights.error_analysis.get()) == len(configs)
+
+    def test_rai_insights_error_analysis_invalid_report(self):
+        X_train, X_test, y_train, y_test, _, _ = create_iris_data()
+        model = create_models_classification(X_train, y_train)[0]
+        X_train[LABELS] = y_train
+        X_test[LABELS] = y_test
+        rai_insights = RAIInsights(
+            model, X_train, X_test, LABELS, 'classification')
+        setup_error_analysis(rai_insights)
+
+        report = rai_insights.error_analysis.get()[0]
+        schema = ErrorAnalysisManager._get_error_analysis_schema()
+        ErrorAnalysisManager._validate_error_report(report, schema)
+        del report.tree[0]['nodeIndex']
+        with pytest.raises(ValidationError):
+            ErrorAnalysisManager._validate_error_report(report, schema)
+
+    def test_rai_insights_get_data_cached_outputs(self):
+        X_train, X_test, y_train, y_test, _, _ = create_iris_data()
+        model = CountingModel(create_models_classification(
+            X_train, y_train)[0])
+        X_train[LABELS] = y_train
+        X_test[LABELS] = y_test
+        rai_insights = RAIInsights(
+            model, X_train, X_test, LABELS, 'classification')
+        num_calls = model.num_calls
+
+        # the model outputs cached by the constructor are used
+        data = rai_insights.get_data()
+        assert model.num_calls == num_calls
+        predictions = model.model.predict(X_test.drop(columns=[LABELS]))
+        classes = list(rai_insights._classes)
+        assert data.dataset.predicted_y == [
+            classes.index(y) for y in predictions]
+        assert len(data.dataset.probability_y) == len(X_test)
+        # the memoized data is shared, but its fields and the fields of
+        # its dataset can be reassigned
+        data.cohortData = []
+        data.dataset.predicted_y = None
+        same_data = rai_insights.get_data()
+        assert same_data is not data
+        assert same_data.dataset is not data.dataset
+        assert not hasattr(same_data, 'cohortData')
+        assert same_data.dataset.predicted_y is not None
+        data = same_data
+
+        # computing new results invalidates the memoized data
+        setup_error_analysis(rai_insights)
+        num_calls = model.num_calls
+        new_data = rai_insights.get_data()
+        assert new_data.dataset.predicted_y is not data.dataset.predicted_y
+        assert len(new_data.errorAnalysisData) == 1
+        assert new_data.dataset.predicted_y == data.dataset.predicted_y
+        assert rai_insights.get_data().dataset.predicted_y is \
+            new_data.dataset.predicted_y
+        # computing without new configs keeps the memoized data
+        rai_insights.error_analysis.compute()
+        assert rai_insights.get_data().dataset.predicted_y is \
+            new_data.dataset.predicted_y
+        rai_insights.error_analysis.add(max_depth=2)
+        rai_insights.error_analysis.compute()
+        num_calls = model.num_calls
+        newest_data = rai_insights.get_data()
+        assert newest_data.dataset.predicted_y is not \
+            new_data.dataset.predicted_y
+        assert len(newest_data.errorAnalysisData) == 2
+        assert model.num_calls == num_calls
+
+        rai_insights.refresh_model_outputs()
+        assert model.num_calls == num_calls + 2
+        assert rai_insights.get_data().dataset.predicted_y == \
+            data.dataset.predicted_y
+
     @pytest.mark.parametrize('manager_type', [ManagerNames.ERROR_ANALYSIS,
                                               ManagerNames.COUNTERFACTUAL,
                                               ManagerNames.EXPLAINER])
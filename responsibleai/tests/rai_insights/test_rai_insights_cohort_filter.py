@@ -1,6 +1,9 @@
 # Copyright (c) Microsoft Corporation
 # Licensed under the MIT License.
 
+import copy
+import pickle
+
 import numpy as np
 import pandas as pd
 import pytest
@@ -370,6 +373,54 @@ class TestCohortFilterRAIInsights(object):
                          model_task,
                          filters=filters)
 
+    def test_cohort_filter_cache(self):
+        X_train, X_test, y_train, y_test, feature_names, _ = \
+            create_iris_pandas()
+        model = create_sklearn_svm_classifier(X_train, y_train)
+        train = X_train.copy()
+        train["target"] = y_train
+        test = X_test.copy()
+        test["target"] = y_test
+        rai_insights = RAIInsights(
+            model, train, test, "target", ModelTask.CLASSIFICATION)
+        filters = [{ARG: [2.8],
+                    COLUMN: SEPAL_WIDTH,
+                    METHOD: CohortFilterMethods.METHOD_LESS_AND_EQUAL}]
+        # same filter with the keys in a different order
+        less_and_equal = CohortFilterMethods.METHOD_LESS_AND_EQUAL
+        reordered_filters = [{METHOD: less_and_equal,
+                              COLUMN: SEPAL_WIDTH,
+                              ARG: [2.8]}]
+
+        filtered_data = rai_insights.get_filtered_test_data(filters, [])
+        cached_data = rai_insights.get_filtered_test_data(
+            reordered_filters, [])
+        original_data = rai_insights.get_filtered_test_data(
+            filters, [], include_original_columns_only=True)
+
+        assert filtered_data.equals(cached_data)
+        assert original_data.equals(X_test.loc[X_test[SEPAL_WIDTH] <= 2.8])
+        stats = rai_insights.get_cohort_cache_stats()
+        assert stats['misses'] == 1
+        assert stats['hits'] == 2
+        assert stats['entries'] == 1
+        assert stats['bytes'] == 4 * len(filtered_data)
+
+        rai_insights.get_filtered_test_data([], [])
+        stats = rai_insights.get_cohort_cache_stats()
+        assert stats['misses'] == 2
+        assert stats['entries'] == 2
+        assert stats['bytes'] == 4 * (len(filtered_data) + len(X_test))
+
+        # the cache is pickled and copied without its lock
+        for rai_insights_copy in [pickle.loads(pickle.dumps(rai_insights)),
+                                  copy.deepcopy(rai_insights)]:
+            assert rai_insights_copy.get_cohort_cache_stats() == stats
+            assert rai_insights_copy.get_filtered_test_data(
+                filters, []).equals(filtered_data)
+            assert rai_insights_copy.get_cohort_cache_stats()['hits'] == \
+                stats['hits'] + 1
+
 
 def create_iris_pandas(use_str_labels=False):
     X_train, X_test, y_train, y_test, feature_names, classes = \
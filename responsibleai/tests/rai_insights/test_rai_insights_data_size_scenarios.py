@@ -4,21 +4,37 @@
 import json
 from pathlib import Path
 from tempfile import TemporaryDirectory
+from unittest.mock import patch
 
+import numpy as np
 import pandas as pd
 import pytest
 from tests.common_utils import create_iris_data
 
+from erroranalysis._internal.constants import (ARG, COLUMN, METHOD,
+                                               CohortFilterMethods)
 from rai_test_utils.datasets.tabular import create_housing_data
 from rai_test_utils.models.sklearn import (
     create_sklearn_random_forest_classifier,
     create_sklearn_random_forest_regressor)
+from raiutils.exceptions import UserConfigValidationException
 from responsibleai import RAIInsights
 from responsibleai._interfaces import Dataset, TabularDatasetMetadata
+from responsibleai.feature_metadata import FeatureMetadata
 
 LABELS = 'labels'
 
 
+class ConstantModel(object):
+    """Predicts the first class for every row."""
+
+    def predict(self, X):
+        return np.zeros(len(X), dtype=int)
+
+    def predict_proba(self, X):
+        return np.tile([1.0, 0.0], (len(X), 1))
+
+
 class TestRAIInsightsLargeData(object):
 
     def do_large_data_validations(self, rai_insights):
@@ -55,6 +71,14 @@ class TestRAIInsightsLargeData(object):
             [], [], use_entire_test_data=True)
         assert len(filtered_large_data) == len(rai_insights.test) + 1
 
+        # the metrics and heatmaps reflect all the rows of the test data
+        cohort_metric = rai_insights.get_cohort_metric([], [])
+        assert cohort_metric['totalSize'] == len(rai_insights.test) + 1
+        feature = rai_insights._feature_columns[0]
+        heatmap = rai_insights.get_cohort_heatmap([feature], [], [])
+        assert sum(cell['count'] for cell in heatmap['matrix'][0]) == \
+            len(rai_insights.test) + 1
+
     def validate_number_of_large_test_samples_on_save(
             self, rai_insights, path):
         top_dir = Path(path)
@@ -84,6 +108,10 @@ class TestRAIInsightsLargeData(object):
                 maximum_rows_for_test=len(test_data) - 1)
 
         self.do_large_data_validations(rai_insights)
+        # the test data shares the memory of the large test data
+        memory_usage = rai_insights.get_dataset_memory_usage()
+        assert memory_usage['bytes'] < sum(
+            memory_usage['datasets'].values())
 
         with TemporaryDirectory() as tmpdir:
             path = Path(tmpdir) / 'rai_test_path'
@@ -121,6 +149,120 @@ class TestRAIInsightsLargeData(object):
         self.validate_rai_insights_for_large_data(
             model, train_data, test_data, LABELS, [], 'regression')
 
+    @pytest.mark.parametrize('with_dropped_features', [False, True])
+    @pytest.mark.parametrize('test_sampling_method',
+                             ['random', 'stratified', 'error_stratified'])
+    def test_rai_insights_large_data_sampling(self, test_sampling_method,
+                                              with_dropped_features):
+        train_data, test_data, y_train, y_test, feature_names, classes = \
+            create_iris_data()
+        dropped_features = feature_names[:1] if with_dropped_features \
+            else []
+        model = create_sklearn_random_forest_classifier(
+            train_data.drop(columns=dropped_features), y_train)
+
+        train_data[LABELS] = y_train
+        test_data[LABELS] = y_test
+        maximum_rows_for_test = len(test_data) // 2
+
+        with pytest.warns(UserWarning,
+                          match=f"Computing insights for a "
+                                f"{test_sampling_method.replace('_', ' ')}"
+                                f" sample of {maximum_rows_for_test}"), \
+                patch.object(model, 'predict',
+                             wraps=model.predict) as predict:
+            rai_insights = RAIInsights(
+                model, train_data, test_data, LABELS,
+                task_type='classification',
+                feature_metadata=FeatureMetadata(
+                    dropped_features=dropped_features),
+                maximum_rows_for_test=maximum_rows_for_test,
+                test_sampling_method=test_sampling_method)
+        # the model is called once on the large test data, and on the
+        # sample only to validate the model, since the outputs on the
+        # sample are taken from the outputs on the large test data
+        num_rows = [len(call.args[0]) for call in predict.call_args_list]
+        assert num_rows.count(len(test_data)) == 1
+        assert num_rows.count(maximum_rows_for_test) == 1
+        for call in predict.call_args_list:
+            assert not set(dropped_features) & set(call.args[0].columns)
+        features = rai_insights.test.drop(columns=[LABELS] +
+                                          dropped_features)
+        np.testing.assert_array_equal(rai_insights._predict_output,
+                                      model.predict(features))
+        np.testing.assert_array_equal(rai_insights._predict_proba_output,
+                                      model.predict_proba(features))
+
+        sample = rai_insights.get_test_sample()
+        assert sample.method == test_sampling_method
+        assert len(sample) == maximum_rows_for_test
+        assert sample.num_rows == len(test_data)
+        assert sample.weights.sum() == pytest.approx(len(test_data))
+        pd.testing.assert_frame_equal(
+            rai_insights.test, test_data.iloc[sample.indexes])
+        assert len(rai_insights._large_test) == len(test_data)
+
+        with TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / 'rai_test_path'
+            rai_insights.save(path)
+            rai_insights = RAIInsights.load(path)
+
+        loaded_sample = rai_insights.get_test_sample()
+        np.testing.assert_array_equal(loaded_sample.indexes, sample.indexes)
+        np.testing.assert_array_equal(loaded_sample.weights, sample.weights)
+
+    def test_rai_insights_large_data_categories(self):
+        num_rows = 50
+        train_data = pd.DataFrame({
+            'color': ['blue', 'red'] * (num_rows // 2),
+            LABELS: [0, 1] * (num_rows // 2)})
+        test_data = train_data.copy()
+        # the last row is not part of the test data
+        test_data.loc[num_rows - 1, 'color'] = 'green'
+
+        with pytest.warns(UserWarning):
+            rai_insights = RAIInsights(
+                ConstantModel(), train_data, test_data, LABELS,
+                task_type='classification', categorical_features=['color'],
+                maximum_rows_for_test=num_rows - 1)
+        assert rai_insights._categories == [['blue', 'green', 'red']]
+        assert len(rai_insights._string_ind_data) == num_rows - 1
+        assert rai_insights._string_ind_data[:2, 0].tolist() == [0, 2]
+
+        filters = [{METHOD: CohortFilterMethods.METHOD_INCLUDES,
+                    COLUMN: 'color', ARG: [1]}]
+        cohort_metric = rai_insights.get_cohort_metric(filters, [])
+        assert cohort_metric['totalSize'] == 1
+        assert len(rai_insights.get_filtered_test_data(
+            filters, [], use_entire_test_data=True)) == 1
+
+        with TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / 'rai_test_path'
+            rai_insights.save(path)
+            loaded = RAIInsights.load(path)
+        assert loaded._categories == rai_insights._categories
+        np.testing.assert_array_equal(loaded._string_ind_data,
+                                      rai_insights._string_ind_data)
+
+    def test_rai_insights_large_data_invalid_sampling(self):
+        train_data, test_data, y_train, y_test, feature_names, classes = \
+            create_iris_data()
+        train_data[LABELS] = y_train
+        test_data[LABELS] = y_test
+
+        with pytest.raises(UserConfigValidationException,
+                           match='Unsupported test_sampling_method'):
+            RAIInsights(None, train_data, test_data, LABELS,
+                        task_type='classification',
+                        maximum_rows_for_test=len(test_data) - 1,
+                        test_sampling_method='last')
+        with pytest.raises(UserConfigValidationException,
+                           match='A model is required'):
+            RAIInsights(None, train_data, test_data, LABELS,
+                        task_type='classification',
+                        maximum_rows_for_test=len(test_data) - 1,
+                        test_sampling_method='error_stratified')
+
 
 class TestRAIInsightsNonLargeData(object):
 
@@ -16,9 +16,10 @@ from rai_test_utils.datasets.tabular import \
 from rai_test_utils.models.lightgbm import create_lightgbm_classifier
 from rai_test_utils.models.sklearn import \
     create_complex_classification_pipeline
+from raiutils.exceptions import UserConfigValidationException
 from raiutils.models import ModelTask
 from responsibleai import RAIInsights
-from responsibleai._internal.constants import (ManagerNames,
+from responsibleai._internal.constants import (DataFormats, ManagerNames,
                                                SerializationAttributes)
 from responsibleai.feature_metadata import FeatureMetadata
 
@@ -138,6 +139,147 @@ class TestRAIInsightsSaveAndLoadScenarios(object):
             rai_2 = RAIInsights.load(save_1)
             assert rai_2 is not None
 
+    @pytest.mark.parametrize('mmap_mode', [None, 'r'])
+    def test_rai_insights_save_load_npy_data_format(self, mmap_mode):
+        X_train, X_test, y_train, y_test, feature_names, classes = \
+            create_iris_data()
+        model = create_lightgbm_classifier(X_train, y_train)
+        X_train['target'] = y_train
+        X_test['target'] = y_test
+
+        rai_insights = RAIInsights(
+            model=model,
+            train=X_train,
+            test=X_test,
+            target_column='target',
+            task_type='classification',
+            maximum_rows_for_test=len(X_test) - 1)
+
+        with TemporaryDirectory() as tmpdir:
+            save_path = Path(tmpdir) / "rai_insights"
+            rai_insights.save(save_path, data_format=DataFormats.NPY)
+            data_path = save_path / SerializationAttributes.DATA_DIRECTORY
+            assert (data_path / 'test' /
+                    SerializationAttributes.MANIFEST_JSON).exists()
+            assert not (data_path / 'test.json').exists()
+            assert (data_path / SerializationAttributes.LARGE_TEST).exists()
+            predictions_path = \
+                save_path / SerializationAttributes.PREDICTIONS_DIRECTORY
+            assert (predictions_path / 'predict.npy').exists()
+
+            rai_2 = RAIInsights.load(save_path, mmap_mode=mmap_mode)
+            validate_rai_insights(
+                rai_2, X_train, X_test.iloc[:-1],
+                'target', ModelTask.CLASSIFICATION)
+            pd.testing.assert_frame_equal(rai_2._large_test,
+                                          rai_insights._large_test)
+            np.testing.assert_array_equal(rai_2._predict_output,
+                                          rai_insights._predict_output)
+            np.testing.assert_array_equal(
+                rai_2._large_predict_proba_output,
+                rai_insights._large_predict_proba_output)
+
+            # reading the values, as predicting does, keeps the columns
+            # memory-mapped since each dtype is saved as one block
+            rai_2.test.to_numpy()
+            rai_2.model.predict(rai_2.test.drop(columns=['target']))
+            assert _is_memory_mapped(
+                rai_2.test[feature_names[0]].to_numpy()) == \
+                (mmap_mode is not None)
+
+            # saving again in the JSON format replaces the npy data
+            rai_2.save(save_path)
+            assert (data_path / 'test.json').exists()
+            assert not (data_path / 'test').exists()
+            assert not (predictions_path / 'predict.npy').exists()
+            rai_3 = RAIInsights.load(save_path)
+            validate_rai_insights(
+                rai_3, X_train, X_test.iloc[:-1],
+                'target', ModelTask.CLASSIFICATION)
+
+        with pytest.raises(UserConfigValidationException,
+                           match='Unsupported data format'):
+            rai_insights.save(save_path, data_format='csv')
+
+    def test_rai_insights_lazy_load(self):
+        X_train, y_train, X_test, y_test, classes = \
+            create_binary_classification_dataset()
+        model = create_lightgbm_classifier(X_train, y_train)
+        X_train[LABELS] = y_train
+        X_test[LABELS] = y_test
+
+        rai_insights = RAIInsights(
+            model, X_train, X_test,
+            LABELS, task_type='classification')
+        rai_insights.error_analysis.add()
+        rai_insights.compute()
+
+        with TemporaryDirectory() as tmpdir:
+            save_path = Path(tmpdir) / "rai_insights"
+            rai_insights.save(save_path)
+
+            rai_2 = RAIInsights.load(save_path, lazy=True)
+            assert 'model' not in rai_2.__dict__
+            assert '_error_analysis_manager' not in rai_2.__dict__
+            assert '_causal_manager' not in rai_2.__dict__
+
+            assert rai_2.error_analysis.list() == \
+                rai_insights.error_analysis.list()
+            assert '_error_analysis_manager' in rai_2.__dict__
+            assert '_causal_manager' not in rai_2.__dict__
+            np.testing.assert_array_equal(rai_2._predict_output,
+                                          rai_insights._predict_output)
+
+            # listing the managers loads all the remaining ones
+            assert rai_2.list() == rai_insights.list()
+            assert '_causal_manager' in rai_2.__dict__
+            assert rai_2.model is not None
+
+            save_path_2 = Path(tmpdir) / "rai_insights_2"
+            rai_2.save(save_path_2)
+            rai_3 = RAIInsights.load(save_path_2)
+            assert rai_3.list() == rai_insights.list()
+
+    @pytest.mark.parametrize('lazy', [True, False])
+    def test_rai_insights_load_components(self, lazy):
+        X_train, y_train, X_test, y_test, classes = \
+            create_binary_classification_dataset()
+        model = create_lightgbm_classifier(X_train, y_train)
+        X_train[LABELS] = y_train
+        X_test[LABELS] = y_test
+
+        rai_insights = RAIInsights(
+            model, X_train, X_test,
+            LABELS, task_type='classification')
+        rai_insights.error_analysis.add()
+        rai_insights.compute()
+
+        with TemporaryDirectory() as tmpdir:
+            save_path = Path(tmpdir) / "rai_insights"
+            rai_insights.save(save_path)
+
+            rai_2 = RAIInsights.load(
+                save_path, components=[ManagerNames.ERROR_ANALYSIS],
+                lazy=lazy)
+            assert list(rai_2.list()) == [ManagerNames.ERROR_ANALYSIS]
+            assert rai_2.error_analysis.list() == \
+                rai_insights.error_analysis.list()
+            assert not hasattr(rai_2, ManagerNames.CAUSAL)
+            with pytest.raises(AttributeError,
+                               match='The causal manager was not loaded'):
+                rai_2.causal
+            data = rai_2.get_data()
+            assert data.errorAnalysisData is not None
+            assert not hasattr(data, 'causalAnalysisData')
+            with pytest.raises(UserConfigValidationException,
+                               match='were not loaded'):
+                rai_2.save(Path(tmpdir) / "rai_insights_2")
+
+            with pytest.raises(UserConfigValidationException,
+                               match='Unknown components'):
+                RAIInsights.load(save_path, components=['unknown'],
+                                 lazy=lazy)
+
     def test_loading_rai_insights_without_model_file(self):
         X_train, X_test, y_train, y_test, feature_names, classes = \
             create_iris_data()
@@ -385,3 +527,11 @@ def validate_rai_insights(
         classes.sort()
         np.testing.assert_array_equal(rai_insights._classes,
                                       classes)
+
+
+def _is_memory_mapped(values):
+    while values is not None:
+        if isinstance(values, np.memmap):
+            return True
+        values = values.base
+    return False
@@ -0,0 +1,175 @@
+# Copyright (c) Microsoft Corporation
+# Licensed under the MIT License.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from responsibleai._internal._dataset_registry import (BYTES, DATASETS,
+                                                       DatasetRegistry,
+                                                       _get_strided_values,
+                                                       get_column_view)
+
+# The views rely on the memory layout of the blocks of the pandas
+# versions the package supports
+supported_pandas = int(pd.__version__.split('.')[0]) < 2
+
+
+def _create_dataset(num_rows=100):
+    return pd.DataFrame({
+        'a': np.arange(num_rows, dtype=np.float64),
+        'b': np.arange(num_rows, dtype=np.int64),
+        'c': pd.Categorical(['x', 'y'] * (num_rows // 2)),
+        'label': np.zeros(num_rows, dtype=np.int64)})
+
+
+class TestGetColumnView(object):
+
+    def test_no_excluded_columns(self):
+        dataset = _create_dataset()
+        assert get_column_view(dataset) is dataset
+        assert get_column_view(dataset, []) is dataset
+
+    def test_excluded_columns(self):
+        dataset = _create_dataset()
+        view = get_column_view(dataset, ['b', 'label'])
+        pd.testing.assert_frame_equal(
+            view, dataset.drop(columns=['b', 'label']))
+        assert np.shares_memory(view['a'].values, dataset['a'].values)
+
+    def test_view_is_not_copied_on_consolidation(self):
+        features = pd.DataFrame(np.random.RandomState(0).rand(100, 4),
+                                columns=['w', 'x', 'y', 'z'])
+        for exclude_columns in [['w'], ['z'], ['w', 'y']]:
+            dataset = features.copy()
+            dataset['c'] = pd.Categorical(['x', 'y'] * 50)
+            dataset['label'] = np.zeros(100, dtype=np.int64)
+            view = get_column_view(dataset, exclude_columns + ['label'])
+            pd.testing.assert_frame_equal(
+                view, dataset.drop(columns=exclude_columns + ['label']))
+            # getting the values consolidates the blocks of the view
+            assert view.values.shape == (100, 5 - len(exclude_columns))
+            for column in view.columns.drop('c'):
+                assert np.shares_memory(view[column].values,
+                                        dataset[column].values)
+
+    def test_unevenly_spaced_columns_are_copied(self):
+        dataset = pd.DataFrame(np.random.RandomState(0).rand(100, 4),
+                               columns=['w', 'x', 'y', 'z'])
+        view = get_column_view(dataset, ['x'])
+        pd.testing.assert_frame_equal(view, dataset.drop(columns=['x']))
+        assert not np.shares_memory(view['w'].values, dataset['w'].values)
+
+    def test_missing_column(self):
+        dataset = _create_dataset()
+        with pytest.raises(KeyError):
+            get_column_view(dataset, ['missing'])
+
+    def test_view_is_read_only(self):
+        dataset = _create_dataset()
+        expected = dataset.copy()
+        view = get_column_view(dataset, ['label'])
+        assert np.shares_memory(view['c'].values.codes,
+                                dataset['c'].values.codes)
+
+        def write_value(view):
+            view.iloc[0, 0] = -1
+
+        def write_column(view):
+            view['a'][0] = -1
+
+        def write_categorical(view):
+            view['c'][0] = 'y'
+
+        def write_values(view):
+            view['b'].values[0] = -1
+
+        for write in [write_value, write_column, write_categorical,
+                      write_values]:
+            with pytest.raises(ValueError, match='read-only'):
+                write(get_column_view(dataset, ['label']))
+        pd.testing.assert_frame_equal(dataset, expected)
+
+        # the columns of the dataset are still writable
+        dataset.iloc[0, 0] = -1
+        assert dataset['a'][0] == -1
+
+    @pytest.mark.skipif(not supported_pandas,
+                        reason="requires pandas<2.0.0")
+    def test_block_layout(self):
+        # pandas holds the columns of a dtype as the equally spaced rows
+        # of a 2-D array, both when the dataset is created from a 2-D
+        # array and when its columns are consolidated
+        values = np.random.RandomState(0).rand(100, 4)
+        columns = ['w', 'x', 'y', 'z']
+        consolidated = pd.DataFrame(dict(zip(columns, values.T)))
+        consolidated.values
+        for dataset in [pd.DataFrame(values, columns=columns),
+                        consolidated]:
+            column_values = [dataset[column].values for column in columns]
+            strided_values = _get_strided_values(column_values)
+            assert strided_values is not None
+            assert not strided_values.flags.writeable
+            for column_strided_values, column_value in zip(
+                    strided_values, column_values):
+                assert np.shares_memory(column_strided_values, column_value)
+            np.testing.assert_array_equal(strided_values, values.T)
+            assert _get_strided_values(
+                [column_values[0], column_values[1], column_values[3]]) \
+                is None
+
+
+class TestDatasetRegistry(object):
+
+    def test_get(self):
+        dataset = _create_dataset()
+        registry = DatasetRegistry()
+        registry.register('train', dataset)
+        assert 'train' in registry
+        assert registry.get('train') is dataset
+        pd.testing.assert_frame_equal(
+            registry.get('train', exclude_columns=['label']),
+            dataset.drop(columns=['label']))
+
+        registry.register('train', None)
+        assert 'train' not in registry
+
+    def test_memory_usage_counts_shared_rows_once(self):
+        dataset = _create_dataset()
+        registry = DatasetRegistry()
+        registry.register('large_test', dataset)
+        registry.register('test', dataset.iloc[0:50])
+
+        memory_usage = registry.get_memory_usage()
+        datasets_bytes = memory_usage[DATASETS]
+        assert datasets_bytes['large_test'] == \
+            dataset.memory_usage(deep=True).sum()
+        assert memory_usage[BYTES] == datasets_bytes['large_test']
+
+    def test_memory_usage_of_separate_datasets(self):
+        registry = DatasetRegistry()
+        train = _create_dataset()
+        test = _create_dataset()
+        test.index = pd.RangeIndex(len(train), len(train) + len(test))
+        registry.register('train', train)
+        registry.register('test', test)
+
+        memory_usage = registry.get_memory_usage()
+        assert memory_usage[BYTES] == sum(memory_usage[DATASETS].values())
+
+    def test_memory_usage_of_other_datasets(self):
+        dataset = _create_dataset()
+        registry = DatasetRegistry()
+        registry.register('test', dataset)
+        test_bytes = registry.get_memory_usage()[BYTES]
+
+        view = registry.get('test', exclude_columns=['label'])
+        memory_usage = registry.get_memory_usage({'view': view})
+        assert memory_usage[DATASETS]['view'] > 0
+        assert memory_usage[BYTES] == test_bytes
+
+        copy = dataset.drop(columns=['c', 'label'])
+        memory_usage = registry.get_memory_usage({'copy': copy})
+        # the copy has the same index as the dataset
+        assert memory_usage[BYTES] == test_bytes + \
+            copy.memory_usage(index=False, deep=True).sum()
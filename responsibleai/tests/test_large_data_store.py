@@ -0,0 +1,123 @@
+# Copyright (c) Microsoft Corporation
+# Licensed under the MIT License.
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.metrics import accuracy_score, mean_squared_error
+
+from erroranalysis._internal.constants import (ARG, COLUMN, METHOD, ROW_INDEX,
+                                               CohortFilterMethods, Metrics)
+from raiutils.exceptions import UserConfigValidationException
+from responsibleai._internal._large_data_store import LargeDataStore
+
+NUM_ROWS = 1000
+CHUNK_SIZE = 130
+
+
+def _create_data(task_type):
+    rng = np.random.default_rng(777)
+    dataset = pd.DataFrame({
+        'numeric': rng.normal(size=NUM_ROWS),
+        'category': rng.choice(['a', 'b', 'c'], NUM_ROWS)})
+    if task_type == 'classification':
+        true_y = rng.integers(0, 2, NUM_ROWS)
+        pred_y = np.where(rng.random(NUM_ROWS) < 0.8, true_y, 1 - true_y)
+    else:
+        true_y = rng.normal(size=NUM_ROWS)
+        pred_y = true_y + rng.normal(size=NUM_ROWS)
+    return dataset, true_y, pred_y
+
+
+def _create_store(task_type, chunk_size=CHUNK_SIZE):
+    dataset, true_y, pred_y = _create_data(task_type)
+    classes = [0, 1] if task_type == 'classification' else None
+    return LargeDataStore(dataset, true_y, pred_y, ['category'],
+                          [['a', 'b', 'c']], task_type, classes=classes,
+                          chunk_size=chunk_size)
+
+
+class TestLargeDataStore(object):
+
+    def test_filtered_row_indexes(self):
+        store = _create_store('classification')
+        filters = [{METHOD: CohortFilterMethods.METHOD_GREATER,
+                    COLUMN: 'numeric', ARG: [0.5]},
+                   {METHOD: CohortFilterMethods.METHOD_INCLUDES,
+                    COLUMN: 'category', ARG: [1]}]
+        row_indexes = store.get_filtered_row_indexes(filters, [])
+        dataset = store.dataset
+        expected = np.flatnonzero((dataset['numeric'] > 0.5) &
+                                  (dataset['category'] == 'b'))
+        np.testing.assert_array_equal(row_indexes, expected)
+
+        store.get_filtered_row_indexes(filters, [])
+        stats = store.get_cohort_cache_stats()
+        assert stats['misses'] == 1
+        assert stats['hits'] == 1
+
+    def test_filter_on_row_index_across_chunks(self):
+        store = _create_store('classification')
+        filters = [{METHOD: CohortFilterMethods.METHOD_RANGE,
+                    COLUMN: ROW_INDEX, ARG: [200, 300]}]
+        row_indexes = store.get_filtered_row_indexes(filters, [])
+        np.testing.assert_array_equal(row_indexes, np.arange(200, 301))
+
+    @pytest.mark.parametrize('metric', [Metrics.ERROR_RATE,
+                                        Metrics.ACCURACY_SCORE])
+    def test_cohort_metric_classification(self, metric):
+        store = _create_store('classification')
+        filters = [{METHOD: CohortFilterMethods.METHOD_LESS,
+                    COLUMN: 'numeric', ARG: [0.0]}]
+        result = store.compute_cohort_metric(filters, [], metric=metric)
+        rows = store.dataset['numeric'].to_numpy() < 0.0
+        accuracy = accuracy_score(store.true_y[rows], store.pred_y[rows])
+        expected = 1 - accuracy if metric == Metrics.ERROR_RATE \
+            else accuracy
+        assert result['totalSize'] == rows.sum()
+        assert result['metricValue'] == pytest.approx(expected)
+
+    def test_cohort_metric_regression(self):
+        store = _create_store('regression')
+        result = store.compute_cohort_metric([], [])
+        assert result['totalSize'] == NUM_ROWS
+        assert result['metricValue'] == pytest.approx(
+            mean_squared_error(store.true_y, store.pred_y))
+
+    @pytest.mark.parametrize('task_type', ['classification', 'regression'])
+    def test_matrix_same_for_any_chunk_size(self, task_type):
+        chunked_store = _create_store(task_type)
+        store = _create_store(task_type, chunk_size=NUM_ROWS)
+        features = ['numeric', 'category']
+        filters = [{METHOD: CohortFilterMethods.METHOD_GREATER,
+                    COLUMN: 'numeric', ARG: [-1.0]}]
+        chunked_matrix = chunked_store.compute_matrix(features, filters, [])
+        matrix = store.compute_matrix(features, filters, [])
+        assert chunked_matrix['category1'] == matrix['category1']
+        assert chunked_matrix['category2'] == matrix['category2']
+        for chunked_row, row in zip(chunked_matrix['matrix'],
+                                    matrix['matrix']):
+            for chunked_cell, cell in zip(chunked_row, row):
+                assert chunked_cell['count'] == cell['count']
+                if 'metricValue' in cell:
+                    assert chunked_cell['metricValue'] == \
+                        pytest.approx(cell['metricValue'])
+                else:
+                    assert chunked_cell['falseCount'] == cell['falseCount']
+        total = sum(cell['count'] for row in matrix['matrix']
+                    for cell in row)
+        assert total == (store.dataset['numeric'] > -1.0).sum()
+
+    def test_unsupported(self):
+        store = _create_store('regression')
+        with pytest.raises(UserConfigValidationException,
+                           match='not supported on the entire test data'):
+            store.compute_cohort_metric([], [],
+                                        metric=Metrics.MEDIAN_ABSOLUTE_ERROR)
+        with pytest.raises(UserConfigValidationException,
+                           match='not found in dataset'):
+            store.compute_matrix(['missing'], [], [])
+        dataset, true_y, pred_y = _create_data('regression')
+        with pytest.raises(UserConfigValidationException,
+                           match='only supported for classification'):
+            LargeDataStore(dataset, true_y, pred_y, [], [], 'forecasting')
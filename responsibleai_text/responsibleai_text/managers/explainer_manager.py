@@ -226,6 +226,7 @@ class ExplainerManager(BaseManager):
             raise ValueError("Unknown task type: {}".format(self._task_type))
 
         self._is_run = True
+        self._invalidate_data_cache()
 
     def get(self):
         """Get the computed explanation.
@@ -193,6 +193,7 @@ class RAITextInsights(RAIBaseInsights):
         if target_column is not None:
             self._ext_test_df[target_column] = test[target_column]
         self.predict_output = None
+        self._init_data_cache()
 
         super(RAITextInsights, self).__init__(
             model, None, test, target_column, task_type,
@@ -479,17 +480,61 @@ class RAITextInsights(RAIBaseInsights):
         """
         return self._explainer_manager
 
+    def _init_data_cache(self):
+        """Initializes the memoized data and model outputs."""
+        super(RAITextInsights, self)._init_data_cache()
+        self._model_outputs = {}
+
+    def refresh_model_outputs(self):
+        """Call the model again on the test data to update its outputs.
+
+        The outputs of the model on the test data are cached once
+        computed, so this is only needed if the model changed its
+        predictions.
+        """
+        self.predict_output = None
+        self._init_data_cache()
+
+    def _get_model_output(self, method, dataset):
+        """Get the cached output of a method of the model on the test data.
+
+        :param method: The name of the model method, predict or
+            predict_proba.
+        :type method: str
+        :param dataset: The test data without the target column.
+        :type dataset: pandas.DataFrame or list[str]
+        :return: The output of the model method.
+        :rtype: numpy.ndarray or list
+        """
+        if method not in self._model_outputs:
+            self._model_outputs[method] = getattr(
+                self._wrapped_model, method)(dataset)
+        return self._model_outputs[method]
+
     def get_data(self):
         """Get all data as RAIInsightsData object
 
+        The data is memoized until any of the managers computes new
+        results or refresh_model_outputs is called. Each call returns a
+        shallow copy of the memoized data and of its dataset, so their
+        fields can be reassigned, but the lists they hold and the results
+        are shared between the calls and must not be modified in place.
+
         :return: Model Analysis Data
         :rtype: RAIInsightsData
         """
-        data = RAIInsightsData()
-        data.dataset = self._get_dataset()
-        data.modelExplanationData = self.explainer.get_data()
-        data.errorAnalysisData = self.error_analysis.get_data()
-        return data
+        data_cache_key = self._get_data_cache_key({
+            ManagerNames.EXPLAINER: self.explainer,
+            ManagerNames.ERROR_ANALYSIS: self.error_analysis})
+        if self._data_cache is None or \
+                self._data_cache_key != data_cache_key:
+            data = RAIInsightsData()
+            data.dataset = self._get_dataset()
+            data.modelExplanationData = self.explainer.get_data()
+            data.errorAnalysisData = self.error_analysis.get_data()
+            self._data_cache = data
+            self._data_cache_key = data_cache_key
+        return self._copy_data_cache()
 
     def save(self, path):
         """Save the RAITextInsights to the given path.
@@ -576,7 +621,7 @@ class RAITextInsights(RAIBaseInsights):
         predicted_y = None
         if dataset is not None and self._wrapped_model is not None:
             try:
-                predicted_y = self._wrapped_model.predict(dataset)
+                predicted_y = self._get_model_output(SKLearn.PREDICT, dataset)
             except Exception as ex:
                 msg = ("Model does not support predict method for given "
                        "dataset type")
@@ -610,7 +655,8 @@ class RAITextInsights(RAIBaseInsights):
         dashboard_dataset.target_column = self.target_column
         if is_classifier(self._wrapped_model) and dataset is not None:
             try:
-                probability_y = self._wrapped_model.predict_proba(dataset)
+                probability_y = self._get_model_output(
+                    SKLearn.PREDICT_PROBA, dataset)
             except Exception as ex:
                 raise ValueError("Model does not support predict_proba method"
                                  " for given dataset type,") from ex
@@ -664,8 +710,8 @@ class RAITextInsights(RAIBaseInsights):
         is_classification_task = self._is_classification_task
         test_without_target_column = self._get_test_text_data(
             is_classification_task)
-        predict_output = self._wrapped_model.predict(
-            test_without_target_column)
+        predict_output = self._get_model_output(
+            SKLearn.PREDICT, test_without_target_column)
         self._write_to_file(
             prediction_output_path / (_PREDICT + _JSON_EXTENSION),
             json.dumps(predict_output.tolist()))
@@ -783,6 +829,7 @@ class RAITextInsights(RAIBaseInsights):
         RAIBaseInsights._load(path, inst, manager_map,
                               RAITextInsights._load_metadata)
         inst._wrapped_model = wrap_model(inst.model, inst.test, inst.task_type)
+        inst._init_data_cache()
         return inst
 
     def normalize_text(self, s):
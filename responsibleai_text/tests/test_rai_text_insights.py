@@ -103,7 +103,11 @@ def run_rai_insights(model, train_data, test_data,
     if task_type != ModelTask.QUESTION_ANSWERING:
         rai_insights.error_analysis.add()
     rai_insights.compute()
-    rai_insights.get_data()
+    data = rai_insights.get_data()
+    # the data is memoized until the managers compute new results
+    same_data = rai_insights.get_data()
+    assert same_data.dataset is not data.dataset
+    assert same_data.errorAnalysisData is data.errorAnalysisData
     # Validate
     validate_rai_text_insights(
         rai_insights, classes, test_data,
@@ -253,6 +253,7 @@ class RAIVisionInsights(RAIBaseInsights):
             classes=classes
         )
         self.predict_output = None
+        self._init_data_cache()
         if task_type == ModelTask.OBJECT_DETECTION:
             test = transform_object_detection_labels(
                 test, target_column, self._classes)
@@ -542,17 +543,60 @@ class RAIVisionInsights(RAIBaseInsights):
         """
         return self._explainer_manager
 
+    def _init_data_cache(self):
+        """Initializes the memoized data and model outputs."""
+        super(RAIVisionInsights, self)._init_data_cache()
+        self._model_outputs = {}
+
+    def refresh_model_outputs(self):
+        """Call the model again on the test data to update its outputs.
+
+        The outputs of the model on the test images are cached once
+        computed, so this is only needed if the model changed its
+        predictions.
+        """
+        self.predict_output = None
+        self._init_data_cache()
+
+    def _get_model_output(self, method, dataset):
+        """Get the cached output of a method of the model on the test data.
+
+        :param method: The name of the model method, predict or
+            predict_proba.
+        :type method: str
+        :param dataset: The test images or their base64 encoding.
+        :type dataset: numpy.ndarray or pandas.DataFrame
+        :return: The output of the model method.
+        :rtype: numpy.ndarray or list
+        """
+        if method not in self._model_outputs:
+            self._model_outputs[method] = getattr(
+                self._wrapped_model, method)(dataset)
+        return self._model_outputs[method]
+
     def get_data(self):
         """Get all data as RAIInsightsData object
 
+        The data is memoized until the error analysis manager computes new
+        results or refresh_model_outputs is called, so that the images are
+        not predicted and encoded again on every call. Each call returns a
+        shallow copy of the memoized data and of its dataset, so their
+        fields can be reassigned, but the lists they hold and the results
+        are shared between the calls and must not be modified in place.
+
         :return: Model Analysis Data
         :rtype: RAIInsightsData
         """
-        data = RAIInsightsData()
-        dataset = self._get_dataset()
-        data.dataset = dataset
-        data.errorAnalysisData = self.error_analysis.get_data()
-        return data
+        data_cache_key = self._get_data_cache_key({
+            ManagerNames.ERROR_ANALYSIS: self.error_analysis})
+        if self._data_cache is None or \
+                self._data_cache_key != data_cache_key:
+            data = RAIInsightsData()
+            data.dataset = self._get_dataset()
+            data.errorAnalysisData = self.error_analysis.get_data()
+            self._data_cache = data
+            self._data_cache_key = data_cache_key
+        return self._copy_data_cache()
 
     def _get_dataset(self):
         dashboard_dataset = Dataset()
@@ -601,7 +645,7 @@ class RAIVisionInsights(RAIBaseInsights):
         predicted_y = None
         if dataset is not None and self._wrapped_model is not None:
             try:
-                predicted_y = self._wrapped_model.predict(dataset)
+                predicted_y = self._get_model_output(SKLearn.PREDICT, dataset)
             except Exception as ex:
                 msg = ('Model does not support predict method for given '
                        'dataset type')
@@ -906,7 +950,7 @@ class RAIVisionInsights(RAIBaseInsights):
                 self.test, self.image_mode, self._transformations
             )
 
-        predict_output = self._wrapped_model.predict(test)
+        predict_output = self._get_model_output(SKLearn.PREDICT, test)
         if type(predict_output) is not list:
             predict_output = predict_output.tolist()
 
@@ -1102,6 +1146,7 @@ class RAIVisionInsights(RAIBaseInsights):
                                          device=inst.device)
         inst.automl_image_model = is_automl_image_model(inst._wrapped_model)
         inst.predict_output = None
+        inst._init_data_cache()
         return inst
 
     def compute_object_detection_metrics(
@@ -332,7 +332,11 @@ def run_rai_insights(model, test_data, target_column,
         rai_insights.error_analysis.add()
     if test_explainer or test_error_analysis:
         rai_insights.compute()
-    rai_insights.get_data()
+    data = rai_insights.get_data()
+    # the data is memoized until the managers compute new results
+    same_data = rai_insights.get_data()
+    assert same_data.dataset is not data.dataset
+    assert same_data.errorAnalysisData is data.errorAnalysisData
     # Validate
     validate_rai_vision_insights(
         rai_insights, test_data,